@@ -0,0 +1,110 @@
+"""
+发布流程基准测试的公共夹具
+
+用 FakeXhsClient 替换 xhs 客户端，在临时目录中创建账号和数据目录，关闭限流、
+上传去重和媒体缓存，使每轮测量都完整走过下载、预检、上传和创建笔记。
+指定 --replay-cassette 时改用真实的 xhs 客户端，由录制的 cassette 回放响应
+"""
+
+import os
+import tempfile
+from contextlib import ExitStack
+from unittest import mock
+
+import pytest
+from fake_xhs import FakeLatency, FakeXhsClient, MediaServer
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.devtools.media import make_jpeg
+
+COOKIE = "a1=bench_a1; web_session=bench_session; webId=bench_web_id"
+ACCOUNTS = ("bench-1", "bench-2")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--fake-latency",
+        type=float,
+        default=1.0,
+        help="FakeXhsClient 模拟延迟（或回放耗时）的倍数，0 为不等待，只测量本地开销",
+    )
+    parser.addoption(
+        "--replay-cassette",
+        default=None,
+        help="用真实的 xhs 客户端回放该 cassette 中录制的响应，代替 FakeXhsClient",
+    )
+
+
+@pytest.fixture(scope="session")
+def bench_env(request):
+    """账号、数据目录和配置，整个会话共用"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cookie_dir = os.path.join(tmp, "cookies")
+        os.makedirs(cookie_dir)
+        for account in ACCOUNTS:
+            with open(os.path.join(cookie_dir, f"{account}.cookie"), "w") as f:
+                f.write(COOKIE)
+        overrides = {
+            "xhs_cookie_dir": cookie_dir,
+            "data_dir": os.path.join(tmp, "data"),
+            "publish_workers": 16,
+            "rate_limit_publish": "0",
+            "rate_limit_read": "0",
+            "rate_limit_auth": "0",
+            "upload_index_ttl": 0,
+            "media_cache_max_mb": 0,
+            "image_normalize": False,
+            "session_check_interval": 0,
+            "cookie_reload_interval": 0,
+            "trace_slow_ms": 0,
+            "metrics_path": None,
+            "trace_export_path": None,
+        }
+        scale = request.config.getoption("fake_latency")
+        cassette = request.config.getoption("replay_cassette")
+        if cassette:
+            overrides["cassette_replay"] = cassette
+            overrides["cassette_time_scale"] = scale
+        FakeXhsClient.reset(FakeLatency(scale=scale))
+        with ExitStack() as stack:
+            stack.enter_context(mock.patch.dict(config._config, overrides))
+            if not cassette:
+                stack.enter_context(
+                    mock.patch(
+                        "mcp_xhs_publisher.services.xhs_client.XhsClient",
+                        FakeXhsClient,
+                    )
+                )
+            yield tmp
+
+
+@pytest.fixture(scope="session")
+def executor(bench_env):
+    """使用替身客户端的 PublishExecutor"""
+    from mcp_xhs_publisher.tools.publish_executor import PublishExecutor
+
+    return PublishExecutor()
+
+
+@pytest.fixture(scope="session")
+def media_server():
+    """本地图片服务器"""
+    server = MediaServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture(scope="session")
+def image_file(bench_env):
+    """按大小生成本地 JPEG，同一大小只生成一次"""
+    paths = {}
+
+    def make(size: int) -> str:
+        if size not in paths:
+            path = os.path.join(bench_env, f"image-{size}.jpg")
+            with open(path, "wb") as f:
+                f.write(make_jpeg(size))
+            paths[size] = path
+        return paths[size]
+
+    return make
@@ -0,0 +1,182 @@
+"""
+基准测试用的小红书替身
+
+FakeXhsClient 实现发布流程用到的 XhsClient 方法，按 FakeLatency 模拟每个接口的延迟和上传带宽，
+不访问网络；MediaServer 在本地提供指定大小的 JPEG，用于测量远程图片下载
+"""
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from mcp_xhs_publisher.devtools.media import make_jpeg
+
+# 上传时每次读取的字节数，与真实客户端流式上传相近
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class FakeLatency:
+    """
+    各接口的模拟延迟（秒）
+
+    默认值取自实际发布时的量级；scale 为 0 时不等待，只测量本地开销
+    """
+
+    permit: float = 0.02
+    upload: float = 0.03
+    # 上传带宽（字节/秒），0 为不限
+    upload_bandwidth: float = 50 * 1024 * 1024
+    create_note: float = 0.08
+    read: float = 0.03
+    scale: float = 1.0
+
+    def wait(self, seconds: float) -> None:
+        """按比例等待"""
+        if seconds > 0 and self.scale > 0:
+            time.sleep(seconds * self.scale)
+
+
+class _Response:
+    """上传接口的响应，只提供发布流程读取的字段"""
+
+    ok = True
+    status_code = 200
+
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class FakeXhsClient:
+    """
+    XhsClient 替身
+
+    所有实例共享 latency 和调用计数，通过类属性配置；替换
+    mcp_xhs_publisher.services.xhs_client.XhsClient 后由账号池照常创建
+    """
+
+    latency = FakeLatency()
+    _ids = itertools.count(1)
+    _lock = threading.Lock()
+    calls: Dict[str, int] = {}
+    uploaded_bytes = 0
+
+    def __init__(self, cookie: Optional[str] = None, **kwargs: Any):
+        self.cookie = cookie
+
+    @classmethod
+    def reset(cls, latency: Optional[FakeLatency] = None) -> None:
+        """清空调用计数，可同时替换延迟配置"""
+        with cls._lock:
+            cls.calls = {}
+            cls.uploaded_bytes = 0
+        if latency is not None:
+            cls.latency = latency
+
+    @classmethod
+    def _count(cls, name: str, nbytes: int = 0) -> int:
+        with cls._lock:
+            cls.calls[name] = cls.calls.get(name, 0) + 1
+            cls.uploaded_bytes += nbytes
+            return next(cls._ids)
+
+    def get_self_info(self) -> Dict[str, Any]:
+        self._count("get_self_info")
+        self.latency.wait(self.latency.read)
+        return {"nickname": "bench", "user_id": "bench"}
+
+    def get_note_by_id(self, note_id: str) -> Dict[str, Any]:
+        self._count("get_note_by_id")
+        self.latency.wait(self.latency.read)
+        return {"note_id": note_id, "title": "bench", "desc": "bench"}
+
+    def get_upload_files_permit(self, file_type: str, count: int = 1) -> tuple:
+        n = self._count("get_upload_files_permit")
+        self.latency.wait(self.latency.permit)
+        return f"{file_type}-{n}", "token"
+
+    def upload_file(
+        self,
+        file_id: str,
+        token: str,
+        file_path: str,
+        content_type: str = "image/jpeg",
+    ) -> _Response:
+        size = 0
+        with open(file_path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                size += len(chunk)
+        self._count("upload_file", size)
+        bandwidth = self.latency.upload_bandwidth
+        self.latency.wait(self.latency.upload + (size / bandwidth if bandwidth else 0))
+        return _Response({"X-Ros-Video-Id": f"video-{file_id}"})
+
+    def get_video_first_frame_image_id(self, video_id: str) -> str:
+        self._count("get_video_first_frame_image_id")
+        self.latency.wait(self.latency.read)
+        return f"frame-{video_id}"
+
+    def create_note(self, **kwargs: Any) -> Dict[str, Any]:
+        n = self._count("create_note")
+        self.latency.wait(self.latency.create_note)
+        return {"id": f"note-{n}"}
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """/<字节数>/<任意名称>.jpg 返回对应大小的 JPEG"""
+
+    _bodies: Dict[int, bytes] = {}
+    _bodies_lock = threading.Lock()
+
+    def do_GET(self):
+        try:
+            size = int(self.path.strip("/").split("/")[0])
+        except ValueError:
+            self.send_error(404)
+            return
+        with self._bodies_lock:
+            body = self._bodies.get(size)
+            if body is None:
+                body = self._bodies[size] = make_jpeg(size)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MediaServer:
+    """在后台线程运行的本地图片服务器"""
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+        self.server.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self._names = itertools.count(1)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, size: int) -> str:
+        """
+        返回指定大小图片的链接，每次名称不同
+
+        Args:
+            size: 图片字节数
+
+        Returns:
+            str: 图片链接
+        """
+        return f"{self.base}/{size}/{next(self._names)}.jpg"
+
+    def close(self) -> None:
+        """停止服务器"""
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,96 @@
+"""
+冷启动基准测试
+
+在独立进程中多次启动服务器（导入入口模块并创建 MCP 服务器），统计到服务器就绪的耗时，
+用于发现启动时间的回退。
+
+用法：
+    $ python benchmarks/startup.py --runs 10
+    $ python benchmarks/startup.py --runs 10 --max-ms 900  # 中位数超过阈值时返回非零
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# 子进程中执行：计时到 create_mcp_server 返回，并记录已导入的重量级模块
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from mcp_xhs_publisher.__main__ import create_mcp_server
+imported = time.perf_counter()
+create_mcp_server()
+ready = time.perf_counter()
+heavy = [m for m in ("xhs", "requests") if m in sys.modules]
+print(json.dumps({"import": imported - start, "ready": ready - start, "heavy": heavy}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    """启动一次服务器并返回耗时（秒）"""
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="服务器冷启动基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="启动次数")
+    parser.add_argument(
+        "--max-ms", type=float, default=0, help="就绪耗时中位数上限（毫秒），0 为不检查"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cookie_dir = os.path.join(tmp, "cookies")
+        os.makedirs(cookie_dir)
+        with open(os.path.join(cookie_dir, "bench.cookie"), "w") as f:
+            f.write("a1=bench; web_session=bench; webId=bench")
+        src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [os.path.abspath(src), os.environ.get("PYTHONPATH")])
+            ),
+            "XHS_COOKIE_DIR": cookie_dir,
+            "XHS_DATA_DIR": os.path.join(tmp, "data"),
+            # 只测启动，不在后台检查登录状态
+            "XHS_SESSION_CHECK_INTERVAL": "0",
+        }
+        results = [run_once(env) for _ in range(args.runs)]
+
+    ready_ms = [r["ready"] * 1000 for r in results]
+    import_ms = [r["import"] * 1000 for r in results]
+    median = statistics.median(ready_ms)
+    print(
+        json.dumps(
+            {
+                "runs": args.runs,
+                "import_median_ms": round(statistics.median(import_ms), 1),
+                "ready_median_ms": round(median, 1),
+                "ready_min_ms": round(min(ready_ms), 1),
+                "ready_max_ms": round(max(ready_ms), 1),
+                "heavy_modules_at_ready": results[-1]["heavy"],
+            },
+            ensure_ascii=False,
+        )
+    )
+    if args.max_ms and median > args.max_ms:
+        print(
+            f"启动耗时中位数 {median:.1f}ms 超过上限 {args.max_ms}ms", file=sys.stderr
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
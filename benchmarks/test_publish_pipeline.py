@@ -0,0 +1,209 @@
+"""
+发布流程基准测试
+
+在不同并发数和图片大小下测量 PublishExecutor 和 MCP 工具处理器发布一批笔记的耗时，
+附带吞吐量、单篇延迟分位数和内存峰值。
+
+用法：
+    $ pip install -e ".[mcp,bench]"
+    $ pytest benchmarks --benchmark-autosave                  # 保存基线
+    $ pytest benchmarks --benchmark-compare \\
+          --benchmark-compare-fail=mean:25%                   # 与最近的基线比较，回退时失败
+    $ pytest benchmarks --fake-latency 0                      # 只测量本地开销
+    $ pytest benchmarks --replay-cassette xhs.jsonl.gz        # 回放录制的真实流量
+"""
+
+import asyncio
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fake_xhs import FakeXhsClient
+
+from mcp_xhs_publisher.models.tool_io_schemas import (
+    PublishImageInput,
+    PublishTextInput,
+)
+from mcp_xhs_publisher.services.cassette import get_cassette_player
+
+KB = 1024
+MB = 1024 * 1024
+SIZES = {"64KB": 64 * KB, "1MB": MB, "8MB": 8 * MB}
+IMAGES_PER_NOTE = 3
+# 每轮发布的笔记数为并发数的倍数，使每个工作线程都处理多篇
+NOTES_PER_WORKER = 4
+# Python 分配的内存峰值上限：固定开销加每个并发发布的开销，不应随图片大小增长
+MEMORY_BASE = 16 * MB
+MEMORY_PER_WORKER = 3 * MB
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _record(benchmark, notes, latencies, peak):
+    """记录吞吐量、单篇延迟和内存峰值；--benchmark-disable 时只执行一次、没有统计，不记录"""
+    if benchmark.disabled:
+        return
+    mean = benchmark.stats.stats.mean
+    benchmark.extra_info.update(
+        {
+            "notes": notes,
+            "notes_per_second": round(notes / mean, 2),
+            "latency_p50_ms": round(statistics.median(latencies) * 1000, 1),
+            "latency_p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+            "peak_memory_mb": round(peak / MB, 2),
+            "upstream_calls": dict(FakeXhsClient.calls),
+        }
+    )
+    player = get_cassette_player()
+    if player is not None:
+        benchmark.extra_info["replayed_exchanges"] = player.served
+
+
+def _peak_memory(fn):
+    """执行一次 fn 并返回 Python 分配的内存峰值（字节）"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _run_executor(benchmark, publish, make_params, concurrency):
+    """用 concurrency 个线程发布一批笔记，每轮参数重新生成"""
+    notes = concurrency * NOTES_PER_WORKER
+    latencies = []
+
+    def publish_one(params):
+        start = time.perf_counter()
+        response = publish(params)
+        latencies.append(time.perf_counter() - start)
+        assert response.status == "success", response.error
+        return response
+
+    def batch():
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(publish_one, [make_params() for _ in range(notes)]))
+
+    FakeXhsClient.reset()
+    benchmark.pedantic(batch, rounds=3, warmup_rounds=1)
+    peak = _peak_memory(batch)
+    _record(benchmark, notes, latencies, peak)
+    assert peak < MEMORY_BASE + concurrency * MEMORY_PER_WORKER
+
+
+@pytest.mark.parametrize("concurrency", [1, 4, 16])
+def test_executor_text(benchmark, executor, concurrency):
+    """纯文本笔记：只有预检和创建笔记"""
+    benchmark.group = "executor-text"
+    _run_executor(
+        benchmark,
+        executor.publish_text,
+        lambda: PublishTextInput(content="基准测试", topics=["bench"]),
+        concurrency,
+    )
+
+
+@pytest.mark.parametrize("concurrency", [1, 4, 16])
+@pytest.mark.parametrize("size", list(SIZES))
+def test_executor_image_local(benchmark, executor, image_file, size, concurrency):
+    """本地图片：预检、上传和创建笔记"""
+    benchmark.group = f"executor-image-local-{size}"
+    path = image_file(SIZES[size])
+    _run_executor(
+        benchmark,
+        executor.publish_image,
+        lambda: PublishImageInput(
+            content="基准测试", image_paths=[path] * IMAGES_PER_NOTE
+        ),
+        concurrency,
+    )
+
+
+@pytest.mark.parametrize("concurrency", [1, 4, 16])
+@pytest.mark.parametrize("size", ["64KB", "1MB"])
+def test_executor_image_remote(benchmark, executor, media_server, size, concurrency):
+    """远程图片：每篇笔记的图片都从本地服务器重新下载"""
+    benchmark.group = f"executor-image-remote-{size}"
+    _run_executor(
+        benchmark,
+        executor.publish_image,
+        lambda: PublishImageInput(
+            content="基准测试",
+            image_paths=[media_server.url(SIZES[size]) for _ in range(IMAGES_PER_NOTE)],
+        ),
+        concurrency,
+    )
+
+
+@pytest.fixture(scope="module")
+def server(executor):
+    """注册了全部工具的 MCP 服务器"""
+    from mcp.server.fastmcp import FastMCP
+
+    from mcp_xhs_publisher.tools.tool_registry import ToolRegistry
+
+    registry = ToolRegistry(executor)
+    mcp_server = FastMCP(name="bench")
+    registry.register_tools(mcp_server)
+    yield mcp_server
+    registry.shutdown()
+
+
+def _run_tool(benchmark, server, tool, make_arguments, concurrency):
+    """同时发起 concurrency 个工具调用，共发布一批笔记"""
+    notes = concurrency * NOTES_PER_WORKER
+    latencies = []
+
+    async def call(arguments, slots):
+        async with slots:
+            start = time.perf_counter()
+            _, result = await server.call_tool(tool, arguments)
+            latencies.append(time.perf_counter() - start)
+        assert result["result"]["status"] == "success", result
+
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(call(make_arguments(), slots) for _ in range(notes)))
+
+    def batch():
+        asyncio.run(run())
+
+    FakeXhsClient.reset()
+    benchmark.pedantic(batch, rounds=3, warmup_rounds=1)
+    peak = _peak_memory(batch)
+    _record(benchmark, notes, latencies, peak)
+    assert peak < MEMORY_BASE + concurrency * MEMORY_PER_WORKER
+
+
+@pytest.mark.parametrize("concurrency", [1, 4, 16])
+def test_tool_publish_text(benchmark, server, concurrency):
+    """publish_text 工具：参数解析、工作线程池调度和结果序列化"""
+    benchmark.group = "tool-text"
+    _run_tool(
+        benchmark,
+        server,
+        "publish_text",
+        lambda: {"content": "基准测试", "topics": ["bench"]},
+        concurrency,
+    )
+
+
+@pytest.mark.parametrize("concurrency", [1, 4, 16])
+@pytest.mark.parametrize("size", ["64KB", "1MB"])
+def test_tool_publish_image(benchmark, server, image_file, size, concurrency):
+    """publish_image 工具：本地图片"""
+    benchmark.group = f"tool-image-{size}"
+    path = image_file(SIZES[size])
+    _run_tool(
+        benchmark,
+        server,
+        "publish_image",
+        lambda: {"content": "基准测试", "image_paths": [path] * IMAGES_PER_NOTE},
+        concurrency,
+    )
@@ -12,6 +12,7 @@ from mcp.server.fastmcp import FastMCP
 import mcp_xhs_publisher.ready_flag as ready_flag
 
 from .config import config
+from .server_workers import current_shard, run_worker, serve_workers
 from .tools.tool_registry import ToolRegistry
 from .util.logging import log_error, log_info, setup_logger
 
@@ -33,12 +34,15 @@ def create_mcp_server() -> FastMCP:
         server_description = (
             "小红书自动发布MCP服务器，提供将内容发布到小红书平台的能力。"
             "支持发布纯文本、图文和视频笔记，以及查询笔记和用户信息。"
-            "所有操作均无需账号参数，扫码登录后自动管理cookie。"
+            "账号参数可选，未指定时自动在cookie目录中的账号之间调度。"
             "此服务器允许大模型直接与小红书平台交互，自动创建和发布内容。"
         )
-        mcp_server = FastMCP(name=server_name, instructions=server_description)
+        mcp_server = FastMCP(
+            **config.get_server_options(), instructions=server_description
+        )
         registry = ToolRegistry()
         registry.register_tools(mcp_server)
+        registry.start()
         logger.info(f"MCP服务器创建成功: {server_name}")
         ready_flag.SERVER_READY = True
         logger.info("MCP服务器初始化完成，已准备好接收请求")
@@ -54,21 +58,29 @@ def create_mcp_server() -> FastMCP:
 
 
 def start_server() -> None:
-    """启动MCP服务器"""
+    """
+    启动MCP服务器
+
+    传输方式由 transport 配置选择（stdio、sse 或 streamable-http），后两者监听 host 和 port；
+    server_workers 大于 1 时当前进程只负责管理子进程，由子进程共享监听套接字提供服务
+    """
     try:
+        transport = config.get_transport()
+        shard = current_shard()
+        workers = config.get_int("server_workers", 1)
+        if workers > 1 and shard is None:
+            sys.exit(serve_workers(workers))
+
         # 创建服务器
         mcp_server = create_mcp_server()
 
-        # 固定使用stdio模式
-        # transport_mode = "sse"  # 原先用变量，类型检查不通过
-
         # 只在命令行交互模式下输出日志到终端
         in_mcp_mode = not sys.stdout.isatty()
         if not in_mcp_mode:
             # 在终端模式下，输出结构化信息
             log_info(
                 "MCP XHS Publisher 服务器启动成功",
-                transport="sse",
+                transport=transport,
                 tools=[
                     "login_phone: 发送手机验证码 (必需，提供phone参数)",
                     "verify_code: 验证手机验证码完成登录 (必需，提供phone和code参数)",
@@ -82,11 +94,13 @@ def start_server() -> None:
             )
         else:
             # 在MCP模式下，只记录到日志文件，不输出到标准输出或标准错误
-            log_info("MCP XHS Publisher 服务器启动", transport="sse")
+            log_info("MCP XHS Publisher 服务器启动", transport=transport)
 
-        # 运行MCP服务器 - 使用stdio传输模式
-        # 使用字面量字符串，满足类型检查
-        mcp_server.run(transport="sse")
+        if shard is not None:
+            # 多进程运行的子进程：在主进程创建的监听套接字上提供服务
+            run_worker(mcp_server, shard)
+        else:
+            mcp_server.run(transport=transport)
 
     except ImportError:
         # 日志会输出到文件而不是stderr，避免干扰MCP通信
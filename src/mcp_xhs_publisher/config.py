@@ -31,6 +31,9 @@ class Config:
     # 配置项敏感度标记，用于日志和错误处理
     SENSITIVE_KEYS = ["xhs_sign_url", "cookie", "xhs_account"]  # 账号作为敏感信息
 
+    # 支持的MCP传输方式
+    TRANSPORTS = ("stdio", "sse", "streamable-http")
+
     def __init__(self, config_file: Optional[str] = None):
         """
         初始化配置管理类
@@ -83,14 +86,70 @@ class Config:
         遵循MCP服务器指南建议，支持通过环境变量进行配置，适用于容器化部署
         """
         # MCP服务器配置
-        env_mapping = {"MCP_LOG_LEVEL": "log_level", "XHS_COOKIE_DIR": "xhs_cookie_dir"}
+        env_mapping = {
+            "MCP_LOG_LEVEL": "log_level",
+            "XHS_COOKIE_DIR": "xhs_cookie_dir",
+            "XHS_PUBLISH_WORKERS": "publish_workers",
+            "XHS_QUERY_WORKERS": "query_workers",
+            "XHS_DOWNLOAD_WORKERS": "download_workers",
+            "XHS_DOWNLOAD_PER_HOST": "download_per_host",
+            "XHS_DOWNLOAD_TIMEOUT": "download_timeout",
+            "XHS_DATA_DIR": "data_dir",
+            "XHS_MEDIA_CACHE_MAX_MB": "media_cache_max_mb",
+            "XHS_MEDIA_CACHE_TTL": "media_cache_ttl",
+            "XHS_VIDEO_DOWNLOAD_SEGMENTS": "video_download_segments",
+            "XHS_VIDEO_SEGMENT_MIN_MB": "video_segment_min_mb",
+            "XHS_JOB_WORKERS": "job_workers",
+            "XHS_JOB_MAX_ATTEMPTS": "job_max_attempts",
+            "XHS_BATCH_CONCURRENCY": "batch_concurrency",
+            "XHS_BATCH_PREFETCH": "batch_prefetch",
+            "XHS_RATE_LIMIT_PUBLISH": "rate_limit_publish",
+            "XHS_RATE_LIMIT_READ": "rate_limit_read",
+            "XHS_RATE_LIMIT_AUTH": "rate_limit_auth",
+            "XHS_RETRY_MAX_ATTEMPTS": "retry_max_attempts",
+            "XHS_RETRY_BASE_DELAY": "retry_base_delay",
+            "XHS_RETRY_MAX_DELAY": "retry_max_delay",
+            "XHS_RETRY_DEADLINE": "retry_deadline",
+            "XHS_BREAKER_FAILURE_THRESHOLD": "breaker_failure_threshold",
+            "XHS_BREAKER_RESET_TIMEOUT": "breaker_reset_timeout",
+            "XHS_NOTE_CACHE_SIZE": "note_cache_size",
+            "XHS_NOTE_CACHE_TTL": "note_cache_ttl",
+            "XHS_NOTE_CACHE_STALE": "note_cache_stale",
+            "XHS_FETCH_CONCURRENCY": "fetch_concurrency",
+            "XHS_SESSION_CHECK_INTERVAL": "session_check_interval",
+            "XHS_SESSION_CACHE_TTL": "session_cache_ttl",
+            "XHS_COOKIE_RELOAD_INTERVAL": "cookie_reload_interval",
+            "XHS_LOG_MAX_BYTES": "log_max_bytes",
+            "XHS_LOG_ROTATE_INTERVAL": "log_rotate_interval",
+            "XHS_LOG_BACKUP_COUNT": "log_backup_count",
+            "XHS_LOG_FLUSH_INTERVAL": "log_flush_interval",
+            "XHS_IMAGE_NORMALIZE": "image_normalize",
+            "XHS_IMAGE_MAX_EDGE": "image_max_edge",
+            "XHS_IMAGE_QUALITY": "image_quality",
+            "XHS_IMAGE_WORKERS": "image_workers",
+            "XHS_UPLOAD_INDEX_TTL": "upload_index_ttl",
+            "XHS_METRICS_PATH": "metrics_path",
+            "XHS_TRACE_SLOW_MS": "trace_slow_ms",
+            "XHS_TRACE_EXPORT_PATH": "trace_export_path",
+            "XHS_API_BASE": "api_base",
+            "XHS_CASSETTE_RECORD": "cassette_record",
+            "XHS_CASSETTE_REPLAY": "cassette_replay",
+            "XHS_CASSETTE_TIME_SCALE": "cassette_time_scale",
+            "XHS_CASSETTE_MAX_BODY": "cassette_max_body",
+            "XHS_TRANSPORT": "transport",
+            "XHS_HOST": "host",
+            "XHS_PORT": "port",
+            "XHS_SERVER_WORKERS": "server_workers",
+            "XHS_SCHEDULE_LEAD_TIME": "schedule_lead_time",
+            "XHS_SCHEDULE_WORKERS": "schedule_workers",
+        }
 
         for env_name, config_key in env_mapping.items():
             if env_name in os.environ:
                 value = os.environ[env_name]
 
                 # 对于路径配置，展开~为用户主目录
-                if env_name == "XHS_COOKIE_DIR" and "~" in value:
+                if env_name in ("XHS_COOKIE_DIR", "XHS_DATA_DIR") and "~" in value:
                     value = os.path.expanduser(value)
 
                 self._config[config_key] = value
@@ -129,12 +188,68 @@ class Config:
             key: 参数名
             value: 参数值
         """
-        key_map = {"log-level": "log_level", "cookie-dir": "xhs_cookie_dir"}
+        key_map = {
+            "log-level": "log_level",
+            "cookie-dir": "xhs_cookie_dir",
+            "publish-workers": "publish_workers",
+            "query-workers": "query_workers",
+            "download-workers": "download_workers",
+            "download-per-host": "download_per_host",
+            "download-timeout": "download_timeout",
+            "data-dir": "data_dir",
+            "media-cache-max-mb": "media_cache_max_mb",
+            "media-cache-ttl": "media_cache_ttl",
+            "video-download-segments": "video_download_segments",
+            "video-segment-min-mb": "video_segment_min_mb",
+            "job-workers": "job_workers",
+            "job-max-attempts": "job_max_attempts",
+            "batch-concurrency": "batch_concurrency",
+            "batch-prefetch": "batch_prefetch",
+            "rate-limit-publish": "rate_limit_publish",
+            "rate-limit-read": "rate_limit_read",
+            "rate-limit-auth": "rate_limit_auth",
+            "retry-max-attempts": "retry_max_attempts",
+            "retry-base-delay": "retry_base_delay",
+            "retry-max-delay": "retry_max_delay",
+            "retry-deadline": "retry_deadline",
+            "breaker-failure-threshold": "breaker_failure_threshold",
+            "breaker-reset-timeout": "breaker_reset_timeout",
+            "note-cache-size": "note_cache_size",
+            "note-cache-ttl": "note_cache_ttl",
+            "note-cache-stale": "note_cache_stale",
+            "fetch-concurrency": "fetch_concurrency",
+            "session-check-interval": "session_check_interval",
+            "session-cache-ttl": "session_cache_ttl",
+            "cookie-reload-interval": "cookie_reload_interval",
+            "log-max-bytes": "log_max_bytes",
+            "log-rotate-interval": "log_rotate_interval",
+            "log-backup-count": "log_backup_count",
+            "log-flush-interval": "log_flush_interval",
+            "image-normalize": "image_normalize",
+            "image-max-edge": "image_max_edge",
+            "image-quality": "image_quality",
+            "image-workers": "image_workers",
+            "upload-index-ttl": "upload_index_ttl",
+            "metrics-path": "metrics_path",
+            "trace-slow-ms": "trace_slow_ms",
+            "trace-export-path": "trace_export_path",
+            "api-base": "api_base",
+            "cassette-record": "cassette_record",
+            "cassette-replay": "cassette_replay",
+            "cassette-time-scale": "cassette_time_scale",
+            "cassette-max-body": "cassette_max_body",
+            "transport": "transport",
+            "host": "host",
+            "port": "port",
+            "server-workers": "server_workers",
+            "schedule-lead-time": "schedule_lead_time",
+            "schedule-workers": "schedule_workers",
+        }
 
         config_key = key_map.get(key, key)
 
         # 对于路径配置，展开~为用户主目录
-        if key == "cookie-dir" and "~" in value:
+        if key in ("cookie-dir", "data-dir") and "~" in value:
             value = os.path.expanduser(value)
 
         self._config[config_key] = value
@@ -165,6 +280,11 @@ class Config:
                 self._config["xhs_cookie_dir"]
             )
 
+        # 数据目录存放媒体缓存等持久化数据
+        self._config["data_dir"] = os.path.expanduser(
+            self._config.get("data_dir") or "~/.mcp_xhs_publisher"
+        )
+
     def get(self, key: str, default: Any = None) -> Any:
         """
         获取配置项
@@ -181,6 +301,60 @@ class Config:
             return self.SERVER_NAME
         return self._config.get(key, default)
 
+    def get_int(self, key: str, default: int) -> int:
+        """
+        获取整数类型的配置项
+
+        环境变量和命令行参数均为字符串，此处统一转换；无法转换时返回默认值
+
+        Args:
+            key: 配置项名称
+            default: 默认值
+
+        Returns:
+            int: 配置项的整数值
+        """
+        value = self.get(key, default)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            logging.warning(f"配置项 {key} 不是有效整数: {value}，使用默认值 {default}")
+            return default
+
+    def get_float(self, key: str, default: float) -> float:
+        """
+        获取浮点数类型的配置项
+
+        Args:
+            key: 配置项名称
+            default: 默认值
+
+        Returns:
+            float: 配置项的浮点数值，无法转换时返回默认值
+        """
+        value = self.get(key, default)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            logging.warning(f"配置项 {key} 不是有效数字: {value}，使用默认值 {default}")
+            return default
+
+    def get_bool(self, key: str, default: bool) -> bool:
+        """
+        获取布尔类型的配置项
+
+        Args:
+            key: 配置项名称
+            default: 默认值
+
+        Returns:
+            bool: "1"、"true"、"yes"、"on"（不区分大小写）为 True，其余字符串为 False
+        """
+        value = self.get(key, default)
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+
     def get_log_level(self) -> int:
         """
         获取日志级别
@@ -230,14 +404,38 @@ class Config:
         config_dict["server_name"] = self.SERVER_NAME
         return config_dict
 
+    def get_transport(self) -> str:
+        """
+        获取MCP传输方式
+
+        Returns:
+            str: stdio、sse 或 streamable-http，默认 sse
+
+        Raises:
+            ValueError: 配置了不支持的传输方式
+        """
+        transport = str(self.get("transport") or "sse").lower()
+        if transport not in self.TRANSPORTS:
+            raise ValueError(
+                f"不支持的传输方式: {transport}，可选 {', '.join(self.TRANSPORTS)}"
+            )
+        return transport
+
     def get_server_options(self) -> Dict[str, Any]:
         """
         获取MCP服务器选项
 
+        多进程运行时各进程之间不共享会话，streamable-http 使用无状态模式
+
         Returns:
             Dict[str, Any]: 服务器配置选项字典
         """
-        return {"name": self.SERVER_NAME}
+        return {
+            "name": self.SERVER_NAME,
+            "host": self.get("host") or "127.0.0.1",
+            "port": self.get_int("port", 8000),
+            "stateless_http": self.get_int("server_workers", 1) > 1,
+        }
 
 
 # 全局配置实例
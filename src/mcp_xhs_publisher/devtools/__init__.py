@@ -0,0 +1,5 @@
+"""
+开发与压测工具包
+
+此包包含本地小红书替身服务器、负载生成器和测试媒体生成函数，不在服务器运行时导入
+"""
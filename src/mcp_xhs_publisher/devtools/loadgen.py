@@ -0,0 +1,392 @@
+"""
+MCP 负载生成器
+
+连接运行中的 SSE 服务器，按配置的比例并发调用 publish_* 工具和读取资源，
+结束后输出吞吐量、各操作的 p50/p95/p99 延迟和按原因分类的错误数。
+服务器与本工具需在同一台机器上运行：发布用的图片和视频写入本地临时目录后以路径传给服务器。
+
+用法：
+    $ python -m mcp_xhs_publisher.devtools.xhs_standin --port 8900 &
+    $ XHS_API_BASE=http://127.0.0.1:8900 mcp-xhs-publisher &
+    $ python -m mcp_xhs_publisher.devtools.loadgen --url http://127.0.0.1:8000/sse \\
+          --concurrency 8 --duration 60 \\
+          --mix publish_text=5,publish_image=3,publish_video=1,read_note=2,read_user=1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .media import make_jpeg, make_mp4
+
+OPERATIONS = (
+    "publish_text",
+    "publish_image",
+    "publish_video",
+    "read_note",
+    "read_user",
+)
+DEFAULT_MIX = "publish_text=5,publish_image=3,publish_video=1,read_note=2,read_user=1"
+# 错误原因的最大长度，超出部分截断以便归类
+MAX_REASON_LENGTH = 80
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    解析 "操作=权重,操作=权重" 格式的操作比例
+
+    Args:
+        spec: 比例字符串
+
+    Returns:
+        Dict[str, float]: 操作名到权重，只包含权重大于 0 的操作
+
+    Raises:
+        ValueError: 操作名或权重无效
+    """
+    mix: Dict[str, float] = {}
+    for item in filter(None, spec.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"未知操作: {name}，可选 {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+    if not mix:
+        raise ValueError("操作比例为空")
+    return mix
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    计算分位数（最近秩）
+
+    Args:
+        values: 已排序的数值
+        q: 分位点，0~1
+
+    Returns:
+        float: 分位数，values 为空时返回 0
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(q * len(values) + 0.5) - 1))]
+
+
+@dataclass
+class LoadReport:
+    """按操作汇总的请求延迟和错误"""
+
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    def record(self, operation: str, seconds: float, error: Optional[str]) -> None:
+        """
+        记录一次请求
+
+        Args:
+            operation: 操作名
+            seconds: 耗时（秒）
+            error: 失败原因，成功时为None
+        """
+        self.latencies.setdefault(operation, []).append(seconds)
+        if error is not None:
+            key = f"{operation}: {error[:MAX_REASON_LENGTH]}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        汇总结果
+
+        Returns:
+            Dict[str, Any]: 总耗时、请求数、吞吐量（次/秒），整体和各操作的请求数、
+            失败数和延迟分位数（毫秒），以及按失败原因分类的次数
+        """
+        elapsed = (self.finished or time.perf_counter()) - self.started
+
+        def stats(values: List[float], errors: int) -> Dict[str, Any]:
+            ordered = sorted(values)
+            return {
+                "requests": len(ordered),
+                "errors": errors,
+                "throughput": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": (
+                    round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0
+                ),
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+            }
+
+        errors_by_operation: Dict[str, int] = {}
+        for key, count in self.errors.items():
+            operation = key.split(":", 1)[0]
+            errors_by_operation[operation] = (
+                errors_by_operation.get(operation, 0) + count
+            )
+        every = [s for values in self.latencies.values() for s in values]
+        return {
+            "elapsed": round(elapsed, 3),
+            "overall": stats(every, sum(self.errors.values())),
+            "operations": {
+                op: stats(values, errors_by_operation.get(op, 0))
+                for op, values in sorted(self.latencies.items())
+            },
+            "errors": dict(sorted(self.errors.items(), key=lambda kv: -kv[1])),
+        }
+
+
+def tool_error(result: Any) -> Optional[str]:
+    """
+    从工具调用结果中取出失败原因
+
+    Args:
+        result: CallToolResult
+
+    Returns:
+        Optional[str]: 协议错误或 status 为 error 时返回原因，成功返回None
+    """
+    payload = getattr(result, "structuredContent", None)
+    if isinstance(payload, dict) and "result" in payload:
+        payload = payload["result"]
+    if payload is None:
+        for item in getattr(result, "content", None) or []:
+            text = getattr(item, "text", None)
+            if text:
+                try:
+                    payload = json.loads(text)
+                except ValueError:
+                    payload = {"status": "error", "error": text}
+                break
+    if getattr(result, "isError", False):
+        return str((payload or {}).get("error") or payload or "工具调用失败")
+    if isinstance(payload, dict) and payload.get("status") == "error":
+        return str(payload.get("error") or payload.get("message") or "未知错误")
+    return None
+
+
+class LoadGenerator:
+    """
+    负载生成器
+
+    每个工作协程持有一个 MCP 会话，按比例随机选择操作并串行发出请求，
+    直到达到总请求数或持续时间
+    """
+
+    def __init__(
+        self,
+        url: str,
+        mix: Dict[str, float],
+        concurrency: int = 4,
+        duration: float = 30.0,
+        requests: int = 0,
+        image_kb: int = 256,
+        images: int = 3,
+        video_kb: int = 2048,
+        account: Optional[str] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        初始化负载生成器
+
+        Args:
+            url: 服务器的 SSE 地址
+            mix: 操作名到权重
+            concurrency: 并发的会话数
+            duration: 持续时间（秒），requests 大于 0 时忽略
+            requests: 总请求数，0 为按持续时间
+            image_kb: 每张图片的大小（KB）
+            images: 每篇图文笔记的图片数
+            video_kb: 每个视频的大小（KB）
+            account: 发布账号，不指定时由服务器调度
+            seed: 随机种子
+        """
+        self.url = url
+        self.operations = list(mix)
+        self.weights = [mix[op] for op in self.operations]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.image_kb = image_kb
+        self.images = images
+        self.video_kb = video_kb
+        self.account = account
+        self.rng = random.Random(seed)
+        self.report = LoadReport()
+        self.note_ids: List[str] = []
+        self._issued = 0
+        self._deadline = 0.0
+        self._tmp = tempfile.TemporaryDirectory(prefix="xhs-loadgen-")
+
+    def _next(self) -> Optional[str]:
+        """选择下一个操作，已达到请求数或持续时间时返回None"""
+        if self.requests:
+            if self._issued >= self.requests:
+                return None
+        elif time.perf_counter() >= self._deadline:
+            return None
+        self._issued += 1
+        return self.rng.choices(self.operations, self.weights)[0]
+
+    def _media(self, suffix: str, data: bytes) -> str:
+        """写入一次性的媒体文件"""
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self._tmp.name)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return path
+
+    def _arguments(self, operation: str) -> Tuple[Dict[str, Any], List[str]]:
+        """生成工具参数和需要在调用后删除的文件；内容每次不同，不会命中上传去重"""
+        arguments: Dict[str, Any] = {
+            "content": f"负载测试 {self._issued}",
+            "topics": ["loadtest"],
+        }
+        if self.account:
+            arguments["account"] = self.account
+        files: List[str] = []
+        if operation == "publish_image":
+            files = [
+                self._media(".jpg", make_jpeg(self.image_kb * 1024, random=True))
+                for _ in range(self.images)
+            ]
+            arguments["image_paths"] = files
+        elif operation == "publish_video":
+            files = [self._media(".mp4", make_mp4(self.video_kb * 1024, random=True))]
+            arguments["video_path"] = files[0]
+        return arguments, files
+
+    async def _one(self, session: Any, operation: str) -> None:
+        """执行一次操作并记录结果"""
+        files: List[str] = []
+        start = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            if operation == "read_note":
+                note_id = (
+                    self.rng.choice(self.note_ids) if self.note_ids else "loadtest"
+                )
+                await session.read_resource(f"xhs-note://{note_id}")
+            elif operation == "read_user":
+                await session.read_resource("xhs-user://")
+            else:
+                arguments, files = self._arguments(operation)
+                start = time.perf_counter()
+                result = await session.call_tool(operation, arguments)
+                error = tool_error(result)
+                payload = getattr(result, "structuredContent", None) or {}
+                note_id = (payload.get("result") or payload).get("note_id")
+                if error is None and note_id:
+                    self.note_ids.append(note_id)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            self.report.record(operation, time.perf_counter() - start, error)
+            for path in files:
+                os.remove(path)
+
+    async def _worker(self) -> None:
+        """一个会话串行发出请求"""
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
+        async with sse_client(self.url, sse_read_timeout=600) as streams:
+            async with ClientSession(*streams) as session:
+                await session.initialize()
+                while (operation := self._next()) is not None:
+                    await self._one(session, operation)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        运行负载并返回汇总结果
+
+        Returns:
+            Dict[str, Any]: LoadReport.summary 的结果，附带运行参数
+        """
+        try:
+            self.report = LoadReport()
+            self._deadline = time.perf_counter() + self.duration
+            await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+            self.report.finished = time.perf_counter()
+        finally:
+            self._tmp.cleanup()
+        summary = self.report.summary()
+        summary["config"] = {
+            "url": self.url,
+            "concurrency": self.concurrency,
+            "mix": dict(zip(self.operations, self.weights)),
+        }
+        return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MCP 负载生成器")
+    parser.add_argument(
+        "--url", default="http://127.0.0.1:8000/sse", help="服务器的 SSE 地址"
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="并发的会话数")
+    parser.add_argument("--duration", type=float, default=30.0, help="持续时间（秒）")
+    parser.add_argument(
+        "--requests", type=int, default=0, help="总请求数，大于 0 时忽略 --duration"
+    )
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help=f"操作比例，可选操作: {', '.join(OPERATIONS)}",
+    )
+    parser.add_argument(
+        "--image-kb", type=int, default=256, help="每张图片的大小（KB）"
+    )
+    parser.add_argument("--images", type=int, default=3, help="每篇图文笔记的图片数")
+    parser.add_argument(
+        "--video-kb", type=int, default=2048, help="每个视频的大小（KB）"
+    )
+    parser.add_argument("--account", default=None, help="发布账号，默认由服务器调度")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=None,
+        help="失败比例上限，超过时返回非零",
+    )
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    generator = LoadGenerator(
+        url=args.url,
+        mix=mix,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        requests=args.requests,
+        image_kb=args.image_kb,
+        images=args.images,
+        video_kb=args.video_kb,
+        account=args.account,
+        seed=args.seed,
+    )
+    summary = asyncio.run(generator.run())
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    overall = summary["overall"]
+    if args.max_error_rate is not None and overall["requests"]:
+        rate = overall["errors"] / overall["requests"]
+        if rate > args.max_error_rate:
+            print(
+                f"失败比例 {rate:.2%} 超过上限 {args.max_error_rate:.2%}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+测试媒体生成
+
+生成能通过发布前预检的最小 JPEG 和 MP4，按需填充到指定大小
+"""
+
+import os
+import struct
+
+
+def make_jpeg(
+    size: int, width: int = 1080, height: int = 1440, random: bool = False
+) -> bytes:
+    """
+    生成 JPEG：SOF 段给出尺寸，其余用注释段填充到指定大小
+
+    Args:
+        size: 目标字节数，不足最小长度时取最小长度
+        width: 图片宽度
+        height: 图片高度
+        random: 是否用随机字节填充，使每次生成的内容不同
+
+    Returns:
+        bytes: 图片内容
+    """
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x11\0"
+    head = b"\xff\xd8" + sof
+    tail = b"\xff\xda\x00\x02" + b"\0" * 16 + b"\xff\xd9"
+    padding = []
+    remaining = size - len(head) - len(tail)
+    while remaining > 4:
+        n = min(remaining - 4, 0xFFFF - 2)
+        filler = os.urandom(n) if random else b"\0" * n
+        padding.append(b"\xff\xfe" + struct.pack(">H", n + 2) + filler)
+        remaining -= n + 4
+    return head + b"".join(padding) + tail
+
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def make_mp4(size: int, duration: int = 10, random: bool = False) -> bytes:
+    """
+    生成 moov 前置的 1920x1080 H.264 MP4，mdat 填充到指定大小
+
+    Args:
+        size: 目标字节数，不足最小长度时取最小长度
+        duration: 时长（秒）
+        random: 是否用随机字节填充 mdat
+
+    Returns:
+        bytes: 视频内容
+    """
+    mvhd = _box(
+        b"mvhd", b"\0" * 12 + struct.pack(">II", 1000, duration * 1000) + b"\0" * 80
+    )
+    tkhd = _box(b"tkhd", b"\0" * 76 + struct.pack(">II", 1920 << 16, 1080 << 16))
+    hdlr = _box(b"hdlr", b"\0" * 8 + b"vide" + b"\0" * 12)
+    stsd = _box(
+        b"stsd", struct.pack(">II", 0, 1) + struct.pack(">I", 16) + b"avc1" + b"\0" * 8
+    )
+    stbl = _box(b"stbl", stsd)
+    trak = _box(b"trak", tkhd + _box(b"mdia", hdlr + _box(b"minf", stbl)))
+    moov = _box(b"moov", mvhd + trak)
+    ftyp = _box(b"ftyp", b"isom" + b"\0\0\0\0" + b"isomavc1")
+    n = max(0, size - len(ftyp) - len(moov) - 8)
+    mdat = _box(b"mdat", os.urandom(n) if random else b"\0" * n)
+    return ftyp + moov + mdat
@@ -0,0 +1,390 @@
+"""
+本地小红书替身服务器
+
+模拟 XhsClient 用到的用户信息、笔记详情、上传凭证、文件上传、视频首帧和创建笔记接口，
+每个接口的延迟分布、错误率和限流比例可单独配置，用于在不访问真实平台的情况下压测服务器。
+服务器以 --api-base 指向本服务后，所有小红书请求都发往这里。
+
+用法：
+    $ python -m mcp_xhs_publisher.devtools.xhs_standin --port 8900 \\
+          --latency-ms 50 --jitter 0.5 --throttle-rate 0.02 \\
+          --endpoint create_note:latency_ms=300,error_rate=0.05
+    $ mcp-xhs-publisher --api-base http://127.0.0.1:8900
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, fields, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# (HTTP 方法, 路径) -> 接口名，上传接口匹配其余所有 PUT 请求
+SELF_INFO = "self_info"
+NOTE = "note"
+PERMIT = "permit"
+UPLOAD = "upload"
+FIRST_FRAME = "first_frame"
+CREATE_NOTE = "create_note"
+ROUTES = {
+    ("GET", "/api/sns/web/v1/user/selfinfo"): SELF_INFO,
+    ("POST", "/api/sns/web/v1/feed"): NOTE,
+    ("GET", "/api/media/v1/upload/web/permit"): PERMIT,
+    ("POST", "/fe_api/burdock/v2/note/query_transcode"): FIRST_FRAME,
+    ("POST", "/web_api/sns/v2/note"): CREATE_NOTE,
+}
+ENDPOINTS = (SELF_INFO, NOTE, PERMIT, UPLOAD, FIRST_FRAME, CREATE_NOTE)
+
+# 平台限流时返回的错误码
+THROTTLE_CODE = 300013
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class EndpointBehavior:
+    """
+    单个接口的模拟行为
+
+    延迟服从对数正态分布：中位数为 latency_ms，jitter 为对数标准差，0 为固定延迟；
+    按 error_rate 返回 500，按 throttle_rate 返回 429 和平台的限流错误码
+    """
+
+    latency_ms: float = 50.0
+    jitter: float = 0.5
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    # 上传带宽（MB/s），只对上传接口生效，0 为不限
+    upload_mbps: float = 0.0
+
+    def delay(self, rng: random.Random, nbytes: int = 0) -> float:
+        """
+        抽取一次响应延迟
+
+        Args:
+            rng: 随机数生成器
+            nbytes: 上传的字节数
+
+        Returns:
+            float: 延迟（秒）
+        """
+        seconds = self.latency_ms / 1000
+        if self.jitter > 0:
+            seconds *= rng.lognormvariate(0, self.jitter)
+        if self.upload_mbps > 0:
+            seconds += nbytes / (self.upload_mbps * 1024 * 1024)
+        return seconds
+
+
+def parse_behavior(spec: str, base: EndpointBehavior) -> Tuple[str, EndpointBehavior]:
+    """
+    解析 "接口名:字段=值,字段=值" 格式的接口配置
+
+    Args:
+        spec: 配置字符串，如 "create_note:latency_ms=300,error_rate=0.05"
+        base: 未给出的字段使用的默认行为
+
+    Returns:
+        Tuple[str, EndpointBehavior]: 接口名和行为
+
+    Raises:
+        ValueError: 接口名或字段无效
+    """
+    name, _, assignments = spec.partition(":")
+    if name not in ENDPOINTS:
+        raise ValueError(f"未知接口: {name}，可选 {', '.join(ENDPOINTS)}")
+    known = {f.name for f in fields(EndpointBehavior)}
+    changes: Dict[str, float] = {}
+    for item in filter(None, assignments.split(",")):
+        key, _, value = item.partition("=")
+        if key not in known:
+            raise ValueError(f"未知字段: {key}，可选 {', '.join(sorted(known))}")
+        changes[key] = float(value)
+    return name, replace(base, **changes)
+
+
+class StandinServer:
+    """
+    在后台线程运行的替身服务器
+
+    每个请求按接口行为等待后返回与平台相同结构的响应，并按接口和结果计数
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        default: Optional[EndpointBehavior] = None,
+        behaviors: Optional[Dict[str, EndpointBehavior]] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        初始化替身服务器
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0 为随机端口
+            default: 未单独配置的接口使用的行为
+            behaviors: 按接口名单独配置的行为
+            seed: 随机种子，用于复现延迟和错误序列
+        """
+        self.default = default or EndpointBehavior()
+        self.behaviors = dict(behaviors or {})
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self.uploaded_bytes = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_port}"
+        self._thread: Optional[threading.Thread] = None
+
+    def behavior(self, endpoint: str) -> EndpointBehavior:
+        """接口的当前行为"""
+        return self.behaviors.get(endpoint, self.default)
+
+    def start(self) -> "StandinServer":
+        """在后台线程开始处理请求"""
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="xhs-standin", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """在当前线程处理请求，被中断后关闭监听"""
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def close(self) -> None:
+        """停止服务器"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取请求统计
+
+        Returns:
+            Dict[str, Any]: 各接口按结果（ok、error、throttled）的请求数，以及上传的总字节数
+        """
+        with self._stats_lock:
+            return {
+                "endpoints": {k: dict(v) for k, v in self._stats.items()},
+                "uploaded_bytes": self.uploaded_bytes,
+            }
+
+    def _count(self, endpoint: str, outcome: str, nbytes: int = 0) -> None:
+        with self._stats_lock:
+            counts = self._stats.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+            self.uploaded_bytes += nbytes
+
+    def _draw(self, endpoint: str, nbytes: int) -> Tuple[float, str]:
+        """抽取延迟和结果"""
+        behavior = self.behavior(endpoint)
+        with self._rng_lock:
+            delay = behavior.delay(self._rng, nbytes)
+            roll = self._rng.random()
+        if roll < behavior.throttle_rate:
+            return delay, "throttled"
+        if roll < behavior.throttle_rate + behavior.error_rate:
+            return delay, "error"
+        return delay, "ok"
+
+    def _respond(self, endpoint: str, query: Dict[str, Any], body: bytes) -> Any:
+        """成功时各接口的响应数据"""
+        n = next(self._ids)
+        if endpoint == SELF_INFO:
+            return {"nickname": "standin", "user_id": "standin", "red_id": "standin"}
+        if endpoint == NOTE:
+            note_id = json.loads(body or b"{}").get("source_note_id", f"note-{n}")
+            return {
+                "items": [
+                    {
+                        "id": note_id,
+                        "note_card": {
+                            "note_id": note_id,
+                            "title": "standin",
+                            "desc": "standin",
+                            "type": "normal",
+                        },
+                    }
+                ]
+            }
+        if endpoint == PERMIT:
+            scene = query.get("scene", ["image"])[0]
+            return {
+                "uploadTempPermits": [
+                    {"fileIds": [f"spectrum/{scene}-{n}"], "token": f"token-{n}"}
+                ]
+            }
+        if endpoint == CREATE_NOTE:
+            return {"id": f"note-{n}", "score": 0}
+        return None
+
+    def _handler(self) -> type:
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _read_body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    chunks = []
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0], 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return b"".join(chunks)
+                        chunks.append(self.rfile.read(size))
+                        self.rfile.readline()
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length)
+
+            def _discard_body(self) -> int:
+                """读取并丢弃上传内容，返回字节数"""
+                remaining = int(self.headers.get("Content-Length") or 0)
+                if not remaining:
+                    return len(self._read_body())
+                total = remaining
+                while remaining:
+                    chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                return total - remaining
+
+            def _send(self, status: int, payload: Any, headers: Dict[str, str]) -> None:
+                data = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self, method: str) -> None:
+                parts = urlsplit(self.path)
+                endpoint = ROUTES.get((method, parts.path))
+                if endpoint is None and method == "PUT":
+                    endpoint = UPLOAD
+                if endpoint is None:
+                    self._read_body()
+                    self._send(404, {"success": False, "msg": "not found"}, {})
+                    return
+
+                nbytes = 0
+                body = b""
+                if endpoint == UPLOAD:
+                    nbytes = self._discard_body()
+                else:
+                    body = self._read_body()
+                delay, outcome = standin._draw(endpoint, nbytes)
+                time.sleep(delay)
+                standin._count(endpoint, outcome, nbytes if outcome == "ok" else 0)
+
+                if outcome == "throttled":
+                    self._send(
+                        429,
+                        {
+                            "success": False,
+                            "code": THROTTLE_CODE,
+                            "msg": "访问频次异常",
+                        },
+                        {},
+                    )
+                elif outcome == "error":
+                    self._send(
+                        500, {"success": False, "code": -1, "msg": "服务器错误"}, {}
+                    )
+                elif endpoint == UPLOAD:
+                    # 与平台一致：上传成功时响应为空，视频 ID 在响应头中
+                    self._send(
+                        200, None, {"X-Ros-Video-Id": f"video-{next(standin._ids)}"}
+                    )
+                elif endpoint == FIRST_FRAME:
+                    frame = f"spectrum/frame-{next(standin._ids)}"
+                    self._send(
+                        200,
+                        {"data": {"hasFirstFrame": True, "firstFrameFileId": frame}},
+                        {},
+                    )
+                else:
+                    data = standin._respond(endpoint, parse_qs(parts.query), body)
+                    self._send(200, {"success": True, "data": data}, {})
+
+            def do_GET(self) -> None:
+                self._handle("GET")
+
+            def do_POST(self) -> None:
+                self._handle("POST")
+
+            def do_PUT(self) -> None:
+                self._handle("PUT")
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地小红书替身服务器")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8900, help="监听端口")
+    parser.add_argument(
+        "--latency-ms", type=float, default=50.0, help="各接口延迟的中位数（毫秒）"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.5, help="延迟的对数标准差，0 为固定延迟"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument(
+        "--throttle-rate", type=float, default=0.0, help="返回限流错误的比例"
+    )
+    parser.add_argument(
+        "--upload-mbps", type=float, default=0.0, help="上传带宽（MB/s），0 为不限"
+    )
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        default=[],
+        metavar="NAME:FIELD=VALUE,...",
+        help=f"单独配置接口行为，可重复；接口名: {', '.join(ENDPOINTS)}",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    default = EndpointBehavior(
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        upload_mbps=args.upload_mbps,
+    )
+    try:
+        behaviors = dict(parse_behavior(spec, default) for spec in args.endpoint)
+    except ValueError as e:
+        parser.error(str(e))
+    server = StandinServer(args.host, args.port, default, behaviors, args.seed)
+    print(f"小红书替身服务器已启动: {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats(), ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,9 @@ class PublishTextInput(BaseModel):
 
     content: str = Field(..., description="笔记文本内容")
     topics: Optional[List[str]] = Field(None, description="话题关键词列表")
+    account: Optional[str] = Field(
+        None, description="发布账号（cookie文件名），不指定时自动选择负载最低的账号"
+    )
 
 
 class PublishImageInput(BaseModel):
@@ -34,15 +37,51 @@ class PublishImageInput(BaseModel):
         ..., description="图片路径列表，支持本地路径和https链接"
     )
     topics: Optional[List[str]] = Field(None, description="话题关键词列表")
+    account: Optional[str] = Field(
+        None, description="发布账号（cookie文件名），不指定时自动选择负载最低的账号"
+    )
 
 
 class PublishVideoInput(BaseModel):
     """视频笔记发布输入参数"""
 
     content: str = Field(..., description="笔记文本内容")
-    video_path: str = Field(..., description="视频文件路径")
+    video_path: str = Field(..., description="视频文件路径，支持本地路径和http(s)链接")
+    cover_path: Optional[str] = Field(
+        None, description="封面图片路径，支持本地路径和http(s)链接"
+    )
+    topics: Optional[List[str]] = Field(None, description="话题关键词列表")
+    video_sha256: Optional[str] = Field(
+        None, description="远程视频的SHA-256摘要，提供时下载后校验"
+    )
+    account: Optional[str] = Field(
+        None, description="发布账号（cookie文件名），不指定时自动选择负载最低的账号"
+    )
+
+
+# 笔记类型到输入模型的映射
+NOTE_INPUT_MODELS = {
+    "text": PublishTextInput,
+    "image": PublishImageInput,
+    "video": PublishVideoInput,
+}
+
+
+class BatchNoteInput(BaseModel):
+    """批量发布中的单篇笔记，按 note_type 填写对应笔记类型的字段"""
+
+    note_type: str = Field(..., description="笔记类型：text, image 或 video")
+    content: str = Field(..., description="笔记文本内容")
+    image_paths: Optional[List[str]] = Field(
+        None, description="图片路径列表，图文笔记必填"
+    )
+    video_path: Optional[str] = Field(None, description="视频文件路径，视频笔记必填")
     cover_path: Optional[str] = Field(None, description="封面图片路径")
     topics: Optional[List[str]] = Field(None, description="话题关键词列表")
+    video_sha256: Optional[str] = Field(None, description="远程视频的SHA-256摘要")
+    account: Optional[str] = Field(
+        None, description="发布账号（cookie文件名），不指定时自动选择负载最低的账号"
+    )
 
 
 class PublishResponse(BaseModel):
@@ -52,6 +91,18 @@ class PublishResponse(BaseModel):
     message: str = Field(..., description="发布结果说明")
     note_id: Optional[str] = Field(None, description="发布成功的笔记ID")
     note_type: Optional[str] = Field(None, description="笔记类型：text, image 或 video")
+    account: Optional[str] = Field(None, description="执行发布的账号")
     publish_time: Optional[str] = Field(None, description="发布时间")
     image_count: Optional[int] = Field(None, description="图片数量，仅图文笔记返回")
+    download_timings: Optional[List[Dict[str, Any]]] = Field(
+        None, description="远程图片的下载耗时，仅图文笔记返回"
+    )
+    image_report: Optional[Dict[str, Any]] = Field(
+        None,
+        description="图片预处理结果（处理前后字节数、节省的字节数），仅开启预处理的图文笔记返回",
+    )
+    upload_report: Optional[Dict[str, Any]] = Field(
+        None,
+        description="媒体上传结果（文件数、复用已上传文件数、节省的上传字节数），仅图文和视频笔记返回",
+    )
     error: Optional[str] = Field(None, description="错误信息")
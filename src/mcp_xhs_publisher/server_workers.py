@@ -0,0 +1,281 @@
+"""
+多进程服务
+
+主进程创建监听套接字后启动多个服务器进程，子进程继承同一个套接字并各自接受连接，
+发布流程的 CPU 开销分摊到多个核心上。账号按启动时的名称顺序轮流分配给各进程，
+每个账号只由一个进程调度，限流和熔断状态不会在进程之间重复计算
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .config import config
+from .util.logging import log_error, log_info
+
+if TYPE_CHECKING:
+    from mcp.server.fastmcp import FastMCP
+
+# 子进程的环境变量：进程序号/进程数/监听套接字的文件描述符，以及启动时的全部账号
+WORKER_ENV = "XHS_WORKER"
+ACCOUNTS_ENV = "XHS_WORKER_ACCOUNTS"
+# 子进程异常退出后重新启动前的等待时间（秒）
+RESTART_DELAY = 1.0
+# 关闭时等待子进程退出的最长时间（秒）
+SHUTDOWN_TIMEOUT = 10.0
+
+
+@dataclass(frozen=True)
+class WorkerShard:
+    """当前进程负责的账号分片"""
+
+    index: int
+    count: int
+    fd: int
+    # 启动时的全部账号，按名称排序
+    accounts: Tuple[str, ...]
+
+    def owns(self, account: str) -> bool:
+        """
+        判断账号是否由当前进程负责
+
+        启动时已有的账号按排序位置轮流分配，启动后新增的账号按名称哈希分配
+
+        Args:
+            account: 账号名
+
+        Returns:
+            bool: 是否由当前进程负责
+        """
+        if account in self.accounts:
+            position = self.accounts.index(account)
+        else:
+            position = zlib.crc32(account.encode("utf-8"))
+        return position % self.count == self.index
+
+
+_shard: Optional[WorkerShard] = None
+_shard_loaded = False
+
+
+def current_shard() -> Optional[WorkerShard]:
+    """
+    获取当前进程的账号分片
+
+    Returns:
+        Optional[WorkerShard]: 多进程运行的子进程中返回分片，否则返回None
+    """
+    global _shard, _shard_loaded
+    if not _shard_loaded:
+        value = os.environ.get(WORKER_ENV)
+        _shard = None
+        if value:
+            index, count, fd = (int(part) for part in value.split("/"))
+            accounts = tuple(json.loads(os.environ.get(ACCOUNTS_ENV) or "[]"))
+            _shard = WorkerShard(index, count, fd, accounts)
+        _shard_loaded = True
+    return _shard
+
+
+def worker_path(path: str) -> str:
+    """
+    多进程运行时为每个服务器进程的输出文件加上进程序号，避免多个进程追加和轮转同一个文件
+
+    Args:
+        path: 配置的文件路径
+
+    Returns:
+        str: 子进程中返回 <名称>.worker-<序号>.<扩展名>（如 xhs.worker-1.jsonl.gz），否则原样返回
+    """
+    shard = current_shard()
+    if shard is None:
+        return path
+    directory, base = os.path.split(path)
+    name, dot, ext = base.partition(".")
+    if not name:
+        # 以点开头的文件名整体视为名称
+        name, dot, ext = base, "", ""
+    return os.path.join(directory, f"{name}.worker-{shard.index}{dot}{ext}")
+
+
+def _startup_accounts() -> List[str]:
+    """启动时 cookie 目录中的有效账号，按名称排序"""
+    from .services.cookie_store import CookieStore
+    from .services.xhs_client import XhsApiClient
+
+    store = CookieStore(config.get("xhs_cookie_dir"), XhsApiClient.REQUIRED_COOKIE_KEYS)
+    store.scan()
+    return sorted(store.records())
+
+
+def _recover_jobs() -> None:
+    """在启动子进程前恢复上次中断的全部发布任务，子进程重新启动时只恢复自己上次认领的任务"""
+    from .services.job_queue import JobQueue
+
+    queue = JobQueue(os.path.join(config.get("data_dir"), "jobs.db"))
+    recovered = queue.recover(config.get_int("job_max_attempts", 3))
+    if recovered:
+        log_info("已恢复未完成的发布任务", count=recovered)
+
+
+class WorkerSupervisor:
+    """
+    服务器子进程的管理器
+
+    子进程使用与主进程相同的命令行参数启动，异常退出后自动重新启动；
+    主进程收到 SIGTERM 或 SIGINT 时通知所有子进程退出
+    """
+
+    def __init__(self, workers: int, accounts: Sequence[str]):
+        """
+        初始化管理器
+
+        Args:
+            workers: 子进程数
+            accounts: 启动时的全部账号
+        """
+        self.workers = workers
+        self.accounts = list(accounts)
+        self.sock: Optional[socket.socket] = None
+        self._procs: Dict[int, subprocess.Popen] = {}
+        self._stopping = False
+
+    def _spawn(self, index: int) -> subprocess.Popen:
+        """启动第 index 个子进程"""
+        fd = self.sock.fileno()
+        env = {
+            **os.environ,
+            WORKER_ENV: f"{index}/{self.workers}/{fd}",
+            ACCOUNTS_ENV: json.dumps(self.accounts, ensure_ascii=False),
+        }
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "mcp_xhs_publisher", *sys.argv[1:]],
+            env=env,
+            pass_fds=(fd,),
+            stdin=subprocess.DEVNULL,
+        )
+        log_info("服务器进程已启动", worker=index, pid=proc.pid)
+        return proc
+
+    def _stop(self, signum: int, frame: object) -> None:
+        self._stopping = True
+
+    def run(self, host: str, port: int) -> int:
+        """
+        监听地址并启动子进程，直到收到终止信号
+
+        Args:
+            host: 监听地址
+            port: 监听端口
+
+        Returns:
+            int: 退出码
+        """
+        self.sock = socket.create_server((host, port), backlog=2048)
+        self.sock.set_inheritable(True)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        log_info(
+            "多进程服务器启动",
+            host=host,
+            port=port,
+            workers=self.workers,
+            accounts=len(self.accounts),
+        )
+        try:
+            for index in range(self.workers):
+                self._procs[index] = self._spawn(index)
+            while not self._stopping:
+                for index, proc in list(self._procs.items()):
+                    code = proc.poll()
+                    if code is None or self._stopping:
+                        continue
+                    log_error("服务器进程退出，正在重新启动", worker=index, code=code)
+                    time.sleep(RESTART_DELAY)
+                    if not self._stopping:
+                        self._procs[index] = self._spawn(index)
+                time.sleep(0.2)
+        finally:
+            self.shutdown()
+        return 0
+
+    def shutdown(self) -> None:
+        """通知所有子进程退出，超时后强制结束"""
+        for proc in self._procs.values():
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGTERM)
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for index, proc in self._procs.items():
+            try:
+                proc.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                log_error("服务器进程未按时退出，强制结束", worker=index, pid=proc.pid)
+                proc.kill()
+                proc.wait()
+        if self.sock is not None:
+            self.sock.close()
+        log_info("多进程服务器已停止")
+
+
+def serve_workers(workers: int) -> int:
+    """
+    以多进程方式运行服务器
+
+    进程数不超过账号数，使每个进程至少负责一个账号
+
+    Args:
+        workers: 配置的进程数
+
+    Returns:
+        int: 退出码
+
+    Raises:
+        ValueError: 传输方式不是 streamable-http
+    """
+    transport = config.get_transport()
+    if transport != "streamable-http":
+        raise ValueError(
+            f"多进程运行需要 streamable-http 传输，当前为 {transport}：stdio 只能由单个进程读写，"
+            "SSE 的会话保存在接受连接的进程中，后续请求可能被其他进程接受"
+        )
+    accounts = _startup_accounts()
+    if 0 < len(accounts) < workers:
+        log_info(
+            "进程数多于账号数，按账号数启动", workers=workers, accounts=len(accounts)
+        )
+        workers = len(accounts)
+    _recover_jobs()
+    options = config.get_server_options()
+    return WorkerSupervisor(workers, accounts).run(options["host"], options["port"])
+
+
+def run_worker(mcp_server: "FastMCP", shard: WorkerShard) -> None:
+    """
+    在继承的监听套接字上运行 streamable-http 服务器
+
+    Args:
+        mcp_server: MCP服务器
+        shard: 当前进程的账号分片
+    """
+    import asyncio
+
+    import uvicorn
+
+    app = mcp_server.streamable_http_app()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app,
+            log_level=mcp_server.settings.log_level.lower(),
+            timeout_graceful_shutdown=int(SHUTDOWN_TIMEOUT / 2),
+        )
+    )
+    sock = socket.socket(fileno=shard.fd)
+    log_info("服务器进程开始接受连接", worker=shard.index, pid=os.getpid())
+    asyncio.run(server.serve(sockets=[sock]))
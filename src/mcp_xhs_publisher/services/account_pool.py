@@ -0,0 +1,258 @@
+"""
+多账号客户端池
+
+为 cookie 目录中的每个 cookie 文件创建独立的小红书客户端，
+并按负载在健康账号之间调度发布请求；cookie 文件更新后自动切换，无需重启。
+多进程运行时每个服务器进程只加载分配给自己的账号
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..config import config
+from ..server_workers import current_shard
+from ..util.logging import log_error, log_info
+from .cookie_store import CookieRecord, CookieStore
+from .resilience import CIRCUIT_OPEN
+from .xhs_client import XhsApiClient
+
+
+class AccountPool:
+    """
+    账号客户端池
+
+    账号名为 cookie 文件名（不含扩展名）。未指定账号时，在健康（未熔断且登录未失效）的账号中选择
+    进行中请求数最少的一个，负载相同时轮询，使多个账号均匀分担发布请求
+    """
+
+    def __init__(self, cookie_dir: str):
+        """
+        加载 cookie 目录中的所有账号
+
+        Args:
+            cookie_dir: cookie 存储目录；若为文件则作为单个账号加载
+
+        Raises:
+            RuntimeError: 没有任何有效账号
+        """
+        self.cookie_dir = os.path.expanduser(cookie_dir)
+        self._lock = threading.Lock()
+        self._clients: Dict[str, XhsApiClient] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._completed: Dict[str, int] = {}
+        self._next = 0
+        self.shard = current_shard()
+
+        self.store = CookieStore(self.cookie_dir, XhsApiClient.REQUIRED_COOKIE_KEYS)
+        self.store.scan()
+        for record in self.store.records().values():
+            if not self.owns(record.account):
+                continue
+            try:
+                self._add(self._build_client(record))
+            except Exception as e:
+                log_error("加载账号失败", cookie_file=record.path, error=str(e))
+        self.store.subscribe(self._on_cookie_changed)
+
+        if not self._clients:
+            raise RuntimeError(
+                "未获取到有效的小红书 cookie，请先登录或配置 cookie 后重试。"
+            )
+        log_info("账号池加载完成", accounts=self.accounts())
+
+    def _build_client(self, record: CookieRecord) -> XhsApiClient:
+        """使用已解析的 cookie 创建账号客户端"""
+        if os.path.isfile(self.cookie_dir):
+            return XhsApiClient(self.cookie_dir, cookie=record.header)
+        return XhsApiClient(
+            self.cookie_dir,
+            cookie_file=os.path.basename(record.path),
+            cookie=record.header,
+        )
+
+    def owns(self, account: str) -> bool:
+        """
+        判断账号是否由当前进程负责，单进程运行时负责所有账号
+
+        Args:
+            account: 账号名
+
+        Returns:
+            bool: 是否由当前进程负责
+        """
+        return self.shard is None or self.shard.owns(account)
+
+    def _on_cookie_changed(self, record: CookieRecord) -> None:
+        """cookie 文件更新时切换已有账号的 cookie，新增的 cookie 文件作为新账号加入"""
+        with self._lock:
+            client = self._clients.get(record.account)
+        if client is not None:
+            client.update_cookie(record.header)
+        elif self.owns(record.account):
+            self._add(self._build_client(record))
+            log_info("新账号已加入账号池", account=record.account)
+
+    def watch(self, interval: float) -> None:
+        """
+        开始轮询 cookie 文件，文件更新后无需重启即可生效
+
+        Args:
+            interval: 轮询间隔（秒），小于等于 0 时不轮询
+        """
+        self.store.start(interval)
+
+    def stop_watching(self) -> None:
+        """停止轮询 cookie 文件"""
+        self.store.stop()
+
+    @staticmethod
+    def build_from_env() -> "AccountPool":
+        """
+        使用启动时解析的配置（环境变量和命令行参数）构建账号池
+
+        Returns:
+            AccountPool 实例
+        """
+        return AccountPool(cookie_dir=config.get("xhs_cookie_dir"))
+
+    def _add(self, client: XhsApiClient) -> None:
+        """登记账号客户端"""
+        with self._lock:
+            self._clients[client.account] = client
+            self._in_flight.setdefault(client.account, 0)
+            self._completed.setdefault(client.account, 0)
+
+    def accounts(self) -> List[str]:
+        """返回所有账号名"""
+        with self._lock:
+            return list(self._clients)
+
+    def owned_elsewhere(self, account: Optional[str]) -> bool:
+        """
+        判断账号是否存在且由其他服务器进程负责，这类请求经任务库交给负责该账号的进程执行
+
+        Args:
+            account: 账号名，为None时返回False
+
+        Returns:
+            bool: 是否由其他进程负责
+        """
+        return (
+            account is not None
+            and not self.owns(account)
+            and self.store.get(account) is not None
+        )
+
+    def owned_accounts(self) -> Optional[List[str]]:
+        """
+        认领后台任务时使用的账号范围
+
+        Returns:
+            Optional[List[str]]: 多进程运行时返回当前进程的账号，单进程运行时返回None（不限账号）
+        """
+        return None if self.shard is None else self.accounts()
+
+    def check(self, account: Optional[str]) -> None:
+        """
+        在下载媒体或写入任务之前检查指定的账号可由当前进程使用
+
+        Args:
+            account: 账号名，为None时不检查
+
+        Raises:
+            ValueError: 账号不存在或由其他服务器进程负责（后者应先用 owned_elsewhere 转交）
+        """
+        if account is not None:
+            with self._lock:
+                self._select(account)
+
+    def _select(self, account: Optional[str]) -> str:
+        """选择账号，调用方需持有锁"""
+        if account is not None:
+            if account not in self._clients:
+                if self.owned_elsewhere(account):
+                    raise ValueError(
+                        f"账号 {account} 由其他服务器进程负责"
+                        f"（当前为第 {self.shard.index + 1} 个，共 {self.shard.count} 个）"
+                    )
+                raise ValueError(f"未知账号: {account}")
+            return account
+
+        names = list(self._clients)
+        candidates = [n for n in names if self._is_healthy(n)] or names
+        least = min(self._in_flight[n] for n in candidates)
+        # 从轮询位置开始查找负载最小的账号
+        for offset in range(len(names)):
+            name = names[(self._next + offset) % len(names)]
+            if name in candidates and self._in_flight[name] == least:
+                self._next = (self._next + offset + 1) % len(names)
+                return name
+        return candidates[0]
+
+    @contextmanager
+    def acquire(self, account: Optional[str] = None) -> Iterator[XhsApiClient]:
+        """
+        借出账号客户端，期间计入该账号的负载
+
+        Args:
+            account: 账号名，未指定时自动选择负载最低的健康账号
+
+        Yields:
+            XhsApiClient: 账号客户端
+
+        Raises:
+            ValueError: 指定的账号不存在
+        """
+        with self._lock:
+            name = self._select(account)
+            self._in_flight[name] += 1
+            client = self._clients[name]
+        try:
+            yield client
+        finally:
+            with self._lock:
+                self._in_flight[name] -= 1
+                self._completed[name] += 1
+
+    def get(self, account: Optional[str] = None) -> XhsApiClient:
+        """
+        获取账号客户端，不计入负载，适用于读取类调用
+
+        Args:
+            account: 账号名，未指定时自动选择
+
+        Returns:
+            XhsApiClient: 账号客户端
+        """
+        with self._lock:
+            return self._clients[self._select(account)]
+
+    def _is_healthy(self, account: str) -> bool:
+        """账号是否健康：熔断器未打开，且会话监控未发现登录失效"""
+        client = self._clients[account]
+        return (
+            client.breaker.state != CIRCUIT_OPEN
+            and client.session.logged_in is not False
+        )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        获取各账号的负载和健康状态
+
+        Returns:
+            List[Dict[str, Any]]: 每个账号的状态
+        """
+        with self._lock:
+            return [
+                {
+                    "account": name,
+                    "healthy": self._is_healthy(name),
+                    "in_flight": self._in_flight[name],
+                    "completed": self._completed[name],
+                    "circuit": self._clients[name].breaker.stats(),
+                    "session": self._clients[name].session.snapshot(),
+                }
+                for name in self._clients
+            ]
@@ -0,0 +1,394 @@
+"""
+小红书请求的录制与回放
+
+录制模式下，每个 XhsClient 会话发出的 HTTP 请求和响应（方法、地址、请求头、正文、状态码、耗时）
+逐行写入 gzip 压缩的 JSON Lines 文件（cassette）；cookie、签名和上传凭证等敏感请求头被替换，
+cookie 的值在地址和正文中出现时同样被替换。回放模式下按方法和路径依次返回录制的响应，
+并按原始耗时或其倍数等待，使基准测试和回归测试无需网络即可复现真实的流量形态
+"""
+
+import atexit
+import base64
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from ..config import Config, config
+from ..util.logging import log_info
+
+REDACTED = "<redacted>"
+# 签名和上传凭证请求头，与 Config.SENSITIVE_KEYS 匹配的请求头（cookie、set-cookie）一并替换
+SECRET_HEADERS = {
+    "x-s",
+    "x-t",
+    "x-s-common",
+    "x-sign",
+    "x-cos-security-token",
+    "authorization",
+}
+# 短于该长度的 cookie 值不在正文中替换，避免误伤
+MIN_SECRET_LENGTH = 6
+
+
+class CassetteMissError(requests.RequestException):
+    """回放时 cassette 中没有匹配的请求"""
+
+
+@dataclass
+class Exchange:
+    """一次录制的 HTTP 请求与响应"""
+
+    method: str
+    url: str
+    request_headers: Dict[str, str]
+    request_body: Optional[str]
+    request_size: int
+    status: int
+    response_headers: Dict[str, str]
+    response_body: Optional[str]
+    response_size: int
+    # 正文为二进制时以 base64 保存
+    binary: bool
+    truncated: bool
+    # 距录制开始的秒数和请求耗时（秒）
+    offset: float
+    elapsed: float
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """回放时的匹配键：方法和路径"""
+        return self.method, urlsplit(self.url).path
+
+    def body(self) -> bytes:
+        """响应正文"""
+        if self.response_body is None:
+            return b""
+        if self.binary:
+            return base64.b64decode(self.response_body)
+        return self.response_body.encode("utf-8")
+
+
+def _is_secret_header(name: str) -> bool:
+    lowered = name.lower()
+    return lowered in SECRET_HEADERS or any(
+        key in lowered for key in Config.SENSITIVE_KEYS
+    )
+
+
+def _cookie_values(headers: Any) -> List[str]:
+    """请求 Cookie 头中足够长的值，按长度降序"""
+    values = []
+    for item in (headers.get("Cookie") or "").split(";"):
+        _, _, value = item.strip().partition("=")
+        if len(value) >= MIN_SECRET_LENGTH:
+            values.append(value)
+    return sorted(set(values), key=len, reverse=True)
+
+
+def _scrub(text: str, secrets: List[str]) -> str:
+    for secret in secrets:
+        text = text.replace(secret, REDACTED)
+    return text
+
+
+def _encode(
+    data: Any, max_body: int, secrets: List[str]
+) -> Tuple[Optional[str], int, bool, bool]:
+    """
+    编码正文
+
+    Returns:
+        (正文, 原始字节数, 是否为二进制, 是否被截断)；流式正文（如上传的文件）只记录大小
+    """
+    if data is None:
+        return None, 0, False, False
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if not isinstance(data, bytes):
+        return None, 0, False, False
+    size = len(data)
+    truncated = 0 <= max_body < size
+    if truncated:
+        data = data[:max_body]
+    try:
+        return _scrub(data.decode("utf-8"), secrets), size, False, truncated
+    except UnicodeDecodeError:
+        return base64.b64encode(data).decode("ascii"), size, True, truncated
+
+
+def _open(path: str, mode: str) -> Any:
+    """按扩展名以 gzip 或普通文本打开 cassette"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class CassetteRecorder:
+    """
+    cassette 录制器
+
+    多个账号和线程共享，每次请求完成后追加一行，写入后立即刷新
+    """
+
+    def __init__(self, path: str, max_body: int = 65536):
+        """
+        初始化录制器
+
+        Args:
+            path: cassette 文件路径，以 .gz 结尾时压缩写入
+            max_body: 正文的最大保存字节数，超出部分截断，-1 为不截断
+        """
+        self.path = path
+        self.max_body = max_body
+        self.count = 0
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._file = _open(path, "at")
+
+    def record(
+        self, request: requests.PreparedRequest, response: Any, elapsed: float
+    ) -> None:
+        """
+        录制一次请求
+
+        Args:
+            request: 已发出的请求
+            response: 收到的响应
+            elapsed: 请求耗时（秒）
+        """
+        secrets = _cookie_values(request.headers)
+        request_body, request_size, _, _ = _encode(request.body, self.max_body, secrets)
+        if request_body is None and request.headers.get("Content-Length"):
+            request_size = int(request.headers["Content-Length"])
+        response_body, response_size, binary, truncated = _encode(
+            response.content, self.max_body, secrets
+        )
+        exchange = Exchange(
+            method=request.method or "GET",
+            url=_scrub(request.url or "", secrets),
+            request_headers=self._headers(request.headers, secrets),
+            request_body=request_body,
+            request_size=request_size,
+            status=response.status_code,
+            response_headers=self._headers(response.headers, secrets),
+            response_body=response_body,
+            response_size=response_size,
+            binary=binary,
+            truncated=truncated,
+            offset=round(time.perf_counter() - self._start - elapsed, 6),
+            elapsed=round(elapsed, 6),
+        )
+        line = json.dumps(asdict(exchange), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.count += 1
+
+    @staticmethod
+    def _headers(headers: Any, secrets: List[str]) -> Dict[str, str]:
+        return {
+            name: REDACTED if _is_secret_header(name) else _scrub(str(value), secrets)
+            for name, value in headers.items()
+        }
+
+    def close(self) -> None:
+        """关闭文件"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def load_cassette(path: str) -> List[Exchange]:
+    """
+    读取 cassette
+
+    Args:
+        path: cassette 文件路径
+
+    Returns:
+        List[Exchange]: 按录制顺序排列的请求
+    """
+    with _open(path, "rt") as f:
+        return [Exchange(**json.loads(line)) for line in f if line.strip()]
+
+
+class CassettePlayer:
+    """
+    cassette 回放器
+
+    按方法和路径分组，每组按录制顺序依次返回；一组用完后从头循环，
+    使回放的请求数可以多于录制的请求数
+    """
+
+    def __init__(self, exchanges: List[Exchange], time_scale: float = 1.0):
+        """
+        初始化回放器
+
+        Args:
+            exchanges: 录制的请求
+            time_scale: 回放耗时相对于原始耗时的倍数，0 为不等待
+        """
+        self.time_scale = time_scale
+        self._groups: Dict[Tuple[str, str], List[Exchange]] = defaultdict(list)
+        for exchange in exchanges:
+            self._groups[exchange.key].append(exchange)
+        self._next: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.served = 0
+        self.misses = 0
+
+    def match(self, method: str, url: str) -> Exchange:
+        """
+        取出下一个匹配的请求
+
+        Args:
+            method: 请求方法
+            url: 请求地址
+
+        Returns:
+            Exchange: 录制的请求
+
+        Raises:
+            CassetteMissError: 没有相同方法和路径的录制
+        """
+        key = (method, urlsplit(url).path)
+        with self._lock:
+            group = self._groups.get(key)
+            if not group:
+                self.misses += 1
+                raise CassetteMissError(f"cassette 中没有 {method} {key[1]} 的录制")
+            index = self._next[key]
+            self._next[key] = index + 1
+            self.served += 1
+            return group[index % len(group)]
+
+    def respond(self, request: requests.PreparedRequest) -> requests.Response:
+        """
+        按录制的响应回复请求，按 time_scale 等待原始耗时
+
+        Args:
+            request: 请求
+
+        Returns:
+            requests.Response: 回放的响应
+        """
+        exchange = self.match(request.method or "GET", request.url or "")
+        if self.time_scale > 0 and exchange.elapsed > 0:
+            time.sleep(exchange.elapsed * self.time_scale)
+        response = requests.Response()
+        response.status_code = exchange.status
+        response.headers = CaseInsensitiveDict(exchange.response_headers)
+        response._content = exchange.body()
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url or ""
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    @classmethod
+    def from_file(cls, path: str, time_scale: float = 1.0) -> "CassettePlayer":
+        """
+        从 cassette 文件创建回放器
+
+        Args:
+            path: cassette 文件路径
+            time_scale: 回放耗时的倍数
+
+        Returns:
+            CassettePlayer: 回放器
+        """
+        exchanges = load_cassette(path)
+        log_info("已加载 cassette", path=path, exchanges=len(exchanges))
+        return cls(exchanges, time_scale)
+
+
+class RecordingAdapter(BaseAdapter):
+    """将请求交给内层适配器发出，并把请求和响应写入 cassette 的传输适配器"""
+
+    def __init__(self, recorder: CassetteRecorder, inner: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.recorder = recorder
+        self.inner = inner or HTTPAdapter()
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        response = self.inner.send(request, **kwargs)
+        # 读取正文后计时，包含下载响应的时间
+        response.content
+        self.recorder.record(request, response, time.perf_counter() - start)
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """从 cassette 回放响应、不访问网络的传输适配器"""
+
+    def __init__(self, player: CassettePlayer):
+        super().__init__()
+        self.player = player
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> Any:
+        return self.player.respond(request)
+
+    def close(self) -> None:
+        pass
+
+
+_recorder: Optional[CassetteRecorder] = None
+_player: Optional[CassettePlayer] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette_recorder() -> Optional[CassetteRecorder]:
+    """
+    获取进程内共享的录制器
+
+    Returns:
+        Optional[CassetteRecorder]: 配置了 cassette_record 时返回录制器，否则返回None；
+        多进程运行时每个服务器进程录制到各自的文件
+    """
+    global _recorder
+    from ..server_workers import worker_path
+
+    path = config.get("cassette_record")
+    if not path:
+        return None
+    path = worker_path(path)
+    with _cassette_lock:
+        if _recorder is None:
+            _recorder = CassetteRecorder(
+                path, max_body=config.get_int("cassette_max_body", 65536)
+            )
+            atexit.register(_recorder.close)
+            log_info("正在录制小红书请求", path=path)
+        return _recorder
+
+
+def get_cassette_player() -> Optional[CassettePlayer]:
+    """
+    获取进程内共享的回放器
+
+    Returns:
+        Optional[CassettePlayer]: 配置了 cassette_replay 时返回回放器，否则返回None
+    """
+    global _player
+    path = config.get("cassette_replay")
+    if not path:
+        return None
+    with _cassette_lock:
+        if _player is None:
+            _player = CassettePlayer.from_file(
+                path, time_scale=config.get_float("cassette_time_scale", 1.0)
+            )
+        return _player
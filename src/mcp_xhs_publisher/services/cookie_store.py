@@ -0,0 +1,226 @@
+"""
+cookie 存储
+
+启动时将 cookie 文件解析为键值对，之后按修改时间轮询 cookie 文件，
+文件更新后重新解析并通知订阅方，使运行中的客户端无需重启即可切换到新的 cookie
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from ..util.cookie_manager import cookie_valid, format_cookie, load_cookie, parse_cookie
+from ..util.logging import log_error, log_info
+
+# 不作为 cookie 文件加载的后缀
+IGNORED_SUFFIXES = (".state", ".tmp", ".lock", ".json", ".db")
+
+
+def list_cookie_files(cookie_dir: str) -> List[str]:
+    """
+    列出 cookie 目录中的 cookie 文件名
+
+    Args:
+        cookie_dir: cookie 存储目录
+
+    Returns:
+        List[str]: 按名称排序的文件名列表，忽略隐藏文件和状态文件
+    """
+    if not os.path.isdir(cookie_dir):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(cookie_dir)
+        if not name.startswith(".")
+        and not name.endswith(IGNORED_SUFFIXES)
+        and os.path.isfile(os.path.join(cookie_dir, name))
+    )
+
+
+@dataclass(frozen=True)
+class CookieRecord:
+    """解析后的账号 cookie"""
+
+    account: str
+    path: str
+    cookies: Mapping[str, str]
+    # 文件的 (修改时间纳秒, 大小)，用于检测变更
+    signature: Tuple[int, int]
+
+    @property
+    def header(self) -> str:
+        """请求头使用的 cookie 字符串"""
+        return format_cookie(dict(self.cookies))
+
+
+CookieListener = Callable[[CookieRecord], None]
+
+
+class CookieStore:
+    """
+    cookie 存储
+
+    cookie_path 可以是目录（每个文件一个账号，账号名为不含扩展名的文件名）或单个文件。
+    文件内容不完整（缺少必要字段）时保留上一次有效的 cookie，避免写入过程中读到半个文件
+    """
+
+    def __init__(self, cookie_path: str, required_keys: List[str]):
+        """
+        初始化 cookie 存储
+
+        Args:
+            cookie_path: cookie 目录或文件路径
+            required_keys: 有效 cookie 必须包含的字段
+        """
+        self.cookie_path = os.path.expanduser(cookie_path)
+        self.required_keys = required_keys
+        self._lock = threading.Lock()
+        self._records: Dict[str, CookieRecord] = {}
+        # 路径 -> 最近一次读取时的文件签名，包括无效文件，避免重复报错
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        self._listeners: List[CookieListener] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _paths(self) -> List[str]:
+        """列出当前的 cookie 文件路径"""
+        if os.path.isfile(self.cookie_path):
+            return [self.cookie_path]
+        return [
+            os.path.join(self.cookie_path, name)
+            for name in list_cookie_files(self.cookie_path)
+        ]
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        """获取文件签名，文件不存在时返回None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read(self, path: str, signature: Tuple[int, int]) -> Optional[CookieRecord]:
+        """读取并解析 cookie 文件，无效时返回None"""
+        try:
+            cookie = load_cookie(path)
+        except OSError as e:
+            log_error("读取 cookie 文件失败", path=path, error=str(e))
+            return None
+        if not cookie or not cookie_valid(cookie, self.required_keys):
+            log_error("cookie 文件缺少必要字段，已忽略", path=path)
+            return None
+        return CookieRecord(
+            account=os.path.splitext(os.path.basename(path))[0],
+            path=path,
+            cookies=MappingProxyType(parse_cookie(cookie)),
+            signature=signature,
+        )
+
+    def scan(self) -> List[CookieRecord]:
+        """
+        检查 cookie 文件的变化，重新解析新增和修改过的文件
+
+        Returns:
+            List[CookieRecord]: 新增或内容变化的有效 cookie
+        """
+        changed = []
+        for path in self._paths():
+            signature = self._signature(path)
+            if signature is None or self._seen.get(path) == signature:
+                continue
+            self._seen[path] = signature
+            record = self._read(path, signature)
+            if record is None:
+                continue
+            with self._lock:
+                previous = self._records.get(record.account)
+                self._records[record.account] = record
+            if previous is None or previous.cookies != record.cookies:
+                changed.append(record)
+        return changed
+
+    def records(self) -> Dict[str, CookieRecord]:
+        """
+        获取所有有效的 cookie
+
+        Returns:
+            Dict[str, CookieRecord]: 账号名到 cookie 的映射
+        """
+        with self._lock:
+            return dict(self._records)
+
+    def get(self, account: str) -> Optional[CookieRecord]:
+        """
+        获取账号的 cookie
+
+        Args:
+            account: 账号名
+
+        Returns:
+            Optional[CookieRecord]: cookie，账号不存在时返回None
+        """
+        with self._lock:
+            return self._records.get(account)
+
+    def subscribe(self, listener: CookieListener) -> None:
+        """
+        订阅 cookie 变化
+
+        Args:
+            listener: cookie 新增或变化时调用的函数，在轮询线程中执行
+        """
+        self._listeners.append(listener)
+
+    def reload(self) -> List[CookieRecord]:
+        """
+        立即检查 cookie 文件并通知订阅方
+
+        Returns:
+            List[CookieRecord]: 新增或内容变化的 cookie
+        """
+        changed = self.scan()
+        for record in changed:
+            log_info("cookie 已更新", account=record.account, path=record.path)
+            for listener in self._listeners:
+                try:
+                    listener(record)
+                except Exception as e:
+                    log_error(
+                        "应用 cookie 更新失败", account=record.account, error=str(e)
+                    )
+        return changed
+
+    def start(self, interval: float) -> None:
+        """
+        启动后台轮询线程
+
+        Args:
+            interval: 轮询间隔（秒），小于等于 0 时不启动
+        """
+        if self._thread is not None or interval <= 0:
+            return
+        self._stop.clear()
+
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                self.reload()
+
+        self._thread = threading.Thread(
+            target=loop, name="xhs-cookie-watch", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止后台轮询线程
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
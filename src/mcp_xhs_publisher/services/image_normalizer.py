@@ -0,0 +1,269 @@
+"""
+图片预处理
+
+上传前在进程池中并行处理图文笔记的图片：按最长边缩放、按目标质量重新编码、
+去除 EXIF 等元数据，并将平台不支持的格式（HEIC、TIFF、BMP 等）转换为 JPEG。
+依赖可选的 Pillow（HEIC 还需要 pillow-heif），未安装时跳过预处理
+"""
+
+import importlib.util
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import config
+from ..util.logging import log_error, log_info
+
+# 可以原样上传的格式，其余格式一律转换
+PASSTHROUGH_FORMATS = {"JPEG", "PNG"}
+
+
+def pillow_available() -> bool:
+    """
+    判断是否安装了 Pillow
+
+    Returns:
+        bool: 可以导入 PIL 时返回 True
+    """
+    return importlib.util.find_spec("PIL") is not None
+
+
+def normalize_file(
+    path: str, out_dir: str, max_edge: int, quality: int
+) -> Dict[str, Any]:
+    """
+    处理单张图片，在工作进程中执行
+
+    按 EXIF 方向旋转后缩放到最长边不超过 max_edge，不透明图片编码为 JPEG，
+    带透明通道的图片编码为 PNG；保存时不写入 EXIF，只保留 ICC 色彩配置。
+    无需缩放和转换、不含 EXIF 且处理后没有变小的图片保留原文件
+
+    Args:
+        path: 本地图片路径
+        out_dir: 输出目录
+        max_edge: 最长边像素上限，0 表示不缩放
+        quality: JPEG 质量（1-95）
+
+    Returns:
+        Dict[str, Any]: 输出路径、处理前后的字节数、尺寸和格式，changed 表示是否使用了新文件
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        from pillow_heif import register_heif_opener
+
+        register_heif_opener()
+    except ImportError:
+        pass
+
+    original_bytes = os.path.getsize(path)
+    with Image.open(path) as source:
+        source_format = source.format
+        has_exif = bool(source.info.get("exif"))
+        icc_profile = source.info.get("icc_profile")
+        image = ImageOps.exif_transpose(source)
+        resized = max_edge > 0 and max(image.size) > max_edge
+        if resized:
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        if has_alpha:
+            image = image.convert("RGBA")
+            fmt, suffix, options = "PNG", ".png", {"optimize": True}
+        else:
+            image = image.convert("RGB")
+            fmt, suffix = "JPEG", ".jpg"
+            options = {"quality": quality, "optimize": True, "progressive": True}
+        if icc_profile:
+            options["icc_profile"] = icc_profile
+
+        fd, out_path = tempfile.mkstemp(prefix="xhs_img_", suffix=suffix, dir=out_dir)
+        os.close(fd)
+        try:
+            image.save(out_path, fmt, **options)
+        except Exception:
+            os.remove(out_path)
+            raise
+
+    new_bytes = os.path.getsize(out_path)
+    width, height = image.size
+    if (
+        not resized
+        and not has_exif
+        and source_format in PASSTHROUGH_FORMATS
+        and new_bytes >= original_bytes
+    ):
+        os.remove(out_path)
+        return {
+            "source": path,
+            "path": path,
+            "changed": False,
+            "original_bytes": original_bytes,
+            "bytes": original_bytes,
+            "width": width,
+            "height": height,
+            "format": source_format,
+        }
+    return {
+        "source": path,
+        "path": out_path,
+        "changed": True,
+        "original_bytes": original_bytes,
+        "bytes": new_bytes,
+        "width": width,
+        "height": height,
+        "format": fmt,
+    }
+
+
+class ImageNormalizer:
+    """
+    图片预处理器
+
+    图片解码和编码是 CPU 密集型操作，在进程池中执行以利用多个核心，
+    多图笔记的图片同时处理。单张图片处理失败时使用原图
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        max_edge: int = 2048,
+        quality: int = 85,
+        out_dir: Optional[str] = None,
+    ):
+        """
+        初始化图片预处理器
+
+        Args:
+            workers: 工作进程数，0 表示使用 CPU 核心数
+            max_edge: 最长边像素上限，0 表示不缩放
+            quality: JPEG 质量（1-95）
+            out_dir: 输出目录，默认系统临时目录
+        """
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.max_edge = max_edge
+        self.quality = max(1, min(95, quality))
+        self.out_dir = out_dir or tempfile.gettempdir()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """首次使用时创建进程池"""
+        with self._lock:
+            if self._executor is None:
+                # 服务进程中有多个线程，使用 spawn 避免 fork 复制持有的锁
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset_pool(self) -> None:
+        """工作进程异常退出后丢弃进程池，下次使用时重建"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def normalize_all(
+        self, image_paths: List[str]
+    ) -> Tuple[List[str], List[str], Dict[str, Any]]:
+        """
+        并行处理多张本地图片
+
+        Args:
+            image_paths: 本地图片路径列表
+
+        Returns:
+            处理后的路径列表（与输入顺序一致）、需要清理的临时文件列表，
+            以及处理报告：图片数、被替换的图片数、处理前后总字节数、节省的字节数和耗时
+        """
+        start = time.perf_counter()
+        os.makedirs(self.out_dir, exist_ok=True)
+        pool = self._pool()
+        futures = [
+            pool.submit(normalize_file, path, self.out_dir, self.max_edge, self.quality)
+            for path in image_paths
+        ]
+
+        paths, tmp_files, errors = [], [], []
+        original_bytes = new_bytes = 0
+        for path, future in zip(image_paths, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._reset_pool()
+                log_error("图片预处理失败，使用原图", path=path, error=str(e))
+                errors.append({"path": path, "error": str(e)})
+                paths.append(path)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    size = 0
+                original_bytes += size
+                new_bytes += size
+                continue
+            paths.append(result["path"])
+            if result["changed"]:
+                tmp_files.append(result["path"])
+            original_bytes += result["original_bytes"]
+            new_bytes += result["bytes"]
+
+        report = {
+            "images": len(image_paths),
+            "changed": len(tmp_files),
+            "original_bytes": original_bytes,
+            "bytes": new_bytes,
+            "saved_bytes": original_bytes - new_bytes,
+            "elapsed": round(time.perf_counter() - start, 3),
+        }
+        if errors:
+            report["errors"] = errors
+        log_info("图片预处理完成", **report)
+        return paths, tmp_files, report
+
+    def close(self) -> None:
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_normalizer: Optional[ImageNormalizer] = None
+_normalizer_lock = threading.Lock()
+_disabled_logged = False
+
+
+def get_image_normalizer() -> Optional[ImageNormalizer]:
+    """
+    获取进程内共享的图片预处理器
+
+    Returns:
+        Optional[ImageNormalizer]: 按配置 image_workers、image_max_edge 和 image_quality
+        创建的预处理器；未开启 image_normalize 或未安装 Pillow 时返回None
+    """
+    global _normalizer, _disabled_logged
+    if not config.get_bool("image_normalize", False):
+        return None
+    with _normalizer_lock:
+        if _normalizer is None:
+            if not pillow_available():
+                if not _disabled_logged:
+                    log_error("已开启图片预处理但未安装 Pillow，跳过预处理")
+                    _disabled_logged = True
+                return None
+            _normalizer = ImageNormalizer(
+                workers=config.get_int("image_workers", 0),
+                max_edge=config.get_int("image_max_edge", 2048),
+                quality=config.get_int("image_quality", 85),
+            )
+        return _normalizer
@@ -0,0 +1,402 @@
+"""
+持久化发布任务队列
+
+使用 SQLite（WAL 模式）保存发布任务，服务重启后未完成的任务可以继续执行。
+定时任务以 scheduled 状态保存发布时间，不会被立即认领，由定时发布器按时间执行
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCESS = "success"
+JOB_ERROR = "error"
+# 定时任务：等待预处理，以及已被某个进程认领并预处理媒体
+JOB_SCHEDULED = "scheduled"
+JOB_STAGED = "staged"
+
+JOB_STATUSES = (
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCESS,
+    JOB_ERROR,
+    JOB_SCHEDULED,
+    JOB_STAGED,
+)
+
+
+class JobQueue:
+    """
+    发布任务队列
+
+    任务按提交顺序被认领。认领时状态原子地从 queued 变为 running，
+    多个工作线程或进程可以安全地共享同一个数据库文件。
+    指定了发布账号的任务只能被负责该账号的进程认领。
+    认领时记录服务器进程序号，重新启动的子进程只恢复自己上次认领的任务
+    """
+
+    def __init__(self, db_path: str, worker: Optional[int] = None):
+        """
+        打开或创建任务数据库
+
+        Args:
+            db_path: SQLite 数据库文件路径
+            worker: 多进程运行时当前服务器进程的序号，单进程运行和主进程中为None
+        """
+        self.db_path = db_path
+        self.worker = worker
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, note_type TEXT NOT NULL, "
+                "params TEXT NOT NULL, status TEXT NOT NULL, "
+                "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status "
+                "ON jobs (status, created_at)"
+            )
+            # 定时发布和发布账号的列在已有数据库上补充
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("publish_at", "staged_at"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} REAL")
+            if "worker" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN worker INTEGER")
+            if "account" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN account TEXT")
+                conn.execute(
+                    "UPDATE jobs SET account = json_extract(params, '$.account')"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建数据库连接，每次操作使用独立连接以便跨线程使用"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _account_filter(accounts: Optional[Sequence[str]]) -> Tuple[str, List[str]]:
+        """未指定账号或账号在 accounts 中的任务的查询条件，accounts 为None时不限账号"""
+        if accounts is None:
+            return "", []
+        marks = ", ".join("?" * len(accounts))
+        return f" AND (account IS NULL OR account IN ({marks}))", list(accounts)
+
+    def _worker_filter(self) -> Tuple[str, List[int]]:
+        """当前进程认领的任务的查询条件，单进程运行和主进程中不限进程"""
+        if self.worker is None:
+            return "", []
+        return " AND worker = ?", [self.worker]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        """将数据库行转换为任务字典"""
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        publish_at = job.get("publish_at")
+        if publish_at is not None:
+            # 定时任务：媒体就绪领先发布时间的秒数，以及开始发布和发布完成相对发布时间的偏差（秒）
+            staged, started = job["staged_at"], job["started_at"]
+            finished = job["finished_at"] if started else None
+            job["stage_lead"] = round(publish_at - staged, 3) if staged else None
+            job["dispatch_lag"] = round(started - publish_at, 3) if started else None
+            job["publish_lag"] = round(finished - publish_at, 3) if finished else None
+        return job
+
+    def submit(self, note_type: str, params: Dict[str, Any]) -> str:
+        """
+        提交发布任务
+
+        Args:
+            note_type: 笔记类型：text, image 或 video
+            params: 发布参数
+
+        Returns:
+            str: 任务ID
+        """
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, note_type, params, status, created_at, account) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    note_type,
+                    json.dumps(params, ensure_ascii=False),
+                    JOB_QUEUED,
+                    time.time(),
+                    params.get("account"),
+                ),
+            )
+        return job_id
+
+    def schedule(
+        self, note_type: str, params: Dict[str, Any], publish_at: float
+    ) -> str:
+        """
+        提交定时发布任务
+
+        Args:
+            note_type: 笔记类型：text, image 或 video
+            params: 发布参数
+            publish_at: 发布时间（Unix 时间戳）
+
+        Returns:
+            str: 任务ID
+        """
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs "
+                "(id, note_type, params, status, created_at, publish_at, account) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    note_type,
+                    json.dumps(params, ensure_ascii=False),
+                    JOB_SCHEDULED,
+                    time.time(),
+                    publish_at,
+                    params.get("account"),
+                ),
+            )
+        return job_id
+
+    def scheduled(
+        self, accounts: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        列出等待预处理的定时任务
+
+        Args:
+            accounts: 只列出未指定账号或指定账号在其中的任务，None表示不限
+
+        Returns:
+            List[Dict[str, Any]]: 按发布时间排列的任务
+        """
+        where, args = self._account_filter(accounts)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE status = ?{where} ORDER BY publish_at",
+                (JOB_SCHEDULED, *args),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def claim_scheduled(
+        self, job_id: str, accounts: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        认领定时任务以预处理媒体，多个进程中只有一个能认领成功
+
+        Args:
+            job_id: 任务ID
+            accounts: 只认领未指定账号或指定账号在其中的任务，None表示不限
+
+        Returns:
+            Optional[Dict[str, Any]]: 认领成功时返回任务，已被认领、取消或账号不在 accounts 中时返回None
+        """
+        where, args = self._account_filter(accounts)
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker = ? "
+                f"WHERE id = ? AND status = ?{where}",
+                (JOB_STAGED, self.worker, job_id, JOB_SCHEDULED, *args),
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def mark_staged(self, job_id: str) -> None:
+        """
+        记录定时任务的媒体已就绪
+
+        Args:
+            job_id: 任务ID
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET staged_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+
+    def mark_running(self, job_id: str) -> None:
+        """
+        记录定时任务开始发布
+
+        Args:
+            job_id: 任务ID
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (JOB_RUNNING, time.time(), job_id),
+            )
+
+    def claim(
+        self, accounts: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        认领最早提交的排队任务
+
+        Args:
+            accounts: 只认领未指定账号或指定账号在其中的任务，None表示不限；
+                多进程运行时传入当前进程负责的账号，指定账号的任务由负责该账号的进程执行
+
+        Returns:
+            Optional[Dict[str, Any]]: 被认领的任务，没有可认领的任务时返回None
+        """
+        where, args = self._account_filter(accounts)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE status = ?{where} "
+                "ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED, *args),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, "
+                "worker = ? WHERE id = ?",
+                (JOB_RUNNING, time.time(), self.worker, row["id"]),
+            )
+            job = conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (row["id"],)
+            ).fetchone()
+        return self._to_dict(job)
+
+    def complete(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        记录任务结果
+
+        Args:
+            job_id: 任务ID
+            status: 最终状态：success 或 error
+            result: 发布结果
+            error: 错误信息
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ?",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def recover(self, max_attempts: int) -> int:
+        """
+        将上次运行中断的任务重新排队
+
+        已尝试次数达到 max_attempts 的任务标记为失败，避免反复导致进程崩溃的任务无限重试。
+        指定了进程序号时只恢复该序号的进程认领的任务，不影响其他仍在运行的进程正在执行的任务
+
+        Args:
+            max_attempts: 最大尝试次数
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        where, args = self._worker_filter()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                f"WHERE status = ? AND attempts >= ?{where}",
+                (
+                    JOB_ERROR,
+                    "任务多次中断，已放弃",
+                    time.time(),
+                    JOB_RUNNING,
+                    max_attempts,
+                    *args,
+                ),
+            )
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, worker = NULL "
+                f"WHERE status = ?{where}",
+                (JOB_QUEUED, JOB_RUNNING, *args),
+            )
+            # 已认领但未发布的定时任务重新等待预处理，暂存的媒体随进程退出失效
+            conn.execute(
+                "UPDATE jobs SET status = ?, staged_at = NULL, worker = NULL "
+                f"WHERE status = ?{where}",
+                (JOB_SCHEDULED, JOB_STAGED, *args),
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询任务
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 任务信息，不存在时返回None
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(
+        self, status: Optional[str] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        按提交时间倒序列出任务
+
+        Args:
+            status: 可选的状态过滤
+            limit: 最大返回数量
+
+        Returns:
+            List[Dict[str, Any]]: 任务列表
+        """
+        with closing(self._connect()) as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? "
+                    "ORDER BY created_at DESC LIMIT ?",
+                    (status, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """
+        统计各状态的任务数
+
+        Returns:
+            Dict[str, int]: 状态到任务数的映射
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
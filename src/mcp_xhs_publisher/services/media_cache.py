@@ -0,0 +1,452 @@
+"""
+媒体磁盘缓存
+
+按内容哈希存储远程图片和视频，索引以 URL 为键并记录 ETag/Last-Modified，
+支持新鲜期内直接命中、过期后条件请求重新验证，以及按容量上限的 LRU 淘汰。
+索引使用 SQLite（WAL 模式），可被多个线程和进程同时使用
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from ..config import config
+from ..util.logging import log_error, log_info
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+@dataclass
+class CachedMedia:
+    """缓存查询结果"""
+
+    path: str
+    content_hash: str
+    size: int
+    # fresh: 新鲜期内命中；revalidated: 条件请求返回304；hash: 按内容哈希命中；miss: 重新下载
+    status: str
+
+
+class MediaCache:
+    """
+    内容寻址的媒体缓存
+
+    文件保存在 blobs/<哈希前两位>/<哈希><扩展名>，相同内容只保存一份。
+    最近 EVICTION_GRACE 秒内被访问过的文件不会被淘汰，避免删除正在上传的文件；
+    需要保留更久的文件（如定时任务提前预处理的媒体）使用 pin 创建独立的硬链接
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    EVICTION_GRACE = 600
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl: float):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存容量上限（字节）
+            ttl: 服务端未提供 max-age 时的默认新鲜期（秒）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._blob_dir = os.path.join(cache_dir, "blobs")
+        self._tmp_dir = os.path.join(cache_dir, "tmp")
+        self._db_path = os.path.join(cache_dir, "index.db")
+        os.makedirs(self._blob_dir, exist_ok=True)
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._url_locks_guard = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS urls ("
+                "url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, etag TEXT, "
+                "last_modified TEXT, fetched_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "content_hash TEXT PRIMARY KEY, ext TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建索引数据库连接，每次操作使用独立连接以便跨线程使用"""
+        return sqlite3.connect(self._db_path, timeout=30)
+
+    def _blob_path(self, content_hash: str, ext: str) -> str:
+        """内容哈希对应的文件路径"""
+        return os.path.join(self._blob_dir, content_hash[:2], content_hash + ext)
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        """同一 URL 在进程内只允许一个下载"""
+        with self._url_locks_guard:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def _expires_at(self, headers: Mapping[str, str]) -> float:
+        """根据 Cache-Control 计算过期时间，no-cache/no-store 时每次都重新验证"""
+        cache_control = headers.get("Cache-Control", "").lower()
+        if "no-cache" in cache_control or "no-store" in cache_control:
+            return 0.0
+        match = _MAX_AGE.search(cache_control)
+        max_age = float(match.group(1)) if match else self.ttl
+        return time.time() + max_age
+
+    def lookup(self, url: str) -> Optional[CachedMedia]:
+        """
+        查询 URL 的缓存文件，不访问网络，也不检查新鲜期
+
+        Args:
+            url: 媒体链接
+
+        Returns:
+            Optional[CachedMedia]: 缓存存在时返回，否则返回None
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT u.content_hash, b.ext, b.size FROM urls u "
+                "JOIN blobs b ON b.content_hash = u.content_hash WHERE u.url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        path = self._blob_path(row[0], row[1])
+        if not os.path.exists(path):
+            return None
+        return CachedMedia(path=path, content_hash=row[0], size=row[2], status="fresh")
+
+    def get_fresh(self, url: str) -> Optional[CachedMedia]:
+        """
+        查询新鲜期内的缓存文件，不访问网络
+
+        Args:
+            url: 媒体链接
+
+        Returns:
+            Optional[CachedMedia]: 未过期的缓存，否则返回None
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT expires_at FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or row[0] <= time.time():
+            return None
+        cached = self.lookup(url)
+        if cached:
+            self._touch(cached.content_hash)
+        return cached
+
+    def revalidate(
+        self, url: str, etag: Optional[str], last_modified: Optional[str]
+    ) -> Optional[CachedMedia]:
+        """
+        使用调用方获取的响应头重新验证缓存
+
+        服务端返回的 ETag 或 Last-Modified 与缓存记录一致时延长新鲜期
+
+        Args:
+            url: 媒体链接
+            etag: 服务端当前的 ETag
+            last_modified: 服务端当前的 Last-Modified
+
+        Returns:
+            Optional[CachedMedia]: 验证通过的缓存，否则返回None
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        if not (
+            (etag and etag == row[0]) or (last_modified and last_modified == row[1])
+        ):
+            return None
+        cached = self.lookup(url)
+        if cached is None:
+            return None
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE urls SET expires_at = ?, fetched_at = ? WHERE url = ?",
+                (time.time() + self.ttl, time.time(), url),
+            )
+        self._touch(cached.content_hash)
+        cached.status = "revalidated"
+        return cached
+
+    def lookup_hash(self, content_hash: str) -> Optional[CachedMedia]:
+        """
+        按内容哈希查询缓存文件，调用方已知内容摘要时无需访问网络即可使用任意链接缓存的相同内容
+
+        Args:
+            content_hash: 内容的 SHA-256 十六进制摘要
+
+        Returns:
+            Optional[CachedMedia]: 缓存文件信息，不存在时返回None
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT ext, size FROM blobs WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        path = self._blob_path(content_hash, row[0])
+        if not os.path.exists(path):
+            return None
+        self._touch(content_hash)
+        return CachedMedia(
+            path=path, content_hash=content_hash, size=row[1], status="hash"
+        )
+
+    def pin(self, path: str) -> Optional[str]:
+        """
+        为缓存文件创建独立的硬链接，淘汰缓存文件后链接仍然可用，调用方用完后自行删除
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            Optional[str]: 链接路径（不支持硬链接时为副本），path 不是缓存文件时返回None
+        """
+        blob_dir = os.path.join(self._blob_dir, "")
+        if not os.path.abspath(path).startswith(os.path.abspath(blob_dir)):
+            return None
+        fd, pinned = tempfile.mkstemp(
+            dir=self._tmp_dir, prefix="pin-", suffix=os.path.splitext(path)[1]
+        )
+        os.close(fd)
+        os.remove(pinned)
+        try:
+            os.link(path, pinned)
+        except OSError:
+            shutil.copyfile(path, pinned)
+        return pinned
+
+    def fetch(self, url: str, session: requests.Session, timeout: float) -> CachedMedia:
+        """
+        获取链接对应的本地缓存文件
+
+        新鲜期内直接返回缓存；过期后携带 If-None-Match/If-Modified-Since 重新验证；
+        未缓存或内容已变化时下载并写入缓存
+
+        Args:
+            url: 媒体链接
+            session: 用于请求的会话
+            timeout: 请求超时时间（秒）
+
+        Returns:
+            CachedMedia: 缓存文件信息
+
+        Raises:
+            requests.RequestException: 下载失败
+        """
+        with self._url_lock(url):
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT content_hash, etag, last_modified, expires_at "
+                    "FROM urls WHERE url = ?",
+                    (url,),
+                ).fetchone()
+            cached = self.lookup(url) if row else None
+
+            headers = {}
+            if cached:
+                if row[3] > time.time():
+                    self._touch(cached.content_hash)
+                    return cached
+                if row[1]:
+                    headers["If-None-Match"] = row[1]
+                if row[2]:
+                    headers["If-Modified-Since"] = row[2]
+
+            with session.get(
+                url, headers=headers, stream=True, timeout=timeout
+            ) as resp:
+                if cached and resp.status_code == 304:
+                    with closing(self._connect()) as conn, conn:
+                        conn.execute(
+                            "UPDATE urls SET expires_at = ?, fetched_at = ? "
+                            "WHERE url = ?",
+                            (self._expires_at(resp.headers), time.time(), url),
+                        )
+                    self._touch(cached.content_hash)
+                    cached.status = "revalidated"
+                    return cached
+                resp.raise_for_status()
+                return self._store(url, resp)
+
+    def _store(self, url: str, resp: requests.Response) -> CachedMedia:
+        """将响应内容流式写入缓存"""
+        _, ext = os.path.splitext(os.path.basename(urlparse(url).path))
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in resp.iter_content(self.CHUNK_SIZE):
+                    hasher.update(chunk)
+                    f.write(chunk)
+            return self.store_file(
+                url,
+                tmp_path,
+                content_hash=hasher.hexdigest(),
+                ext=ext,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+                expires_at=self._expires_at(resp.headers),
+            )
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store_file(
+        self,
+        url: str,
+        file_path: str,
+        content_hash: str,
+        ext: str = "",
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        expires_at: Optional[float] = None,
+    ) -> CachedMedia:
+        """
+        将已下载的文件移入缓存并登记 URL，超出容量上限时淘汰旧文件
+
+        Args:
+            url: 媒体链接
+            file_path: 已下载的文件，调用后该文件被移动或删除
+            content_hash: 文件内容的 SHA-256 十六进制摘要
+            ext: 文件扩展名
+            etag: 响应的 ETag
+            last_modified: 响应的 Last-Modified
+            expires_at: 新鲜期截止时间戳，默认按 ttl 计算
+
+        Returns:
+            CachedMedia: 缓存文件信息
+        """
+        now = time.time()
+        size = os.path.getsize(file_path)
+        path = self._blob_path(content_hash, ext)
+        if os.path.exists(path):
+            os.remove(file_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(file_path, path)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO blobs (content_hash, ext, size, last_access) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(content_hash) "
+                "DO UPDATE SET last_access = excluded.last_access",
+                (content_hash, ext, size, now),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO urls "
+                "(url, content_hash, etag, last_modified, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    content_hash,
+                    etag,
+                    last_modified,
+                    now,
+                    now + self.ttl if expires_at is None else expires_at,
+                ),
+            )
+        self._evict()
+        return CachedMedia(
+            path=path, content_hash=content_hash, size=size, status="miss"
+        )
+
+    def _touch(self, content_hash: str) -> None:
+        """更新文件的最近访问时间"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE blobs SET last_access = ? WHERE content_hash = ?",
+                (time.time(), content_hash),
+            )
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰文件，直到总大小不超过容量上限"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[
+                0
+            ]
+            if total <= self.max_bytes:
+                return
+            rows = conn.execute(
+                "SELECT content_hash, ext, size FROM blobs WHERE last_access < ? "
+                "ORDER BY last_access",
+                (time.time() - self.EVICTION_GRACE,),
+            ).fetchall()
+            evicted = 0
+            for content_hash, ext, size in rows:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self._blob_path(content_hash, ext))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    log_error(
+                        "媒体缓存淘汰失败", content_hash=content_hash, error=str(e)
+                    )
+                    continue
+                conn.execute("DELETE FROM urls WHERE content_hash = ?", (content_hash,))
+                conn.execute(
+                    "DELETE FROM blobs WHERE content_hash = ?", (content_hash,)
+                )
+                total -= size
+                evicted += 1
+        if evicted:
+            log_info("媒体缓存已淘汰旧文件", evicted=evicted, total_bytes=total)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计
+
+        Returns:
+            Dict[str, int]: URL数、文件数和总字节数
+        """
+        with closing(self._connect()) as conn:
+            urls = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            blobs, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+        return {"urls": urls, "blobs": blobs, "total_bytes": total}
+
+
+_cache: Optional[MediaCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_media_cache() -> Optional[MediaCache]:
+    """
+    获取进程内共享的媒体缓存
+
+    Returns:
+        Optional[MediaCache]: 缓存实例，media_cache_max_mb 为0时返回None
+    """
+    global _cache
+    max_mb = config.get_int("media_cache_max_mb", 1024)
+    if max_mb <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = MediaCache(
+                cache_dir=os.path.join(config.get("data_dir"), "media_cache"),
+                max_bytes=max_mb * 1024 * 1024,
+                ttl=config.get_float("media_cache_ttl", 86400.0),
+            )
+        return _cache
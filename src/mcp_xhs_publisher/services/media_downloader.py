@@ -0,0 +1,333 @@
+"""
+远程媒体下载服务
+
+使用共享的连接池会话并发下载远程图片，复用 TCP/TLS 连接，
+并限制单个主机的并发连接数；大文件（视频）使用分段下载；
+启用媒体缓存时优先从缓存读取
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..config import config
+from ..util.logging import log_error, log_info
+from ..util.tracing import bind, span
+from .media_cache import MediaCache, get_media_cache
+from .segmented_downloader import SegmentedDownloader
+
+
+def is_remote(path: str) -> bool:
+    """判断路径是否为 http(s) 链接"""
+    return path.startswith("https://") or path.startswith("http://")
+
+
+@dataclass
+class DownloadResult:
+    """单个媒体的下载结果"""
+
+    source: str
+    local_path: Optional[str] = None
+    # 是否为需要调用方清理的临时文件
+    downloaded: bool = False
+    size: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    # 媒体缓存状态：fresh、revalidated、hash 或 miss，未启用缓存时为None
+    cache: Optional[str] = None
+
+    def timing(self) -> Dict[str, Any]:
+        """返回用于日志和响应的耗时信息"""
+        return {
+            "source": self.source,
+            "downloaded": self.downloaded,
+            "bytes": self.size,
+            "seconds": round(self.elapsed, 4),
+            "cache": self.cache,
+            "error": self.error,
+        }
+
+
+class MediaDownloader:
+    """
+    并发媒体下载器
+
+    所有下载共享一个带连接池的 requests.Session；
+    max_workers 控制总并发数，per_host_limit 控制单个主机的并发连接数
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        per_host_limit: int = 4,
+        timeout: float = 10.0,
+        cache: Optional[MediaCache] = None,
+        segmented: Optional[SegmentedDownloader] = None,
+        partial_dir: Optional[str] = None,
+    ):
+        """
+        初始化下载器
+
+        Args:
+            max_workers: 同时下载的最大数量
+            per_host_limit: 单个主机的最大并发连接数
+            timeout: 单次请求超时时间（秒）
+            cache: 可选的媒体缓存，提供时下载结果保存在缓存中而非临时文件
+            segmented: 大文件使用的分段下载器
+            partial_dir: 大文件下载过程中的存放目录，用于断点续传
+        """
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.cache = cache
+        self.segmented = segmented or SegmentedDownloader(timeout=timeout)
+        self.partial_dir = partial_dir or tempfile.gettempdir()
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=max(self.max_workers, self.per_host_limit),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="xhs-download"
+        )
+        self._host_lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._large_locks: Dict[str, threading.Lock] = {}
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """获取主机对应的并发信号量"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+            return slot
+
+    def _large_lock(self, url: str) -> threading.Lock:
+        """同一大文件链接在进程内只允许一个下载，后到的调用可直接命中缓存"""
+        with self._host_lock:
+            return self._large_locks.setdefault(url, threading.Lock())
+
+    def _fetch_cached(self, url: str) -> DownloadResult:
+        """通过媒体缓存获取单个链接"""
+        result = DownloadResult(source=url)
+        start = time.perf_counter()
+        try:
+            with self._host_slot(url):
+                media = self.cache.fetch(url, self.session, self.timeout)
+            result.local_path = media.path
+            result.size = media.size
+            result.cache = media.status
+        except Exception as e:
+            result.error = str(e)
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _fetch_traced(self, url: str, dest_dir: str) -> DownloadResult:
+        """下载单个链接，在当前追踪中记录 download.fetch"""
+        with span("download.fetch", url=url) as current:
+            result = self._fetch(url, dest_dir)
+            current.set(bytes=result.size, cache=result.cache or "")
+            if result.error:
+                current.fail(result.error)
+        return result
+
+    def _fetch(self, url: str, dest_dir: str) -> DownloadResult:
+        """下载单个链接到临时文件"""
+        if self.cache is not None:
+            return self._fetch_cached(url)
+        result = DownloadResult(source=url)
+        name = os.path.basename(urlparse(url).path) or "media"
+        _, ext = os.path.splitext(name)
+        start = time.perf_counter()
+        fd, filename = tempfile.mkstemp(prefix="xhs_", suffix=ext, dir=dest_dir)
+        try:
+            with os.fdopen(fd, "wb") as f, self._host_slot(url):
+                with self.session.get(url, stream=True, timeout=self.timeout) as resp:
+                    resp.raise_for_status()
+                    for chunk in resp.iter_content(self.CHUNK_SIZE):
+                        f.write(chunk)
+            result.local_path = filename
+            result.downloaded = True
+            result.size = os.path.getsize(filename)
+        except Exception as e:
+            result.error = str(e)
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def download_all(
+        self, paths: List[str], dest_dir: Optional[str] = None
+    ) -> List[DownloadResult]:
+        """
+        并发下载路径列表中的远程链接，本地路径原样返回
+
+        Args:
+            paths: 本地路径或 http(s) 链接列表
+            dest_dir: 下载目录，默认使用系统临时目录
+
+        Returns:
+            List[DownloadResult]: 与输入顺序一致的下载结果
+        """
+        dest_dir = dest_dir or tempfile.gettempdir()
+        start = time.perf_counter()
+        futures = {
+            i: self._executor.submit(bind(self._fetch_traced), path, dest_dir)
+            for i, path in enumerate(paths)
+            if is_remote(path)
+        }
+        results = []
+        for i, path in enumerate(paths):
+            if i in futures:
+                results.append(futures[i].result())
+            else:
+                results.append(DownloadResult(source=path, local_path=path))
+
+        if futures:
+            for r in results:
+                if r.error:
+                    log_error("图片下载失败", url=r.source, error=r.error)
+            log_info(
+                "远程图片下载完成",
+                count=len(futures),
+                total_seconds=round(time.perf_counter() - start, 4),
+                timings=[r.timing() for r in results if is_remote(r.source)],
+            )
+        return results
+
+    def download_large(
+        self, url: str, expected_sha256: Optional[str] = None
+    ) -> DownloadResult:
+        """
+        分段下载大文件（如视频）
+
+        下载中的文件以链接哈希命名保存在 partial_dir，中断后再次调用会继续下载；
+        启用缓存时完成的文件移入缓存，给出预期摘要且缓存中已有相同内容时不访问网络
+
+        Args:
+            url: 文件链接
+            expected_sha256: 可选的预期 SHA-256 十六进制摘要
+
+        Returns:
+            DownloadResult: 下载结果
+        """
+        with span("download.large", url=url) as current, self._large_lock(url):
+            result = self._download_large(url, expected_sha256)
+            current.set(bytes=result.size, cache=result.cache or "")
+            if result.error:
+                current.fail(result.error)
+        return result
+
+    def _download_large(
+        self, url: str, expected_sha256: Optional[str]
+    ) -> DownloadResult:
+        """分段下载大文件，由 download_large 记录 span"""
+        result = DownloadResult(source=url)
+        start = time.perf_counter()
+        _, ext = os.path.splitext(os.path.basename(urlparse(url).path))
+        expected = expected_sha256.lower() if expected_sha256 else None
+        try:
+            if self.cache is not None:
+                # 内容摘要已知时，其他链接下载过的相同内容同样可用，无需 HEAD 请求
+                cached = self.cache.lookup_hash(expected) if expected else None
+                cached = cached or self.cache.get_fresh(url)
+                if cached is None:
+                    head = self.session.head(
+                        url, allow_redirects=True, timeout=self.timeout
+                    )
+                    if head.ok:
+                        cached = self.cache.revalidate(
+                            url,
+                            head.headers.get("ETag"),
+                            head.headers.get("Last-Modified"),
+                        )
+                if cached and expected in (None, cached.content_hash):
+                    result.local_path = cached.path
+                    result.size = cached.size
+                    result.cache = cached.status
+                    result.elapsed = time.perf_counter() - start
+                    return result
+
+            name = hashlib.sha1(url.encode("utf-8")).hexdigest() + ext
+            download = self.segmented.download(
+                url, os.path.join(self.partial_dir, name), expected
+            )
+            result.size = download.size
+            if self.cache is not None:
+                media = self.cache.store_file(
+                    url,
+                    download.path,
+                    content_hash=download.sha256,
+                    ext=ext,
+                    etag=download.etag,
+                    last_modified=download.last_modified,
+                )
+                result.local_path = media.path
+                result.cache = media.status
+            else:
+                # 移到独立的临时文件，调用方用完后删除时不影响同一链接的其他下载
+                fd, path = tempfile.mkstemp(dir=self.partial_dir, suffix=ext)
+                os.close(fd)
+                os.replace(download.path, path)
+                result.local_path = path
+                result.downloaded = True
+        except Exception as e:
+            result.error = str(e)
+            log_error("大文件下载失败", url=url, error=str(e))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def close(self) -> None:
+        """关闭线程池和连接池"""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+        self.segmented.close()
+
+
+_downloader: Optional[MediaDownloader] = None
+_downloader_lock = threading.Lock()
+
+
+def get_media_downloader() -> MediaDownloader:
+    """
+    获取进程内共享的下载器实例
+
+    Returns:
+        MediaDownloader: 按配置创建的下载器
+    """
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = MediaDownloader(
+                max_workers=config.get_int("download_workers", 4),
+                per_host_limit=config.get_int("download_per_host", 4),
+                timeout=config.get_float("download_timeout", 10.0),
+                cache=get_media_cache(),
+                segmented=SegmentedDownloader(
+                    segments=config.get_int("video_download_segments", 4),
+                    min_segment_bytes=config.get_int("video_segment_min_mb", 8)
+                    * 1024
+                    * 1024,
+                    timeout=config.get_float("download_timeout", 10.0),
+                ),
+                partial_dir=os.path.join(config.get("data_dir"), "downloads"),
+            )
+        return _downloader
@@ -0,0 +1,369 @@
+"""
+媒体文件头探测与发布前预检
+
+通过内存映射只读取容器头：JPEG、PNG、WebP 解析尺寸，MP4/MOV 遍历 box 获取时长、
+视频编码以及 moov 是否位于 mdat 之前（faststart）。发布前检查正文、话题和本地媒体，
+不合格的笔记在发起任何网络请求前即被拒绝
+"""
+
+import mmap
+import os
+import struct
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..config import config
+from .media_downloader import is_remote
+
+# 平台限制
+MAX_CONTENT_CHARS = 1000
+MAX_TOPICS = 10
+MAX_IMAGES = 18
+MIN_IMAGE_EDGE = 100
+MAX_VIDEO_SECONDS = 15 * 60
+
+# 平台直接接受的图片格式；其余可识别格式需开启图片预处理后转换
+SUPPORTED_IMAGE_FORMATS = {"jpeg", "png", "webp"}
+CONVERTIBLE_IMAGE_FORMATS = {"heic", "gif", "bmp", "tiff"}
+VIDEO_HANDLER = b"vide"
+
+# 不带长度字段的 JPEG 标记
+_JPEG_STANDALONE = {0x01, *range(0xD0, 0xD9)}
+# SOF 标记（不含 DHT、JPG、DAC）
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+class PreflightError(ValueError):
+    """笔记未通过发布前预检"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("；".join(errors))
+        self.errors = errors
+
+
+@dataclass
+class MediaInfo:
+    """媒体文件头信息"""
+
+    path: str
+    size: int
+    format: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    # 以下仅视频
+    duration: Optional[float] = None
+    codec: Optional[str] = None
+    faststart: Optional[bool] = None
+    problems: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典，省略空字段"""
+        return {k: v for k, v in asdict(self).items() if v not in (None, [])}
+
+
+def _map(path: str) -> Tuple[Optional[mmap.mmap], int]:
+    """只读映射文件，空文件返回 (None, 0)"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return None, 0
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size
+
+
+def _probe_jpeg(data: mmap.mmap, info: MediaInfo) -> None:
+    """逐段跳过 JPEG 标记，直到 SOF 段读取尺寸"""
+    pos, end = 2, len(data)
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            info.problems.append("JPEG 标记损坏")
+            return
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in _JPEG_STANDALONE:
+            pos += 2
+            continue
+        (length,) = struct.unpack_from(">H", data, pos + 2)
+        if marker in _JPEG_SOF:
+            if pos + 9 > end:
+                break
+            info.height, info.width = struct.unpack_from(">HH", data, pos + 5)
+            return
+        if marker == 0xDA:
+            break
+        pos += 2 + length
+    info.problems.append("文件不完整：未找到图片尺寸")
+
+
+def _probe_png(data: mmap.mmap, info: MediaInfo) -> None:
+    """读取 IHDR 中的尺寸并检查 IEND 结尾"""
+    if len(data) < 24 or data[12:16] != b"IHDR":
+        info.problems.append("文件不完整：缺少 IHDR")
+        return
+    info.width, info.height = struct.unpack_from(">II", data, 16)
+    if data.rfind(b"IEND", max(0, len(data) - 12)) < 0:
+        info.problems.append("文件不完整：缺少 IEND")
+
+
+def _probe_webp(data: mmap.mmap, info: MediaInfo) -> None:
+    """按 VP8、VP8L、VP8X 三种编码读取尺寸"""
+    (riff_size,) = struct.unpack_from("<I", data, 4)
+    if riff_size + 8 > len(data):
+        info.problems.append("文件不完整：RIFF 长度超出文件大小")
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        width, height = struct.unpack_from("<HH", data, 26)
+        info.width, info.height = width & 0x3FFF, height & 0x3FFF
+    elif chunk == b"VP8L" and len(data) >= 25:
+        (bits,) = struct.unpack_from("<I", data, 21)
+        info.width, info.height = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    elif chunk == b"VP8X" and len(data) >= 30:
+        info.width = int.from_bytes(data[24:27], "little") + 1
+        info.height = int.from_bytes(data[27:30], "little") + 1
+    else:
+        info.problems.append("无法识别的 WebP 编码")
+
+
+def _boxes(data: mmap.mmap, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    遍历 ISO BMFF box
+
+    Yields:
+        (类型, 内容起始偏移, box 结束偏移)；box 超出范围时结束偏移大于 end
+    """
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            (size,) = struct.unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _probe_mp4(data: mmap.mmap, info: MediaInfo) -> None:
+    """遍历顶层 box 确定 moov/mdat 顺序，并从 moov 中读取时长和视频编码"""
+    end = len(data)
+    order = []
+    moov = None
+    for kind, body, box_end in _boxes(data, 0, end):
+        if box_end > end:
+            info.problems.append(f"文件不完整：{kind.decode('latin-1')} 超出文件大小")
+        if kind in (b"moov", b"mdat"):
+            order.append(kind)
+        if kind == b"moov":
+            moov = (body, min(box_end, end))
+    if moov is None:
+        info.problems.append("缺少 moov（文件不完整或未正确封装）")
+        return
+    info.faststart = order[0] == b"moov"
+    _probe_moov(data, *moov, info)
+
+
+def _probe_moov(data: mmap.mmap, start: int, end: int, info: MediaInfo) -> None:
+    """读取 mvhd 时长，以及第一条视频轨道的尺寸和编码"""
+    for kind, body, box_end in _boxes(data, start, end):
+        if kind == b"mvhd" and body + 32 <= end:
+            if data[body] == 1:
+                timescale, duration = struct.unpack_from(">IQ", data, body + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", data, body + 12)
+            if timescale:
+                info.duration = round(duration / timescale, 3)
+        elif kind == b"trak" and info.codec is None:
+            track: Dict[str, Any] = {}
+            _walk_track(data, body, min(box_end, end), track)
+            if track.get("handler") == VIDEO_HANDLER:
+                info.codec = track.get("codec")
+                info.width, info.height = track.get("width"), track.get("height")
+
+
+def _walk_track(data: mmap.mmap, start: int, end: int, track: Dict[str, Any]) -> None:
+    """递归读取轨道中的 tkhd、hdlr 和 stsd"""
+    for kind, body, box_end in _boxes(data, start, end):
+        box_end = min(box_end, end)
+        if kind in _MP4_CONTAINERS:
+            _walk_track(data, body, box_end, track)
+        elif kind == b"tkhd":
+            offset = body + (88 if data[body] == 1 else 76)
+            if offset + 8 <= box_end:
+                width, height = struct.unpack_from(">II", data, offset)
+                track["width"], track["height"] = width >> 16, height >> 16
+        elif kind == b"hdlr" and body + 12 <= box_end:
+            track["handler"] = bytes(data[body + 8 : body + 12])
+        elif kind == b"stsd" and body + 16 <= box_end:
+            track["codec"] = bytes(data[body + 12 : body + 16]).decode("latin-1")
+
+
+def probe(path: str) -> MediaInfo:
+    """
+    探测本地媒体文件的格式和关键参数，只读取文件头
+
+    Args:
+        path: 本地文件路径
+
+    Returns:
+        MediaInfo: 格式、尺寸、时长、编码等；无法识别或文件损坏时记录在 problems 中
+    """
+    try:
+        data, size = _map(path)
+    except OSError as e:
+        return MediaInfo(path=path, size=0, problems=[f"无法读取文件: {e}"])
+    info = MediaInfo(path=path, size=size)
+    if data is None:
+        info.problems.append("文件为空")
+        return info
+    try:
+        head = data[:16]
+        if head.startswith(b"\xff\xd8"):
+            info.format = "jpeg"
+            _probe_jpeg(data, info)
+        elif head.startswith(b"\x89PNG\r\n\x1a\n"):
+            info.format = "png"
+            _probe_png(data, info)
+        elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            info.format = "webp"
+            _probe_webp(data, info)
+        elif head[:4] in (b"GIF8",):
+            info.format = "gif"
+            info.width, info.height = struct.unpack_from("<HH", data, 6)
+        elif head[:2] == b"BM":
+            info.format = "bmp"
+        elif head[:4] in (b"II*\x00", b"MM\x00*"):
+            info.format = "tiff"
+        elif head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1"):
+            info.format = "heic"
+        elif head[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free"):
+            info.format = "mov" if head[8:10] == b"qt" else "mp4"
+            _probe_mp4(data, info)
+        else:
+            info.problems.append("无法识别的文件格式")
+    except struct.error:
+        info.problems.append("文件不完整：文件头被截断")
+    finally:
+        data.close()
+    return info
+
+
+def _check_image(path: str, label: str, errors: List[str]) -> Dict[str, Any]:
+    """检查本地图片，问题追加到 errors"""
+    info = probe(path)
+    errors.extend(f"{label} {path}: {p}" for p in info.problems)
+    if info.problems:
+        return info.to_dict()
+    if info.format not in SUPPORTED_IMAGE_FORMATS:
+        if info.format not in CONVERTIBLE_IMAGE_FORMATS:
+            errors.append(f"{label} {path}: 不是图片文件（{info.format}）")
+        elif not config.get_bool("image_normalize", False):
+            errors.append(
+                f"{label} {path}: 平台不支持 {info.format} 格式，请转换或开启 --image-normalize"
+            )
+    if info.width and info.height and min(info.width, info.height) < MIN_IMAGE_EDGE:
+        errors.append(
+            f"{label} {path}: 尺寸 {info.width}x{info.height} 过小，短边至少 {MIN_IMAGE_EDGE} 像素"
+        )
+    return info.to_dict()
+
+
+def _check_video(path: str, errors: List[str]) -> Dict[str, Any]:
+    """检查本地视频，问题追加到 errors"""
+    info = probe(path)
+    errors.extend(f"视频 {path}: {p}" for p in info.problems)
+    if info.problems:
+        return info.to_dict()
+    if info.format not in ("mp4", "mov"):
+        errors.append(f"视频 {path}: 不是 MP4/MOV 文件（{info.format}）")
+        return info.to_dict()
+    if info.codec is None:
+        errors.append(f"视频 {path}: 没有视频轨道")
+    if info.faststart is False:
+        errors.append(
+            f"视频 {path}: moov 位于文件末尾，请使用 ffmpeg -movflags +faststart 重新封装"
+        )
+    if info.duration is not None and info.duration > MAX_VIDEO_SECONDS:
+        errors.append(
+            f"视频 {path}: 时长 {info.duration:.0f} 秒超过上限 {MAX_VIDEO_SECONDS} 秒"
+        )
+    return info.to_dict()
+
+
+def preflight(note_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    发布前预检：检查正文、话题和本地媒体，不发起网络请求
+
+    远程媒体在下载后发布前再检查
+
+    Args:
+        note_type: 笔记类型：text, image 或 video
+        params: 发布参数
+
+    Returns:
+        Dict[str, Any]: errors（问题列表，为空表示通过）、media（本地媒体的探测结果）和耗时
+    """
+    start = time.perf_counter()
+    errors: List[str] = []
+    media: List[Dict[str, Any]] = []
+
+    content = params.get("content") or ""
+    if not content.strip():
+        errors.append("正文不能为空")
+    elif len(content) > MAX_CONTENT_CHARS:
+        errors.append(f"正文 {len(content)} 字超过上限 {MAX_CONTENT_CHARS} 字")
+    topics = params.get("topics") or []
+    if len(topics) > MAX_TOPICS:
+        errors.append(f"话题 {len(topics)} 个超过上限 {MAX_TOPICS} 个")
+    if any(not str(t).strip() for t in topics):
+        errors.append("话题不能为空")
+
+    if note_type == "image":
+        image_paths = params.get("image_paths") or []
+        if not image_paths:
+            errors.append("至少需要一张图片")
+        elif len(image_paths) > MAX_IMAGES:
+            errors.append(f"图片 {len(image_paths)} 张超过上限 {MAX_IMAGES} 张")
+        for path in image_paths:
+            if not is_remote(path):
+                media.append(_check_image(path, "图片", errors))
+    elif note_type == "video":
+        video_path = params.get("video_path")
+        if video_path and not is_remote(video_path):
+            media.append(_check_video(video_path, errors))
+        cover_path = params.get("cover_path")
+        if cover_path and not is_remote(cover_path):
+            media.append(_check_image(cover_path, "封面", errors))
+
+    return {
+        "errors": errors,
+        "media": media,
+        "elapsed": round(time.perf_counter() - start, 6),
+    }
+
+
+def ensure_valid(note_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    执行预检，未通过时抛出异常
+
+    Args:
+        note_type: 笔记类型
+        params: 发布参数
+
+    Returns:
+        Dict[str, Any]: 预检结果
+
+    Raises:
+        PreflightError: 笔记未通过预检
+    """
+    report = preflight(note_type, params)
+    if report["errors"]:
+        raise PreflightError(report["errors"])
+    return report
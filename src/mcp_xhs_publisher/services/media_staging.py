@@ -0,0 +1,183 @@
+"""
+发布媒体预处理
+
+在发布前将笔记引用的远程图片、视频和封面下载到本地，并按配置压缩图文笔记的图片，
+使下载阶段可以与其它笔记的上传阶段并行执行
+"""
+
+import os
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..util.metrics import STAGE, get_metrics
+from .image_normalizer import get_image_normalizer
+from .media_cache import get_media_cache
+from .media_downloader import get_media_downloader, is_remote
+
+
+def download_images(
+    image_paths: List[str],
+) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+    """
+    并发下载 http(s) 图片到临时目录，本地路径原样保留
+
+    Args:
+        image_paths: 图片路径列表
+
+    Returns:
+        本地路径列表（与输入顺序一致，下载失败的图片被跳过）、
+        需要清理的临时文件列表，以及每张远程图片的下载耗时
+    """
+    # 只有包含远程图片时才计入下载阶段
+    remote = any(is_remote(path) for path in image_paths)
+    with get_metrics().track(STAGE, "download") if remote else nullcontext():
+        results = get_media_downloader().download_all(image_paths)
+    local_paths = [r.local_path for r in results if r.local_path]
+    tmp_files = [r.local_path for r in results if r.downloaded]
+    timings = [r.timing() for r in results if is_remote(r.source)]
+    return local_paths, tmp_files, timings
+
+
+def normalize_images(
+    image_paths: List[str],
+) -> Tuple[List[str], List[str], Optional[Dict[str, Any]]]:
+    """
+    按配置缩放、重新编码本地图片
+
+    Args:
+        image_paths: 本地图片路径列表
+
+    Returns:
+        处理后的路径列表、需要清理的临时文件列表，以及处理报告（未开启预处理时为None）
+    """
+    normalizer = get_image_normalizer()
+    if normalizer is None or not image_paths:
+        return image_paths, [], None
+    with get_metrics().track(STAGE, "normalize"):
+        return normalizer.normalize_all(image_paths)
+
+
+def download_video(
+    video_path: str, video_sha256: Optional[str] = None
+) -> Tuple[str, List[str]]:
+    """
+    分段下载 http(s) 视频，本地路径原样返回
+
+    Args:
+        video_path: 视频路径
+        video_sha256: 期望的 SHA-256 摘要（可选）
+
+    Returns:
+        本地视频路径，以及需要清理的临时文件列表
+
+    Raises:
+        RuntimeError: 视频下载或校验失败
+    """
+    if not is_remote(video_path):
+        return video_path, []
+    with get_metrics().track(STAGE, "download") as span:
+        result = get_media_downloader().download_large(video_path, video_sha256)
+        if result.error:
+            span.fail()
+    if result.error:
+        raise RuntimeError(f"视频下载失败: {result.error}")
+    return result.local_path, [result.local_path] if result.downloaded else []
+
+
+def remove_files(paths: List[str]) -> None:
+    """删除临时文件，忽略不存在的文件"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@dataclass
+class StagedNote:
+    """媒体已就绪的待发布笔记"""
+
+    note_type: str
+    # 发布参数，其中的媒体路径均已替换为本地路径
+    params: Dict[str, Any]
+    tmp_files: List[str] = field(default_factory=list)
+    download_timings: List[Dict[str, Any]] = field(default_factory=list)
+    image_report: Optional[Dict[str, Any]] = None
+
+    def cleanup(self) -> None:
+        """删除预处理阶段下载的临时文件"""
+        remove_files(self.tmp_files)
+        self.tmp_files = []
+
+
+def _pin(staged: StagedNote, path: str) -> str:
+    """
+    暂存的媒体直接指向缓存文件时，为其创建硬链接，避免发布前被缓存淘汰
+
+    Args:
+        staged: 暂存的笔记，创建的链接加入其临时文件
+        path: 媒体的本地路径
+
+    Returns:
+        str: 发布时使用的路径
+    """
+    cache = get_media_cache()
+    if cache is None or path in staged.tmp_files:
+        return path
+    pinned = cache.pin(path)
+    if pinned is None:
+        return path
+    staged.tmp_files.append(pinned)
+    return pinned
+
+
+def stage_note(note_type: str, params: Dict[str, Any]) -> StagedNote:
+    """
+    下载笔记引用的远程媒体，图文笔记的图片按配置预处理
+
+    Args:
+        note_type: 笔记类型：text, image 或 video
+        params: 发布参数
+
+    Returns:
+        StagedNote: 媒体路径已替换为本地路径的笔记；来自媒体缓存的文件替换为硬链接，
+            定时任务提前预处理后，缓存淘汰不影响到点发布
+
+    Raises:
+        RuntimeError: 媒体下载失败，已下载的临时文件会被清理
+    """
+    staged = StagedNote(note_type=note_type, params=dict(params))
+    try:
+        if note_type == "image":
+            local_paths, tmp_files, timings = download_images(params["image_paths"])
+            staged.tmp_files += tmp_files
+            staged.download_timings = timings
+            if not local_paths:
+                raise RuntimeError("图片全部下载失败")
+            local_paths, normalized_tmp, staged.image_report = normalize_images(
+                local_paths
+            )
+            staged.tmp_files += normalized_tmp
+            if any(is_remote(path) for path in params["image_paths"]):
+                local_paths = [_pin(staged, path) for path in local_paths]
+            staged.params["image_paths"] = local_paths
+        elif note_type == "video":
+            video_path, tmp_files = download_video(
+                params["video_path"], params.get("video_sha256")
+            )
+            staged.tmp_files += tmp_files
+            if is_remote(params["video_path"]):
+                video_path = _pin(staged, video_path)
+            staged.params["video_path"] = video_path
+            cover_path = params.get("cover_path")
+            if cover_path and is_remote(cover_path):
+                covers, cover_tmp, _ = download_images([cover_path])
+                staged.tmp_files += cover_tmp
+                if not covers:
+                    raise RuntimeError(f"封面下载失败: {cover_path}")
+                staged.params["cover_path"] = _pin(staged, covers[0])
+    except Exception:
+        staged.cleanup()
+        raise
+    return staged
@@ -0,0 +1,229 @@
+"""
+媒体上传
+
+在 XhsClient 的上传接口之上按内容去重：上传前计算文件摘要并查询上传索引，
+有效期内已上传过的内容直接复用文件ID，否则申请上传凭证并上传后写入索引
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from ..util.logging import log_info
+from ..util.metrics import STAGE, get_metrics
+from .upload_index import UploadIndex, file_digest, get_upload_index
+
+IMAGE = "image"
+VIDEO = "video"
+
+_CONTENT_TYPES = {IMAGE: "image/jpeg", VIDEO: "video/mp4"}
+
+
+@dataclass
+class UploadedMedia:
+    """一个文件的上传结果"""
+
+    path: str
+    kind: str
+    file_id: str
+    size: int
+    # 复用了之前的上传结果
+    reused: bool
+    digest: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+class MediaUploader:
+    """
+    单个账号的媒体上传器
+
+    同一进程内同时上传相同内容时只有一个请求真正上传，其余等待后复用结果；
+    未启用上传索引时每次都上传
+    """
+
+    def __init__(self, account: str, index: Optional[UploadIndex] = None):
+        """
+        初始化上传器
+
+        Args:
+            account: 账号名，上传结果只在同一账号内复用
+            index: 上传索引，None 表示不去重
+        """
+        self.account = account
+        self.index = index
+        # 内容键 -> [锁, 持有或等待该锁的线程数]，无人使用时移除
+        self._locks: Dict[str, List[Any]] = {}
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def _lock(self, key: str) -> Iterator[None]:
+        """同一内容在进程内只允许一个上传"""
+        with self._locks_guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    @staticmethod
+    def _put(client: Any, kind: str, path: str) -> Dict[str, Any]:
+        """
+        申请上传凭证并上传文件
+
+        Returns:
+            Dict[str, Any]: 文件ID，视频还包含平台返回的 video_id
+
+        Raises:
+            requests.HTTPError: 上传被拒绝
+        """
+        file_id, token = client.get_upload_files_permit(kind)
+        res = client.upload_file(
+            file_id, token, path, content_type=_CONTENT_TYPES[kind]
+        )
+        # 上传接口成功时返回空内容，xhs 直接返回 Response 对象
+        if isinstance(res, requests.Response):
+            res.raise_for_status()
+        extra = {}
+        if kind == VIDEO:
+            extra["video_id"] = res.headers["X-Ros-Video-Id"]
+        return {"file_id": file_id, "extra": extra}
+
+    def upload(
+        self, client: Any, path: str, kind: str, reuse: bool = True
+    ) -> UploadedMedia:
+        """
+        上传单个文件，内容已上传过时复用文件ID
+
+        Args:
+            client: 当前线程借出的 XhsClient 实例
+            path: 本地文件路径
+            kind: 文件类型：image 或 video
+            reuse: 是否允许复用索引中的上传结果
+
+        Returns:
+            UploadedMedia: 上传结果
+        """
+        with get_metrics().track(STAGE, "upload"):
+            return self._upload(client, path, kind, reuse)
+
+    def _upload(self, client: Any, path: str, kind: str, reuse: bool) -> UploadedMedia:
+        """上传单个文件，由 upload 计时"""
+        size = os.path.getsize(path)
+        if self.index is None:
+            uploaded = self._put(client, kind, path)
+            return UploadedMedia(
+                path, kind, uploaded["file_id"], size, False, None, uploaded["extra"]
+            )
+
+        digest = file_digest(path)
+        with self._lock(f"{kind}:{digest}"):
+            if reuse:
+                record = self.index.lookup(self.account, kind, digest)
+                if record is not None:
+                    return UploadedMedia(
+                        path, kind, record.file_id, size, True, digest, record.extra
+                    )
+            uploaded = self._put(client, kind, path)
+            self.index.record(
+                self.account, kind, digest, uploaded["file_id"], size, uploaded["extra"]
+            )
+        return UploadedMedia(
+            path, kind, uploaded["file_id"], size, False, digest, uploaded["extra"]
+        )
+
+    def upload_all(
+        self, client: Any, paths: List[str], kind: str, reuse: bool = True
+    ) -> List[UploadedMedia]:
+        """
+        按顺序上传多个文件
+
+        Args:
+            client: 当前线程借出的 XhsClient 实例
+            paths: 本地文件路径列表
+            kind: 文件类型：image 或 video
+            reuse: 是否允许复用索引中的上传结果
+
+        Returns:
+            List[UploadedMedia]: 与输入顺序一致的上传结果
+        """
+        return [self.upload(client, path, kind, reuse) for path in paths]
+
+    def remember(self, media: UploadedMedia, **extra: Any) -> None:
+        """
+        为已上传的文件补充附加信息，如视频首帧封面ID
+
+        Args:
+            media: 上传结果
+            **extra: 附加信息
+        """
+        media.extra.update(extra)
+        if self.index is not None and media.digest and not media.reused:
+            self.index.record(
+                self.account,
+                media.kind,
+                media.digest,
+                media.file_id,
+                media.size,
+                media.extra,
+            )
+
+    def forget(self, uploads: List[UploadedMedia]) -> int:
+        """
+        从索引中删除复用过的上传结果，平台拒绝这些文件ID时调用
+
+        Args:
+            uploads: 上传结果列表
+
+        Returns:
+            int: 删除的条目数
+        """
+        reused = [media for media in uploads if media.reused]
+        if self.index is not None:
+            for media in reused:
+                self.index.invalidate(self.account, media.kind, media.digest)
+        if reused:
+            log_info(
+                "已丢弃被拒绝复用的上传结果", account=self.account, count=len(reused)
+            )
+        return len(reused)
+
+    @staticmethod
+    def report(uploads: List[UploadedMedia]) -> Dict[str, int]:
+        """
+        汇总上传结果
+
+        Args:
+            uploads: 上传结果列表
+
+        Returns:
+            Dict[str, int]: 文件数、复用数、实际上传数，以及复用节省的上传字节数
+        """
+        reused = [media for media in uploads if media.reused]
+        return {
+            "files": len(uploads),
+            "reused": len(reused),
+            "uploaded": len(uploads) - len(reused),
+            "saved_bytes": sum(media.size for media in reused),
+        }
+
+
+def build_media_uploader(account: str) -> MediaUploader:
+    """
+    按配置创建账号的上传器
+
+    Args:
+        account: 账号名
+
+    Returns:
+        MediaUploader: 使用进程内共享上传索引的上传器
+    """
+    return MediaUploader(account, get_upload_index())
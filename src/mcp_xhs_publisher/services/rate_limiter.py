@@ -0,0 +1,227 @@
+"""
+小红书API限流
+
+按账号和接口类别（发布、读取、登录检查）维护独立的令牌桶，
+突发请求按到达顺序排队等待令牌，而不是直接失败
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import config
+from ..util.logging import log_error
+
+# 接口类别及默认配置：(每分钟请求数, 突发容量)
+PUBLISH = "publish"
+READ = "read"
+AUTH = "auth"
+
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    PUBLISH: (6.0, 2.0),
+    READ: (60.0, 10.0),
+    AUTH: (30.0, 5.0),
+}
+
+
+def parse_limit(value: Any, default: Tuple[float, float]) -> Tuple[float, float]:
+    """
+    解析 "每分钟请求数:突发容量" 格式的限流配置
+
+    Args:
+        value: 配置值，如 "6:2"；只给出速率时突发容量为 1
+        default: 配置缺失或无效时使用的默认值
+
+    Returns:
+        Tuple[float, float]: (每分钟请求数, 突发容量)，速率为 0 表示不限流
+    """
+    if value is None or value == "":
+        return default
+    try:
+        rate, _, burst = str(value).partition(":")
+        return float(rate), max(1.0, float(burst or 1))
+    except ValueError:
+        log_error("限流配置无效，使用默认值", value=value, default=default)
+        return default
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    每个请求在到达时预约一个令牌：令牌不足时余额变为负数，请求等待到
+    预约的令牌生成为止。等待时间在持锁时确定，因此请求严格按到达顺序获得令牌
+    """
+
+    def __init__(self, per_minute: float, burst: float):
+        """
+        初始化令牌桶
+
+        Args:
+            per_minute: 每分钟生成的令牌数，0 表示不限流
+            burst: 桶容量，即允许的突发请求数
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._acquired = 0
+        self._delayed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _refill(self, now: float) -> None:
+        """按经过的时间补充令牌，调用方需持有锁"""
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        预约一个令牌
+
+        Returns:
+            float: 获得令牌前需要等待的秒数
+        """
+        with self._lock:
+            self._acquired += 1
+            if self.rate <= 0:
+                return 0.0
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait > 0:
+                self._delayed += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+            return wait
+
+    def acquire(self) -> float:
+        """
+        获取一个令牌，令牌不足时阻塞等待
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self.reserve()
+        if wait > 0:
+            with self._lock:
+                self._waiting += 1
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取令牌桶状态
+
+        Returns:
+            Dict[str, Any]: 当前令牌数、排队数和累计等待时间
+        """
+        with self._lock:
+            if self.rate > 0:
+                self._refill(time.monotonic())
+            return {
+                "per_minute": round(self.rate * 60, 4),
+                "burst": self.capacity,
+                "tokens": round(self._tokens, 3),
+                "waiting": self._waiting,
+                "acquired": self._acquired,
+                "delayed": self._delayed,
+                "wait_total": round(self._wait_total, 3),
+                "wait_max": round(self._wait_max, 3),
+            }
+
+
+class RateLimiter:
+    """
+    按 (账号, 接口类别) 管理令牌桶，桶在首次使用时创建
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        初始化限流器
+
+        Args:
+            limits: 接口类别到 (每分钟请求数, 突发容量) 的映射，缺省的类别使用默认配置
+        """
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, account: str, endpoint: str) -> TokenBucket:
+        """
+        获取账号和接口类别对应的令牌桶
+
+        Args:
+            account: 账号名
+            endpoint: 接口类别：publish、read 或 auth
+
+        Returns:
+            TokenBucket: 令牌桶
+        """
+        key = (account, endpoint)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                per_minute, burst = self.limits.get(endpoint, (0.0, 1.0))
+                bucket = self._buckets[key] = TokenBucket(per_minute, burst)
+            return bucket
+
+    def acquire(self, account: str, endpoint: str) -> float:
+        """
+        获取令牌，令牌不足时按到达顺序排队等待
+
+        Args:
+            account: 账号名
+            endpoint: 接口类别
+
+        Returns:
+            float: 等待的秒数
+        """
+        return self.bucket(account, endpoint).acquire()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        获取所有令牌桶的状态
+
+        Returns:
+            List[Dict[str, Any]]: 每个令牌桶的账号、接口类别和当前状态
+        """
+        with self._lock:
+            buckets = sorted(self._buckets.items())
+        return [
+            {"account": account, "endpoint": endpoint, **bucket.stats()}
+            for (account, endpoint), bucket in buckets
+        ]
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    获取进程内共享的限流器
+
+    Returns:
+        RateLimiter: 按配置 rate_limit_publish、rate_limit_read 和
+        rate_limit_auth 创建的限流器
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                {
+                    endpoint: parse_limit(config.get(f"rate_limit_{endpoint}"), default)
+                    for endpoint, default in DEFAULT_LIMITS.items()
+                }
+            )
+        return _limiter
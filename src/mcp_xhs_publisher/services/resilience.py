@@ -0,0 +1,348 @@
+"""
+小红书API调用的重试与熔断
+
+区分可重试的瞬时错误（网络超时、5xx、签名失败）和不可重试的错误（业务错误、验证码、IP封禁），
+可重试错误按带随机抖动的指数退避重试，并受总截止时间约束；
+每个账号一个熔断器，平台持续异常时直接失败，避免工作线程堆积在注定失败的请求上
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError
+
+from ..config import config
+from ..util.logging import log_error, log_info
+
+try:
+    from xhs.exception import IPBlockError, NeedVerifyError, SignError
+except ImportError:  # 仅便于类型提示，实际运行需安装 xhs 包
+
+    class IPBlockError(Exception):
+        pass
+
+    class NeedVerifyError(Exception):
+        pass
+
+    class SignError(Exception):
+        pass
+
+
+T = TypeVar("T")
+
+# 可重试的 HTTP 状态码
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器处于打开状态，请求未发出"""
+
+
+class AmbiguousWriteError(RuntimeError):
+    """非幂等请求（如创建笔记）失败时平台可能已处理该请求，为避免重复写入不再重试"""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    判断异常是否为可重试的瞬时错误
+
+    Args:
+        exc: 调用抛出的异常
+
+    Returns:
+        bool: 网络错误、超时、签名失败以及 429/5xx 响应返回 True
+    """
+    if isinstance(exc, (NeedVerifyError, IPBlockError, CircuitOpenError)):
+        return False
+    if isinstance(exc, SignError):
+        return True
+    if isinstance(
+        exc,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        ),
+    ):
+        return True
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code in RETRYABLE_STATUS
+
+
+def is_safe_to_resend(exc: BaseException) -> bool:
+    """
+    判断失败的请求是否确定未被平台处理，非幂等请求只在这种情况下重试
+
+    Args:
+        exc: 调用抛出的异常
+
+    Returns:
+        bool: 建立连接失败（请求未发出）、429 限流和签名校验失败返回 True
+    """
+    if isinstance(exc, (requests.exceptions.ConnectTimeout, SignError)):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        reason = getattr(exc.args[0], "reason", exc.args[0])
+        if isinstance(reason, ConnectTimeoutError):
+            return True
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code == 429
+
+
+def is_outage(exc: BaseException) -> bool:
+    """
+    判断异常是否说明平台或网络异常，计入熔断器的失败次数
+
+    业务错误（参数错误、登录过期等）说明平台工作正常，不计入
+
+    Args:
+        exc: 调用抛出的异常
+
+    Returns:
+        bool: 可重试错误和 IP 封禁返回 True
+    """
+    if isinstance(exc, AmbiguousWriteError) and exc.__cause__ is not None:
+        return is_outage(exc.__cause__)
+    return isinstance(exc, IPBlockError) or is_retryable(exc)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续 failure_threshold 次异常后打开，打开期间请求直接抛出 CircuitOpenError；
+    reset_timeout 秒后进入半开状态，只放行一个试探请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ):
+        """
+        初始化熔断器
+
+        Args:
+            name: 名称（账号名），用于日志
+            failure_threshold: 打开熔断器的连续失败次数，0 表示不熔断
+            reset_timeout: 打开后进入半开状态前的等待秒数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态：closed、open 或 half_open"""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        """计算当前状态，调用方需持有锁"""
+        if (
+            self._state == CIRCUIT_OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = CIRCUIT_HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        请求前检查熔断状态
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下已有试探请求在执行
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CIRCUIT_CLOSED:
+                return
+            if state == CIRCUIT_HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self._rejected += 1
+            retry_in = max(
+                0.0, self.reset_timeout - (time.monotonic() - self._opened_at)
+            )
+        raise CircuitOpenError(
+            f"账号 {self.name} 的请求已熔断，平台暂时不可用，约 {retry_in:.0f} 秒后重试"
+        )
+
+    def record_success(self) -> None:
+        """记录成功，关闭熔断器"""
+        with self._lock:
+            if self._state != CIRCUIT_CLOSED:
+                log_info("熔断器关闭", account=self.name)
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """记录一次平台异常，连续失败达到阈值或半开试探失败时打开熔断器"""
+        with self._lock:
+            self._failures += 1
+            if self.failure_threshold <= 0:
+                return
+            if (
+                self._state == CIRCUIT_HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != CIRCUIT_OPEN:
+                    log_error("熔断器打开", account=self.name, failures=self._failures)
+                self._state = CIRCUIT_OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取熔断器状态
+
+        Returns:
+            Dict[str, Any]: 状态、连续失败次数和被拒绝的请求数
+        """
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "failures": self._failures,
+                "rejected": self._rejected,
+            }
+
+
+class RetryPolicy:
+    """
+    带随机抖动的指数退避重试策略
+
+    第 n 次重试前等待 [0, min(max_delay, base_delay * 2^n)) 内的随机时间（full jitter），
+    避免多个请求同时重试；预计等待后将超过 deadline 时不再重试
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        deadline: float = 60.0,
+    ):
+        """
+        初始化重试策略
+
+        Args:
+            max_attempts: 最大尝试次数（含首次调用）
+            base_delay: 退避基数（秒）
+            max_delay: 单次等待上限（秒）
+            deadline: 从首次调用开始计算的总截止时间（秒）
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, retry: int) -> float:
+        """
+        计算第 retry 次重试前的等待时间
+
+        Args:
+            retry: 重试序号，从 0 开始
+
+        Returns:
+            float: 等待秒数
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2**retry)))
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        breaker: Optional[CircuitBreaker] = None,
+        name: str = "",
+    ) -> T:
+        """
+        按策略调用函数
+
+        Args:
+            fn: 无参数的调用
+            breaker: 熔断器（可选），每次尝试前检查并记录结果
+            name: 调用名称，用于日志
+
+        Returns:
+            调用结果
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            Exception: 不可重试的错误，或重试耗尽后的最后一次错误
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                if breaker is not None:
+                    if is_outage(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                attempt += 1
+                if not is_retryable(e) or attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt - 1)
+                if time.monotonic() - start + delay > self.deadline:
+                    raise
+                log_info(
+                    "调用失败，准备重试",
+                    call=name,
+                    attempt=attempt,
+                    delay=round(delay, 3),
+                    error=str(e),
+                )
+                time.sleep(delay)
+                continue
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+
+def build_retry_policy() -> RetryPolicy:
+    """
+    按配置创建重试策略
+
+    Returns:
+        RetryPolicy: 使用 retry_max_attempts、retry_base_delay、retry_max_delay
+        和 retry_deadline 配置的重试策略
+    """
+    return RetryPolicy(
+        max_attempts=config.get_int("retry_max_attempts", 3),
+        base_delay=config.get_float("retry_base_delay", 0.5),
+        max_delay=config.get_float("retry_max_delay", 8.0),
+        deadline=config.get_float("retry_deadline", 60.0),
+    )
+
+
+def build_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    按配置创建熔断器
+
+    Args:
+        name: 账号名
+
+    Returns:
+        CircuitBreaker: 使用 breaker_failure_threshold 和 breaker_reset_timeout 配置的熔断器
+    """
+    return CircuitBreaker(
+        name,
+        failure_threshold=config.get_int("breaker_failure_threshold", 5),
+        reset_timeout=config.get_float("breaker_reset_timeout", 30.0),
+    )
@@ -0,0 +1,351 @@
+"""
+分段下载服务
+
+使用 HTTP Range 请求将大文件并行分段下载到磁盘，下载进度持久化到状态文件，
+连接中断或进程重启后可从已完成的位置继续，内存占用与文件大小无关
+"""
+
+import base64
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..util.logging import log_error, log_info
+from ..util.tracing import bind, span
+
+
+class DownloadVerificationError(Exception):
+    """下载文件的大小或哈希与预期不符"""
+
+
+@dataclass
+class SegmentedDownload:
+    """分段下载结果"""
+
+    path: str
+    size: int
+    sha256: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    segments: int
+    resumed_bytes: int
+    elapsed: float
+
+
+class SegmentedDownloader:
+    """
+    分段并行下载器
+
+    服务端支持 Range 且文件足够大时按 segments 个分段并行下载，
+    否则退化为单连接流式下载。状态文件与目标文件同名，后缀为 .state
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    # 每写入该字节数持久化一次进度
+    CHECKPOINT_BYTES = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        segments: int = 4,
+        min_segment_bytes: int = 8 * 1024 * 1024,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+    ):
+        """
+        初始化下载器
+
+        Args:
+            segments: 最大并行分段数
+            min_segment_bytes: 单个分段的最小字节数
+            timeout: 单次请求超时时间（秒）
+            max_retries: 每个分段连接中断后的最大重试次数
+        """
+        self.segments = max(1, segments)
+        self.min_segment_bytes = max(1, min_segment_bytes)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.segments)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._path_locks: Dict[str, threading.Lock] = {}
+        self._path_locks_guard = threading.Lock()
+
+    def _path_lock(self, dest_path: str) -> threading.Lock:
+        """同一目标文件在进程内只允许一个下载，避免并发写入同一文件和状态文件"""
+        with self._path_locks_guard:
+            return self._path_locks.setdefault(dest_path, threading.Lock())
+
+    def download(
+        self, url: str, dest_path: str, expected_sha256: Optional[str] = None
+    ) -> SegmentedDownload:
+        """
+        下载文件到目标路径，存在匹配的状态文件时继续之前的下载
+
+        同一目标路径的并发调用依次执行
+
+        Args:
+            url: 文件链接
+            dest_path: 目标文件路径
+            expected_sha256: 可选的预期 SHA-256 十六进制摘要
+
+        Returns:
+            SegmentedDownload: 下载结果
+
+        Raises:
+            requests.RequestException: 下载失败且重试耗尽
+            DownloadVerificationError: 文件大小或哈希校验失败
+        """
+        with self._path_lock(dest_path):
+            return self._download(url, dest_path, expected_sha256)
+
+    def _download(
+        self, url: str, dest_path: str, expected_sha256: Optional[str]
+    ) -> SegmentedDownload:
+        """持有目标路径的锁后执行下载"""
+        start = time.perf_counter()
+        head = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+        head.raise_for_status()
+        size = int(head.headers.get("Content-Length") or 0)
+        etag = head.headers.get("ETag")
+        last_modified = head.headers.get("Last-Modified")
+        ranged = head.headers.get("Accept-Ranges", "").lower() == "bytes" and size > 0
+
+        state_path = dest_path + ".state"
+        if ranged:
+            state = self._load_state(state_path, url, size, etag, dest_path)
+            resumed = sum(seg[2] - seg[0] for seg in state["segments"])
+            self._download_ranges(url, dest_path, state, state_path)
+        else:
+            state = {"segments": [[0, size - 1, 0]]}
+            resumed = 0
+            self._download_whole(url, dest_path)
+
+        try:
+            actual_size = os.path.getsize(dest_path)
+            if size and actual_size != size:
+                raise DownloadVerificationError(
+                    f"文件大小不符: 预期 {size} 字节，实际 {actual_size} 字节"
+                )
+            sha256 = self._verify_hash(dest_path, expected_sha256, head.headers)
+        except DownloadVerificationError:
+            # 校验失败的文件不能续传，删除后下次重新下载
+            os.remove(dest_path)
+            raise
+        finally:
+            if os.path.exists(state_path):
+                os.remove(state_path)
+
+        result = SegmentedDownload(
+            path=dest_path,
+            size=actual_size,
+            sha256=sha256,
+            etag=etag,
+            last_modified=last_modified,
+            segments=len(state["segments"]),
+            resumed_bytes=resumed,
+            elapsed=time.perf_counter() - start,
+        )
+        log_info(
+            "分段下载完成",
+            url=url,
+            bytes=result.size,
+            segments=result.segments,
+            resumed_bytes=result.resumed_bytes,
+            seconds=round(result.elapsed, 3),
+        )
+        return result
+
+    def _load_state(
+        self,
+        state_path: str,
+        url: str,
+        size: int,
+        etag: Optional[str],
+        dest_path: str,
+    ) -> Dict[str, Any]:
+        """读取可续传的状态，不匹配时重新规划分段并预分配文件"""
+        if os.path.exists(state_path) and os.path.exists(dest_path):
+            try:
+                with open(state_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if (
+                    state.get("url") == url
+                    and state.get("size") == size
+                    and state.get("etag") == etag
+                    and os.path.getsize(dest_path) == size
+                ):
+                    return state
+            except (OSError, ValueError) as e:
+                log_error(
+                    "分段下载状态文件无效，重新下载", path=state_path, error=str(e)
+                )
+
+        count = min(self.segments, max(1, math.ceil(size / self.min_segment_bytes)))
+        step = math.ceil(size / count)
+        # 每个分段记录 [起始位置, 结束位置(含), 下一个待写入位置]
+        segments: List[List[int]] = [
+            [begin, min(begin + step, size) - 1, begin]
+            for begin in range(0, size, step)
+        ]
+        with open(dest_path, "wb") as f:
+            f.truncate(size)
+        state = {"url": url, "size": size, "etag": etag, "segments": segments}
+        self._save_state(state_path, state)
+        return state
+
+    @staticmethod
+    def _save_state(state_path: str, state: Dict[str, Any]) -> None:
+        """原子地写入状态文件：写入临时文件并落盘后替换"""
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, state_path)
+
+    def _download_ranges(
+        self, url: str, dest_path: str, state: Dict[str, Any], state_path: str
+    ) -> None:
+        """并行下载所有未完成的分段"""
+        lock = threading.Lock()
+        pending = [seg for seg in state["segments"] if seg[2] <= seg[1]]
+        if not pending:
+            return
+
+        def checkpoint() -> None:
+            with lock:
+                self._save_state(state_path, state)
+
+        with ThreadPoolExecutor(
+            max_workers=len(pending), thread_name_prefix="xhs-segment"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    bind(self._download_segment), url, dest_path, seg, checkpoint
+                )
+                for seg in pending
+            ]
+            errors = []
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(e)
+        checkpoint()
+        if errors:
+            raise errors[0]
+
+    def _download_segment(
+        self, url: str, dest_path: str, segment: List[int], checkpoint: Any
+    ) -> None:
+        """下载单个分段，连接中断时从已写入位置重试"""
+        with span("download.segment", start=segment[2], end=segment[1]) as current:
+            retries = self._download_range(url, dest_path, segment, checkpoint)
+            current.set(retries=retries)
+
+    def _download_range(
+        self, url: str, dest_path: str, segment: List[int], checkpoint: Any
+    ) -> int:
+        """
+        下载分段的剩余部分，返回中断重试的次数
+
+        segment[2] 只在写入的数据落盘后前移，状态文件中记录的进度不会超过磁盘上的数据
+        """
+        attempts = 0
+        while segment[2] <= segment[1]:
+            try:
+                headers = {"Range": f"bytes={segment[2]}-{segment[1]}"}
+                with self.session.get(
+                    url, headers=headers, stream=True, timeout=self.timeout
+                ) as resp:
+                    if resp.status_code != 206:
+                        raise requests.HTTPError(
+                            f"服务端未返回分段内容: HTTP {resp.status_code}",
+                            response=resp,
+                        )
+                    with open(dest_path, "r+b") as f:
+                        f.seek(segment[2])
+                        offset = segment[2]
+                        try:
+                            for chunk in resp.iter_content(self.CHUNK_SIZE):
+                                f.write(chunk)
+                                offset += len(chunk)
+                                if offset - segment[2] >= self.CHECKPOINT_BYTES:
+                                    self._sync(f)
+                                    segment[2] = offset
+                                    checkpoint()
+                        finally:
+                            # 连接中断时已写入的部分同样落盘后再记录进度
+                            self._sync(f)
+                            segment[2] = offset
+                if segment[2] <= segment[1]:
+                    raise requests.ConnectionError("分段连接提前结束")
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                attempts += 1
+                if attempts > self.max_retries:
+                    raise
+                log_error(
+                    "分段下载中断，继续下载",
+                    url=url,
+                    offset=segment[2],
+                    attempt=attempts,
+                    error=str(e),
+                )
+                checkpoint()
+        return attempts
+
+    @staticmethod
+    def _sync(f: Any) -> None:
+        """将已写入的数据刷新到磁盘"""
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _download_whole(self, url: str, dest_path: str) -> None:
+        """服务端不支持 Range 时单连接流式下载"""
+        with self.session.get(url, stream=True, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            with open(dest_path, "wb") as f:
+                for chunk in resp.iter_content(self.CHUNK_SIZE):
+                    f.write(chunk)
+
+    def _verify_hash(
+        self,
+        path: str,
+        expected_sha256: Optional[str],
+        headers: "requests.structures.CaseInsensitiveDict[str]",
+    ) -> str:
+        """流式计算文件哈希，并与调用方或服务端提供的摘要比对"""
+        sha256 = hashlib.sha256()
+        content_md5 = headers.get("Content-MD5")
+        md5 = hashlib.md5() if content_md5 else None
+        with open(path, "rb") as f:
+            while chunk := f.read(self.CHUNK_SIZE):
+                sha256.update(chunk)
+                if md5 is not None:
+                    md5.update(chunk)
+        digest = sha256.hexdigest()
+        if expected_sha256 and digest != expected_sha256.lower():
+            raise DownloadVerificationError(
+                f"文件 SHA-256 不符: 预期 {expected_sha256}，实际 {digest}"
+            )
+        if md5 is not None and base64.b64encode(md5.digest()).decode() != content_md5:
+            raise DownloadVerificationError("文件 Content-MD5 校验失败")
+        return digest
+
+    def close(self) -> None:
+        """关闭连接池"""
+        self.session.close()
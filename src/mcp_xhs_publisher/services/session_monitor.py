@@ -0,0 +1,197 @@
+"""
+账号会话健康监控
+
+后台线程按固定间隔检查每个账号的登录状态并缓存用户信息，
+登录检查和用户信息资源直接读取缓存；发布时遇到登录失效立即标记会话无效
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from ..util.logging import log_error, log_info
+
+if TYPE_CHECKING:
+    from .account_pool import AccountPool
+
+# 登录已过期的业务错误码，与 xhs.exception.ErrorEnum.SESSION_EXPIRED 一致；
+# 不在此处导入 xhs，避免启动时加载
+SESSION_EXPIRED_CODE = -100
+
+
+def is_auth_error(exc: BaseException) -> bool:
+    """
+    判断异常是否说明登录已失效
+
+    Args:
+        exc: 调用抛出的异常
+
+    Returns:
+        bool: 登录过期错误码或 401 响应返回 True
+    """
+    data = exc.args[0] if exc.args else None
+    if isinstance(data, dict) and data.get("code") == SESSION_EXPIRED_CODE:
+        return True
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code == 401
+
+
+@dataclass
+class SessionState:
+    """账号会话状态缓存"""
+
+    # None 表示尚未检查
+    logged_in: Optional[bool] = None
+    user_info: Optional[Dict[str, Any]] = None
+    checked_at: float = 0.0
+    error: Optional[str] = None
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def update(
+        self,
+        logged_in: Optional[bool],
+        user_info: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        记录一次检查结果
+
+        Args:
+            logged_in: 是否已登录，None 表示无法判断（如网络错误），保留原状态
+            user_info: 用户信息，登录有效时记录
+            error: 检查失败的错误信息
+        """
+        with self._lock:
+            if logged_in is not None:
+                self.logged_in = logged_in
+                self.user_info = user_info if logged_in else None
+            self.checked_at = time.time()
+            self.error = error
+
+    def reset(self) -> None:
+        """清除缓存的检查结果，下次读取时重新检查"""
+        with self._lock:
+            self.logged_in = None
+            self.user_info = None
+            self.checked_at = 0.0
+            self.error = None
+
+    def invalidate(self, reason: str) -> None:
+        """
+        标记会话失效
+
+        Args:
+            reason: 失效原因
+        """
+        self.update(False, error=reason)
+
+    def is_fresh(self, max_age: float) -> bool:
+        """
+        判断缓存是否可以直接使用
+
+        Args:
+            max_age: 最大缓存时间（秒）
+
+        Returns:
+            bool: 已检查过且未超过 max_age
+        """
+        with self._lock:
+            return (
+                self.logged_in is not None and time.time() - self.checked_at < max_age
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取会话状态
+
+        Returns:
+            Dict[str, Any]: 登录状态、检查时间和错误信息
+        """
+        with self._lock:
+            return {
+                "logged_in": self.logged_in,
+                "checked_at": self.checked_at,
+                "error": self.error,
+            }
+
+
+class SessionMonitor:
+    """
+    会话健康监控
+
+    启动时立即检查一次所有账号，之后每隔 interval 秒检查一次
+    """
+
+    def __init__(self, pool: "AccountPool", interval: float = 300.0):
+        """
+        初始化会话监控
+
+        Args:
+            pool: 账号池
+            interval: 检查间隔（秒）
+        """
+        self.pool = pool
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check_all(self) -> Dict[str, bool]:
+        """
+        检查所有账号的会话
+
+        Returns:
+            Dict[str, bool]: 账号名到是否已登录的映射
+        """
+        results = {}
+        for account in self.pool.accounts():
+            try:
+                state = self.pool.get(account).check_session()
+                results[account] = bool(state.logged_in)
+            except Exception as e:
+                log_error("会话检查出错", account=account, error=str(e))
+                results[account] = False
+        return results
+
+    def start(self) -> None:
+        """启动后台检查线程"""
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="xhs-session-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止后台检查线程
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        """后台线程主循环"""
+        while not self._stop.is_set():
+            results = self.check_all()
+            log_info("会话检查完成", accounts=results)
+            self._stop.wait(self.interval)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        获取各账号的会话状态
+
+        Returns:
+            List[Dict[str, Any]]: 每个账号的会话状态
+        """
+        return [
+            {"account": account, **self.pool.get(account).session.snapshot()}
+            for account in self.pool.accounts()
+        ]
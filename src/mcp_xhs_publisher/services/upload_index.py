@@ -0,0 +1,267 @@
+"""
+上传去重索引
+
+按内容哈希（BLAKE2b，分块流式计算）记录每个账号已上传到平台的文件ID，
+同一图片或视频被多篇笔记引用时复用之前的上传结果，不再重复上传。
+索引使用 SQLite（WAL 模式）持久化，条目超过有效期后重新上传
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import config
+from ..util.logging import log_info
+
+CHUNK_SIZE = 1024 * 1024
+# 进程内缓存的文件摘要数量，避免重试和批量发布时重复读取同一文件
+DIGEST_CACHE_SIZE = 1024
+
+_digest_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """
+    分块流式计算文件的 BLAKE2b 摘要，大文件不会整体读入内存
+
+    以 (路径, 修改时间, 大小) 为键缓存最近的结果，文件被修改后重新计算
+
+    Args:
+        path: 本地文件路径
+
+    Returns:
+        str: 32 字节摘要的十六进制字符串
+    """
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _digest_lock:
+        digest = _digest_cache.get(key)
+        if digest is not None:
+            _digest_cache.move_to_end(key)
+            return digest
+
+    hasher = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+
+    with _digest_lock:
+        _digest_cache[key] = digest
+        while len(_digest_cache) > DIGEST_CACHE_SIZE:
+            _digest_cache.popitem(last=False)
+    return digest
+
+
+@dataclass
+class UploadRecord:
+    """已上传文件的索引条目"""
+
+    file_id: str
+    digest: str
+    kind: str
+    size: int
+    uploaded_at: float
+    # 平台返回的附加信息，如视频的 video_id 和首帧封面ID
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+class UploadIndex:
+    """
+    内容哈希到平台文件ID的持久化索引
+
+    平台上传的文件归属于账号，索引按 (账号, 类型, 摘要) 区分；
+    条目在上传 ttl 秒后过期，之后同一内容会重新上传
+    """
+
+    def __init__(self, db_path: str, ttl: float):
+        """
+        初始化索引
+
+        Args:
+            db_path: SQLite 数据库文件路径
+            ttl: 上传结果的有效期（秒）
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self._counters = {"hits": 0, "misses": 0, "invalidated": 0}
+        self._counters_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "account TEXT NOT NULL, kind TEXT NOT NULL, digest TEXT NOT NULL, "
+                "file_id TEXT NOT NULL, size INTEGER NOT NULL, extra TEXT NOT NULL, "
+                "uploaded_at REAL NOT NULL, last_used REAL NOT NULL, "
+                "hits INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (account, kind, digest))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建数据库连接，每次操作使用独立连接以便跨线程使用"""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _count(self, name: str, n: int = 1) -> None:
+        """累加统计计数"""
+        with self._counters_lock:
+            self._counters[name] += n
+
+    def lookup(self, account: str, kind: str, digest: str) -> Optional[UploadRecord]:
+        """
+        查询有效期内的上传结果
+
+        Args:
+            account: 账号名
+            kind: 文件类型：image 或 video
+            digest: 文件摘要
+
+        Returns:
+            Optional[UploadRecord]: 未过期的条目，不存在或已过期时返回None
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT file_id, size, extra, uploaded_at FROM uploads "
+                "WHERE account = ? AND kind = ? AND digest = ? AND uploaded_at > ?",
+                (account, kind, digest, now - self.ttl),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE uploads SET last_used = ?, hits = hits + 1 "
+                    "WHERE account = ? AND kind = ? AND digest = ?",
+                    (now, account, kind, digest),
+                )
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return UploadRecord(
+            file_id=row[0],
+            digest=digest,
+            kind=kind,
+            size=row[1],
+            uploaded_at=row[3],
+            extra=json.loads(row[2]),
+        )
+
+    def record(
+        self,
+        account: str,
+        kind: str,
+        digest: str,
+        file_id: str,
+        size: int,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> UploadRecord:
+        """
+        记录一次上传结果，覆盖同一内容的旧条目
+
+        Args:
+            account: 账号名
+            kind: 文件类型：image 或 video
+            digest: 文件摘要
+            file_id: 平台返回的文件ID
+            size: 文件字节数
+            extra: 附加信息（可选）
+
+        Returns:
+            UploadRecord: 新条目
+        """
+        now = time.time()
+        extra = extra or {}
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads "
+                "(account, kind, digest, file_id, size, extra, uploaded_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (account, kind, digest, file_id, size, json.dumps(extra), now, now),
+            )
+        return UploadRecord(
+            file_id=file_id,
+            digest=digest,
+            kind=kind,
+            size=size,
+            uploaded_at=now,
+            extra=extra,
+        )
+
+    def invalidate(self, account: str, kind: str, digest: str) -> None:
+        """
+        删除条目，平台拒绝复用的文件ID时调用
+
+        Args:
+            account: 账号名
+            kind: 文件类型：image 或 video
+            digest: 文件摘要
+        """
+        with closing(self._connect()) as conn, conn:
+            deleted = conn.execute(
+                "DELETE FROM uploads WHERE account = ? AND kind = ? AND digest = ?",
+                (account, kind, digest),
+            ).rowcount
+        if deleted:
+            self._count("invalidated")
+
+    def purge_expired(self) -> int:
+        """
+        删除已过期的条目
+
+        Returns:
+            int: 删除的条目数
+        """
+        with closing(self._connect()) as conn, conn:
+            deleted = conn.execute(
+                "DELETE FROM uploads WHERE uploaded_at <= ?", (time.time() - self.ttl,)
+            ).rowcount
+        if deleted:
+            log_info("上传索引已清理过期条目", deleted=deleted)
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计
+
+        Returns:
+            Dict[str, Any]: 条目数、有效条目数、命中/未命中/失效次数
+        """
+        with closing(self._connect()) as conn:
+            entries, live = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(uploaded_at > ?), 0) FROM uploads",
+                (time.time() - self.ttl,),
+            ).fetchone()
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {"entries": entries, "live": live, **counters}
+
+
+_index: Optional[UploadIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_upload_index() -> Optional[UploadIndex]:
+    """
+    获取进程内共享的上传索引
+
+    Returns:
+        Optional[UploadIndex]: 索引实例，upload_index_ttl 为0时返回None
+    """
+    global _index
+    ttl = config.get_float("upload_index_ttl", 86400.0)
+    if ttl <= 0:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = UploadIndex(
+                os.path.join(config.get("data_dir"), "uploads.db"), ttl=ttl
+            )
+            _index.purge_expired()
+        return _index
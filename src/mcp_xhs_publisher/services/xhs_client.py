@@ -5,11 +5,14 @@
 """
 
 import os
-import shutil
-import tempfile
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit, urlunsplit
 
 import requests
+from requests.adapters import HTTPAdapter
 
 try:
     from xhs import DataFetchError, XhsClient
@@ -17,32 +20,143 @@ except ImportError:
     XhsClient = None  # 仅便于类型提示，实际运行需安装 xhs 包
     DataFetchError = Exception
 
-from ..util.config_loader import load_xhs_config
+from ..config import config
 from ..util.cookie_manager import cookie_valid, load_cookie
+from ..util.logging import log_info
+from ..util.metrics import STAGE, UPSTREAM, get_metrics
+from ..util.tracing import annotate, span
+from .cassette import (
+    RecordingAdapter,
+    ReplayAdapter,
+    get_cassette_player,
+    get_cassette_recorder,
+)
+from .media_downloader import is_remote
+from .media_staging import (
+    download_images,
+    download_video,
+    normalize_images,
+    remove_files,
+)
+from .media_uploader import IMAGE, VIDEO, MediaUploader, build_media_uploader
+from .rate_limiter import AUTH, PUBLISH, READ, get_rate_limiter
+from .resilience import (
+    AmbiguousWriteError,
+    build_circuit_breaker,
+    build_retry_policy,
+    is_retryable,
+    is_safe_to_resend,
+)
+from .session_monitor import SessionState, is_auth_error
+
+
+class _TimedClient:
+    """
+    XhsClient 的计时代理，每次方法调用计入 upstream 类别的指标
+
+    xhs 对非 JSON 的错误响应直接返回 Response，这类结果同样记为失败
+    """
+
+    def __init__(self, client: XhsClient):
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            with get_metrics().track(UPSTREAM, name) as span:
+                result = attr(*args, **kwargs)
+                if isinstance(result, requests.Response) and not result.ok:
+                    span.fail()
+                return result
+
+        return call
+
+
+class _RerouteAdapter(HTTPAdapter):
+    """
+    将请求改发到指定地址的传输适配器，保留原路径和查询参数
+
+    xhs 的接口、上传和转码请求分属多个域名，挂载到会话上后全部发往同一个本地替身服务器
+    """
+
+    def __init__(self, base: str):
+        super().__init__()
+        parts = urlsplit(base)
+        self.scheme, self.netloc = parts.scheme, parts.netloc
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> Any:
+        parts = urlsplit(request.url)
+        request.url = urlunsplit(
+            (self.scheme, self.netloc, parts.path, parts.query, parts.fragment)
+        )
+        return super().send(request, **kwargs)
+
+
+def _placeholder_sign(uri: str, data: Any = None, **kwargs: Any) -> Dict[str, str]:
+    """本地替身服务器不校验签名，使用固定的签名请求头"""
+    return {"x-s": "local", "x-t": str(int(time.time() * 1000))}
 
 
 class XhsApiClient:
     """
     小红书API客户端，封装XhsClient并提供额外功能
+
+    XhsClient 在每次请求前会改写会话级的签名请求头，不是线程安全的。
+    本类为每个并发调用借出独立的 XhsClient 实例，可被多个工作线程同时使用。
+    每次调用前按账号和接口类别从令牌桶获取令牌，突发请求排队等待；
+    瞬时错误按重试策略重试，账号熔断器打开时直接失败
     """
 
     REQUIRED_COOKIE_KEYS = ["a1", "web_session", "webId"]
+    # 未指定封面时轮询视频首帧的次数和间隔（秒），与 xhs 一致
+    FIRST_FRAME_POLLS = 10
+    FIRST_FRAME_INTERVAL = 3.0
 
-    def __init__(self, cookie_dir: str):
+    def __init__(
+        self,
+        cookie_dir: str,
+        cookie_file: Optional[str] = None,
+        cookie: Optional[str] = None,
+    ):
         """
         初始化小红书客户端。
         Args:
             cookie_dir: cookie 存储目录，必须显式指定
+            cookie_file: cookie 文件名，未指定时将 cookie_dir 本身作为 cookie 文件
+            cookie: 已解析的 cookie 字符串（可选），提供时不再读取文件
         """
         self.cookie_dir = os.path.expanduser(cookie_dir)
         self.client = None
+        self._cookie: Optional[str] = None
+        self._client_lock = threading.Lock()
+        self._idle_clients: List[XhsClient] = []
+        # cookie 每次更新后递增，借出的旧实例归还时被丢弃
+        self._generation = 0
+        self.limiter = get_rate_limiter()
+        self.retry = build_retry_policy()
+        self.session = SessionState()
+        self._uploader: Optional[MediaUploader] = None
+
+        if cookie_file:
+            cookie_path = os.path.join(self.cookie_dir, cookie_file)
+            self.account = os.path.splitext(cookie_file)[0]
+        else:
+            cookie_path = self.cookie_dir
+            self.account = os.path.splitext(os.path.basename(self.cookie_dir))[0]
+        self.breaker = build_circuit_breaker(self.account)
 
         if not os.path.exists(self.cookie_dir):
             os.makedirs(self.cookie_dir)
 
-        cookie = load_cookie(self.cookie_dir)
+        if cookie is None:
+            cookie = load_cookie(cookie_path)
         if cookie and cookie_valid(cookie, self.REQUIRED_COOKIE_KEYS):
-            self.client = XhsClient(cookie=cookie)
+            self._cookie = cookie
+            self.client = self._new_client(cookie)
+            self._idle_clients.append(self.client)
         else:
             raise RuntimeError(
                 "未获取到有效的小红书 cookie，请先登录或配置 cookie 后重试。"
@@ -51,86 +165,358 @@ class XhsApiClient:
     @staticmethod
     def build_from_env() -> "XhsApiClient":
         """
-        从环境变量和命令行参数构建客户端。
-        必须显式指定 cookie_dir 和 cookie_name。
+        使用启动时解析的配置（环境变量和命令行参数）构建客户端。
         Returns:
             XhsApiClient 实例
         Raises:
-            ValueError: 如果未找到必要的账号信息
+            RuntimeError: 如果 cookie 目录中没有有效的 cookie
         """
-        config = load_xhs_config()
-        return XhsApiClient(cookie_dir=config.cookie_dir)
+        return XhsApiClient(cookie_dir=config.get("xhs_cookie_dir"))
 
-    def _is_logged_in(self) -> bool:
-        """检查是否已登录"""
+    @staticmethod
+    def _new_client(cookie: str) -> XhsClient:
+        """
+        创建 XhsClient 实例
+
+        配置了 cassette_replay 时从 cassette 回放响应、不访问网络；配置了 api_base 时
+        所有请求改发到该地址；配置了 cassette_record 时把请求和响应录制到 cassette
+
+        Args:
+            cookie: cookie 字符串
+
+        Returns:
+            XhsClient: 新实例
+        """
+        player = get_cassette_player()
+        if player is not None:
+            client = XhsClient(cookie=cookie, sign=_placeholder_sign)
+            adapter = ReplayAdapter(player)
+            client.session.mount("https://", adapter)
+            client.session.mount("http://", adapter)
+            return client
+
+        base = config.get("api_base")
+        if base:
+            client = XhsClient(cookie=cookie, sign=_placeholder_sign)
+            # 不使用环境变量中的代理，本地地址直接连接
+            client.session.trust_env = False
+            client.session.mount("https://", _RerouteAdapter(base))
+            client.session.mount("http://", _RerouteAdapter(base))
+        else:
+            client = XhsClient(cookie=cookie)
+
+        recorder = get_cassette_recorder()
+        if recorder is not None:
+            for prefix in ("https://", "http://"):
+                inner = client.session.get_adapter(prefix)
+                client.session.mount(prefix, RecordingAdapter(recorder, inner))
+        return client
+
+    @contextmanager
+    def _borrow_client(self) -> Iterator[XhsClient]:
+        """
+        借出一个由当前线程独占的 XhsClient 实例，用完后归还
+
+        Yields:
+            XhsClient: 空闲实例，若无空闲实例则新建
+        """
+        with self._client_lock:
+            client = self._idle_clients.pop() if self._idle_clients else None
+            cookie, generation = self._cookie, self._generation
+        if client is None:
+            client = self._new_client(cookie)
         try:
-            info = self.client.get_self_info()
-            return bool(info and info.get("nickname"))
-        except Exception:
-            return False
+            yield client
+        finally:
+            with self._client_lock:
+                if generation == self._generation:
+                    self._idle_clients.append(client)
 
-    def _download_images(self, image_paths: List[str]) -> (List[str], List[str]):
+    def update_cookie(self, cookie: str) -> None:
         """
-        下载 https 图片到临时目录，返回本地路径列表和临时文件列表。
+        原子地切换到新的 cookie，之后借出的实例均使用新 cookie
+
+        进行中的调用继续使用旧实例完成，归还时被丢弃；登录状态缓存被重置，
+        下次检查时重新验证
+
+        Args:
+            cookie: 新的 cookie 字符串
+
+        Raises:
+            ValueError: cookie 缺少必要字段
         """
-        local_paths = []
-        tmp_files = []
-        for path in image_paths:
-            if path.startswith("https://") or path.startswith("http://"):
-                tmp_dir = tempfile.gettempdir()
-                filename = os.path.join(tmp_dir, os.path.basename(path).split("?")[0])
-                try:
-                    resp = requests.get(path, stream=True, timeout=10)
-                    resp.raise_for_status()
-                    with open(filename, "wb") as f:
-                        shutil.copyfileobj(resp.raw, f)
-                    local_paths.append(filename)
-                    tmp_files.append(filename)
-                except Exception as e:
-                    print(f"图片下载失败: {path}, 错误: {e}")
+        if not cookie_valid(cookie, self.REQUIRED_COOKIE_KEYS):
+            raise ValueError("cookie 缺少必要字段")
+        client = self._new_client(cookie)
+        with self._client_lock:
+            self._cookie = cookie
+            self._generation += 1
+            self._idle_clients = [client]
+            self.client = client
+        self.session.reset()
+        log_info("账号 cookie 已切换", account=self.account)
+
+    @property
+    def uploader(self) -> MediaUploader:
+        """媒体上传器，首次上传时创建，避免启动时打开上传索引"""
+        if self._uploader is None:
+            self._uploader = build_media_uploader(self.account)
+        return self._uploader
+
+    def _throttle(self, endpoint: str) -> None:
+        """
+        获取接口类别的令牌，令牌不足时阻塞等待
+
+        Args:
+            endpoint: 接口类别：publish、read 或 auth
+        """
+        waited = self.limiter.acquire(self.account, endpoint)
+        if waited > 0:
+            annotate(throttled_ms=round(waited * 1000, 1))
+            log_info(
+                "请求被限流，已排队等待",
+                account=self.account,
+                endpoint=endpoint,
+                seconds=round(waited, 3),
+            )
+
+    def _call(self, endpoint: str, fn: Callable[[XhsClient], Any]) -> Any:
+        """
+        经过限流、熔断和重试调用小红书API，每次尝试都重新获取令牌
+
+        Args:
+            endpoint: 接口类别：publish、read 或 auth
+            fn: 接收 XhsClient 实例的调用
+
+        Returns:
+            调用结果
+
+        Raises:
+            CircuitOpenError: 账号熔断器打开
+            Exception: 不可重试的错误，或重试耗尽后的最后一次错误
+        """
+
+        attempts = 0
+
+        def attempt() -> Any:
+            nonlocal attempts
+            attempts += 1
+            current.set(attempts=attempts)
+            self._throttle(endpoint)
+            with self._borrow_client() as client:
+                result = fn(_TimedClient(client))
+            # xhs 对非 JSON 响应（如网关 5xx 错误页）直接返回 Response 而不抛出异常
+            if isinstance(result, requests.Response):
+                result.raise_for_status()
+            return result
+
+        with span(f"xhs.{endpoint}", account=self.account) as current:
+            try:
+                return self.retry.call(attempt, breaker=self.breaker, name=endpoint)
+            except Exception as e:
+                if is_auth_error(e):
+                    self.session.invalidate(str(e))
+                    log_info("登录已失效", account=self.account, endpoint=endpoint)
+                raise
+
+    def check_session(self) -> SessionState:
+        """
+        请求用户信息以检查登录状态，并更新会话缓存
+
+        网络错误或熔断时无法判断登录状态，保留上次的结果
+
+        Returns:
+            SessionState: 更新后的会话状态
+        """
+        try:
+            info = self._call(AUTH, lambda client: client.get_self_info())
+            logged_in = bool(info and info.get("nickname"))
+            self.session.update(logged_in, info if logged_in else None)
+        except Exception as e:
+            if is_auth_error(e):
+                self.session.invalidate(str(e))
             else:
-                local_paths.append(path)
-        return local_paths, tmp_files
+                self.session.update(None, error=str(e))
+        return self.session
+
+    def _is_logged_in(self) -> bool:
+        """检查是否已登录"""
+        return bool(self.check_session().logged_in)
 
     def get_self_info(self) -> Dict[str, Any]:
         """获取当前登录用户信息"""
-        return self.client.get_self_info()
+        return self._call(READ, lambda client: client.get_self_info())
 
     def get_note_by_id(self, note_id: str) -> Dict[str, Any]:
         """获取笔记信息"""
-        return self.client.get_note_by_id(note_id)
+        return self._call(READ, lambda client: client.get_note_by_id(note_id))
+
+    @staticmethod
+    def _create_note(client: XhsClient, **kwargs: Any) -> Any:
+        """
+        创建笔记，计入 create_note 阶段
+
+        创建笔记不是幂等的：请求可能已到达平台的失败（读取超时、连接中断、5xx）
+        转换为 AmbiguousWriteError，重试策略不再重试，只重试确定未被处理的失败
+
+        Args:
+            client: 当前线程借出的 XhsClient 实例
+            **kwargs: XhsClient.create_note 的参数
+
+        Returns:
+            创建笔记的结果
+
+        Raises:
+            AmbiguousWriteError: 平台可能已创建笔记
+        """
+        with get_metrics().track(STAGE, "create_note"):
+            try:
+                result = client.create_note(**kwargs)
+                if isinstance(result, requests.Response):
+                    result.raise_for_status()
+                return result
+            except Exception as e:
+                if is_retryable(e) and not is_safe_to_resend(e):
+                    raise AmbiguousWriteError(
+                        f"创建笔记的请求可能已被平台处理，为避免重复发布不再重试，请确认后再发布: {e}"
+                    ) from e
+                raise
+
+    def _create_with_reuse(
+        self, create: Callable[[bool], Any], uploads: List[Any]
+    ) -> Any:
+        """
+        复用已上传的文件创建笔记，平台拒绝时丢弃复用的文件ID，重新上传后再试一次
+
+        Args:
+            create: 接收是否允许复用、上传媒体并创建笔记的函数，上传结果写入 uploads
+            uploads: create 本次使用的上传结果
+
+        Returns:
+            创建笔记的结果
+        """
+        try:
+            return create(True)
+        except DataFetchError as e:
+            if is_auth_error(e) or not any(media.reused for media in uploads):
+                raise
+            log_info(
+                "复用的上传文件被拒绝，重新上传",
+                account=self.account,
+                error=str(e),
+            )
+            self.uploader.forget(uploads)
+            return create(False)
+
+    def _first_frame(self, client: XhsClient, video: Any) -> Optional[str]:
+        """
+        获取视频首帧作为封面，复用的视频直接使用记录的首帧ID
+
+        Args:
+            client: 当前线程借出的 XhsClient 实例
+            video: 视频的上传结果
+
+        Returns:
+            Optional[str]: 首帧图片ID，轮询超时返回None
+        """
+        image_id = video.extra.get("first_frame")
+        if image_id:
+            return image_id
+        for _ in range(self.FIRST_FRAME_POLLS):
+            time.sleep(self.FIRST_FRAME_INTERVAL)
+            image_id = client.get_video_first_frame_image_id(video.extra["video_id"])
+            if image_id:
+                self.uploader.remember(video, first_frame=image_id)
+                return image_id
+        return None
 
     def create_text_note(
         self, content: str, topics: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """创建纯文本笔记"""
         try:
-            result = self.client.create_note(
-                title="", desc=content, note_type="normal", topics=topics or []
+            result = self._call(
+                PUBLISH,
+                lambda client: self._create_note(
+                    client,
+                    title="",
+                    desc=content,
+                    note_type="normal",
+                    topics=topics or [],
+                ),
             )
             return {"status": "success", "type": "text", "result": result}
         except Exception as e:
             return {"status": "error", "type": "text", "error": str(e)}
 
     def create_image_note(
-        self, content: str, image_paths: List[str], topics: Optional[List[str]] = None
+        self,
+        content: str,
+        image_paths: List[str],
+        topics: Optional[List[str]] = None,
+        prepared: bool = False,
     ) -> Dict[str, Any]:
-        """创建图文笔记"""
+        """
+        创建图文笔记，上传前按配置预处理图片
+
+        prepared 为 True 时图片已由 stage_note 下载并预处理，直接上传，不再下载和重新编码
+        """
         tmp_files = []
+        timings = []
+        report = None
         try:
-            local_paths, tmp_files = self._download_images(image_paths)
-            result = self.client.create_image_note(
-                title="", desc=content, files=local_paths, topics=topics or []
-            )
-            return {"status": "success", "type": "image", "result": result}
+            local_paths = image_paths
+            if not prepared:
+                local_paths, tmp_files, timings = download_images(image_paths)
+                local_paths, normalized_tmp, report = normalize_images(local_paths)
+                tmp_files += normalized_tmp
+            uploads = []
+
+            def publish(client: XhsClient) -> Any:
+                def create(reuse: bool) -> Any:
+                    uploads[:] = self.uploader.upload_all(
+                        client, local_paths, IMAGE, reuse
+                    )
+                    images = [
+                        {
+                            "file_id": media.file_id,
+                            "metadata": {"source": -1},
+                            "stickers": {"version": 2, "floating": []},
+                            "extra_info_json": '{"mimeType":"image/jpeg"}',
+                        }
+                        for media in uploads
+                    ]
+                    return self._create_note(
+                        client,
+                        title="",
+                        desc=content,
+                        note_type="normal",
+                        ats=[],
+                        topics=topics or [],
+                        image_info={"images": images},
+                    )
+
+                return self._create_with_reuse(create, uploads)
+
+            result = self._call(PUBLISH, publish)
+            return {
+                "status": "success",
+                "type": "image",
+                "result": result,
+                "download_timings": timings,
+                "image_report": report,
+                "upload_report": MediaUploader.report(uploads),
+            }
         except Exception as e:
-            return {"status": "error", "type": "image", "error": str(e)}
+            return {
+                "status": "error",
+                "type": "image",
+                "error": str(e),
+                "download_timings": timings,
+                "image_report": report,
+            }
         finally:
-            for f in tmp_files:
-                try:
-                    os.remove(f)
-                except Exception:
-                    pass
+            remove_files(tmp_files)
 
     def create_video_note(
         self,
@@ -138,16 +524,71 @@ class XhsApiClient:
         video_path: str,
         cover_path: Optional[str] = None,
         topics: Optional[List[str]] = None,
+        video_sha256: Optional[str] = None,
+        prepared: bool = False,
     ) -> Dict[str, Any]:
-        """创建视频笔记"""
+        """
+        创建视频笔记，视频和封面均支持本地路径和 http(s) 链接
+
+        prepared 为 True 时视频和封面已由 stage_note 下载，直接上传
+        """
+        tmp_files = []
         try:
-            result = self.client.create_video_note(
-                title="",
-                desc=content,
-                video_path=video_path,
-                cover_path=cover_path,
-                topics=topics or [],
-            )
-            return {"status": "success", "type": "video", "result": result}
+            if not prepared:
+                video_path, tmp_files = download_video(video_path, video_sha256)
+            if not prepared and cover_path and is_remote(cover_path):
+                covers, cover_tmp, _ = download_images([cover_path])
+                tmp_files += cover_tmp
+                if not covers:
+                    raise RuntimeError(f"封面下载失败: {cover_path}")
+                cover_path = covers[0]
+            uploads = []
+
+            def publish(client: XhsClient) -> Any:
+                def create(reuse: bool) -> Any:
+                    video = self.uploader.upload(client, video_path, VIDEO, reuse)
+                    uploads[:] = [video]
+                    if cover_path:
+                        cover = self.uploader.upload(client, cover_path, IMAGE, reuse)
+                        uploads.append(cover)
+                        cover_id, is_upload = cover.file_id, True
+                    else:
+                        cover_id, is_upload = self._first_frame(client, video), False
+                    video_info = {
+                        "file_id": video.file_id,
+                        "timelines": [],
+                        "cover": {
+                            "file_id": cover_id,
+                            "frame": {
+                                "ts": 0,
+                                "is_user_select": False,
+                                "is_upload": is_upload,
+                            },
+                        },
+                        "chapters": [],
+                        "chapter_sync_text": False,
+                        "entrance": "web",
+                    }
+                    return self._create_note(
+                        client,
+                        title="",
+                        desc=content,
+                        note_type="video",
+                        ats=[],
+                        topics=topics or [],
+                        video_info=video_info,
+                    )
+
+                return self._create_with_reuse(create, uploads)
+
+            result = self._call(PUBLISH, publish)
+            return {
+                "status": "success",
+                "type": "video",
+                "result": result,
+                "upload_report": MediaUploader.report(uploads),
+            }
         except Exception as e:
             return {"status": "error", "type": "video", "error": str(e)}
+        finally:
+            remove_files(tmp_files)
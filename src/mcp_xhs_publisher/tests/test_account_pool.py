@@ -0,0 +1,79 @@
+"""
+账号池测试
+
+测试从 cookie 目录加载多个账号以及按负载调度
+"""
+
+import os
+import tempfile
+import unittest
+
+from mcp_xhs_publisher.services.account_pool import AccountPool
+
+COOKIE = "a1=test_a1; web_session=test_session; webId=test_web_id"
+
+
+class TestAccountPool(unittest.TestCase):
+    """测试 AccountPool"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name in ["alice.cookie", "bob.cookie", "carol.cookie"]:
+            with open(os.path.join(self.tmp.name, name), "w") as f:
+                f.write(COOKIE)
+        with open(os.path.join(self.tmp.name, "broken.cookie"), "w") as f:
+            f.write("invalid")
+        with open(os.path.join(self.tmp.name, ".hidden"), "w") as f:
+            f.write(COOKIE)
+        self.pool = AccountPool(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_loads_every_valid_cookie(self):
+        """测试加载目录中所有有效的 cookie 文件"""
+        self.assertEqual(self.pool.accounts(), ["alice", "bob", "carol"])
+
+    def test_round_robin_when_idle(self):
+        """测试负载相同时轮询选择账号"""
+        picked = []
+        for _ in range(6):
+            with self.pool.acquire() as client:
+                picked.append(client.account)
+        self.assertEqual(picked, ["alice", "bob", "carol"] * 2)
+
+    def test_least_loaded(self):
+        """测试优先选择进行中请求最少的账号"""
+        with self.pool.acquire("alice"), self.pool.acquire("bob"):
+            with self.pool.acquire() as client:
+                self.assertEqual(client.account, "carol")
+                with self.pool.acquire() as second:
+                    self.assertIn(second.account, ["alice", "bob"])
+
+    def test_unhealthy_account_skipped(self):
+        """测试熔断或登录失效的账号不参与自动调度"""
+        self.pool.get("alice").session.update(False, error="登录已失效")
+        bob = self.pool.get("bob").breaker
+        for _ in range(bob.failure_threshold):
+            bob.record_failure()
+        for _ in range(3):
+            with self.pool.acquire() as client:
+                self.assertEqual(client.account, "carol")
+        stats = {s["account"]: s for s in self.pool.stats()}
+        self.assertEqual(stats["carol"]["completed"], 3)
+        self.assertFalse(stats["alice"]["healthy"])
+
+    def test_unknown_account(self):
+        """测试指定不存在的账号时报错"""
+        with self.assertRaises(ValueError):
+            with self.pool.acquire("nobody"):
+                pass
+
+    def test_single_cookie_file(self):
+        """测试 cookie 路径为文件时作为单个账号加载"""
+        pool = AccountPool(os.path.join(self.tmp.name, "bob.cookie"))
+        self.assertEqual(pool.accounts(), ["bob"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+批量发布测试
+
+测试预处理与发布阶段的流水线重叠、结果顺序和失败隔离
+"""
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mcp.server.fastmcp import FastMCP
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.models.tool_io_schemas import PublishResponse
+from mcp_xhs_publisher.services.media_staging import StagedNote
+from mcp_xhs_publisher.tools import tool_registry
+from mcp_xhs_publisher.tools.batch_publisher import BatchPublisher
+from mcp_xhs_publisher.util.worker_pool import WorkerPool
+
+
+class _TimedExecutor:
+    """记录各阶段起止时间的执行器，内容为 bad 的笔记预处理失败"""
+
+    STAGE_SECONDS = 0.05
+    PUBLISH_SECONDS = 0.1
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.cleaned = []
+        self.pool = mock.Mock()
+
+    def _record(self, stage, content, start):
+        with self.lock:
+            self.events.append((stage, content, start, time.perf_counter()))
+
+    def stage(self, note_type, params):
+        start = time.perf_counter()
+        time.sleep(self.STAGE_SECONDS)
+        self._record("stage", params["content"], start)
+        if params["content"] == "bad":
+            raise RuntimeError("图片全部下载失败")
+        staged = StagedNote(note_type=note_type, params=params)
+        staged.cleanup = lambda: self.cleaned.append(params["content"])
+        return staged
+
+    def publish_staged(self, staged):
+        start = time.perf_counter()
+        time.sleep(self.PUBLISH_SECONDS)
+        self._record("publish", staged.params["content"], start)
+        staged.cleanup()
+        return PublishResponse(
+            status="success",
+            message="成功",
+            note_id=staged.params["content"],
+            note_type=staged.note_type,
+        )
+
+    def span(self, stage, content):
+        for event in self.events:
+            if event[:2] == (stage, content):
+                return event[2], event[3]
+        raise AssertionError(f"{stage} {content} 未执行")
+
+
+class TestBatchPublisher(unittest.TestCase):
+    """测试 BatchPublisher"""
+
+    def setUp(self):
+        self.executor = _TimedExecutor()
+        self.prepare_pool = WorkerPool(2, "test-prepare")
+        self.publish_pool = WorkerPool(2, "test-publish")
+        self.publisher = BatchPublisher(
+            self.executor, self.prepare_pool, self.publish_pool, prefetch=2
+        )
+
+    def tearDown(self):
+        self.prepare_pool.shutdown()
+        self.publish_pool.shutdown()
+
+    def test_stages_overlap(self):
+        """测试下一篇笔记的预处理与当前笔记的发布重叠"""
+        notes = [{"note_type": "text", "content": str(i)} for i in range(4)]
+        summary = asyncio.run(self.publisher.run(notes))
+
+        self.assertEqual(summary["succeeded"], 4)
+        for i in range(3):
+            publish_start, publish_end = self.executor.span("publish", str(i))
+            stage_start, stage_end = self.executor.span("stage", str(i + 1))
+            self.assertLess(stage_end, publish_end)
+        # 发布阶段串行执行
+        publishes = sorted(e[2:] for e in self.executor.events if e[0] == "publish")
+        for (_, end), (start, _) in zip(publishes, publishes[1:]):
+            self.assertGreaterEqual(start, end)
+        # 流水线总耗时小于各阶段耗时之和
+        serial = 4 * (_TimedExecutor.STAGE_SECONDS + _TimedExecutor.PUBLISH_SECONDS)
+        self.assertLess(summary["elapsed"], serial)
+
+    def test_results_in_input_order_and_streamed(self):
+        """测试结果按输入顺序返回，回调在每篇完成时调用"""
+        notes = [
+            {"note_type": "text", "content": "a"},
+            {"note_type": "image", "content": "bad", "image_paths": ["x"]},
+            {"note_type": "text", "content": "c"},
+        ]
+        streamed = []
+
+        async def on_result(item):
+            streamed.append(item["index"])
+
+        summary = asyncio.run(self.publisher.run(notes, on_result=on_result))
+
+        self.assertEqual([r["index"] for r in summary["results"]], [0, 1, 2])
+        self.assertEqual(sorted(streamed), [0, 1, 2])
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(summary["status"], "error")
+        failed = summary["results"][1]
+        self.assertEqual(failed["message"], "笔记预处理失败")
+        self.assertEqual(failed["note_type"], "image")
+        self.assertEqual(summary["results"][2]["note_id"], "c")
+        self.assertEqual(sorted(self.executor.cleaned), ["a", "c"])
+        self.assertGreater(summary["notes_per_minute"], 0)
+
+
+class TestPublishBatchTool(unittest.TestCase):
+    """测试 publish_batch 工具"""
+
+    def test_publish_batch(self):
+        """测试工具返回每篇笔记结果和吞吐量"""
+        executor = _TimedExecutor()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with mock.patch.dict(config._config, {"data_dir": tmp.name}):
+            registry = tool_registry.ToolRegistry(executor)
+        self.addCleanup(registry.shutdown)
+        server = FastMCP(name="test")
+        registry.register_tools(server)
+
+        notes = [
+            {"note_type": "text", "content": "a"},
+            {"note_type": "video", "content": "b", "video_path": "/tmp/v.mp4"},
+        ]
+        content, _ = asyncio.run(server.call_tool("publish_batch", {"notes": notes}))
+        summary = json.loads(content[0].text)
+
+        self.assertEqual(summary["succeeded"], 2)
+        self.assertEqual(
+            [r["note_type"] for r in summary["results"]], ["text", "video"]
+        )
+        self.assertIn("notes_per_minute", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+请求录制与回放测试
+
+测试录制替身服务器上的真实请求并替换敏感信息，以及关闭替身服务器后从 cassette 回放
+"""
+
+import gzip
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.devtools.media import make_jpeg
+from mcp_xhs_publisher.devtools.xhs_standin import EndpointBehavior, StandinServer
+from mcp_xhs_publisher.services import cassette
+from mcp_xhs_publisher.services.cassette import (
+    REDACTED,
+    CassetteMissError,
+    CassettePlayer,
+    Exchange,
+    load_cassette,
+)
+from mcp_xhs_publisher.services.xhs_client import XhsApiClient
+
+COOKIE = "a1=secret_a1_value; web_session=secret_session_value; webId=web_id_value"
+
+
+def _exchange(path, elapsed=0.0, body='{"success":true}'):
+    return Exchange(
+        method="GET",
+        url=f"https://edith.xiaohongshu.com{path}",
+        request_headers={},
+        request_body=None,
+        request_size=0,
+        status=200,
+        response_headers={"Content-Type": "application/json"},
+        response_body=body,
+        response_size=len(body),
+        binary=False,
+        truncated=False,
+        offset=0.0,
+        elapsed=elapsed,
+    )
+
+
+class TestCassette(unittest.TestCase):
+    """测试录制和回放 XhsClient 的请求"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "xhs.jsonl.gz")
+        self.cookie_file = os.path.join(self.tmp.name, "alice.cookie")
+        with open(self.cookie_file, "w") as f:
+            f.write(COOKIE)
+        self.image = os.path.join(self.tmp.name, "a.jpg")
+        with open(self.image, "wb") as f:
+            f.write(make_jpeg(100 * 1024))
+        for name in ("_recorder", "_player"):
+            patcher = mock.patch.object(cassette, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _client(self, overrides):
+        patcher = mock.patch.dict(
+            config._config,
+            # 关闭上传索引，回放时同样走完整的上传流程
+            {"data_dir": self.tmp.name, "upload_index_ttl": "0", **overrides},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        api = XhsApiClient(cookie_dir=self.cookie_file)
+        api.limiter = mock.Mock()
+        api.limiter.acquire.return_value = 0
+        api.FIRST_FRAME_INTERVAL = 0
+        return api
+
+    def _record(self):
+        server = StandinServer(
+            default=EndpointBehavior(latency_ms=20, jitter=0), seed=1
+        ).start()
+        try:
+            api = self._client(
+                {"api_base": server.base_url, "cassette_record": self.path}
+            )
+            results = [
+                api.get_note_by_id("n1"),
+                api.create_image_note("hello", [self.image]),
+            ]
+        finally:
+            server.close()
+            cassette._recorder.close()
+        return results
+
+    def test_record_redacts_secrets(self):
+        """测试录制的 cassette 包含完整的请求，且不含 cookie 和签名"""
+        self._record()
+
+        exchanges = load_cassette(self.path)
+        paths = [urlpath for _, urlpath in (e.key for e in exchanges)]
+        self.assertIn("/api/sns/web/v1/feed", paths)
+        self.assertIn("/web_api/sns/v2/note", paths)
+        upload = next(e for e in exchanges if e.method == "PUT")
+        self.assertIsNone(upload.request_body)
+        self.assertEqual(upload.request_size, 100 * 1024)
+        self.assertTrue(all(e.elapsed >= 0.02 for e in exchanges))
+
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            raw = f.read()
+        for secret in ("secret_a1_value", "secret_session_value", "web_id_value"):
+            self.assertNotIn(secret, raw)
+        for exchange in exchanges:
+            for name, value in exchange.request_headers.items():
+                if name.lower() in ("cookie", "x-s", "x-t"):
+                    self.assertEqual(value, REDACTED)
+
+    def test_replay_without_network(self):
+        """测试关闭替身服务器后按 cassette 回放得到相同的结果"""
+        recorded = self._record()
+
+        api = self._client({"cassette_replay": self.path, "cassette_time_scale": "0"})
+        replayed = [
+            api.get_note_by_id("n1"),
+            api.create_image_note("hello", [self.image]),
+        ]
+
+        self.assertEqual(replayed[0], recorded[0])
+        self.assertEqual(replayed[1]["status"], "success")
+        self.assertEqual(replayed[1]["result"], recorded[1]["result"])
+        self.assertEqual(cassette._player.misses, 0)
+
+    def test_player_cycles_and_scales_time(self):
+        """测试同一路径的录制按顺序循环返回，等待时间按倍数缩放，未录制的路径报错"""
+        player = CassettePlayer(
+            [_exchange("/a", 0.1, '{"n":1}'), _exchange("/a", 0.1, '{"n":2}')],
+            time_scale=0.5,
+        )
+        bodies = [player.match("GET", "http://x/a?q=1").body() for _ in range(3)]
+        self.assertEqual(bodies, [b'{"n":1}', b'{"n":2}', b'{"n":1}'])
+
+        request = mock.Mock(method="GET", url="http://x/a")
+        start = time.perf_counter()
+        response = player.respond(request)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+        self.assertEqual(response.json(), {"n": 2})
+
+        with self.assertRaises(CassetteMissError):
+            player.match("POST", "http://x/a")
+        self.assertEqual(player.misses, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+cookie 存储测试
+
+测试 cookie 解析、按修改时间检测文件变化以及运行中的客户端切换 cookie
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from mcp_xhs_publisher.services.account_pool import AccountPool
+from mcp_xhs_publisher.services.cookie_store import CookieStore
+from mcp_xhs_publisher.util.cookie_manager import cookie_valid, parse_cookie
+
+KEYS = ["a1", "web_session", "webId"]
+COOKIE = "a1=test_a1; web_session=session_v1; webId=test_web_id"
+REFRESHED = "a1=test_a1; web_session=session_v2; webId=test_web_id"
+
+
+class TestCookieParsing(unittest.TestCase):
+    """测试 cookie 解析"""
+
+    def test_parse(self):
+        """测试解析为键值对，值中可包含等号"""
+        cookies = parse_cookie(" a1=x ; token=a=b;; broken ;webId=")
+        self.assertEqual(cookies, {"a1": "x", "token": "a=b", "webId": ""})
+
+    def test_valid_requires_keys_not_substrings(self):
+        """测试必要字段按键判断，不再按子串匹配"""
+        self.assertTrue(cookie_valid(COOKIE, KEYS))
+        self.assertFalse(cookie_valid("xa1=1; web_session=2; webId=3", KEYS))
+        self.assertFalse(cookie_valid("a1=; web_session=2; webId=3", KEYS))
+
+
+class TestCookieStore(unittest.TestCase):
+    """测试 CookieStore 和账号池的热更新"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self._write("alice.cookie", COOKIE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        # 保证修改时间变化，不依赖文件系统的时间精度
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        return path
+
+    def test_detects_changes(self):
+        """测试只有内容变化的文件被重新通知，无效内容保留旧 cookie"""
+        store = CookieStore(self.tmp.name, KEYS)
+        self.assertEqual([r.account for r in store.scan()], ["alice"])
+        self.assertEqual(store.scan(), [])
+
+        self._write("alice.cookie", "a1=half")
+        self.assertEqual(store.scan(), [])
+        self.assertEqual(store.get("alice").cookies["web_session"], "session_v1")
+
+        self._write("alice.cookie", REFRESHED)
+        changed = store.scan()
+        self.assertEqual(changed[0].cookies["web_session"], "session_v2")
+
+    def test_pool_swaps_credentials(self):
+        """测试 cookie 更新后运行中的客户端切换到新 cookie，新文件作为新账号加入"""
+        pool = AccountPool(self.tmp.name)
+        alice = pool.get("alice")
+        alice.session.invalidate("登录已过期")
+
+        with alice._borrow_client() as in_flight:
+            self._write("alice.cookie", REFRESHED)
+            self._write("bob.cookie", COOKIE)
+            pool.store.reload()
+            self.assertIn("session_v1", in_flight.cookie)
+
+        with alice._borrow_client() as client:
+            self.assertIn("session_v2", client.cookie)
+        self.assertNotIn(in_flight, alice._idle_clients)
+        self.assertIsNone(alice.session.logged_in)
+        self.assertEqual(pool.accounts(), ["alice", "bob"])
+
+    def test_background_watch(self):
+        """测试后台轮询自动应用 cookie 更新"""
+        pool = AccountPool(self.tmp.name)
+        pool.watch(0.02)
+        self.addCleanup(pool.stop_watching)
+        self._write("alice.cookie", REFRESHED)
+
+        deadline = time.time() + 2
+        while time.time() < deadline and "session_v2" not in pool.get("alice")._cookie:
+            time.sleep(0.01)
+        self.assertIn("session_v2", pool.get("alice")._cookie)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+图片预处理测试
+
+测试缩放、重新编码、元数据去除和格式转换，以及未开启、未安装 Pillow 和处理失败时的回退
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.devtools.media import make_jpeg
+from mcp_xhs_publisher.services import image_normalizer
+from mcp_xhs_publisher.services.image_normalizer import (
+    ImageNormalizer,
+    normalize_file,
+    pillow_available,
+)
+from mcp_xhs_publisher.services.media_staging import StagedNote, normalize_images
+from mcp_xhs_publisher.tools.publish_executor import PublishExecutor
+
+
+class TestNormalizeFallback(unittest.TestCase):
+    """测试预处理关闭或失败时使用原图"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "broken.jpg")
+        with open(self.path, "wb") as f:
+            f.write(b"not an image")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_disabled_by_default(self):
+        """测试未开启预处理时原样返回"""
+        with mock.patch.dict(config._config, {"image_normalize": "false"}):
+            self.assertEqual(normalize_images([self.path]), ([self.path], [], None))
+
+    def test_without_pillow(self):
+        """测试开启预处理但未安装 Pillow 时跳过"""
+        with (
+            mock.patch.dict(config._config, {"image_normalize": "true"}),
+            mock.patch.object(image_normalizer, "_normalizer", None),
+            mock.patch.object(image_normalizer, "pillow_available", return_value=False),
+        ):
+            self.assertIsNone(image_normalizer.get_image_normalizer())
+
+    def test_failure_keeps_original(self):
+        """测试单张图片处理失败时使用原图并在报告中记录错误"""
+        normalizer = ImageNormalizer(workers=1, out_dir=self.tmp.name)
+        self.addCleanup(normalizer.close)
+        paths, tmp_files, report = normalizer.normalize_all([self.path])
+        self.assertEqual(paths, [self.path])
+        self.assertEqual(tmp_files, [])
+        self.assertEqual(report["saved_bytes"], 0)
+        self.assertEqual(report["errors"][0]["path"], self.path)
+
+
+class TestStagedImages(unittest.TestCase):
+    """测试预处理阶段已压缩的图片在发布时不再重复处理"""
+
+    def test_publish_staged_skips_normalization(self):
+        """测试 publish_staged 通知客户端图片已预处理"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "a.jpg")
+        with open(path, "wb") as f:
+            f.write(make_jpeg(4096))
+        client = mock.Mock(account="alice")
+        client.create_image_note.return_value = {"status": "success", "result": {}}
+        executor = PublishExecutor.__new__(PublishExecutor)
+        executor.pool = mock.Mock()
+        executor.pool.acquire.return_value.__enter__ = mock.Mock(return_value=client)
+        executor.pool.acquire.return_value.__exit__ = mock.Mock(return_value=False)
+        staged = StagedNote("image", {"content": "c", "image_paths": [path]})
+
+        response = executor.publish_staged(staged)
+
+        self.assertEqual(response.status, "success")
+        self.assertTrue(client.create_image_note.call_args.kwargs["prepared"])
+
+
+@unittest.skipUnless(pillow_available(), "未安装 Pillow")
+class TestNormalizeFile(unittest.TestCase):
+    """测试单张图片的处理"""
+
+    def setUp(self):
+        from PIL import Image
+
+        self.Image = Image
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _save(self, name, image, **options):
+        path = os.path.join(self.tmp.name, name)
+        image.save(path, **options)
+        return path
+
+    def _noise(self, size, mode="RGB"):
+        return self.Image.frombytes(
+            mode, size, os.urandom(size[0] * size[1] * len(mode))
+        )
+
+    def test_downscale_and_strip_exif(self):
+        """测试按最长边缩放并去除 EXIF"""
+        exif = self.Image.Exif()
+        exif[0x010F] = "TestCamera"
+        path = self._save(
+            "big.jpg", self._noise((1200, 800)), quality=95, exif=exif.tobytes()
+        )
+        result = normalize_file(path, self.tmp.name, max_edge=600, quality=80)
+
+        self.assertTrue(result["changed"])
+        self.assertEqual((result["width"], result["height"]), (600, 400))
+        self.assertLess(result["bytes"], result["original_bytes"])
+        with self.Image.open(result["path"]) as out:
+            self.assertEqual(out.format, "JPEG")
+            self.assertNotIn("exif", out.info)
+
+    def test_convert_unsupported_format(self):
+        """测试不支持的格式转换为 JPEG，带透明通道的图片保存为 PNG"""
+        bmp = self._save("photo.bmp", self._noise((64, 64)))
+        self.assertEqual(normalize_file(bmp, self.tmp.name, 0, 85)["format"], "JPEG")
+
+        rgba = self._save("alpha.tiff", self._noise((64, 64), "RGBA"))
+        self.assertEqual(normalize_file(rgba, self.tmp.name, 0, 85)["format"], "PNG")
+
+    def test_keep_small_original(self):
+        """测试无需处理且重新编码没有变小的图片保留原文件"""
+        path = self._save("small.png", self.Image.new("RGB", (32, 32), "red"))
+        result = normalize_file(path, self.tmp.name, max_edge=2048, quality=85)
+        self.assertFalse(result["changed"])
+        self.assertEqual(result["path"], path)
+
+    def test_normalize_all(self):
+        """测试多张图片并行处理并报告节省的字节数"""
+        paths = [
+            self._save(f"{i}.jpg", self._noise((800, 800)), quality=95)
+            for i in range(3)
+        ]
+        normalizer = ImageNormalizer(workers=2, max_edge=400, out_dir=self.tmp.name)
+        self.addCleanup(normalizer.close)
+        out_paths, tmp_files, report = normalizer.normalize_all(paths)
+
+        self.assertEqual(len(out_paths), 3)
+        self.assertEqual(out_paths, tmp_files)
+        self.assertEqual(report["changed"], 3)
+        self.assertGreater(report["saved_bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
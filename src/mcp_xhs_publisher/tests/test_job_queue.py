@@ -0,0 +1,230 @@
+"""
+发布任务队列测试
+
+测试任务的提交、认领、中断恢复，以及后台执行器和提交/查询工具
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mcp.server.fastmcp import FastMCP
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.models.tool_io_schemas import PublishResponse
+from mcp_xhs_publisher.services.job_queue import (
+    JOB_ERROR,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SCHEDULED,
+    JOB_SUCCESS,
+    JobQueue,
+)
+from mcp_xhs_publisher.tools import tool_registry
+from mcp_xhs_publisher.tools.job_runner import JobRunner
+
+
+class _FakeExecutor:
+    """记录发布调用的执行器，内容为 fail 时返回失败"""
+
+    def __init__(self):
+        self.calls = []
+        self.done = threading.Event()
+        self.pool = mock.Mock()
+        self.pool.owned_elsewhere.return_value = False
+        self.pool.owned_accounts.return_value = None
+
+    def publish(self, note_type, params):
+        self.calls.append((note_type, params))
+        self.done.set()
+        if params.get("content") == "fail":
+            return PublishResponse(status="error", message="失败", error="发布失败")
+        return PublishResponse(status="success", message="成功", note_id="n1")
+
+
+class TestJobQueue(unittest.TestCase):
+    """测试 JobQueue"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.tmp.name, "jobs.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_claim_in_submit_order(self):
+        """测试按提交顺序认领，认领后状态变为 running"""
+        first = self.queue.submit("text", {"content": "a"})
+        second = self.queue.submit("text", {"content": "b"})
+
+        job = self.queue.claim()
+        self.assertEqual(job["id"], first)
+        self.assertEqual(job["status"], JOB_RUNNING)
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(self.queue.claim()["id"], second)
+        self.assertIsNone(self.queue.claim())
+
+    def test_complete(self):
+        """测试记录任务结果"""
+        job_id = self.queue.submit("text", {"content": "a"})
+        self.queue.claim()
+        self.queue.complete(job_id, JOB_SUCCESS, result={"note_id": "n1"})
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], JOB_SUCCESS)
+        self.assertEqual(job["result"], {"note_id": "n1"})
+        self.assertEqual(self.queue.counts()[JOB_SUCCESS], 1)
+
+    def test_claim_owned_accounts(self):
+        """测试只认领未指定账号或指定了给定账号的任务"""
+        alice = self.queue.submit("text", {"content": "a", "account": "alice"})
+        bob = self.queue.submit("text", {"content": "b", "account": "bob"})
+        anyone = self.queue.submit("text", {"content": "c"})
+
+        self.assertEqual(self.queue.claim(["bob"])["id"], bob)
+        self.assertEqual(self.queue.claim(["bob"])["id"], anyone)
+        self.assertIsNone(self.queue.claim(["bob"]))
+        self.assertIsNone(self.queue.claim([]))
+        self.assertEqual(self.queue.claim()["id"], alice)
+
+    def test_recover_interrupted(self):
+        """测试重启后中断的任务重新排队，超过尝试次数的标记为失败"""
+        exhausted_id = self.queue.submit("text", {"content": "a"})
+        self.queue.claim()
+        self.queue.recover(max_attempts=3)
+        self.queue.claim()
+        retry_id = self.queue.submit("text", {"content": "b"})
+        self.queue.claim()
+
+        reopened = JobQueue(self.queue.db_path)
+        self.assertEqual(reopened.recover(max_attempts=2), 1)
+        self.assertEqual(reopened.get(retry_id)["status"], JOB_QUEUED)
+        self.assertEqual(reopened.get(exhausted_id)["status"], JOB_ERROR)
+
+    def test_recover_own_worker(self):
+        """测试重新启动的子进程只恢复自己认领的任务，主进程恢复全部任务"""
+        workers = [JobQueue(self.queue.db_path, worker=i) for i in range(2)]
+        first = self.queue.submit("text", {"content": "a"})
+        second = self.queue.submit("text", {"content": "b"})
+        scheduled = self.queue.schedule("text", {"content": "c"}, time.time() + 60)
+        workers[0].claim()
+        workers[1].claim()
+        workers[1].claim_scheduled(scheduled)
+
+        self.assertEqual(workers[1].recover(max_attempts=3), 1)
+        self.assertEqual(self.queue.get(first)["status"], JOB_RUNNING)
+        self.assertEqual(self.queue.get(second)["status"], JOB_QUEUED)
+        self.assertEqual(self.queue.get(scheduled)["status"], JOB_SCHEDULED)
+
+        self.assertEqual(self.queue.recover(max_attempts=3), 1)
+        self.assertEqual(self.queue.get(first)["status"], JOB_QUEUED)
+
+
+class TestJobRunner(unittest.TestCase):
+    """测试 JobRunner"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.tmp.name, "jobs.db"))
+        self.executor = _FakeExecutor()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _wait_finished(self, job_id, timeout=5.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.queue.get(job_id)
+            if job["status"] in (JOB_SUCCESS, JOB_ERROR):
+                return job
+            time.sleep(0.02)
+        self.fail(f"任务未完成: {job_id}")
+
+    def test_runs_submitted_jobs(self):
+        """测试提交后被后台线程执行并记录成功和失败结果"""
+        runner = JobRunner(self.queue, self.executor, workers=2)
+        runner.start()
+        self.addCleanup(runner.stop)
+
+        ok_id = self.queue.submit("text", {"content": "ok"})
+        fail_id = self.queue.submit("text", {"content": "fail"})
+        runner.notify()
+
+        ok = self._wait_finished(ok_id)
+        self.assertEqual(ok["result"]["note_id"], "n1")
+        failed = self._wait_finished(fail_id)
+        self.assertEqual(failed["error"], "发布失败")
+
+    def test_resumes_after_restart(self):
+        """测试启动时执行上次中断的任务"""
+        job_id = self.queue.submit("text", {"content": "ok"})
+        self.queue.claim()
+
+        runner = JobRunner(self.queue, self.executor, workers=1)
+        runner.start()
+        self.addCleanup(runner.stop)
+
+        self.assertEqual(self._wait_finished(job_id)["status"], JOB_SUCCESS)
+        self.assertEqual(self.executor.calls, [("text", {"content": "ok"})])
+
+
+class TestJobTools(unittest.TestCase):
+    """测试 submit_publish / get_job_status / list_jobs 工具"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.executor = _FakeExecutor()
+        with mock.patch.dict(config._config, {"data_dir": self.tmp.name}):
+            self.registry = tool_registry.ToolRegistry(self.executor)
+        self.server = FastMCP(name="test")
+        self.registry.register_tools(self.server)
+
+    def tearDown(self):
+        self.registry.shutdown()
+        self.tmp.cleanup()
+
+    def _call(self, name, args):
+        content, _ = asyncio.run(self.server.call_tool(name, args))
+        return json.loads(content[0].text)
+
+    def test_submit_and_poll(self):
+        """测试提交任务后立即返回，并可查询到执行结果"""
+        submitted = self._call(
+            "submit_publish",
+            {"note_type": "image", "content": "c", "image_paths": ["/tmp/a.jpg"]},
+        )
+        self.assertEqual(submitted["status"], "queued")
+        self.assertFalse(self.executor.calls)
+
+        self.registry.start()
+        self.assertTrue(self.executor.done.wait(5))
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            job = self._call("get_job_status", {"job_id": submitted["job_id"]})
+            if job["status"] == JOB_SUCCESS:
+                break
+            time.sleep(0.02)
+        self.assertEqual(job["status"], JOB_SUCCESS)
+        self.assertEqual(
+            self.executor.calls,
+            [("image", {"content": "c", "image_paths": ["/tmp/a.jpg"]})],
+        )
+        listed = self._call("list_jobs", {"status": "success"})
+        self.assertEqual(listed["counts"][JOB_SUCCESS], 1)
+
+    def test_submit_invalid(self):
+        """测试参数不完整时拒绝提交"""
+        result = self._call("submit_publish", {"note_type": "video", "content": "c"})
+        self.assertEqual(result["status"], "error")
+        result = self._call("submit_publish", {"note_type": "audio", "content": "c"})
+        self.assertIn("不支持的笔记类型", result["message"])
+        self.assertEqual(self._call("list_jobs", {})["jobs"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+日志写入测试
+
+测试后台批量写入、按大小和时间轮转压缩，以及格式化器对普通文本的处理
+"""
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from mcp_xhs_publisher.util.log_writer import LogWriter
+from mcp_xhs_publisher.util.logging import JsonFormatter
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestLogWriter(unittest.TestCase):
+    """测试 LogWriter"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "logs", "app.log")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _backups(self):
+        directory = os.path.dirname(self.path)
+        return sorted(name for name in os.listdir(directory) if name.endswith(".gz"))
+
+    def test_batches_writes(self):
+        """测试写入在后台完成，flush 后全部落盘且按批次写入"""
+        writer = LogWriter(self.path, flush_interval=0.05)
+        self.addCleanup(writer.close)
+        for i in range(200):
+            writer.write(json.dumps({"i": i}))
+        self.assertTrue(writer.flush())
+
+        with open(self.path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual([json.loads(line)["i"] for line in lines], list(range(200)))
+        stats = writer.stats()
+        self.assertEqual(stats["written"], 200)
+        self.assertLessEqual(stats["batches"], 200)
+
+    def test_rotates_by_size(self):
+        """测试超过大小上限时压缩旧文件，并只保留 backup_count 个"""
+        clock = FakeClock()
+        writer = LogWriter(self.path, max_bytes=100, backup_count=2, clock=clock)
+        self.addCleanup(writer.close)
+        for i in range(4):
+            writer.write("x" * 60 + str(i))
+            writer.flush()
+            clock.now += 1
+
+        backups = self._backups()
+        self.assertEqual(len(backups), 2)
+        with gzip.open(os.path.join(os.path.dirname(self.path), backups[-1])) as f:
+            self.assertEqual(f.read().decode().strip(), "x" * 60 + "2")
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read().strip(), "x" * 60 + "3")
+
+    def test_rotates_by_period(self):
+        """测试跨越轮转周期后轮转"""
+        clock = FakeClock(now=3600.0 * 10)
+        writer = LogWriter(self.path, max_bytes=0, rotate_interval=3600, clock=clock)
+        self.addCleanup(writer.close)
+        writer.write("first")
+        writer.flush()
+        clock.now += 1800
+        writer.write("same period")
+        writer.flush()
+        self.assertEqual(self._backups(), [])
+
+        clock.now += 1800
+        writer.write("next period")
+        writer.flush()
+        self.assertEqual(len(self._backups()), 1)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read().strip(), "next period")
+
+    def test_close_drains_queue(self):
+        """测试关闭时写入剩余日志，关闭后的写入被忽略"""
+        writer = LogWriter(self.path)
+        writer.write("last")
+        writer.close()
+        writer.write("ignored")
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "last\n")
+
+
+class TestJsonFormatter(unittest.TestCase):
+    """测试 JsonFormatter"""
+
+    def _format(self, msg):
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, None, None)
+        return json.loads(JsonFormatter().format(record))
+
+    def test_plain_message(self):
+        """测试普通文本直接作为 message"""
+        self.assertEqual(self._format("hello {x}")["message"], "hello {x}")
+
+    def test_json_message(self):
+        """测试 JSON 对象消息展开为字段，无效 JSON 保留原文"""
+        data = self._format('{"event": "publish", "ok": true}')
+        self.assertEqual(data["event"], "publish")
+        self.assertNotIn("message", data)
+        self.assertEqual(self._format("{not json}")["message"], "{not json}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+媒体缓存测试
+
+测试新鲜期命中、条件请求重新验证、内容去重、LRU 淘汰，以及暂存媒体不受淘汰影响
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+
+from mcp_xhs_publisher.services import media_staging
+from mcp_xhs_publisher.services.media_cache import MediaCache
+from mcp_xhs_publisher.services.media_downloader import MediaDownloader
+
+
+class _EtagHandler(BaseHTTPRequestHandler):
+    """支持 ETag 条件请求的图片服务"""
+
+    protocol_version = "HTTP/1.1"
+    bodies = {}
+    requests_seen = []
+
+    def do_GET(self):
+        body = self.bodies.get(self.path)
+        self.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        if body is None:
+            self.send_error(404)
+            return
+        etag = f'"{hash(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestMediaCache(unittest.TestCase):
+    """测试 MediaCache"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _EtagHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = requests.Session()
+        _EtagHandler.bodies = {"/a.jpg": b"a" * 1000, "/b.jpg": b"b" * 1000}
+        _EtagHandler.requests_seen = []
+
+    def tearDown(self):
+        self.session.close()
+        self.tmp.cleanup()
+
+    def test_fresh_hit_skips_network(self):
+        """测试新鲜期内命中缓存不访问网络"""
+        cache = MediaCache(self.tmp.name, max_bytes=10**6, ttl=60)
+        first = cache.fetch(f"{self.base}/a.jpg", self.session, 5)
+        second = cache.fetch(f"{self.base}/a.jpg", self.session, 5)
+
+        self.assertEqual(first.status, "miss")
+        self.assertEqual(second.status, "fresh")
+        self.assertEqual(second.path, first.path)
+        self.assertEqual(len(_EtagHandler.requests_seen), 1)
+
+    def test_revalidation(self):
+        """测试过期后使用 ETag 重新验证，内容变化时重新下载"""
+        cache = MediaCache(self.tmp.name, max_bytes=10**6, ttl=0)
+        url = f"{self.base}/a.jpg"
+        cache.fetch(url, self.session, 5)
+
+        revalidated = cache.fetch(url, self.session, 5)
+        self.assertEqual(revalidated.status, "revalidated")
+        self.assertIsNotNone(_EtagHandler.requests_seen[-1][1])
+
+        _EtagHandler.bodies["/a.jpg"] = b"changed"
+        changed = cache.fetch(url, self.session, 5)
+        self.assertEqual(changed.status, "miss")
+        with open(changed.path, "rb") as f:
+            self.assertEqual(f.read(), b"changed")
+
+    def test_content_dedup(self):
+        """测试不同 URL 的相同内容只保存一份"""
+        _EtagHandler.bodies["/copy.jpg"] = _EtagHandler.bodies["/a.jpg"]
+        cache = MediaCache(self.tmp.name, max_bytes=10**6, ttl=60)
+        a = cache.fetch(f"{self.base}/a.jpg", self.session, 5)
+        copy = cache.fetch(f"{self.base}/copy.jpg", self.session, 5)
+
+        self.assertEqual(a.path, copy.path)
+        self.assertEqual(cache.lookup_hash(a.content_hash).path, a.path)
+        self.assertEqual(cache.stats(), {"urls": 2, "blobs": 1, "total_bytes": 1000})
+
+    def test_known_hash_skips_network(self):
+        """测试已知摘要的大文件直接使用缓存中的相同内容"""
+        cache = MediaCache(self.tmp.name, max_bytes=10**6, ttl=60)
+        a = cache.fetch(f"{self.base}/a.jpg", self.session, 5)
+        downloader = MediaDownloader(
+            max_workers=1, per_host_limit=1, cache=cache, partial_dir=self.tmp.name
+        )
+        self.addCleanup(downloader.close)
+
+        result = downloader.download_large(f"{self.base}/other.mp4", a.content_hash)
+
+        self.assertEqual(result.cache, "hash")
+        self.assertEqual(result.local_path, a.path)
+        self.assertEqual(len(_EtagHandler.requests_seen), 1)
+
+    def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未访问的文件"""
+        cache = MediaCache(self.tmp.name, max_bytes=1500, ttl=60)
+        cache.EVICTION_GRACE = -1
+        a = cache.fetch(f"{self.base}/a.jpg", self.session, 5)
+        time.sleep(0.01)
+        cache.fetch(f"{self.base}/b.jpg", self.session, 5)
+
+        self.assertIsNone(cache.lookup(f"{self.base}/a.jpg"))
+        self.assertIsNone(cache.lookup_hash(a.content_hash))
+        self.assertIsNotNone(cache.lookup(f"{self.base}/b.jpg"))
+        self.assertEqual(cache.stats()["total_bytes"], 1000)
+
+    def test_store_file_evicts(self):
+        """测试分段下载完成后移入缓存的大文件同样受容量上限约束"""
+        cache = MediaCache(self.tmp.name, max_bytes=1500, ttl=60)
+        cache.EVICTION_GRACE = -1
+        a = cache.fetch(f"{self.base}/a.jpg", self.session, 5)
+        time.sleep(0.01)
+        video = os.path.join(self.tmp.name, "video.mp4")
+        with open(video, "wb") as f:
+            f.write(b"v" * 1200)
+        cache.store_file(f"{self.base}/v.mp4", video, content_hash="f" * 64, ext=".mp4")
+
+        self.assertIsNone(cache.lookup_hash(a.content_hash))
+        self.assertEqual(cache.stats()["total_bytes"], 1200)
+
+    def test_pinned_file_survives_eviction(self):
+        """测试固定的缓存文件被淘汰后链接仍可读取，非缓存文件不固定"""
+        cache = MediaCache(self.tmp.name, max_bytes=1500, ttl=60)
+        cache.EVICTION_GRACE = -1
+        a = cache.fetch(f"{self.base}/a.jpg", self.session, 5)
+        pinned = cache.pin(a.path)
+        time.sleep(0.01)
+        cache.fetch(f"{self.base}/b.jpg", self.session, 5)
+
+        self.assertFalse(os.path.exists(a.path))
+        with open(pinned, "rb") as f:
+            self.assertEqual(f.read(), b"a" * 1000)
+        self.assertIsNone(cache.pin(pinned))
+
+    def test_stage_note_pins_cached_media(self):
+        """测试预处理的视频指向缓存文件时改用链接，清理时只删除链接"""
+        cache = MediaCache(self.tmp.name, max_bytes=10**6, ttl=60)
+        a = cache.fetch(f"{self.base}/a.jpg", self.session, 5)
+        with (
+            mock.patch.object(media_staging, "get_media_cache", return_value=cache),
+            mock.patch.object(
+                media_staging, "download_video", return_value=(a.path, [])
+            ),
+        ):
+            staged = media_staging.stage_note(
+                "video", {"content": "c", "video_path": f"{self.base}/v.mp4"}
+            )
+
+        video = staged.params["video_path"]
+        self.assertNotEqual(video, a.path)
+        self.assertEqual(staged.tmp_files, [video])
+        staged.cleanup()
+        self.assertFalse(os.path.exists(video))
+        self.assertTrue(os.path.exists(a.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
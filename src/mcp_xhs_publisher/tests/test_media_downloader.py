@@ -0,0 +1,106 @@
+"""
+媒体下载服务测试
+
+使用本地HTTP服务器测试并发下载、结果顺序和失败处理
+"""
+
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mcp_xhs_publisher.services.media_downloader import MediaDownloader
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """按路径返回不同内容的图片，每次响应延迟一段时间"""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.2
+
+    def do_GET(self):
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        time.sleep(self.delay)
+        body = self.path.encode() * 100
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestMediaDownloader(unittest.TestCase):
+    """测试 MediaDownloader"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.downloader = MediaDownloader(max_workers=6, per_host_limit=6)
+
+    def tearDown(self):
+        self.downloader.close()
+
+    def _cleanup(self, results):
+        for r in results:
+            if r.downloaded:
+                os.remove(r.local_path)
+
+    def test_parallel_download_keeps_order(self):
+        """测试并发下载且结果与输入顺序一致"""
+        urls = [f"{self.base}/img{i}.jpg" for i in range(6)]
+        paths = urls[:3] + ["/local/a.png"] + urls[3:]
+
+        start = time.perf_counter()
+        results = self.downloader.download_all(paths)
+        elapsed = time.perf_counter() - start
+        self.addCleanup(self._cleanup, results)
+
+        self.assertLess(elapsed, 6 * _ImageHandler.delay)
+        self.assertEqual([r.source for r in results], paths)
+        self.assertEqual(results[3].local_path, "/local/a.png")
+        self.assertFalse(results[3].downloaded)
+        for r in results[:3] + results[4:]:
+            with open(r.local_path, "rb") as f:
+                self.assertTrue(
+                    f.read().startswith(r.source[len(self.base) :].encode())
+                )
+            self.assertGreater(r.timing()["seconds"], 0)
+
+    def test_per_host_limit(self):
+        """测试单主机并发限制"""
+        downloader = MediaDownloader(max_workers=4, per_host_limit=1)
+        self.addCleanup(downloader.close)
+        urls = [f"{self.base}/img{i}.jpg" for i in range(3)]
+
+        start = time.perf_counter()
+        results = downloader.download_all(urls)
+        elapsed = time.perf_counter() - start
+        self.addCleanup(self._cleanup, results)
+
+        self.assertGreaterEqual(elapsed, 3 * _ImageHandler.delay)
+
+    def test_failed_download(self):
+        """测试下载失败时记录错误且不留下临时文件"""
+        results = self.downloader.download_all([f"{self.base}/missing.jpg"])
+
+        self.assertIsNone(results[0].local_path)
+        self.assertIn("404", results[0].error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+媒体探测与发布前预检测试
+
+使用手工构造的文件头测试 JPEG、PNG、WebP 尺寸解析和 MP4 box 遍历，以及预检规则
+"""
+
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.models.tool_io_schemas import PublishImageInput, PublishTextInput
+from mcp_xhs_publisher.services.media_probe import (
+    MAX_CONTENT_CHARS,
+    PreflightError,
+    ensure_valid,
+    preflight,
+    probe,
+)
+from mcp_xhs_publisher.services.media_staging import StagedNote
+from mcp_xhs_publisher.tools.publish_executor import PublishExecutor
+
+
+def png(width, height, complete=True):
+    ihdr = struct.pack(">II5B", width, height, 8, 2, 0, 0, 0)
+    data = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + b"\0" * 4
+    data += struct.pack(">I", 4) + b"IDAT" + b"\0" * 8
+    if complete:
+        data += struct.pack(">I", 0) + b"IEND" + b"\xae\x42\x60\x82"
+    return data
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x11\0"
+    return b"\xff\xd8" + app0 + sof + b"\xff\xda\x00\x02" + b"\0" * 16 + b"\xff\xd9"
+
+
+def webp(width, height):
+    vp8x = b"VP8X" + struct.pack("<I", 10) + b"\0" * 4
+    vp8x += (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+    return b"RIFF" + struct.pack("<I", 4 + len(vp8x)) + b"WEBP" + vp8x
+
+
+def box(kind, payload):
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def mp4(duration=10, codec=b"avc1", faststart=True, truncate=0):
+    mvhd = box(
+        b"mvhd", b"\0" * 12 + struct.pack(">II", 1000, duration * 1000) + b"\0" * 80
+    )
+    tkhd = box(b"tkhd", b"\0" * 76 + struct.pack(">II", 1920 << 16, 1080 << 16))
+    hdlr = box(b"hdlr", b"\0" * 8 + b"vide" + b"\0" * 12)
+    stsd = box(
+        b"stsd", struct.pack(">II", 0, 1) + struct.pack(">I", 16) + codec + b"\0" * 8
+    )
+    trak = box(b"trak", tkhd + box(b"mdia", hdlr + box(b"minf", box(b"stbl", stsd))))
+    moov = box(b"moov", mvhd + trak)
+    mdat = box(b"mdat", b"\0" * 64)
+    ftyp = box(b"ftyp", b"isom" + b"\0\0\0\0" + b"isomavc1")
+    data = ftyp + (moov + mdat if faststart else mdat + moov)
+    return data[: len(data) - truncate]
+
+
+class ProbeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+
+class TestProbe(ProbeTestCase):
+    """测试文件头探测"""
+
+    def test_image_dimensions(self):
+        """测试读取 JPEG、PNG、WebP 的尺寸"""
+        for name, data, fmt in [
+            ("a.jpg", jpeg(640, 480), "jpeg"),
+            ("a.png", png(800, 600), "png"),
+            ("a.webp", webp(1080, 1440), "webp"),
+        ]:
+            info = probe(self.write(name, data))
+            self.assertEqual(info.problems, [], name)
+            self.assertEqual(info.format, fmt)
+        self.assertEqual((info.width, info.height), (1080, 1440))
+        self.assertEqual(probe(self.write("b.jpg", jpeg(640, 480))).width, 640)
+
+    def test_broken_images(self):
+        """测试空文件、截断的 PNG 和未知格式"""
+        self.assertIn("文件为空", probe(self.write("empty.jpg", b"")).problems)
+        self.assertTrue(probe(self.write("cut.png", png(10, 10, False))).problems)
+        self.assertTrue(probe(self.write("x.jpg", b"hello world!" * 4)).problems)
+
+    def test_mp4(self):
+        """测试读取时长、编码、尺寸和 faststart"""
+        info = probe(self.write("v.mp4", mp4(duration=42)))
+        self.assertEqual(info.problems, [])
+        self.assertEqual(
+            (info.format, info.duration, info.codec, info.width, info.height),
+            ("mp4", 42.0, "avc1", 1920, 1080),
+        )
+        self.assertTrue(info.faststart)
+        self.assertFalse(probe(self.write("late.mp4", mp4(faststart=False))).faststart)
+
+    def test_truncated_mp4(self):
+        """测试 mdat 被截断时报告文件不完整"""
+        info = probe(self.write("cut.mp4", mp4(truncate=10)))
+        self.assertTrue(any("文件不完整" in p for p in info.problems))
+
+
+class TestPreflight(ProbeTestCase):
+    """测试发布前预检"""
+
+    def test_text_limits(self):
+        """测试正文长度和话题数量限制"""
+        report = preflight(
+            "text", {"content": "x" * (MAX_CONTENT_CHARS + 1), "topics": ["t"] * 11}
+        )
+        self.assertEqual(len(report["errors"]), 2)
+        self.assertEqual(preflight("text", {"content": "ok"})["errors"], [])
+
+    def test_image_rules(self):
+        """测试图片过小和平台不支持的格式，远程图片不在预检中下载"""
+        small = self.write("small.png", png(50, 50))
+        heic = self.write("a.heic", box(b"ftyp", b"heic" + b"\0" * 8))
+        good = self.write("good.jpg", jpeg(1080, 1080))
+        params = {
+            "content": "c",
+            "image_paths": [small, heic, good, "https://example.com/a.jpg"],
+        }
+        with mock.patch.dict(config._config, {"image_normalize": "false"}):
+            errors = preflight("image", params)["errors"]
+        self.assertEqual(len(errors), 2)
+        self.assertIn("过小", errors[0])
+        self.assertIn("image-normalize", errors[1])
+
+        with mock.patch.dict(config._config, {"image_normalize": "true"}):
+            self.assertEqual(len(preflight("image", params)["errors"]), 1)
+
+    def test_video_rules(self):
+        """测试 moov 位于末尾的视频被拒绝"""
+        late = self.write("late.mp4", mp4(faststart=False))
+        with self.assertRaises(PreflightError) as ctx:
+            ensure_valid("video", {"content": "c", "video_path": late})
+        self.assertIn("faststart", ctx.exception.errors[0])
+        ok = self.write("ok.mp4", mp4())
+        report = ensure_valid("video", {"content": "c", "video_path": ok})
+        self.assertEqual(report["media"][0]["codec"], "avc1")
+
+    def test_executor_rejects_before_publish(self):
+        """测试执行器在获取账号前拒绝不合格的笔记"""
+        executor = PublishExecutor.__new__(PublishExecutor)
+        executor.pool = mock.Mock()
+        response = executor.publish_text(
+            PublishTextInput(content="x" * (MAX_CONTENT_CHARS + 1))
+        )
+        self.assertEqual(response.status, "error")
+        self.assertIn("预检", response.message)
+        executor.pool.acquire.assert_not_called()
+
+    def test_executor_checks_downloaded_media(self):
+        """测试直接发布远程媒体时先下载，下载后的文件未通过预检时不上传"""
+        broken = self.write("broken.png", png(800, 600, complete=False))
+        url = "https://example.com/a.png"
+
+        def stage(note_type, params):
+            self.assertEqual(params["image_paths"], [url])
+            return StagedNote(note_type, {**params, "image_paths": [broken]})
+
+        executor = PublishExecutor.__new__(PublishExecutor)
+        executor.pool = mock.Mock()
+        with mock.patch(
+            "mcp_xhs_publisher.tools.publish_executor.stage_note", side_effect=stage
+        ):
+            response = executor.publish_image(
+                PublishImageInput(content="c", image_paths=[url])
+            )
+
+        self.assertEqual(response.status, "error")
+        self.assertIn("预检", response.message)
+        executor.pool.acquire.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+运行指标测试
+
+测试耗时直方图与分位数估算、Prometheus 文本格式、工具计时装饰器，
+以及 xhs-metrics:// 资源和 Prometheus 路由
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from mcp.server.fastmcp import FastMCP
+from starlette.testclient import TestClient
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.models.tool_io_schemas import PublishResponse
+from mcp_xhs_publisher.services.xhs_client import XhsApiClient
+from mcp_xhs_publisher.tools import tool_registry
+from mcp_xhs_publisher.util.metrics import (
+    STAGE,
+    TOOL,
+    UPSTREAM,
+    Metrics,
+    get_metrics,
+)
+
+COOKIE = "a1=test_a1; web_session=test_session; webId=test_web_id"
+
+
+class _FakeClock:
+    """手动推进的计时函数"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMetrics(unittest.TestCase):
+    """测试 Metrics"""
+
+    def setUp(self):
+        self.clock = _FakeClock()
+        self.metrics = Metrics(buckets=(0.1, 1.0, 10.0), clock=self.clock)
+
+    def test_track_counts_errors_and_in_flight(self):
+        """测试计时、进行中数量和异常计为失败"""
+        with self.metrics.track(STAGE, "upload"):
+            self.assertEqual(self.metrics.snapshot()[STAGE]["upload"]["in_flight"], 1)
+            self.clock.now += 0.5
+        with self.assertRaises(RuntimeError):
+            with self.metrics.track(STAGE, "upload"):
+                self.clock.now += 2.0
+                raise RuntimeError("boom")
+        with self.metrics.track(STAGE, "upload") as span:
+            span.fail()
+
+        upload = self.metrics.snapshot()[STAGE]["upload"]
+        self.assertEqual((upload["calls"], upload["errors"]), (3, 2))
+        self.assertEqual(upload["in_flight"], 0)
+        self.assertEqual(upload["max"], 2.0)
+        self.assertAlmostEqual(upload["mean"], 2.5 / 3, places=5)
+
+    def test_quantiles(self):
+        """测试按分桶插值估算分位数，且不超过最大值"""
+        for seconds in [0.05] * 90 + [0.5] * 9 + [20.0]:
+            self.metrics.observe(UPSTREAM, "create_note", seconds)
+        summary = self.metrics.snapshot()[UPSTREAM]["create_note"]
+        self.assertLessEqual(summary["p50"], 0.1)
+        self.assertTrue(0.1 < summary["p95"] <= 1.0)
+        self.assertEqual(summary["p99"], 1.0)
+        self.assertEqual(summary["max"], 20.0)
+
+    def test_render_prometheus(self):
+        """测试直方图为累计计数，计数器按状态区分，标签值被转义"""
+        self.metrics.observe(TOOL, "publish_text", 0.05)
+        self.metrics.observe(TOOL, "publish_text", 5.0, ok=False)
+        self.metrics.observe(TOOL, 'we"ird', 0.05)
+        text = self.metrics.render_prometheus()
+
+        self.assertIn("# TYPE xhs_tool_duration_seconds histogram", text)
+        self.assertIn(
+            'xhs_tool_duration_seconds_bucket{tool="publish_text",le="0.1"} 1', text
+        )
+        self.assertIn(
+            'xhs_tool_duration_seconds_bucket{tool="publish_text",le="+Inf"} 2', text
+        )
+        self.assertIn('xhs_tool_duration_seconds_count{tool="publish_text"} 2', text)
+        self.assertIn(
+            'xhs_tool_calls_total{tool="publish_text",status="error"} 1', text
+        )
+        self.assertIn('xhs_tool_in_flight{tool="publish_text"} 0', text)
+        self.assertIn('tool="we\\"ird"', text)
+        self.assertIn("# TYPE xhs_upstream_calls_total counter", text)
+
+
+class TestMetricsEndpoints(unittest.TestCase):
+    """测试工具计时、xhs-metrics:// 资源和 Prometheus 路由"""
+
+    def setUp(self):
+        get_metrics().reset()
+        self.executor = mock.Mock()
+        self.executor.publish_text.return_value = PublishResponse(
+            status="success", message="成功", note_id="n1"
+        )
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        with mock.patch.dict(config._config, {"data_dir": self.tmp.name}):
+            self.registry = tool_registry.ToolRegistry(self.executor)
+        self.addCleanup(self.registry.shutdown)
+
+    def _server(self, metrics_path=None):
+        server = FastMCP(name="test")
+        with mock.patch.dict(config._config, {"metrics_path": metrics_path}):
+            self.registry.register_tools(server)
+        return server
+
+    def test_tool_and_resource(self):
+        """测试工具调用被计时，错误结果计为失败，并通过资源读取"""
+        server = self._server()
+
+        async def scenario():
+            await server.call_tool("publish_text", {"content": "hello"})
+            await server.call_tool("get_job_status", {"job_id": "missing"})
+            contents = await server.read_resource("xhs-metrics://")
+            return json.loads(contents[0].content)
+
+        snapshot = asyncio.run(scenario())
+        self.assertEqual(snapshot[TOOL]["publish_text"]["calls"], 1)
+        self.assertEqual(snapshot[TOOL]["publish_text"]["errors"], 0)
+        self.assertEqual(snapshot[TOOL]["get_job_status"]["errors"], 1)
+        self.assertIn("uptime", snapshot)
+
+    def test_prometheus_route(self):
+        """测试配置 metrics_path 后 SSE 服务器提供 Prometheus 文本"""
+        self.assertNotIn(
+            "/metrics", [route.path for route in self._server().sse_app().routes]
+        )
+        server = self._server("/metrics")
+        asyncio.run(server.call_tool("publish_text", {"content": "hello"}))
+
+        response = TestClient(server.sse_app()).get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn(
+            'xhs_tool_calls_total{tool="publish_text",status="ok"} 1', response.text
+        )
+
+    def test_upstream_and_stage(self):
+        """测试小红书 API 调用和创建笔记阶段被计时"""
+        cookie_file = os.path.join(self.tmp.name, "alice.cookie")
+        with open(cookie_file, "w") as f:
+            f.write(COOKIE)
+        api = XhsApiClient(cookie_dir=cookie_file)
+        api.retry.max_attempts = 1
+        api.limiter = mock.Mock()
+        api.limiter.acquire.return_value = 0
+        api._idle_clients[0] = mock.Mock()
+        api._idle_clients[0].create_note.return_value = {"id": "n1"}
+        api._idle_clients[0].get_self_info.side_effect = RuntimeError("down")
+
+        api.create_text_note("hello")
+        api.check_session()
+
+        snapshot = get_metrics().snapshot()
+        self.assertEqual(snapshot[UPSTREAM]["create_note"]["calls"], 1)
+        self.assertEqual(snapshot[UPSTREAM]["get_self_info"]["errors"], 1)
+        self.assertEqual(snapshot[STAGE]["create_note"]["calls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
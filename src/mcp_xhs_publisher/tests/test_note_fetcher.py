@@ -0,0 +1,145 @@
+"""
+批量获取笔记测试
+
+测试有限并发、部分失败、按完成顺序推送结果，以及 fetch_notes 工具
+"""
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mcp.server.fastmcp import FastMCP
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.tools import tool_registry
+from mcp_xhs_publisher.tools.note_fetcher import MAX_NOTES, NoteFetcher
+
+
+class TestNoteFetcher(unittest.TestCase):
+    """测试 NoteFetcher"""
+
+    def setUp(self):
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+
+    async def _load(self, note_id):
+        self.calls.append(note_id)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.1 if note_id == "slow" else 0.01)
+            if note_id.startswith("bad"):
+                raise RuntimeError("笔记不存在")
+            return {"note_id": note_id}
+        finally:
+            self.active -= 1
+
+    def test_partial_results_and_errors(self):
+        """测试部分笔记失败时返回已获取的笔记和每篇的错误，重复ID只获取一次"""
+        result = asyncio.run(
+            NoteFetcher(self._load).run(["n1", "bad1", "n2", "n1", "bad2"])
+        )
+
+        self.assertEqual(result["status"], "partial")
+        self.assertEqual(list(result["notes"]), ["n1", "n2"])
+        self.assertEqual(result["notes"]["n2"], {"note_id": "n2"})
+        self.assertEqual(result["errors"], {"bad1": "笔记不存在", "bad2": "笔记不存在"})
+        self.assertEqual((result["total"], result["succeeded"]), (4, 2))
+        self.assertEqual(sorted(self.calls), ["bad1", "bad2", "n1", "n2"])
+
+    def test_bounded_concurrency_and_streaming(self):
+        """测试同时获取的笔记数不超过并发数，结果按完成顺序推送"""
+        streamed = []
+
+        async def on_result(item):
+            streamed.append(item["note_id"])
+
+        ids = ["slow"] + [f"n{i}" for i in range(9)]
+        asyncio.run(NoteFetcher(self._load, concurrency=3).run(ids, on_result))
+
+        self.assertEqual(self.peak, 3)
+        self.assertEqual(streamed[-1], "slow")
+        self.assertEqual(sorted(streamed), sorted(ids))
+
+    def test_rejects_empty_or_oversized(self):
+        """测试空列表和超过上限的列表报错"""
+        fetcher = NoteFetcher(self._load)
+        with self.assertRaises(ValueError):
+            asyncio.run(fetcher.run([]))
+        with self.assertRaisesRegex(ValueError, str(MAX_NOTES)):
+            asyncio.run(fetcher.run([f"n{i}" for i in range(MAX_NOTES + 1)]))
+        self.assertEqual(self.calls, [])
+
+    def test_status(self):
+        """测试全部成功为 success，全部失败为 error"""
+        fetcher = NoteFetcher(self._load)
+        self.assertEqual(asyncio.run(fetcher.run(["n1"]))["status"], "success")
+        self.assertEqual(asyncio.run(fetcher.run(["bad1"]))["status"], "error")
+
+
+class TestFetchNotesTool(unittest.TestCase):
+    """测试 fetch_notes 工具"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.lock = threading.Lock()
+        self.calls = []
+
+        def get_note_by_id(note_id):
+            with self.lock:
+                self.calls.append(note_id)
+            time.sleep(0.05)
+            if note_id == "missing":
+                raise RuntimeError("笔记不存在")
+            return {"note_id": note_id, "title": f"标题 {note_id}"}
+
+        executor = mock.Mock()
+        executor.client.get_note_by_id.side_effect = get_note_by_id
+        overrides = {"data_dir": self.tmp.name, "fetch_concurrency": "4"}
+        with mock.patch.dict(config._config, overrides):
+            self.registry = tool_registry.ToolRegistry(executor)
+            self.server = FastMCP(name="test")
+            self.registry.register_tools(self.server)
+        self.addCleanup(self.registry.shutdown)
+
+    def _call(self, args):
+        with mock.patch.dict(config._config, {"fetch_concurrency": "4"}):
+            content, _ = asyncio.run(self.server.call_tool("fetch_notes", args))
+        return json.loads(content[0].text)
+
+    def test_fetch_notes(self):
+        """测试并发获取多篇笔记，返回部分结果和失败笔记的错误"""
+        ids = [f"n{i}" for i in range(8)] + ["missing"]
+        start = time.perf_counter()
+        result = self._call({"note_ids": ids})
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result["succeeded"], 8)
+        self.assertEqual(result["notes"]["n3"]["title"], "标题 n3")
+        self.assertIn("笔记不存在", result["errors"]["missing"])
+        # 9 篇笔记串行获取至少需要 0.45 秒
+        self.assertLess(elapsed, 0.4)
+
+    def test_uses_note_cache(self):
+        """测试批量获取与 xhs-note 资源共用笔记缓存"""
+        self._call({"note_ids": ["n1", "n2"]})
+        result = self._call({"note_ids": ["n1", "n2", "n3"]})
+
+        self.assertEqual(result["succeeded"], 3)
+        self.assertEqual(sorted(self.calls), ["n1", "n2", "n3"])
+
+    def test_invalid_input(self):
+        """测试空列表返回错误"""
+        result = self._call({"note_ids": []})
+        self.assertEqual(result["status"], "error")
+        self.assertIn("为空", result["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
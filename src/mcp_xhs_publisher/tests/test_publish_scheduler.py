@@ -0,0 +1,269 @@
+"""
+定时发布测试
+
+测试定时任务的持久化和认领、提前预处理媒体后到点发布，以及 schedule_publish 工具
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mcp.server.fastmcp import FastMCP
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.models.tool_io_schemas import PublishResponse
+from mcp_xhs_publisher.services.job_queue import (
+    JOB_ERROR,
+    JOB_QUEUED,
+    JOB_SCHEDULED,
+    JOB_STAGED,
+    JOB_SUCCESS,
+    JobQueue,
+)
+from mcp_xhs_publisher.services.media_staging import StagedNote
+from mcp_xhs_publisher.tools import tool_registry
+from mcp_xhs_publisher.tools.publish_scheduler import (
+    PublishScheduler,
+    parse_publish_at,
+)
+from mcp_xhs_publisher.util.worker_pool import WorkerPool
+
+STAGE_SECONDS = 0.2
+
+
+class _FakeExecutor:
+    """预处理耗时 STAGE_SECONDS 的执行器，记录预处理和发布的时间"""
+
+    def __init__(self):
+        self.staged_at = {}
+        self.published_at = {}
+        self.done = threading.Event()
+        self.pool = mock.Mock()
+        self.pool.owned_elsewhere.return_value = False
+        self.pool.accounts.return_value = []
+        self.pool.owned_accounts.return_value = None
+
+    def stage(self, note_type, params):
+        if params["content"] == "bad":
+            raise RuntimeError("图片全部下载失败")
+        time.sleep(STAGE_SECONDS)
+        self.staged_at[params["content"]] = time.time()
+        return StagedNote(note_type=note_type, params=params)
+
+    def publish_staged(self, staged):
+        self.published_at[staged.params["content"]] = time.time()
+        self.done.set()
+        return PublishResponse(status="success", message="成功", note_id="n1")
+
+
+class TestScheduledJobs(unittest.TestCase):
+    """测试 JobQueue 的定时任务"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.queue = JobQueue(os.path.join(self.tmp.name, "jobs.db"))
+
+    def test_scheduled_jobs_not_claimed_immediately(self):
+        """测试定时任务不被立即认领，只能被认领一次预处理"""
+        job_id = self.queue.schedule("text", {"content": "a"}, time.time() + 60)
+        self.assertIsNone(self.queue.claim())
+        self.assertEqual([j["id"] for j in self.queue.scheduled()], [job_id])
+
+        self.assertEqual(self.queue.claim_scheduled(job_id)["status"], JOB_STAGED)
+        self.assertIsNone(self.queue.claim_scheduled(job_id))
+        self.assertEqual(self.queue.scheduled(), [])
+
+    def test_owned_accounts(self):
+        """测试只加载和认领未指定账号或指定了给定账号的定时任务"""
+        when = time.time() + 60
+        alice = self.queue.schedule("text", {"content": "a", "account": "alice"}, when)
+        anyone = self.queue.schedule("text", {"content": "b"}, when)
+
+        self.assertEqual([j["id"] for j in self.queue.scheduled(["bob"])], [anyone])
+        self.assertIsNone(self.queue.claim_scheduled(alice, ["bob"]))
+        self.assertEqual(self.queue.claim_scheduled(alice, ["alice"])["id"], alice)
+
+    def test_recover_restages(self):
+        """测试重启后已预处理未发布的任务重新等待预处理，发布中的任务立即执行"""
+        staged = self.queue.schedule("text", {"content": "a"}, time.time() + 60)
+        running = self.queue.schedule("text", {"content": "b"}, time.time() - 1)
+        self.queue.claim_scheduled(staged)
+        self.queue.mark_staged(staged)
+        self.queue.claim_scheduled(running)
+        self.queue.mark_running(running)
+
+        self.queue.recover(max_attempts=3)
+
+        self.assertEqual(self.queue.get(staged)["status"], JOB_SCHEDULED)
+        self.assertIsNone(self.queue.get(staged)["stage_lead"])
+        self.assertEqual(self.queue.get(running)["status"], JOB_QUEUED)
+
+    def test_parse_publish_at(self):
+        """测试 ISO 8601 和 Unix 时间戳两种发布时间"""
+        self.assertEqual(parse_publish_at("2026-11-11T20:00:00+08:00"), 1794398400.0)
+        self.assertEqual(parse_publish_at("1794398400"), 1794398400.0)
+        with self.assertRaises(ValueError):
+            parse_publish_at("明天晚上")
+        for value in ("nan", "inf", "1e12", "9999-01-01T00:00:00"):
+            with self.assertRaisesRegex(ValueError, "超出范围"):
+                parse_publish_at(value)
+
+
+class TestPublishScheduler(unittest.TestCase):
+    """测试 PublishScheduler"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.queue = JobQueue(os.path.join(self.tmp.name, "jobs.db"))
+        self.executor = _FakeExecutor()
+        pools = [WorkerPool(2, "test-stage"), WorkerPool(2, "test-publish")]
+        for pool in pools:
+            self.addCleanup(pool.shutdown)
+        self.scheduler = PublishScheduler(
+            self.queue, self.executor, *pools, lead_time=0.5
+        )
+
+    def _wait_finished(self, job_id, timeout=5.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.queue.get(job_id)
+            if job["status"] in (JOB_SUCCESS, JOB_ERROR):
+                return job
+            time.sleep(0.01)
+        self.fail("任务未完成")
+
+    def test_stages_ahead_and_publishes_on_time(self):
+        """测试媒体在发布时间前就绪，到点发布，结果中给出偏差"""
+        publish_at = time.time() + 0.8
+        job_id = self.queue.schedule("image", {"content": "a"}, publish_at)
+        self.scheduler.start()
+        self.addCleanup(self.scheduler.stop)
+
+        job = self._wait_finished(job_id)
+
+        self.assertEqual(job["status"], JOB_SUCCESS)
+        self.assertLess(self.executor.staged_at["a"], publish_at)
+        self.assertGreaterEqual(self.executor.published_at["a"], publish_at)
+        self.assertGreater(job["stage_lead"], 0)
+        self.assertGreaterEqual(job["dispatch_lag"], 0)
+        self.assertLess(job["dispatch_lag"], 0.1)
+        self.assertGreaterEqual(job["publish_lag"], job["dispatch_lag"])
+
+    def test_staging_failure_reported_before_publish_time(self):
+        """测试媒体预处理失败时在发布时间之前标记任务失败"""
+        job_id = self.queue.schedule("image", {"content": "bad"}, time.time() + 30)
+        self.scheduler.lead_time = 60
+        self.scheduler.start()
+        self.addCleanup(self.scheduler.stop)
+
+        job = self._wait_finished(job_id)
+
+        self.assertEqual(job["status"], JOB_ERROR)
+        self.assertIn("图片全部下载失败", job["error"])
+        self.assertIsNone(job["dispatch_lag"])
+        self.assertEqual(self.executor.published_at, {})
+
+    def test_invalid_stored_time_fails(self):
+        """测试任务库中发布时间无效的任务在加载时失败，不影响其他任务按时发布"""
+        broken = self.queue.schedule("text", {"content": "nan"}, float("nan"))
+        job_id = self.queue.schedule("text", {"content": "a"}, time.time() + 0.3)
+        self.scheduler.start()
+        self.addCleanup(self.scheduler.stop)
+
+        self.assertEqual(self._wait_finished(job_id)["status"], JOB_SUCCESS)
+        self.assertEqual(self.queue.get(broken)["error"], "发布时间无效")
+
+    def test_polls_jobs_from_other_processes(self):
+        """测试计时线程定期加载其他进程写入任务库的定时任务"""
+        self.scheduler.POLL_INTERVAL = 0.05
+        self.scheduler.start()
+        self.addCleanup(self.scheduler.stop)
+        job_id = self.queue.schedule("text", {"content": "a"}, time.time() + 0.3)
+
+        self.assertEqual(self._wait_finished(job_id)["status"], JOB_SUCCESS)
+        self.assertEqual(self.scheduler.stats()["pending_events"], 0)
+
+    def test_added_job_wakes_timer(self):
+        """测试计时线程等待中登记的更早任务按时执行"""
+        later = self.queue.schedule("text", {"content": "later"}, time.time() + 60)
+        self.scheduler.start()
+        self.addCleanup(self.scheduler.stop)
+        sooner = self.queue.schedule("text", {"content": "soon"}, time.time() + 0.3)
+        self.scheduler.add(sooner, self.queue.get(sooner)["publish_at"])
+
+        self.assertEqual(self._wait_finished(sooner)["status"], JOB_SUCCESS)
+        self.assertEqual(self.queue.get(later)["status"], JOB_SCHEDULED)
+        self.assertEqual(self.scheduler.stats()["pending_events"], 1)
+
+
+class TestScheduleTool(unittest.TestCase):
+    """测试 schedule_publish 工具"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.executor = _FakeExecutor()
+        overrides = {"data_dir": self.tmp.name, "schedule_lead_time": "0.2"}
+        with mock.patch.dict(config._config, overrides):
+            self.registry = tool_registry.ToolRegistry(self.executor)
+        self.addCleanup(self.registry.shutdown)
+        self.server = FastMCP(name="test")
+        self.registry.register_tools(self.server)
+
+    def _call(self, name, args):
+        content, _ = asyncio.run(self.server.call_tool(name, args))
+        return json.loads(content[0].text)
+
+    def test_schedule_and_poll(self):
+        """测试提交定时任务后按时发布，可查询到发布时间的偏差"""
+        self.registry.start()
+        scheduled = self._call(
+            "schedule_publish",
+            {
+                "note_type": "text",
+                "content": "c",
+                "publish_at": str(time.time() + 0.5),
+            },
+        )
+        self.assertEqual(scheduled["status"], JOB_SCHEDULED)
+
+        self.assertTrue(self.executor.done.wait(5))
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            job = self._call("get_job_status", {"job_id": scheduled["job_id"]})
+            if job["status"] == JOB_SUCCESS:
+                break
+            time.sleep(0.02)
+        self.assertEqual(job["status"], JOB_SUCCESS)
+        self.assertLess(job["dispatch_lag"], 0.1)
+
+    def test_schedule_invalid(self):
+        """测试发布时间已过或无法解析时拒绝提交"""
+        past = self._call(
+            "schedule_publish",
+            {"note_type": "text", "content": "c", "publish_at": "2020-01-01T00:00:00"},
+        )
+        self.assertIn("发布时间已过", past["message"])
+        bad = self._call(
+            "schedule_publish",
+            {"note_type": "text", "content": "c", "publish_at": "soon"},
+        )
+        self.assertIn("无法解析发布时间", bad["message"])
+        for value in ("1e12", "inf", "nan"):
+            rejected = self._call(
+                "schedule_publish",
+                {"note_type": "text", "content": "c", "publish_at": value},
+            )
+            self.assertEqual(rejected["status"], "error")
+        self.assertEqual(self.registry.job_queue.scheduled(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
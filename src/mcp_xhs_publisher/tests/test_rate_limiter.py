@@ -0,0 +1,86 @@
+"""
+限流器测试
+
+测试令牌桶的突发容量、排队顺序和按账号、接口类别隔离
+"""
+
+import threading
+import time
+import unittest
+
+from mcp_xhs_publisher.services.rate_limiter import (
+    PUBLISH,
+    READ,
+    RateLimiter,
+    TokenBucket,
+    parse_limit,
+)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """测试 TokenBucket"""
+
+    def test_burst_then_wait(self):
+        """测试突发容量内不等待，超出后按速率等待"""
+        bucket = TokenBucket(per_minute=600, burst=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+        stats = bucket.stats()
+        self.assertEqual(stats["delayed"], 2)
+        self.assertLess(stats["tokens"], 0)
+
+    def test_fifo_order(self):
+        """测试排队的请求按到达顺序获得令牌"""
+        bucket = TokenBucket(per_minute=1200, burst=1)
+        bucket.acquire()
+        order = []
+        lock = threading.Lock()
+
+        def worker(i):
+            bucket.acquire()
+            with lock:
+                order.append(i)
+
+        threads = []
+        for i in range(4):
+            thread = threading.Thread(target=worker, args=(i,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.005)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [0, 1, 2, 3])
+
+    def test_unlimited(self):
+        """测试速率为 0 时不限流"""
+        bucket = TokenBucket(per_minute=0, burst=1)
+        self.assertEqual(sum(bucket.reserve() for _ in range(100)), 0.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """测试 RateLimiter"""
+
+    def test_buckets_isolated(self):
+        """测试不同账号和接口类别使用独立的令牌桶"""
+        limiter = RateLimiter({PUBLISH: (60, 1), READ: (60, 1)})
+        self.assertEqual(limiter.bucket("alice", PUBLISH).reserve(), 0.0)
+        self.assertEqual(limiter.bucket("bob", PUBLISH).reserve(), 0.0)
+        self.assertEqual(limiter.bucket("alice", READ).reserve(), 0.0)
+        self.assertGreater(limiter.bucket("alice", PUBLISH).reserve(), 0.0)
+
+        stats = {(s["account"], s["endpoint"]): s for s in limiter.stats()}
+        self.assertEqual(stats[("alice", PUBLISH)]["acquired"], 2)
+        self.assertEqual(stats[("bob", PUBLISH)]["delayed"], 0)
+
+    def test_parse_limit(self):
+        """测试解析限流配置"""
+        self.assertEqual(parse_limit("6:2", (1, 1)), (6.0, 2.0))
+        self.assertEqual(parse_limit("30", (1, 1)), (30.0, 1.0))
+        self.assertEqual(parse_limit(None, (1, 1)), (1, 1))
+        self.assertEqual(parse_limit("fast", (1, 1)), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+"""
+重试与熔断测试
+
+测试错误分类、指数退避重试、总截止时间以及熔断器的打开、半开和关闭
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from xhs.exception import DataFetchError, IPBlockError, NeedVerifyError, SignError
+
+from mcp_xhs_publisher.services.resilience import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    AmbiguousWriteError,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    is_outage,
+    is_retryable,
+    is_safe_to_resend,
+)
+from mcp_xhs_publisher.services.xhs_client import XhsApiClient
+
+COOKIE = "a1=test_a1; web_session=test_session; webId=test_web_id"
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status}", response=response)
+
+
+class _Flaky:
+    """前 failures 次调用抛出 error，之后返回 ok"""
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+
+class TestErrorClassification(unittest.TestCase):
+    """测试 is_retryable"""
+
+    def test_transient_errors(self):
+        """测试网络错误、超时、签名失败和 5xx 可重试"""
+        self.assertTrue(is_retryable(requests.ConnectionError()))
+        self.assertTrue(is_retryable(requests.Timeout()))
+        self.assertTrue(is_retryable(SignError("sign")))
+        self.assertTrue(is_retryable(_http_error(503)))
+        self.assertTrue(is_retryable(_http_error(429)))
+
+    def test_fatal_errors(self):
+        """测试业务错误、验证码和 IP 封禁不重试"""
+        self.assertFalse(is_retryable(_http_error(400)))
+        self.assertFalse(is_retryable(DataFetchError({"code": -100})))
+        self.assertFalse(is_retryable(NeedVerifyError("captcha")))
+        self.assertFalse(is_retryable(IPBlockError("blocked")))
+        self.assertFalse(is_retryable(ValueError("bad")))
+
+    def test_safe_to_resend(self):
+        """测试只有确定未被平台处理的失败可以重发非幂等请求"""
+        refused = requests.ConnectionError(
+            MaxRetryError(None, "/", NewConnectionError(None, "refused"))
+        )
+        self.assertTrue(is_safe_to_resend(refused))
+        self.assertTrue(is_safe_to_resend(requests.exceptions.ConnectTimeout()))
+        self.assertTrue(is_safe_to_resend(_http_error(429)))
+        self.assertFalse(is_safe_to_resend(requests.exceptions.ReadTimeout()))
+        self.assertFalse(is_safe_to_resend(requests.ConnectionError("reset")))
+        self.assertFalse(is_safe_to_resend(_http_error(502)))
+
+        ambiguous = AmbiguousWriteError("may exist")
+        ambiguous.__cause__ = requests.exceptions.ReadTimeout()
+        self.assertFalse(is_retryable(ambiguous))
+        self.assertTrue(is_outage(ambiguous))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """测试 RetryPolicy"""
+
+    def setUp(self):
+        sleep = mock.patch("mcp_xhs_publisher.services.resilience.time.sleep")
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_retries_transient_error(self):
+        """测试瞬时错误重试后成功"""
+        fn = _Flaky(2, requests.Timeout())
+        policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=10)
+        self.assertEqual(policy.call(fn), "ok")
+        self.assertEqual(fn.calls, 3)
+        delays = [c.args[0] for c in self.sleep.call_args_list]
+        self.assertLessEqual(delays[0], 1)
+        self.assertLessEqual(delays[1], 2)
+
+    def test_fatal_error_not_retried(self):
+        """测试不可重试错误立即抛出"""
+        fn = _Flaky(5, DataFetchError({"code": -1}))
+        with self.assertRaises(DataFetchError):
+            RetryPolicy(max_attempts=5).call(fn)
+        self.assertEqual(fn.calls, 1)
+
+    def test_attempts_exhausted(self):
+        """测试重试次数耗尽后抛出最后一次错误"""
+        fn = _Flaky(5, requests.ConnectionError())
+        with self.assertRaises(requests.ConnectionError):
+            RetryPolicy(max_attempts=3).call(fn)
+        self.assertEqual(fn.calls, 3)
+
+    def test_deadline(self):
+        """测试等待后将超过截止时间时不再重试"""
+        fn = _Flaky(5, requests.Timeout())
+        policy = RetryPolicy(max_attempts=10, base_delay=5, max_delay=5, deadline=1)
+        with mock.patch.object(policy, "backoff", return_value=2.0):
+            with self.assertRaises(requests.Timeout):
+                policy.call(fn)
+        self.assertEqual(fn.calls, 1)
+
+
+class TestCreateNoteRetry(unittest.TestCase):
+    """测试发布时只重试上传，不重发可能已被处理的创建笔记请求"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        sleep = mock.patch("mcp_xhs_publisher.services.resilience.time.sleep")
+        sleep.start()
+        self.addCleanup(sleep.stop)
+        cookie_file = os.path.join(self.tmp.name, "alice.cookie")
+        with open(cookie_file, "w") as f:
+            f.write(COOKIE)
+        self.image = os.path.join(self.tmp.name, "a.jpg")
+        with open(self.image, "wb") as f:
+            f.write(b"\xff\xd8" + os.urandom(1024))
+        self.api = XhsApiClient(cookie_dir=cookie_file)
+        self.api.limiter = mock.Mock()
+        self.api.limiter.acquire.return_value = 0
+        self.api._uploader = mock.Mock()
+        self.api._uploader.upload_all.return_value = [mock.Mock(reused=False)]
+        self.client = mock.Mock()
+        self.client.create_note.return_value = {"id": "n1"}
+        self.api._idle_clients[0] = self.client
+
+    def test_ambiguous_create_not_retried(self):
+        """测试创建笔记读取超时时不重试，返回错误"""
+        self.client.create_note.side_effect = requests.exceptions.ReadTimeout()
+
+        result = self.api.create_text_note("hello")
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("不再重试", result["error"])
+        self.assertEqual(self.client.create_note.call_count, 1)
+
+    def test_unsent_create_retried(self):
+        """测试连接未建立或被限流的创建笔记请求重试"""
+        self.client.create_note.side_effect = [
+            requests.exceptions.ConnectTimeout(),
+            _http_error(429),
+            {"id": "n1"},
+        ]
+
+        result = self.api.create_text_note("hello")
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(self.client.create_note.call_count, 3)
+
+    def test_upload_failure_retried(self):
+        """测试上传的瞬时错误照常重试"""
+        self.api._uploader.upload_all.side_effect = [
+            requests.exceptions.ReadTimeout(),
+            [mock.Mock(reused=False, file_id="f1")],
+        ]
+
+        result = self.api.create_image_note("hello", [self.image])
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(self.api._uploader.upload_all.call_count, 2)
+        self.assertEqual(self.client.create_note.call_count, 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """测试 CircuitBreaker"""
+
+    def test_opens_and_fails_fast(self):
+        """测试连续失败后打开熔断器，之后请求不再发出"""
+        breaker = CircuitBreaker("alice", failure_threshold=2, reset_timeout=60)
+        policy = RetryPolicy(max_attempts=1)
+        fn = _Flaky(10, requests.ConnectionError())
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectionError):
+                policy.call(fn, breaker=breaker)
+        self.assertEqual(breaker.state, CIRCUIT_OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            policy.call(fn, breaker=breaker)
+        self.assertEqual(fn.calls, 2)
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+    def test_business_error_does_not_trip(self):
+        """测试业务错误不计入熔断失败次数"""
+        breaker = CircuitBreaker("alice", failure_threshold=1)
+        with self.assertRaises(DataFetchError):
+            RetryPolicy().call(_Flaky(1, DataFetchError({})), breaker=breaker)
+        self.assertEqual(breaker.state, CIRCUIT_CLOSED)
+
+    def test_half_open_probe(self):
+        """测试超时后半开状态只放行一个试探请求，成功后关闭"""
+        breaker = CircuitBreaker("alice", failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CIRCUIT_OPEN)
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CIRCUIT_HALF_OPEN)
+
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CIRCUIT_CLOSED)
+
+    def test_half_open_probe_failure_reopens(self):
+        """测试半开试探失败后重新打开"""
+        breaker = CircuitBreaker("alice", failure_threshold=3, reset_timeout=0.05)
+        for _ in range(3):
+            breaker.record_failure()
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CIRCUIT_OPEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
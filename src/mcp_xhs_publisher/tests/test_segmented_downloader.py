@@ -0,0 +1,184 @@
+"""
+分段下载测试
+
+测试 Range 分段下载、连接中断后续传以及大小和哈希校验
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from mcp_xhs_publisher.services.segmented_downloader import (
+    DownloadVerificationError,
+    SegmentedDownloader,
+)
+
+PAYLOAD = os.urandom(256 * 1024)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """支持 Range 请求的文件服务，可模拟连接中断"""
+
+    protocol_version = "HTTP/1.1"
+    ranges_seen = []
+    # 剩余需要中断的响应次数，中断时只发送一半内容
+    drops_remaining = 0
+    lock = threading.Lock()
+
+    def _headers(self, status, length, extra=None):
+        self.send_response(status)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(length))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers(200, len(PAYLOAD))
+
+    def do_GET(self):
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if not match:
+            self._headers(200, len(PAYLOAD))
+            self.wfile.write(PAYLOAD)
+            return
+        begin, end = int(match.group(1)), int(match.group(2))
+        self.ranges_seen.append((begin, end))
+        body = PAYLOAD[begin : end + 1]
+        self._headers(206, len(body), {"Content-Range": f"bytes {begin}-{end}/*"})
+        with self.lock:
+            drop = _RangeHandler.drops_remaining > 0
+            if drop:
+                _RangeHandler.drops_remaining -= 1
+        if drop:
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSegmentedDownloader(unittest.TestCase):
+    """测试 SegmentedDownloader"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/video.mp4"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, "video.mp4")
+        _RangeHandler.ranges_seen = []
+        _RangeHandler.drops_remaining = 0
+        self.downloader = SegmentedDownloader(segments=4, min_segment_bytes=32 * 1024)
+        self.downloader.CHUNK_SIZE = 8 * 1024
+
+    def tearDown(self):
+        self.downloader.close()
+        self.tmp.cleanup()
+
+    def test_parallel_segments(self):
+        """测试按分段并行下载并校验哈希"""
+        result = self.downloader.download(
+            self.url, self.dest, hashlib.sha256(PAYLOAD).hexdigest()
+        )
+
+        self.assertEqual(result.segments, 4)
+        self.assertEqual(len(_RangeHandler.ranges_seen), 4)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        self.assertFalse(os.path.exists(self.dest + ".state"))
+
+    def test_resume_after_dropped_connection(self):
+        """测试连接中断后从已写入位置继续下载"""
+        _RangeHandler.drops_remaining = 2
+
+        result = self.downloader.download(self.url, self.dest)
+
+        self.assertEqual(result.sha256, hashlib.sha256(PAYLOAD).hexdigest())
+        resumed = [r for r in _RangeHandler.ranges_seen if r[0] % (64 * 1024)]
+        self.assertEqual(len(resumed), 2)
+
+    def test_resume_from_state_file(self):
+        """测试重新调用时从状态文件记录的位置继续"""
+        self.downloader.max_retries = 0
+        _RangeHandler.drops_remaining = 4
+        with self.assertRaises(Exception):
+            self.downloader.download(self.url, self.dest)
+        self.assertTrue(os.path.exists(self.dest + ".state"))
+
+        _RangeHandler.ranges_seen = []
+        result = self.downloader.download(self.url, self.dest)
+
+        self.assertGreater(result.resumed_bytes, 0)
+        self.assertTrue(all(r[0] % (64 * 1024) for r in _RangeHandler.ranges_seen))
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+
+    def test_checkpoint_records_written_bytes_only(self):
+        """测试状态文件记录的每个分段进度都已写入目标文件"""
+        self.downloader.CHUNK_SIZE = 1024
+        self.downloader.CHECKPOINT_BYTES = 16 * 1024
+        save_state = SegmentedDownloader._save_state
+        checked = []
+
+        def verify(state_path, state):
+            with open(self.dest, "rb") as f:
+                data = f.read()
+            for begin, _, offset in state["segments"]:
+                self.assertEqual(data[begin:offset], PAYLOAD[begin:offset])
+            checked.append(len(state["segments"]))
+            save_state(state_path, state)
+
+        with mock.patch.object(
+            SegmentedDownloader, "_save_state", staticmethod(verify)
+        ):
+            self.downloader.download(self.url, self.dest)
+        self.assertGreater(len(checked), 4)
+
+    def test_concurrent_downloads_same_dest(self):
+        """测试同一目标文件的并发下载依次执行，互不破坏文件和状态文件"""
+        errors = []
+
+        def run():
+            try:
+                result = self.downloader.download(self.url, self.dest)
+                self.assertEqual(result.sha256, hashlib.sha256(PAYLOAD).hexdigest())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertFalse(os.path.exists(self.dest + ".state"))
+
+    def test_hash_mismatch(self):
+        """测试哈希不符时报错并删除文件"""
+        with self.assertRaises(DownloadVerificationError):
+            self.downloader.download(self.url, self.dest, "0" * 64)
+        self.assertFalse(os.path.exists(self.dest))
+
+
+if __name__ == "__main__":
+    unittest.main()
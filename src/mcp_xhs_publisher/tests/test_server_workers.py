@@ -0,0 +1,245 @@
+"""
+多进程服务测试
+
+测试账号在服务器进程之间的分配、子进程中的账号池只加载分配给自己的账号、
+指定其他进程账号的请求经任务库转交负责的进程，以及传输方式和服务器选项的配置
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mcp.server.fastmcp import FastMCP
+
+from mcp_xhs_publisher import server_workers
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.models.tool_io_schemas import (
+    PublishImageInput,
+    PublishResponse,
+)
+from mcp_xhs_publisher.server_workers import (
+    ACCOUNTS_ENV,
+    WORKER_ENV,
+    WorkerShard,
+    current_shard,
+    serve_workers,
+    worker_path,
+)
+from mcp_xhs_publisher.services.account_pool import AccountPool
+from mcp_xhs_publisher.services.job_queue import JOB_SUCCESS, JobQueue
+from mcp_xhs_publisher.tools import tool_registry
+from mcp_xhs_publisher.tools.publish_executor import PublishExecutor
+from mcp_xhs_publisher.util import tracing
+
+COOKIE = "a1=test_a1; web_session=test_session; webId=test_web_id"
+ACCOUNTS = ("alice", "bob", "carol", "dave", "erin")
+
+
+class TestWorkerShard(unittest.TestCase):
+    """测试账号分片"""
+
+    def test_startup_accounts_round_robin(self):
+        """测试启动时的账号按排序位置轮流分配"""
+        shards = [WorkerShard(i, 2, 3, ACCOUNTS) for i in range(2)]
+        owned = [[a for a in ACCOUNTS if shard.owns(a)] for shard in shards]
+        self.assertEqual(owned, [["alice", "carol", "erin"], ["bob", "dave"]])
+
+    def test_new_account_has_single_owner(self):
+        """测试启动后新增的账号恰好由一个进程负责"""
+        shards = [WorkerShard(i, 3, 3, ACCOUNTS) for i in range(3)]
+        for account in ("frank", "grace", "heidi"):
+            self.assertEqual(sum(shard.owns(account) for shard in shards), 1)
+
+    def test_current_shard_from_env(self):
+        """测试从环境变量解析当前进程的分片，主进程中没有分片"""
+        for name, value in (("_shard", None), ("_shard_loaded", False)):
+            patcher = mock.patch.object(server_workers, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        env = {WORKER_ENV: "1/2/7", ACCOUNTS_ENV: '["alice", "bob"]'}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(current_shard(), WorkerShard(1, 2, 7, ("alice", "bob")))
+
+        server_workers._shard_loaded = False
+        with mock.patch.dict(os.environ):
+            os.environ.pop(WORKER_ENV, None)
+            self.assertIsNone(current_shard())
+
+    def test_worker_path(self):
+        """测试子进程的输出文件加上进程序号，主进程中原样返回"""
+        shard = WorkerShard(1, 2, 3, ACCOUNTS)
+        with mock.patch.object(server_workers, "current_shard", return_value=shard):
+            self.assertEqual(worker_path("/d/xhs.jsonl.gz"), "/d/xhs.worker-1.jsonl.gz")
+            self.assertEqual(worker_path("trace"), "trace.worker-1")
+            tmp = tempfile.TemporaryDirectory()
+            self.addCleanup(tmp.cleanup)
+            path = os.path.join(tmp.name, "t.jsonl")
+            with (
+                mock.patch.dict(config._config, {"trace_export_path": path}),
+                mock.patch.object(tracing, "_exporter", None),
+            ):
+                exporter = tracing.get_span_exporter()
+                self.addCleanup(exporter.close)
+            self.assertEqual(exporter.path, os.path.join(tmp.name, "t.worker-1.jsonl"))
+        with mock.patch.object(server_workers, "current_shard", return_value=None):
+            self.assertEqual(worker_path("/d/xhs.jsonl.gz"), "/d/xhs.jsonl.gz")
+
+
+class TestShardedAccountPool(unittest.TestCase):
+    """测试子进程中的账号池"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for name in ACCOUNTS[:3]:
+            with open(os.path.join(self.tmp.name, f"{name}.cookie"), "w") as f:
+                f.write(COOKIE)
+        patcher = mock.patch(
+            "mcp_xhs_publisher.services.account_pool.current_shard",
+            return_value=WorkerShard(1, 2, 3, ACCOUNTS[:3]),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = AccountPool(self.tmp.name)
+
+    def test_loads_owned_accounts_only(self):
+        """测试只加载分配给当前进程的账号，指定其他进程的账号时报错"""
+        self.assertEqual(self.pool.accounts(), ["bob"])
+        with self.assertRaisesRegex(ValueError, "其他服务器进程"):
+            self.pool.get("alice")
+        shard = WorkerShard(1, 2, 3, ACCOUNTS[:3])
+        unknown = next(n for n in ("x1", "x2", "x3", "x4") if shard.owns(n))
+        with self.assertRaisesRegex(ValueError, "未知账号"):
+            self.pool.get(unknown)
+
+    def test_new_cookie_joins_owner_only(self):
+        """测试新增的 cookie 文件只加入负责该账号的进程"""
+        shard = WorkerShard(1, 2, 3, ACCOUNTS[:3])
+        for name in ("frank", "grace", "heidi", "ivan"):
+            with open(os.path.join(self.tmp.name, f"{name}.cookie"), "w") as f:
+                f.write(COOKIE)
+        self.pool.store.reload()
+        expected = ["bob"] + [
+            n for n in ("frank", "grace", "heidi", "ivan") if shard.owns(n)
+        ]
+        self.assertEqual(sorted(self.pool.accounts()), sorted(expected))
+
+    def _owner(self, queue, accounts):
+        """在后台线程中模拟负责 accounts 的进程：认领一个任务并返回成功结果"""
+        claimed = []
+
+        def run():
+            deadline = time.time() + 5
+            while time.time() < deadline:
+                job = queue.claim(accounts)
+                if job is not None:
+                    claimed.append(job)
+                    result = PublishResponse(
+                        status="success", message="ok", note_id="n9", account="alice"
+                    )
+                    queue.complete(job["id"], JOB_SUCCESS, result=result.dict())
+                    return
+                time.sleep(0.02)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        return claimed
+
+    def test_executor_routes_other_accounts(self):
+        """测试指定其他进程的账号时不下载媒体，转交负责的进程发布并返回其结果"""
+        self.assertEqual(self.pool.owned_accounts(), ["bob"])
+        self.assertTrue(self.pool.owned_elsewhere("alice"))
+        executor = PublishExecutor.__new__(PublishExecutor)
+        executor.pool = self.pool
+        executor.job_queue = JobQueue(os.path.join(self.tmp.name, "jobs.db"))
+        self.assertIsNone(executor.job_queue.claim(self.pool.owned_accounts()))
+        claimed = self._owner(executor.job_queue, ["alice"])
+        url = "https://example.com/a.png"
+        params = PublishImageInput(content="c", image_paths=[url], account="alice")
+        with mock.patch(
+            "mcp_xhs_publisher.tools.publish_executor.stage_note"
+        ) as stage_note:
+            response = executor.publish_image(params)
+
+        self.assertEqual((response.status, response.note_id), ("success", "n9"))
+        self.assertEqual(claimed[0]["params"]["image_paths"], [url])
+        stage_note.assert_not_called()
+
+        shard = WorkerShard(1, 2, 3, ACCOUNTS[:3])
+        unknown = next(n for n in ("x1", "x2", "x3", "x4") if not shard.owns(n))
+        params = PublishImageInput(content="c", image_paths=[url], account=unknown)
+        response = executor.publish_image(params)
+        self.assertEqual(response.status, "error")
+        self.assertIn("未知账号", response.error)
+
+    def test_job_tools_route_to_owner(self):
+        """测试后台任务和定时任务指定其他进程的账号时写入任务库，由负责的进程认领"""
+        executor = mock.Mock()
+        executor.pool = self.pool
+        with mock.patch.dict(config._config, {"data_dir": self.tmp.name}):
+            registry = tool_registry.ToolRegistry(executor)
+        self.addCleanup(registry.shutdown)
+        server = FastMCP(name="test")
+        registry.register_tools(server)
+
+        def call(name, args):
+            content, _ = asyncio.run(server.call_tool(name, args))
+            return json.loads(content[0].text)
+
+        args = {"note_type": "text", "content": "c", "account": "alice"}
+        submitted = call("submit_publish", args)
+        self.assertEqual(submitted["status"], "queued")
+        self.assertIsNone(registry.job_queue.claim(self.pool.owned_accounts()))
+        self.assertEqual(registry.job_queue.claim(["alice"])["id"], submitted["job_id"])
+
+        when = str(time.time() + 60)
+        scheduled = call("schedule_publish", {**args, "publish_at": when})
+        self.assertEqual(scheduled["status"], "scheduled")
+        self.assertEqual(registry.scheduler.stats()["pending_events"], 0)
+        self.assertEqual(registry.job_queue.scheduled(self.pool.owned_accounts()), [])
+        owner_jobs = registry.job_queue.scheduled(["alice"])
+        self.assertEqual([j["id"] for j in owner_jobs], [scheduled["job_id"]])
+
+        rejected = call(
+            "schedule_publish", {**args, "account": "nobody", "publish_at": when}
+        )
+        self.assertIn("未知账号", rejected["message"])
+
+
+class TestServerOptions(unittest.TestCase):
+    """测试传输方式和服务器选项"""
+
+    def test_transport(self):
+        """测试默认使用 SSE，不支持的传输方式报错"""
+        with mock.patch.dict(config._config, {"transport": None}):
+            self.assertEqual(config.get_transport(), "sse")
+        with mock.patch.dict(config._config, {"transport": "Streamable-HTTP"}):
+            self.assertEqual(config.get_transport(), "streamable-http")
+        with mock.patch.dict(config._config, {"transport": "websocket"}):
+            with self.assertRaises(ValueError):
+                config.get_transport()
+
+    def test_server_options(self):
+        """测试监听地址和多进程时的无状态模式"""
+        overrides = {"host": "0.0.0.0", "port": "9000", "server_workers": "4"}
+        with mock.patch.dict(config._config, overrides):
+            options = config.get_server_options()
+        self.assertEqual((options["host"], options["port"]), ("0.0.0.0", 9000))
+        self.assertTrue(options["stateless_http"])
+
+    def test_workers_require_streamable_http(self):
+        """测试 SSE 和 stdio 传输不能多进程运行"""
+        for transport in ("sse", "stdio"):
+            with mock.patch.dict(config._config, {"transport": transport}):
+                with self.assertRaisesRegex(ValueError, "streamable-http"):
+                    serve_workers(2)
+
+
+if __name__ == "__main__":
+    unittest.main()
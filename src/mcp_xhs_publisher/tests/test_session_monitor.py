@@ -0,0 +1,112 @@
+"""
+会话健康监控测试
+
+测试登录状态缓存、后台检查以及发布时登录失效立即生效
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import requests
+from xhs.exception import DataFetchError
+
+from mcp_xhs_publisher.services.account_pool import AccountPool
+from mcp_xhs_publisher.services.session_monitor import (
+    SessionMonitor,
+    SessionState,
+    is_auth_error,
+)
+
+COOKIE = "a1=test_a1; web_session=test_session; webId=test_web_id"
+EXPIRED = DataFetchError({"code": -100, "success": False, "msg": "登录已过期"})
+
+
+class TestSessionState(unittest.TestCase):
+    """测试 SessionState"""
+
+    def test_fresh_and_invalidate(self):
+        """测试缓存新鲜度以及失效标记"""
+        state = SessionState()
+        self.assertFalse(state.is_fresh(60))
+        state.update(True, {"nickname": "alice"})
+        self.assertTrue(state.is_fresh(60))
+        self.assertEqual(state.user_info["nickname"], "alice")
+
+        state.invalidate("登录已过期")
+        self.assertFalse(state.logged_in)
+        self.assertIsNone(state.user_info)
+
+    def test_unknown_result_keeps_state(self):
+        """测试网络错误等无法判断的结果保留原登录状态"""
+        state = SessionState()
+        state.update(True, {"nickname": "alice"})
+        state.update(None, error="timeout")
+        self.assertTrue(state.logged_in)
+        self.assertEqual(state.error, "timeout")
+
+    def test_is_auth_error(self):
+        """测试识别登录失效错误"""
+        self.assertTrue(is_auth_error(EXPIRED))
+        self.assertFalse(is_auth_error(DataFetchError({"code": -1})))
+        self.assertFalse(is_auth_error(requests.Timeout()))
+
+
+class TestSessionMonitor(unittest.TestCase):
+    """测试 SessionMonitor 和 XhsApiClient 的会话缓存"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name in ["alice.cookie", "bob.cookie"]:
+            with open(os.path.join(self.tmp.name, name), "w") as f:
+                f.write(COOKIE)
+        self.pool = AccountPool(self.tmp.name)
+        for account in self.pool.accounts():
+            client = self.pool.get(account)
+            client.retry.max_attempts = 1
+            client._idle_clients[0] = mock.Mock()
+            client._idle_clients[0].get_self_info.return_value = {"nickname": account}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_check_all_caches_user_info(self):
+        """测试检查结果和用户信息被缓存"""
+        monitor = SessionMonitor(self.pool)
+        self.assertEqual(monitor.check_all(), {"alice": True, "bob": True})
+        alice = self.pool.get("alice")
+        self.assertEqual(alice.session.user_info, {"nickname": "alice"})
+        self.assertTrue(alice.session.is_fresh(60))
+        stats = {s["account"]: s for s in monitor.stats()}
+        self.assertTrue(stats["bob"]["logged_in"])
+
+    def test_auth_failure_during_publish(self):
+        """测试发布时登录失效立即标记会话无效，并不再自动调度该账号"""
+        SessionMonitor(self.pool).check_all()
+        alice = self.pool.get("alice")
+        alice._idle_clients[0].create_note.side_effect = EXPIRED
+
+        result = alice.create_text_note("hello")
+
+        self.assertEqual(result["status"], "error")
+        self.assertFalse(alice.session.logged_in)
+        for _ in range(3):
+            with self.pool.acquire() as client:
+                self.assertEqual(client.account, "bob")
+
+    def test_background_loop(self):
+        """测试后台线程按间隔检查"""
+        monitor = SessionMonitor(self.pool, interval=0.05)
+        monitor.start()
+        self.addCleanup(monitor.stop)
+        deadline = time.time() + 2
+        bob = self.pool.get("bob")
+        while time.time() < deadline and not bob.session.logged_in:
+            time.sleep(0.01)
+        self.assertTrue(bob.session.logged_in)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+启动测试
+
+测试创建MCP服务器时不导入 xhs、requests，也不重复解析配置
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# 在独立进程中创建服务器，关闭后台启动任务以便检查启动路径本身导入的模块
+CHILD = """
+import json, sys
+from mcp_xhs_publisher.tools.tool_registry import ToolRegistry
+ToolRegistry.start = lambda self: None
+from mcp_xhs_publisher.__main__ import create_mcp_server
+create_mcp_server()
+watched = ("xhs", "requests", "mcp_xhs_publisher.util.config_loader")
+print(json.dumps([m for m in watched if m in sys.modules]))
+"""
+
+
+class TestStartup(unittest.TestCase):
+    """测试服务器冷启动"""
+
+    def test_heavy_modules_loaded_lazily(self):
+        """测试服务器就绪前不加载 xhs、requests 和账号 cookie"""
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                # cookie 目录不存在：启动时加载账号会直接失败
+                "XHS_COOKIE_DIR": os.path.join(tmp, "missing"),
+                "XHS_DATA_DIR": tmp,
+            }
+            proc = subprocess.run(
+                [sys.executable, "-c", CHILD],
+                env=env,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(json.loads(proc.stdout.strip().splitlines()[-1]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+请求追踪测试
+
+测试 span 嵌套与跨线程传递、慢调用日志、OTLP/JSON 导出，以及工具调用作为追踪的根
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from mcp.server.fastmcp import FastMCP
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.models.tool_io_schemas import PublishResponse
+from mcp_xhs_publisher.tools import tool_registry
+from mcp_xhs_publisher.util import tracing
+from mcp_xhs_publisher.util.logging import JsonFormatter
+from mcp_xhs_publisher.util.tracing import bind, current_trace_id, span, to_otlp
+from mcp_xhs_publisher.util.worker_pool import WorkerPool
+
+
+class TestSpans(unittest.TestCase):
+    """测试 span 树的构建"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(config._config, {"trace_slow_ms": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_nesting_and_errors(self):
+        """测试子 span 共享追踪ID，异常标记为失败并继续抛出"""
+        with span("root", tool="t") as root:
+            self.assertEqual(current_trace_id(), root.trace_id)
+            with span("child"):
+                pass
+            with self.assertRaises(ValueError):
+                with span("broken"):
+                    raise ValueError("bad input")
+        self.assertIsNone(current_trace_id())
+
+        tree = root.to_dict()
+        self.assertEqual([c["name"] for c in tree["children"]], ["child", "broken"])
+        self.assertEqual(tree["children"][1]["status"], "error")
+        self.assertIn("bad input", tree["children"][1]["error"])
+        self.assertEqual(tree["attributes"], {"tool": "t"})
+        self.assertEqual(len({s.trace_id for s in root.walk()}), 1)
+
+    def test_propagates_to_threads(self):
+        """测试 WorkerPool 和 bind 提交的任务挂在调用方的 span 下"""
+        pool = WorkerPool(2, "test-trace")
+        self.addCleanup(pool.shutdown)
+
+        def work(name):
+            with span(name):
+                time.sleep(0.01)
+
+        with span("root") as root:
+            pool.submit(work, "pooled").result()
+            with ThreadPoolExecutor(2) as executor:
+                list(executor.map(bind(work), ["bound-1", "bound-2"]))
+        names = sorted(c["name"] for c in root.to_dict()["children"])
+        self.assertEqual(names, ["bound-1", "bound-2", "pooled"])
+
+
+class TestTraceOutput(unittest.TestCase):
+    """测试慢调用日志和 OTLP/JSON 导出"""
+
+    def test_slow_trace_logged(self):
+        """测试超过阈值的追踪写入完整的 span 树，未超过的不写"""
+        with (
+            mock.patch.dict(config._config, {"trace_slow_ms": 20}),
+            mock.patch("mcp_xhs_publisher.util.logging.log_info") as log,
+        ):
+            with span("fast"):
+                pass
+            with span("slow"):
+                with span("step"):
+                    time.sleep(0.03)
+
+        self.assertEqual(log.call_count, 1)
+        fields = log.call_args.kwargs
+        self.assertEqual(fields["name"], "slow")
+        self.assertEqual(fields["spans"]["children"][0]["name"], "step")
+        self.assertGreaterEqual(fields["spans"]["children"][0]["ms"], 20)
+
+    def test_otlp_export(self):
+        """测试每条追踪导出为一行 OTLP/JSON"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "traces.jsonl")
+        with mock.patch.dict(
+            config._config, {"trace_slow_ms": 0, "trace_export_path": path}
+        ):
+            with span("root", count=2) as root:
+                with span("child") as child:
+                    child.fail("rejected")
+            exporter = tracing.get_span_exporter()
+            self.addCleanup(exporter.close)
+            self.assertTrue(exporter.flush())
+
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        by_name = {s["name"]: s for s in spans}
+        self.assertEqual(len(by_name["root"]["traceId"]), 32)
+        self.assertNotIn("parentSpanId", by_name["root"])
+        self.assertEqual(by_name["child"]["parentSpanId"], root.span_id)
+        self.assertEqual(by_name["child"]["status"], {"code": 2, "message": "rejected"})
+        self.assertEqual(
+            by_name["root"]["attributes"],
+            [{"key": "count", "value": {"intValue": "2"}}],
+        )
+        self.assertLessEqual(
+            int(by_name["root"]["startTimeUnixNano"]),
+            int(by_name["child"]["startTimeUnixNano"]),
+        )
+        self.assertEqual(
+            to_otlp(root)["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"],
+            "root",
+        )
+
+    def test_log_lines_carry_trace_id(self):
+        """测试追踪中的日志附带追踪ID"""
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "hello", None, None)
+        with mock.patch.dict(config._config, {"trace_slow_ms": 0}):
+            with span("root") as root:
+                line = json.loads(JsonFormatter().format(record))
+        self.assertEqual(line["trace_id"], root.trace_id)
+        self.assertNotIn("trace_id", json.loads(JsonFormatter().format(record)))
+
+
+class TestToolTrace(unittest.TestCase):
+    """测试工具调用作为追踪的根"""
+
+    def test_executor_spans_nest_under_tool(self):
+        """测试执行器在线程池中记录的 span 挂在工具调用下"""
+        executor = mock.Mock()
+
+        def publish_text(params):
+            with span("inner"):
+                return PublishResponse(status="success", message="成功")
+
+        executor.publish_text.side_effect = publish_text
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with mock.patch.dict(config._config, {"data_dir": tmp.name}):
+            registry = tool_registry.ToolRegistry(executor)
+        self.addCleanup(registry.shutdown)
+        server = FastMCP(name="test")
+        registry.register_tools(server)
+
+        with (
+            mock.patch.dict(config._config, {"trace_slow_ms": 0.001}),
+            mock.patch("mcp_xhs_publisher.util.logging.log_info") as log,
+        ):
+            asyncio.run(server.call_tool("publish_text", {"content": "hello"}))
+
+        tree = log.call_args.kwargs["spans"]
+        self.assertEqual(tree["name"], "tool.publish_text")
+        self.assertEqual(tree["children"][0]["name"], "inner")
+
+
+if __name__ == "__main__":
+    unittest.main()
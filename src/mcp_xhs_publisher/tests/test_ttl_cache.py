@@ -0,0 +1,122 @@
+"""
+异步 TTL/LRU 缓存测试
+
+测试命中、过期、陈旧值后台刷新、LRU 淘汰以及并发加载合并
+"""
+
+import asyncio
+import unittest
+
+from mcp_xhs_publisher.util.ttl_cache import AsyncTTLCache
+
+
+class _Loader:
+    """计数的加载函数，可设置延迟和失败"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {"version": self.calls}
+
+
+class TestAsyncTTLCache(unittest.TestCase):
+    """测试 AsyncTTLCache"""
+
+    def setUp(self):
+        self.now = 1000.0
+
+    def _cache(self, **kwargs):
+        return AsyncTTLCache(clock=lambda: self.now, **kwargs)
+
+    def test_hit_and_expire(self):
+        """测试新鲜期内命中，过期后重新加载"""
+        cache = self._cache(max_entries=10, ttl=60)
+        loader = _Loader()
+
+        async def scenario():
+            self.assertEqual(await cache.get("n1", loader), {"version": 1})
+            self.assertEqual(await cache.get("n1", loader), {"version": 1})
+            self.now += 61
+            self.assertEqual(await cache.get("n1", loader), {"version": 2})
+
+        asyncio.run(scenario())
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_stale_while_revalidate(self):
+        """测试陈旧期内立即返回旧值并在后台刷新"""
+        cache = self._cache(max_entries=10, ttl=60, stale_ttl=300)
+        loader = _Loader()
+
+        async def scenario():
+            await cache.get("n1", loader)
+            self.now += 120
+            self.assertEqual(await cache.get("n1", loader), {"version": 1})
+            await asyncio.sleep(0.01)
+            self.assertEqual(await cache.get("n1", loader), {"version": 2})
+
+        asyncio.run(scenario())
+        stats = cache.stats()
+        self.assertEqual(stats["stale_hits"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_failed_refresh_keeps_stale(self):
+        """测试后台刷新失败时保留旧值，加载失败不缓存"""
+        cache = self._cache(max_entries=10, ttl=60, stale_ttl=300)
+
+        async def scenario():
+            await cache.get("n1", _Loader())
+            self.now += 120
+            failing = _Loader(error=RuntimeError("down"))
+            self.assertEqual(await cache.get("n1", failing), {"version": 1})
+            await asyncio.sleep(0.01)
+            self.assertEqual(await cache.get("n1", failing), {"version": 1})
+            with self.assertRaises(RuntimeError):
+                await cache.get("n2", failing)
+
+        asyncio.run(scenario())
+        self.assertEqual(cache.stats()["load_errors"], 3)
+        self.assertEqual(cache.stats()["size"], 1)
+
+    def test_lru_eviction(self):
+        """测试超出条目上限时淘汰最久未访问的条目"""
+        cache = self._cache(max_entries=2, ttl=60)
+        loader = _Loader()
+
+        async def scenario():
+            await cache.get("a", loader)
+            await cache.get("b", loader)
+            await cache.get("a", loader)
+            await cache.get("c", loader)
+            calls = loader.calls
+            await cache.get("a", loader)
+            self.assertEqual(loader.calls, calls)
+            await cache.get("b", loader)
+            self.assertEqual(loader.calls, calls + 1)
+
+        asyncio.run(scenario())
+        self.assertGreaterEqual(cache.stats()["evictions"], 1)
+
+    def test_single_flight(self):
+        """测试同一个键的并发读取只加载一次"""
+        cache = self._cache(max_entries=10, ttl=60)
+        loader = _Loader(delay=0.05)
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get("n1", loader) for _ in range(10)))
+
+        results = asyncio.run(scenario())
+        self.assertEqual(loader.calls, 1)
+        self.assertTrue(all(r == {"version": 1} for r in results))
+        self.assertEqual(cache.stats()["coalesced"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+上传去重测试
+
+测试流式摘要、索引过期与失效，以及多篇笔记引用同一文件时复用上传结果
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from xhs.exception import DataFetchError
+
+from mcp_xhs_publisher.services.media_uploader import IMAGE, VIDEO, MediaUploader
+from mcp_xhs_publisher.services.upload_index import UploadIndex, file_digest
+from mcp_xhs_publisher.services.xhs_client import XhsApiClient
+
+COOKIE = "a1=test_a1; web_session=test_session; webId=test_web_id"
+
+
+def _fake_client():
+    """按调用次数分配文件ID的 XhsClient"""
+    client = mock.Mock()
+    counter = iter(range(1, 1000))
+    client.get_upload_files_permit.side_effect = lambda kind: (
+        f"{kind}-{next(counter)}",
+        "token",
+    )
+    client.upload_file.return_value.headers = {"X-Ros-Video-Id": "vid-1"}
+    client.create_note.return_value = {"id": "note-1"}
+    return client
+
+
+class TestUploadIndex(unittest.TestCase):
+    """测试 file_digest 和 UploadIndex"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = UploadIndex(os.path.join(self.tmp.name, "uploads.db"), ttl=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_digest_streams_large_file(self):
+        """测试分块摘要与整体计算一致，文件修改后重新计算"""
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        path = self._write("a.bin", data)
+        expected = hashlib.blake2b(data, digest_size=32).hexdigest()
+        self.assertEqual(file_digest(path), expected)
+        self.assertEqual(file_digest(self._write("b.bin", data)), expected)
+
+        path = self._write("a.bin", b"changed")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        self.assertEqual(
+            file_digest(path), hashlib.blake2b(b"changed", digest_size=32).hexdigest()
+        )
+
+    def test_lookup_expiry_and_invalidate(self):
+        """测试条目按账号区分、过期后不再命中，以及手动失效"""
+        self.index.record("alice", IMAGE, "d1", "file-1", 10, {"k": "v"})
+        record = self.index.lookup("alice", IMAGE, "d1")
+        self.assertEqual((record.file_id, record.extra), ("file-1", {"k": "v"}))
+        self.assertIsNone(self.index.lookup("bob", IMAGE, "d1"))
+        self.assertIsNone(self.index.lookup("alice", VIDEO, "d1"))
+
+        self.index.ttl = 0
+        self.assertIsNone(self.index.lookup("alice", IMAGE, "d1"))
+        self.assertEqual(self.index.purge_expired(), 1)
+
+        self.index.ttl = 60
+        self.index.record("alice", IMAGE, "d2", "file-2", 10)
+        self.index.invalidate("alice", IMAGE, "d2")
+        self.assertIsNone(self.index.lookup("alice", IMAGE, "d2"))
+        stats = self.index.stats()
+        self.assertEqual((stats["entries"], stats["hits"]), (0, 1))
+        self.assertEqual(stats["invalidated"], 1)
+
+    def test_persists_across_instances(self):
+        """测试索引在重启后仍然有效"""
+        self.index.record("alice", IMAGE, "d1", "file-1", 10)
+        reopened = UploadIndex(self.index.db_path, ttl=60)
+        self.assertEqual(reopened.lookup("alice", IMAGE, "d1").file_id, "file-1")
+
+
+class TestMediaUploader(unittest.TestCase):
+    """测试 MediaUploader 和 XhsApiClient 的上传复用"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = UploadIndex(os.path.join(self.tmp.name, "uploads.db"), ttl=60)
+        self.image = os.path.join(self.tmp.name, "a.jpg")
+        with open(self.image, "wb") as f:
+            f.write(b"\xff\xd8" + os.urandom(1024))
+        cookie_file = os.path.join(self.tmp.name, "alice.cookie")
+        with open(cookie_file, "w") as f:
+            f.write(COOKIE)
+        self.api = XhsApiClient(cookie_dir=cookie_file)
+        self.api.retry.max_attempts = 1
+        self.api.limiter = mock.Mock()
+        self.api.limiter.acquire.return_value = 0
+        self.api._uploader = MediaUploader(self.api.account, self.index)
+        self.client = _fake_client()
+        self.api._idle_clients[0] = self.client
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_image_uploaded_once(self):
+        """测试同一图片被多篇笔记引用时只上传一次"""
+        first = self.api.create_image_note("one", [self.image, self.image])
+        second = self.api.create_image_note("two", [self.image])
+
+        self.assertEqual(first["status"], "success")
+        self.assertEqual(self.client.upload_file.call_count, 1)
+        self.assertEqual(first["upload_report"]["reused"], 1)
+        self.assertEqual(second["upload_report"]["saved_bytes"], 1026)
+        images = self.client.create_note.call_args.kwargs["image_info"]["images"]
+        self.assertEqual(images[0]["file_id"], "image-1")
+
+    def test_rejected_reuse_uploads_again(self):
+        """测试平台拒绝复用的文件ID时丢弃条目并重新上传"""
+        self.api.create_image_note("one", [self.image])
+        self.client.create_note.side_effect = [
+            DataFetchError({"code": -9101, "msg": "file not found"}),
+            {"id": "note-2"},
+        ]
+
+        result = self.api.create_image_note("two", [self.image])
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["upload_report"]["reused"], 0)
+        self.assertEqual(self.client.upload_file.call_count, 2)
+        self.assertEqual(
+            self.index.lookup("alice", IMAGE, file_digest(self.image)).file_id,
+            "image-2",
+        )
+
+    def test_video_reuses_first_frame(self):
+        """测试复用视频时同时复用首帧封面，不再轮询"""
+        video = os.path.join(self.tmp.name, "v.mp4")
+        with open(video, "wb") as f:
+            f.write(os.urandom(2048))
+        self.api.FIRST_FRAME_INTERVAL = 0
+        self.client.get_video_first_frame_image_id.side_effect = [None, "frame-1"]
+
+        self.api.create_video_note("one", video)
+        result = self.api.create_video_note("two", video)
+
+        self.assertEqual(result["upload_report"]["reused"], 1)
+        self.assertEqual(self.client.get_video_first_frame_image_id.call_count, 2)
+        video_info = self.client.create_note.call_args.kwargs["video_info"]
+        self.assertEqual(video_info["file_id"], "video-1")
+        self.assertEqual(video_info["cover"]["file_id"], "frame-1")
+
+    def test_prepared_images_not_renormalized(self):
+        """测试预处理阶段已处理的图片发布时不再下载和重新编码"""
+        with (
+            mock.patch(
+                "mcp_xhs_publisher.services.xhs_client.download_images"
+            ) as download,
+            mock.patch(
+                "mcp_xhs_publisher.services.xhs_client.normalize_images"
+            ) as normalize,
+        ):
+            result = self.api.create_image_note("one", [self.image], prepared=True)
+
+        self.assertEqual(result["status"], "success")
+        download.assert_not_called()
+        normalize.assert_not_called()
+        self.assertEqual(self.client.upload_file.call_count, 1)
+
+    def test_upload_locks_released(self):
+        """测试上传结束后释放内容锁，上传失败时同样释放"""
+        uploader = self.api._uploader
+        uploader.upload(self.client, self.image, IMAGE)
+        self.assertEqual(uploader._locks, {})
+
+        self.client.upload_file.side_effect = RuntimeError("boom")
+        with self.assertRaises(RuntimeError):
+            uploader.upload(self.client, self.image, IMAGE, reuse=False)
+        self.assertEqual(uploader._locks, {})
+
+    def test_disabled_index_always_uploads(self):
+        """测试未启用索引时每次都上传"""
+        self.api._uploader = MediaUploader(self.api.account, None)
+        self.api.create_image_note("one", [self.image])
+        self.api.create_image_note("two", [self.image])
+        self.assertEqual(self.client.upload_file.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
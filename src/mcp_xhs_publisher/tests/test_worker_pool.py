@@ -0,0 +1,152 @@
+"""
+工作线程池测试
+
+测试有界线程池的并发执行，以及异步工具处理器之间互不阻塞
+"""
+
+import asyncio
+import contextvars
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from mcp.server.fastmcp import FastMCP
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.models.tool_io_schemas import PublishResponse
+from mcp_xhs_publisher.services.session_monitor import SessionState
+from mcp_xhs_publisher.tools import tool_registry
+from mcp_xhs_publisher.util.worker_pool import WorkerPool
+
+request_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_var")
+
+
+class _BlockingExecutor:
+    """发布调用会一直阻塞，直到测试放行的执行器"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.client = mock.Mock()
+        self.client.session = SessionState()
+        self.client.check_session.side_effect = self._check_session
+        self.pool = mock.Mock()
+        self.pool.accounts.return_value = ["default"]
+        self.pool.get.return_value = self.client
+
+    def _check_session(self):
+        self.client.session.update(True, {"nickname": "tester"})
+        return self.client.session
+
+    def publish_video(self, params):
+        self.release.wait(5)
+        return PublishResponse(status="success", message="ok", note_type="video")
+
+
+class TestWorkerPool(unittest.TestCase):
+    """测试 WorkerPool"""
+
+    def test_runs_calls_in_parallel(self):
+        """测试多个阻塞调用并行执行"""
+        pool = WorkerPool(4, "test")
+
+        async def run_all():
+            return await asyncio.gather(*(pool.run(time.sleep, 0.2) for _ in range(4)))
+
+        start = time.perf_counter()
+        asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(pool.stats()["completed"], 4)
+
+    def test_bounded_concurrency(self):
+        """测试并发数不超过 max_workers"""
+        pool = WorkerPool(2, "test")
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def work():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+        futures = [pool.submit(work) for _ in range(6)]
+        for f in futures:
+            f.result()
+        pool.shutdown()
+
+        self.assertEqual(max(peak), 2)
+
+    def test_context_propagation(self):
+        """测试 contextvars 传递到工作线程"""
+        pool = WorkerPool(1, "test")
+        request_var.set("req-1")
+        self.assertEqual(pool.submit(request_var.get).result(), "req-1")
+        pool.shutdown()
+
+    def test_cancelled_while_queued(self):
+        """测试排队中被取消的调用不计入排队数"""
+        pool = WorkerPool(1, "test")
+        release = threading.Event()
+
+        async def scenario():
+            blocker = asyncio.ensure_future(pool.run(release.wait, 5))
+            queued = asyncio.ensure_future(pool.run(time.sleep, 0))
+            await asyncio.sleep(0.05)
+            queued.cancel()
+            await asyncio.sleep(0)
+            pending = pool.stats()["pending"]
+            release.set()
+            await blocker
+            return pending
+
+        self.assertEqual(asyncio.run(scenario()), 0)
+        pool.shutdown()
+        self.assertEqual(pool.stats()["pending"], 0)
+
+
+class TestAsyncToolHandlers(unittest.TestCase):
+    """测试异步工具处理器"""
+
+    def test_login_check_not_blocked_by_upload(self):
+        """测试发布线程池占满时登录检查仍能立即返回"""
+        executor = _BlockingExecutor()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with mock.patch.dict(config._config, {"data_dir": tmp.name}):
+            registry = tool_registry.ToolRegistry(executor)
+        registry.publish_pool = WorkerPool(1, "test-publish")
+        server = FastMCP(name="test")
+        registry.register_tools(server)
+
+        async def scenario():
+            upload = asyncio.create_task(
+                server.call_tool(
+                    "publish_video", {"content": "c", "video_path": "/tmp/v.mp4"}
+                )
+            )
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            login = await server.call_tool("is_logged_in", {})
+            login_elapsed = time.perf_counter() - start
+            self.assertIn('"logged_in": true', login[0][0].text)
+            self.assertFalse(upload.done())
+            executor.release.set()
+            await upload
+            return login_elapsed
+
+        login_elapsed = asyncio.run(scenario())
+        registry.shutdown()
+
+        self.assertLess(login_elapsed, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
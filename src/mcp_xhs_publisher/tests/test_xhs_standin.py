@@ -0,0 +1,160 @@
+"""
+本地替身服务器与负载生成器测试
+
+测试 api_base 将 XhsClient 的请求改发到替身服务器、注入的限流被重试，
+以及负载生成器的参数解析和结果汇总
+"""
+
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from mcp_xhs_publisher.config import config
+from mcp_xhs_publisher.devtools.loadgen import LoadReport, parse_mix, tool_error
+from mcp_xhs_publisher.devtools.media import make_jpeg, make_mp4
+from mcp_xhs_publisher.devtools.xhs_standin import (
+    CREATE_NOTE,
+    EndpointBehavior,
+    StandinServer,
+    parse_behavior,
+)
+from mcp_xhs_publisher.services.media_probe import preflight
+from mcp_xhs_publisher.services.xhs_client import XhsApiClient
+
+COOKIE = "a1=test_a1; web_session=test_session; webId=test_web_id"
+
+
+class TestStandinServer(unittest.TestCase):
+    """测试通过替身服务器走完整的 xhs 客户端调用"""
+
+    def setUp(self):
+        self.server = StandinServer(
+            default=EndpointBehavior(latency_ms=1, jitter=0), seed=1
+        ).start()
+        self.addCleanup(self.server.close)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.dict(
+            config._config,
+            {"api_base": self.server.base_url, "data_dir": self.tmp.name},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        cookie_file = os.path.join(self.tmp.name, "alice.cookie")
+        with open(cookie_file, "w") as f:
+            f.write(COOKIE)
+        self.api = XhsApiClient(cookie_dir=cookie_file)
+        self.api.limiter = mock.Mock()
+        self.api.limiter.acquire.return_value = 0
+        self.api.retry.base_delay = 0.01
+        self.api.FIRST_FRAME_INTERVAL = 0
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_publish_and_read(self):
+        """测试登录检查、笔记详情和三种笔记的发布都由替身服务器响应"""
+        image = self._write("a.jpg", make_jpeg(200 * 1024))
+        video = self._write("v.mp4", make_mp4(300 * 1024))
+
+        self.assertTrue(self.api.check_session().logged_in)
+        self.assertEqual(self.api.get_note_by_id("n1")["note_id"], "n1")
+        results = [
+            self.api.create_text_note("hello"),
+            self.api.create_image_note("hello", [image]),
+            self.api.create_video_note("hello", video),
+        ]
+
+        self.assertEqual([r["status"] for r in results], ["success"] * 3)
+        stats = self.server.stats()
+        self.assertEqual(stats["endpoints"][CREATE_NOTE], {"ok": 3})
+        self.assertEqual(stats["endpoints"]["first_frame"], {"ok": 1})
+        self.assertEqual(stats["uploaded_bytes"], 500 * 1024)
+
+    def test_injected_throttling_is_retried(self):
+        """测试注入的限流响应按重试策略重试，耗尽后返回错误"""
+        self.server.behaviors[CREATE_NOTE] = EndpointBehavior(
+            latency_ms=1, jitter=0, throttle_rate=1.0
+        )
+        self.api.retry.max_attempts = 2
+
+        result = self.api.create_text_note("hello")
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("300013", result["error"])
+        self.assertEqual(
+            self.server.stats()["endpoints"][CREATE_NOTE], {"throttled": 2}
+        )
+
+    def test_generated_media_passes_preflight(self):
+        """测试生成的图片和视频能通过发布前预检"""
+        image = self._write("a.jpg", make_jpeg(1024, random=True))
+        video = self._write("v.mp4", make_mp4(1024, random=True))
+        image_note = {"content": "hello", "image_paths": [image]}
+        video_note = {"content": "hello", "video_path": video}
+        self.assertEqual(preflight("image", image_note)["errors"], [])
+        self.assertEqual(preflight("video", video_note)["errors"], [])
+
+
+class TestLoadgen(unittest.TestCase):
+    """测试负载生成器和替身服务器的参数解析与结果汇总"""
+
+    def test_parse_specs(self):
+        """测试操作比例和接口行为的解析"""
+        self.assertEqual(
+            parse_mix("publish_text=3,read_user=1,publish_video=0"),
+            {"publish_text": 3.0, "read_user": 1.0},
+        )
+        with self.assertRaises(ValueError):
+            parse_mix("publish_text=1,delete_note=1")
+        name, behavior = parse_behavior(
+            "create_note:latency_ms=300,error_rate=0.1", EndpointBehavior(jitter=0)
+        )
+        self.assertEqual((name, behavior.latency_ms), (CREATE_NOTE, 300.0))
+        self.assertEqual((behavior.error_rate, behavior.jitter), (0.1, 0))
+        with self.assertRaises(ValueError):
+            parse_behavior("create_note:speed=1", EndpointBehavior())
+
+    def test_report_summary(self):
+        """测试分位数、吞吐量和按原因分类的错误数"""
+        report = LoadReport(started=0.0, finished=10.0)
+        for i in range(1, 101):
+            report.record("publish_text", i / 1000, None)
+        report.record("publish_image", 2.0, "上传失败")
+        report.record("publish_image", 3.0, "上传失败")
+
+        summary = report.summary()
+        text = summary["operations"]["publish_text"]
+        self.assertEqual((text["p50_ms"], text["p95_ms"], text["p99_ms"]), (50, 95, 99))
+        self.assertEqual(summary["overall"]["requests"], 102)
+        self.assertEqual(summary["overall"]["throughput"], 10.2)
+        self.assertEqual(summary["operations"]["publish_image"]["errors"], 2)
+        self.assertEqual(summary["errors"], {"publish_image: 上传失败": 2})
+
+    def test_tool_error(self):
+        """测试从工具结果中识别失败"""
+        ok = SimpleNamespace(
+            isError=False, structuredContent={"result": {"status": "success"}}
+        )
+        failed = SimpleNamespace(
+            isError=False,
+            structuredContent={"result": {"status": "error", "error": "熔断"}},
+        )
+        protocol = SimpleNamespace(
+            isError=True,
+            structuredContent=None,
+            content=[SimpleNamespace(text="坏参数")],
+        )
+        self.assertIsNone(tool_error(ok))
+        self.assertEqual(tool_error(failed), "熔断")
+        self.assertEqual(tool_error(protocol), "坏参数")
+
+
+if __name__ == "__main__":
+    unittest.main()
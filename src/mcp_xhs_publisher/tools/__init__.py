@@ -4,7 +4,17 @@ MCP工具模块
 包含实现MCP工具协议的所有工具类和函数
 """
 
-from .publish_executor import PublishExecutor
+from typing import Any
+
 from .tool_registry import ToolRegistry
 
 __all__ = ["ToolRegistry", "PublishExecutor"]
+
+
+def __getattr__(name: str) -> Any:
+    # PublishExecutor 依赖 xhs 和 requests，按需导入以加快启动
+    if name == "PublishExecutor":
+        from .publish_executor import PublishExecutor
+
+        return PublishExecutor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
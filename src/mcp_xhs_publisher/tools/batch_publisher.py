@@ -0,0 +1,150 @@
+"""
+批量发布流水线
+
+将每篇笔记拆分为预处理（校验参数、下载远程媒体）和发布（上传、创建笔记）两个阶段，
+下一篇笔记的下载与当前笔记的上传并行执行
+"""
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from ..models.tool_io_schemas import PublishResponse
+from ..util.logging import log_info
+from ..util.tracing import span
+from ..util.worker_pool import WorkerPool
+
+if TYPE_CHECKING:
+    from .publish_executor import PublishExecutor
+
+ResultCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class BatchPublisher:
+    """
+    批量发布器
+
+    预处理在 prepare_pool 中提前进行，最多领先发布阶段 prefetch 篇笔记，
+    以限制暂存媒体占用的磁盘空间；发布阶段同时最多执行 concurrency 篇
+    """
+
+    def __init__(
+        self,
+        executor: "PublishExecutor",
+        prepare_pool: WorkerPool,
+        publish_pool: WorkerPool,
+        concurrency: int = 1,
+        prefetch: int = 2,
+    ):
+        """
+        初始化批量发布器
+
+        Args:
+            executor: 发布执行器
+            prepare_pool: 预处理阶段使用的线程池
+            publish_pool: 发布阶段使用的线程池
+            concurrency: 发布阶段的并发数
+            prefetch: 预处理阶段最多领先发布阶段的笔记数
+        """
+        self.executor = executor
+        self.prepare_pool = prepare_pool
+        self.publish_pool = publish_pool
+        self.concurrency = max(1, concurrency)
+        self.prefetch = max(0, prefetch)
+
+    async def _process(
+        self,
+        index: int,
+        note: Dict[str, Any],
+        window: asyncio.Semaphore,
+        publish_slot: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        """依次执行单篇笔记的预处理和发布阶段，每篇笔记在当前追踪中记录为 batch.note"""
+        async with window:
+            start = time.perf_counter()
+            params = dict(note)
+            note_type = params.pop("note_type", None)
+            with span("batch.note", index=index, note_type=note_type or "") as current:
+                response = await self._run_note(note_type, params, publish_slot)
+                if response.status != "success":
+                    current.fail(response.error)
+            return {
+                "index": index,
+                "elapsed": round(time.perf_counter() - start, 4),
+                **response.dict(),
+            }
+
+    async def _run_note(
+        self,
+        note_type: Optional[str],
+        params: Dict[str, Any],
+        publish_slot: asyncio.Semaphore,
+    ) -> PublishResponse:
+        """执行单篇笔记的预处理和发布阶段，预处理失败时返回错误结果"""
+        try:
+            staged = await self.prepare_pool.run(self.executor.stage, note_type, params)
+        except Exception as e:
+            return PublishResponse(
+                status="error",
+                message="笔记预处理失败",
+                note_type=note_type,
+                error=str(e),
+            )
+        published = False
+        try:
+            async with publish_slot:
+                published = True
+                return await self.publish_pool.run(self.executor.publish_staged, staged)
+        finally:
+            if not published:
+                staged.cleanup()
+
+    async def run(
+        self,
+        notes: List[Dict[str, Any]],
+        on_result: Optional[ResultCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        发布一批笔记
+
+        Args:
+            notes: 笔记列表，每项包含 note_type 和对应笔记类型的发布参数
+            on_result: 每篇笔记完成时调用的异步回调（可选），按完成顺序调用
+
+        Returns:
+            Dict[str, Any]: 按输入顺序排列的结果、成功和失败数、总耗时及吞吐量
+        """
+        start = time.perf_counter()
+        window = asyncio.Semaphore(self.concurrency + self.prefetch)
+        publish_slot = asyncio.Semaphore(self.concurrency)
+        tasks = [
+            asyncio.ensure_future(self._process(i, note, window, publish_slot))
+            for i, note in enumerate(notes)
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                if on_result is not None:
+                    await on_result(item)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        results = [task.result() for task in tasks]
+        elapsed = time.perf_counter() - start
+        succeeded = sum(1 for r in results if r["status"] == "success")
+        summary = {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "elapsed": round(elapsed, 4),
+            "notes_per_minute": (
+                round(len(results) * 60 / elapsed, 2) if elapsed > 0 else 0.0
+            ),
+        }
+        log_info("批量发布完成", **summary)
+        return {
+            "status": "success" if summary["failed"] == 0 else "error",
+            **summary,
+            "results": results,
+        }
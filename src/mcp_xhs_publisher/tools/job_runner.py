@@ -0,0 +1,122 @@
+"""
+发布任务执行器
+
+后台工作线程从持久化任务队列中认领任务并调用发布执行器完成发布
+"""
+
+import threading
+from typing import TYPE_CHECKING, List
+
+from ..services.job_queue import JOB_ERROR, JOB_SUCCESS, JobQueue
+from ..util.logging import log_error, log_info
+from ..util.tracing import span
+
+if TYPE_CHECKING:
+    from .publish_executor import PublishExecutor
+
+
+class JobRunner:
+    """
+    任务队列消费者
+
+    启动时将上次中断的任务重新排队。提交新任务后调用 notify 立即唤醒空闲线程，
+    其余情况下每隔 POLL_INTERVAL 秒检查一次队列，以便处理其它进程提交的任务。
+    多进程运行时只认领未指定账号或指定了当前进程账号的任务，
+    提交到其他进程的任务由负责该账号的进程执行。
+    注意：执行中被中断的任务会被完整重试，若中断发生在平台已创建笔记之后可能重复发布
+    """
+
+    POLL_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        executor: "PublishExecutor",
+        workers: int = 2,
+        max_attempts: int = 3,
+    ):
+        """
+        初始化任务执行器
+
+        Args:
+            queue: 任务队列
+            executor: 发布执行器
+            workers: 工作线程数
+            max_attempts: 单个任务的最大尝试次数
+        """
+        self.queue = queue
+        self.executor = executor
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """
+        恢复中断的任务并启动工作线程
+
+        多进程运行时只恢复同一序号的进程上次认领的任务，子进程异常退出并重新启动后继续执行，
+        不会把其他进程正在执行的任务重新排队
+        """
+        recovered = self.queue.recover(self.max_attempts)
+        if recovered:
+            log_info("已恢复未完成的发布任务", count=recovered)
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._loop, name=f"xhs-job-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self) -> None:
+        """唤醒一个空闲的工作线程"""
+        with self._cond:
+            self._cond.notify()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止工作线程，正在执行的任务在下次启动时恢复
+
+        Args:
+            timeout: 等待每个线程退出的最长时间（秒）
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self) -> None:
+        """工作线程主循环"""
+        while not self._stopping:
+            try:
+                job = self.queue.claim(self.executor.pool.owned_accounts())
+            except Exception as e:
+                log_error("认领发布任务失败", error=str(e))
+                job = None
+            if job is None:
+                with self._cond:
+                    if not self._stopping:
+                        self._cond.wait(self.POLL_INTERVAL)
+                continue
+            self._run(job)
+
+    def _run(self, job: dict) -> None:
+        """执行单个任务并记录结果，每个任务是一条独立的追踪"""
+        with span("job", job_id=job["id"], note_type=job["note_type"]) as current:
+            log_info("开始执行发布任务", job_id=job["id"], note_type=job["note_type"])
+            try:
+                response = self.executor.publish(job["note_type"], job["params"])
+                status = JOB_SUCCESS if response.status == "success" else JOB_ERROR
+                self.queue.complete(
+                    job["id"], status, result=response.dict(), error=response.error
+                )
+                if status == JOB_ERROR:
+                    current.fail(response.error)
+                log_info("发布任务完成", job_id=job["id"], status=status)
+            except Exception as e:
+                current.fail(str(e))
+                log_error("发布任务执行出错", job_id=job["id"], error=str(e))
+                self.queue.complete(job["id"], JOB_ERROR, error=str(e))
@@ -0,0 +1,113 @@
+"""
+批量获取笔记
+
+一次请求获取多篇笔记，有限并发地调用读取接口（仍经过每个账号的读取限流），
+部分笔记获取失败时返回已获取的笔记和每篇失败笔记的错误
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..util.logging import log_info
+from ..util.tracing import span
+
+NoteLoader = Callable[[str], Awaitable[Dict[str, Any]]]
+ResultCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# 单次请求最多获取的笔记数
+MAX_NOTES = 100
+
+
+class NoteFetcher:
+    """
+    批量笔记获取器
+
+    同时最多 concurrency 篇笔记在获取中，重复的笔记ID只获取一次
+    """
+
+    def __init__(self, load: NoteLoader, concurrency: int = 3):
+        """
+        初始化批量笔记获取器
+
+        Args:
+            load: 获取单篇笔记的异步函数
+            concurrency: 同时获取的笔记数
+        """
+        self.load = load
+        self.concurrency = max(1, concurrency)
+
+    async def _fetch(self, note_id: str, slot: asyncio.Semaphore) -> Dict[str, Any]:
+        """获取单篇笔记，失败时返回错误信息，每篇笔记在当前追踪中记录为 fetch.note"""
+        async with slot:
+            start = time.perf_counter()
+            with span("fetch.note", note_id=note_id) as current:
+                try:
+                    note = await self.load(note_id)
+                    item = {"note_id": note_id, "status": "success", "note": note}
+                except Exception as e:
+                    current.fail(str(e))
+                    item = {"note_id": note_id, "status": "error", "error": str(e)}
+            item["elapsed"] = round(time.perf_counter() - start, 4)
+            return item
+
+    async def run(
+        self,
+        note_ids: List[str],
+        on_result: Optional[ResultCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        获取一批笔记
+
+        Args:
+            note_ids: 笔记ID列表
+            on_result: 每篇笔记完成时调用的异步回调（可选），按完成顺序调用
+
+        Returns:
+            Dict[str, Any]: 按输入顺序排列的笔记、每篇失败笔记的错误、成功和失败数及总耗时；
+                status 为 success（全部成功）、partial（部分成功）或 error（全部失败）
+
+        Raises:
+            ValueError: 笔记ID列表为空或超过 MAX_NOTES
+        """
+        unique = list(dict.fromkeys(note_ids))
+        if not unique:
+            raise ValueError("笔记ID列表为空")
+        if len(unique) > MAX_NOTES:
+            raise ValueError(f"单次最多获取 {MAX_NOTES} 篇笔记，当前 {len(unique)} 篇")
+
+        start = time.perf_counter()
+        slot = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self._fetch(i, slot)) for i in unique]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                if on_result is not None:
+                    await on_result(item)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        results = [task.result() for task in tasks]
+        notes = {r["note_id"]: r["note"] for r in results if r["status"] == "success"}
+        errors = {r["note_id"]: r["error"] for r in results if r["status"] == "error"}
+        summary = {
+            "total": len(results),
+            "succeeded": len(notes),
+            "failed": len(errors),
+            "elapsed": round(time.perf_counter() - start, 4),
+        }
+        log_info("批量获取笔记完成", **summary)
+        if not errors:
+            status = "success"
+        elif notes:
+            # 部分获取成功，已获取的笔记照常返回
+            status = "partial"
+        else:
+            status = "error"
+        return {
+            "status": status,
+            **summary,
+            "notes": notes,
+            "errors": errors,
+        }
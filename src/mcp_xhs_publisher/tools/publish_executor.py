@@ -4,14 +4,25 @@
 实现MCP工具发布功能，遵循MCP工具指南规范
 """
 
+import time
+from typing import Any, Dict, Optional
+
 from ..models.tool_io_schemas import (
+    NOTE_INPUT_MODELS,
     PublishImageInput,
     PublishResponse,
     PublishTextInput,
     PublishVideoInput,
 )
+from ..services.account_pool import AccountPool
+from ..services.job_queue import JOB_ERROR, JOB_SUCCESS, JobQueue
+from ..services.media_downloader import is_remote
+from ..services.media_probe import PreflightError, ensure_valid
+from ..services.media_staging import StagedNote, stage_note
 from ..services.xhs_client import XhsApiClient
-from ..util.logging import log_error
+from ..util.logging import log_error, log_info
+from ..util.metrics import STAGE, get_metrics
+from ..util.tracing import annotate
 
 
 class PublishExecutor:
@@ -19,18 +30,209 @@ class PublishExecutor:
     小红书发布工具执行器
 
     负责实现MCP工具的具体执行逻辑，包括文本、图文和视频笔记的发布
-    使用单一客户端实例
+    通过账号池在多个账号之间调度发布请求。多进程运行时，指定了其他进程负责的账号的笔记
+    写入共享的任务库，由负责该账号的进程认领发布，当前进程等待结果后返回
     """
 
-    def __init__(self):
-        """初始化执行器，创建单一客户端实例"""
+    # 等待其他进程发布结果时查询任务库的间隔（秒）
+    ROUTE_POLL_INTERVAL = 0.2
+    job_queue: Optional[JobQueue] = None
+
+    def __init__(self, job_queue: Optional[JobQueue] = None):
+        """
+        初始化执行器，加载 cookie 目录中的所有账号
+
+        Args:
+            job_queue: 任务队列（可选），用于把其他进程负责的账号的笔记交给该进程发布
+        """
+        self.job_queue = job_queue
         try:
-            # 直接从环境变量创建客户端实例
-            self.client = XhsApiClient.build_from_env()
+            # 直接从环境变量创建账号池
+            self.pool = AccountPool.build_from_env()
         except Exception as e:
             log_error(f"创建客户端实例失败: {e}")
             raise
 
+    @property
+    def client(self) -> XhsApiClient:
+        """默认账号的客户端，供读取类调用使用"""
+        return self.pool.get()
+
+    def publish(self, note_type: str, params: Dict[str, Any]) -> PublishResponse:
+        """
+        按笔记类型发布笔记
+
+        Args:
+            note_type: 笔记类型：text, image 或 video
+            params: 对应笔记类型输入模型的字段
+
+        Returns:
+            PublishResponse: 发布结果
+
+        Raises:
+            ValueError: 笔记类型不支持
+            pydantic.ValidationError: 参数不符合输入模型
+        """
+        if note_type not in NOTE_INPUT_MODELS:
+            raise ValueError(f"不支持的笔记类型: {note_type}")
+        model = NOTE_INPUT_MODELS[note_type](**params)
+        return getattr(self, f"publish_{note_type}")(model)
+
+    def stage(self, note_type: str, params: Dict[str, Any]) -> StagedNote:
+        """
+        校验发布参数并下载笔记引用的远程媒体
+
+        Args:
+            note_type: 笔记类型：text, image 或 video
+            params: 对应笔记类型输入模型的字段
+
+        Returns:
+            StagedNote: 媒体已就绪的笔记，发布后由 publish_staged 清理临时文件
+
+        Raises:
+            ValueError: 笔记类型不支持
+            pydantic.ValidationError: 参数不符合输入模型
+            PreflightError: 正文、话题或本地媒体未通过预检
+            RuntimeError: 媒体下载失败
+        """
+        if note_type not in NOTE_INPUT_MODELS:
+            raise ValueError(f"不支持的笔记类型: {note_type}")
+        params = NOTE_INPUT_MODELS[note_type](**params).dict(exclude_none=True)
+        ensure_valid(note_type, params)
+        return stage_note(note_type, params)
+
+    def publish_staged(self, staged: StagedNote) -> PublishResponse:
+        """
+        发布媒体已就绪的笔记，完成后删除预处理阶段下载的临时文件
+
+        媒体已在预处理阶段下载和压缩，发布时只检查本地文件后上传，不再重复处理
+
+        Args:
+            staged: stage 返回的笔记
+
+        Returns:
+            PublishResponse: 发布结果，图文笔记附带预处理阶段的下载耗时和图片预处理结果
+        """
+        try:
+            model = NOTE_INPUT_MODELS[staged.note_type](**staged.params)
+            if staged.note_type == "text":
+                response = self.publish_text(model)
+            else:
+                response = getattr(self, f"publish_{staged.note_type}")(
+                    model, prepared=True
+                )
+        finally:
+            staged.cleanup()
+        if staged.download_timings:
+            response.download_timings = staged.download_timings
+        if staged.image_report:
+            response.image_report = staged.image_report
+        return response
+
+    def _route(self, note_type: str, params: Any) -> Optional[PublishResponse]:
+        """
+        在下载媒体之前处理指定的发布账号：其他进程负责的账号交给该进程发布，不存在的账号返回错误
+
+        Args:
+            note_type: 笔记类型
+            params: 笔记输入模型
+
+        Returns:
+            Optional[PublishResponse]: 已由其他进程发布时返回其结果，账号不可用时返回错误结果，
+                由当前进程发布时返回None
+        """
+        if self.job_queue is not None and self.pool.owned_elsewhere(params.account):
+            return self._publish_by_owner(note_type, params)
+        try:
+            self.pool.check(params.account)
+        except ValueError as e:
+            return PublishResponse(
+                status="error",
+                message="发布账号不可用",
+                note_type=note_type,
+                error=str(e),
+            )
+        return None
+
+    def _publish_by_owner(self, note_type: str, params: Any) -> PublishResponse:
+        """
+        将笔记写入任务库，等待负责该账号的进程认领并发布
+
+        Args:
+            note_type: 笔记类型
+            params: 笔记输入模型，媒体为本机路径时由负责的进程直接读取
+
+        Returns:
+            PublishResponse: 负责的进程返回的发布结果
+        """
+        job_id = self.job_queue.submit(note_type, params.dict(exclude_none=True))
+        log_info(
+            "发布账号由其他服务器进程负责，已转交",
+            account=params.account,
+            job_id=job_id,
+        )
+        while True:
+            job = self.job_queue.get(job_id)
+            if job is not None and job["status"] in (JOB_SUCCESS, JOB_ERROR):
+                break
+            time.sleep(self.ROUTE_POLL_INTERVAL)
+        if job["result"]:
+            return PublishResponse(**job["result"])
+        return PublishResponse(
+            status="error",
+            message="发布任务执行出错",
+            note_type=note_type,
+            account=params.account,
+            error=job["error"],
+        )
+
+    def _preflight(self, note_type: str, params: Any) -> Optional[PublishResponse]:
+        """
+        发布前预检，在上传前拒绝不合格的笔记
+
+        Args:
+            note_type: 笔记类型
+            params: 笔记输入模型
+
+        Returns:
+            Optional[PublishResponse]: 未通过时返回错误结果，通过时返回None
+        """
+        try:
+            with get_metrics().track(STAGE, "preflight"):
+                ensure_valid(note_type, params.dict(exclude_none=True))
+        except PreflightError as e:
+            log_error("笔记未通过发布前预检", note_type=note_type, errors=e.errors)
+            return PublishResponse(
+                status="error",
+                message="笔记未通过发布前预检",
+                note_type=note_type,
+                error=str(e),
+            )
+        return None
+
+    def _publish_remote(self, note_type: str, params: Any) -> PublishResponse:
+        """
+        先下载笔记引用的远程媒体，预检下载后的本地文件再上传
+
+        Args:
+            note_type: 笔记类型：image 或 video
+            params: 笔记输入模型
+
+        Returns:
+            PublishResponse: 发布结果，媒体下载失败或未通过预检时返回错误结果
+        """
+        try:
+            staged = stage_note(note_type, params.dict(exclude_none=True))
+        except Exception as e:
+            log_error("远程媒体下载失败", note_type=note_type, error=str(e))
+            return PublishResponse(
+                status="error",
+                message="远程媒体下载失败",
+                note_type=note_type,
+                error=str(e),
+            )
+        return self.publish_staged(staged)
+
     def publish_text(self, params: PublishTextInput) -> PublishResponse:
         """
         发布纯文本笔记
@@ -41,10 +243,15 @@ class PublishExecutor:
         Returns:
             PublishResponse: 发布结果
         """
+        rejected = self._preflight("text", params) or self._route("text", params)
+        if rejected is not None:
+            return rejected
         try:
-            response = self.client.create_text_note(
-                content=params.content, topics=params.topics or []
-            )
+            with self.pool.acquire(params.account) as client:
+                annotate(account=client.account)
+                response = client.create_text_note(
+                    content=params.content, topics=params.topics or []
+                )
             if response.get("status") == "success":
                 result = response.get("result", {}) or {}
                 note_id = result.get("id") or result.get("note_id") or ""
@@ -54,12 +261,14 @@ class PublishExecutor:
                     message="文本笔记发布成功",
                     note_id=note_id,
                     note_type="text",
+                    account=client.account,
                     publish_time=publish_time,
                 )
             else:
                 return PublishResponse(
                     status="error",
                     message="文本笔记发布失败",
+                    account=client.account,
                     error=response.get("error", "未知错误"),
                 )
         except Exception as e:
@@ -68,22 +277,33 @@ class PublishExecutor:
                 status="error", message="发布文本笔记时发生异常", error=str(e)
             )
 
-    def publish_image(self, params: PublishImageInput) -> PublishResponse:
+    def publish_image(
+        self, params: PublishImageInput, prepared: bool = False
+    ) -> PublishResponse:
         """
         发布图文笔记
 
         Args:
             params: 图文笔记参数
+            prepared: 图片是否已由 stage 下载并预处理
 
         Returns:
             PublishResponse: 发布结果
         """
+        rejected = self._preflight("image", params) or self._route("image", params)
+        if rejected is not None:
+            return rejected
+        if not prepared and any(is_remote(path) for path in params.image_paths):
+            return self._publish_remote("image", params)
         try:
-            response = self.client.create_image_note(
-                content=params.content,
-                image_paths=params.image_paths,
-                topics=params.topics or [],
-            )
+            with self.pool.acquire(params.account) as client:
+                annotate(account=client.account)
+                response = client.create_image_note(
+                    content=params.content,
+                    image_paths=params.image_paths,
+                    topics=params.topics or [],
+                    prepared=prepared,
+                )
             if response.get("status") == "success":
                 result = response.get("result", {}) or {}
                 note_id = result.get("id") or result.get("note_id") or ""
@@ -95,14 +315,21 @@ class PublishExecutor:
                     message="图文笔记发布成功",
                     note_id=note_id,
                     note_type="image",
+                    account=client.account,
                     publish_time=publish_time,
                     image_count=image_count,
+                    download_timings=response.get("download_timings"),
+                    image_report=response.get("image_report"),
+                    upload_report=response.get("upload_report"),
                 )
             else:
                 return PublishResponse(
                     status="error",
                     message="图文笔记发布失败",
+                    account=client.account,
                     error=response.get("error", "未知错误"),
+                    download_timings=response.get("download_timings"),
+                    image_report=response.get("image_report"),
                 )
         except Exception as e:
             log_error(f"发布图文笔记出错: {e}")
@@ -110,23 +337,36 @@ class PublishExecutor:
                 status="error", message="发布图文笔记时发生异常", error=str(e)
             )
 
-    def publish_video(self, params: PublishVideoInput) -> PublishResponse:
+    def publish_video(
+        self, params: PublishVideoInput, prepared: bool = False
+    ) -> PublishResponse:
         """
         发布视频笔记
 
         Args:
             params: 视频笔记参数
+            prepared: 视频和封面是否已由 stage 下载
 
         Returns:
             PublishResponse: 发布结果
         """
+        rejected = self._preflight("video", params) or self._route("video", params)
+        if rejected is not None:
+            return rejected
+        remote = [params.video_path, params.cover_path or ""]
+        if not prepared and any(is_remote(path) for path in remote):
+            return self._publish_remote("video", params)
         try:
-            response = self.client.create_video_note(
-                content=params.content,
-                video_path=params.video_path,
-                cover_path=params.cover_path,
-                topics=params.topics or [],
-            )
+            with self.pool.acquire(params.account) as client:
+                annotate(account=client.account)
+                response = client.create_video_note(
+                    content=params.content,
+                    video_path=params.video_path,
+                    cover_path=params.cover_path,
+                    topics=params.topics or [],
+                    video_sha256=params.video_sha256,
+                    prepared=prepared,
+                )
             if response.get("status") == "success":
                 result = response.get("result", {}) or {}
                 note_id = result.get("id") or result.get("note_id") or ""
@@ -136,12 +376,15 @@ class PublishExecutor:
                     message="视频笔记发布成功",
                     note_id=note_id,
                     note_type="video",
+                    account=client.account,
                     publish_time=publish_time,
+                    upload_report=response.get("upload_report"),
                 )
             else:
                 return PublishResponse(
                     status="error",
                     message="视频笔记发布失败",
+                    account=client.account,
                     error=response.get("error", "未知错误"),
                 )
         except Exception as e:
@@ -0,0 +1,271 @@
+"""
+定时发布
+
+定时任务保存在持久化任务队列中，内存中按时间维护一个最小堆：在发布时间前 lead_time 秒
+下载、预检并预处理媒体，到发布时间时只剩上传和创建笔记，使下载和图片处理不占用发布时刻的耗时
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from ..services.job_queue import JOB_ERROR, JOB_SUCCESS, JobQueue
+from ..util.logging import log_error, log_info
+from ..util.tracing import span
+from ..util.worker_pool import WorkerPool
+
+if TYPE_CHECKING:
+    from ..services.media_staging import StagedNote
+    from .publish_executor import PublishExecutor
+
+STAGE = "stage"
+PUBLISH = "publish"
+# 最多提前多久提交定时任务（秒）
+MAX_SCHEDULE_AHEAD = 366 * 86400
+# 计时线程单次等待的上限（秒），避免超出 threading.TIMEOUT_MAX
+MAX_WAIT = 3600.0
+
+
+def parse_publish_at(value: str) -> float:
+    """
+    解析发布时间
+
+    Args:
+        value: ISO 8601 时间（如 2026-11-11T20:00:00+08:00，不带时区时按本地时间）或 Unix 时间戳
+
+    Returns:
+        float: Unix 时间戳
+
+    Raises:
+        ValueError: 无法解析，或不是有限值、晚于当前时间 MAX_SCHEDULE_AHEAD 秒以上
+    """
+    value = str(value).strip()
+    try:
+        when = float(value)
+    except ValueError:
+        try:
+            when = datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            raise ValueError(f"无法解析发布时间: {value}") from None
+    if not math.isfinite(when) or when > time.time() + MAX_SCHEDULE_AHEAD:
+        raise ValueError(
+            f"发布时间超出范围，最多提前 {MAX_SCHEDULE_AHEAD // 86400} 天: {value}"
+        )
+    return when
+
+
+class PublishScheduler:
+    """
+    定时发布器
+
+    计时线程按时间顺序从堆中取出到期的预处理和发布事件，分别交给 stage_pool 和 publish_pool 执行，
+    计时线程本身只做任务库的轻量查询。预处理前先在数据库中认领任务，多个服务器进程共享任务库时每个任务只执行一次，
+    指定了发布账号的任务只由负责该账号的进程加载和执行。计时线程每隔 POLL_INTERVAL 秒重新查询任务库，
+    加载其他进程写入的定时任务
+    """
+
+    POLL_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        executor: "PublishExecutor",
+        stage_pool: WorkerPool,
+        publish_pool: WorkerPool,
+        lead_time: float = 300.0,
+    ):
+        """
+        初始化定时发布器
+
+        Args:
+            queue: 任务队列
+            executor: 发布执行器
+            stage_pool: 预处理媒体使用的线程池
+            publish_pool: 到点发布使用的线程池
+            lead_time: 提前预处理的秒数
+        """
+        self.queue = queue
+        self.executor = executor
+        self.stage_pool = stage_pool
+        self.publish_pool = publish_pool
+        self.lead_time = max(0.0, lead_time)
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._seq = itertools.count()
+        self._staged: Dict[str, Tuple["StagedNote", float]] = {}
+        # 已登记预处理事件、尚未认领的任务
+        self._known: Set[str] = set()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """从任务库加载当前进程可执行的等待中定时任务并启动计时线程"""
+        count = self._load()
+        if count:
+            log_info("已加载定时发布任务", count=count)
+        self._thread = threading.Thread(
+            target=self._loop, name="xhs-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止计时线程并删除已暂存的媒体，未发布的任务在下次启动时重新预处理
+
+        Args:
+            timeout: 等待计时线程退出的最长时间（秒）
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            staged = list(self._staged.values())
+            self._staged.clear()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for note, _ in staged:
+            note.cleanup()
+
+    def _load(self) -> int:
+        """
+        登记任务库中当前进程可执行、尚未登记的定时任务
+
+        Returns:
+            int: 新登记的任务数
+        """
+        jobs = self.queue.scheduled(self.executor.pool.owned_accounts())
+        with self._cond:
+            jobs = [job for job in jobs if job["id"] not in self._known]
+        count = 0
+        for job in jobs:
+            if job["publish_at"] is None or not math.isfinite(job["publish_at"]):
+                # 早期版本未校验发布时间（NaN 在 SQLite 中保存为 NULL），无效的任务直接失败，不进入计时
+                self.queue.complete(job["id"], JOB_ERROR, error="发布时间无效")
+                continue
+            self.add(job["id"], job["publish_at"])
+            count += 1
+        return count
+
+    def add(self, job_id: str, publish_at: float) -> None:
+        """
+        登记定时任务，在 publish_at - lead_time 时开始预处理
+
+        Args:
+            job_id: 任务ID
+            publish_at: 发布时间（Unix 时间戳）
+        """
+        with self._cond:
+            self._known.add(job_id)
+        self._push(publish_at - self.lead_time, STAGE, job_id)
+
+    def _push(self, when: float, kind: str, job_id: str) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._seq), kind, job_id))
+            self._cond.notify()
+
+    def _loop(self) -> None:
+        """计时线程主循环：等待最早的事件到期后分派，每隔 POLL_INTERVAL 秒加载其他进程写入的任务"""
+        next_poll = time.time() + self.POLL_INTERVAL
+        while True:
+            event = None
+            with self._cond:
+                while not self._stopping:
+                    now = time.time()
+                    if self._heap and self._heap[0][0] <= now:
+                        event = heapq.heappop(self._heap)
+                        break
+                    if now >= next_poll:
+                        break
+                    due = min(self._heap[0][0], next_poll) if self._heap else next_poll
+                    self._cond.wait(min(due - now, MAX_WAIT))
+                if self._stopping:
+                    return
+            if event is None:
+                try:
+                    count = self._load()
+                    if count:
+                        log_info("已加载其他进程提交的定时任务", count=count)
+                except Exception as e:
+                    log_error("加载定时任务失败", error=str(e))
+                next_poll = time.time() + self.POLL_INTERVAL
+                continue
+            _, _, kind, job_id = event
+            if kind == STAGE:
+                self.stage_pool.submit(self._stage, job_id)
+            else:
+                self.publish_pool.submit(self._publish, job_id)
+
+    def _stage(self, job_id: str) -> None:
+        """认领任务并预处理媒体，完成后登记发布事件；媒体未通过预检或下载失败时任务直接失败"""
+        job = self.queue.claim_scheduled(job_id, self.executor.pool.owned_accounts())
+        with self._cond:
+            self._known.discard(job_id)
+        if job is None:
+            return
+        publish_at = job["publish_at"]
+        with span(
+            "schedule.stage", job_id=job_id, note_type=job["note_type"]
+        ) as current:
+            try:
+                staged = self.executor.stage(job["note_type"], job["params"])
+            except Exception as e:
+                current.fail(str(e))
+                log_error("定时任务预处理失败", job_id=job_id, error=str(e))
+                self.queue.complete(job_id, JOB_ERROR, error=f"媒体预处理失败: {e}")
+                return
+        self.queue.mark_staged(job_id)
+        with self._cond:
+            if self._stopping:
+                staged.cleanup()
+                return
+            self._staged[job_id] = (staged, publish_at)
+        lead = publish_at - time.time()
+        log_info("定时任务媒体已就绪", job_id=job_id, lead=round(lead, 3))
+        self._push(publish_at, PUBLISH, job_id)
+
+    def _publish(self, job_id: str) -> None:
+        """发布已预处理的笔记并记录结果"""
+        with self._cond:
+            staged, publish_at = self._staged.pop(job_id, (None, 0.0))
+        if staged is None:
+            return
+        self.queue.mark_running(job_id)
+        note_type = staged.note_type
+        with span("schedule.publish", job_id=job_id, note_type=note_type) as current:
+            try:
+                response = self.executor.publish_staged(staged)
+                status = JOB_SUCCESS if response.status == "success" else JOB_ERROR
+                self.queue.complete(
+                    job_id, status, result=response.dict(), error=response.error
+                )
+                if status == JOB_ERROR:
+                    current.fail(response.error)
+            except Exception as e:
+                current.fail(str(e))
+                log_error("定时任务发布出错", job_id=job_id, error=str(e))
+                self.queue.complete(job_id, JOB_ERROR, error=str(e))
+                return
+        log_info(
+            "定时任务发布完成",
+            job_id=job_id,
+            status=status,
+            publish_lag=round(time.time() - publish_at, 3),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取定时发布器状态
+
+        Returns:
+            Dict[str, Any]: 提前预处理的秒数、等待中的事件数和已暂存媒体的任务数
+        """
+        with self._cond:
+            return {
+                "lead_time": self.lead_time,
+                "pending_events": len(self._heap),
+                "staged_jobs": len(self._staged),
+            }
@@ -4,27 +4,44 @@ MCP工具注册模块
 负责注册所有小红书发布相关的MCP工具和资源
 """
 
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 # 条件导入以避免循环引用
 if TYPE_CHECKING:
     from mcp.server.fastmcp import FastMCP
 
+    from .publish_executor import PublishExecutor
+
+from ..config import config
 from ..models.tool_io_schemas import (
+    NOTE_INPUT_MODELS,
+    BatchNoteInput,
     PublishImageInput,
     PublishTextInput,
     PublishVideoInput,  # 添加手机登录输入模型导入
 )
-from .publish_executor import PublishExecutor
+from ..server_workers import current_shard
+from ..services.job_queue import JOB_SCHEDULED, JOB_STATUSES, JobQueue
+from ..services.rate_limiter import get_rate_limiter
+from ..services.session_monitor import SessionMonitor, SessionState
+from ..services.upload_index import get_upload_index
+from ..util.logging import log_error
+from ..util.metrics import get_metrics, timed_tool
+from ..util.ttl_cache import AsyncTTLCache
+from ..util.worker_pool import WorkerPool
+from .batch_publisher import BatchPublisher
+from .job_runner import JobRunner
+from .note_fetcher import MAX_NOTES, NoteFetcher
+from .publish_scheduler import PublishScheduler, parse_publish_at
 
 # from .. import __main__  # 已废弃，避免循环导入
 
-# 导入XhsClient类，用于二维码登录
-try:
-    from xhs import XhsClient
-except ImportError:
-    XhsClient = None  # 仅便于类型提示，实际运行需安装 xhs 包
-
 
 class ToolRegistry:
     """
@@ -32,11 +49,161 @@ class ToolRegistry:
 
     负责向MCP服务器注册所有小红书发布相关工具和资源，
     管理工具执行器的创建和生命周期
+
+    所有工具处理器均为异步函数，阻塞的小红书API调用在线程池中执行：
+    发布类调用使用 publish_pool，登录检查和资源读取等快速调用使用独立的
+    query_pool，避免被耗时的上传任务占满
+
+    发布执行器（以及依赖它的会话监控和任务执行器）在首次使用时创建，
+    xhs、requests 的导入和账号 cookie 的加载不计入服务器启动时间
     """
 
-    def __init__(self):
-        """初始化工具注册器，创建执行器实例"""
-        self.executor = PublishExecutor()
+    def __init__(self, executor: Optional["PublishExecutor"] = None):
+        """
+        初始化工具注册器，创建工作线程池
+
+        Args:
+            executor: 发布执行器（可选），未提供时在首次使用时按配置创建
+        """
+        self._executor = None
+        self._load_lock = threading.Lock()
+        self._starter: Optional[threading.Thread] = None
+        self.publish_pool = WorkerPool(
+            config.get_int("publish_workers", 4), "xhs-publish"
+        )
+        self.query_pool = WorkerPool(config.get_int("query_workers", 4), "xhs-query")
+        self.prepare_pool = WorkerPool(
+            max(1, config.get_int("batch_prefetch", 2)), "xhs-prepare"
+        )
+        # 定时任务到点发布使用独立的线程池，不与即时发布排队
+        self.schedule_pool = WorkerPool(
+            config.get_int("schedule_workers", 2), "xhs-schedule"
+        )
+        self.note_cache: AsyncTTLCache[Dict[str, Any]] = AsyncTTLCache(
+            max_entries=config.get_int("note_cache_size", 256),
+            ttl=config.get_float("note_cache_ttl", 60.0),
+            stale_ttl=config.get_float("note_cache_stale", 300.0),
+        )
+        self.session_cache_ttl = config.get_float("session_cache_ttl", 600.0)
+        shard = current_shard()
+        self.job_queue = JobQueue(
+            os.path.join(config.get("data_dir"), "jobs.db"),
+            worker=shard.index if shard is not None else None,
+        )
+        if executor is not None:
+            self._bind(executor)
+
+    def _bind(self, executor: "PublishExecutor") -> None:
+        """创建依赖发布执行器的组件"""
+        self._session_monitor = SessionMonitor(
+            executor.pool,
+            interval=config.get_float("session_check_interval", 300.0),
+        )
+        self._job_runner = JobRunner(
+            self.job_queue,
+            executor,
+            workers=config.get_int("job_workers", 2),
+            max_attempts=config.get_int("job_max_attempts", 3),
+        )
+        self._scheduler = PublishScheduler(
+            self.job_queue,
+            executor,
+            stage_pool=self.prepare_pool,
+            publish_pool=self.schedule_pool,
+            lead_time=config.get_float("schedule_lead_time", 300.0),
+        )
+        self._executor = executor
+
+    def _load(self) -> None:
+        """首次使用时创建发布执行器，多个线程同时调用时只创建一次"""
+        if self._executor is not None:
+            return
+        with self._load_lock:
+            if self._executor is None:
+                from .publish_executor import PublishExecutor
+
+                self._bind(PublishExecutor(self.job_queue))
+
+    @property
+    def executor(self) -> "PublishExecutor":
+        """发布执行器"""
+        self._load()
+        return self._executor
+
+    @property
+    def session_monitor(self) -> SessionMonitor:
+        """会话健康监控"""
+        self._load()
+        return self._session_monitor
+
+    @property
+    def job_runner(self) -> JobRunner:
+        """后台发布任务执行器"""
+        self._load()
+        return self._job_runner
+
+    @property
+    def scheduler(self) -> PublishScheduler:
+        """定时发布器"""
+        self._load()
+        return self._scheduler
+
+    def start(self) -> None:
+        """
+        启动后台任务：cookie 文件监视、会话健康检查，恢复上次未完成的发布任务，以及加载定时发布任务
+
+        在后台线程中加载账号后启动，服务器无需等待即可响应请求
+        """
+        if self._starter is not None:
+            return
+
+        def run() -> None:
+            try:
+                self.executor.pool.watch(
+                    config.get_float("cookie_reload_interval", 5.0)
+                )
+                self.session_monitor.start()
+                self.job_runner.start()
+                self.scheduler.start()
+            except Exception as e:
+                log_error("后台任务启动失败", error=str(e))
+
+        self._starter = threading.Thread(target=run, name="xhs-startup", daemon=True)
+        self._starter.start()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        关闭后台任务和工作线程池
+
+        Args:
+            wait: 是否等待进行中的任务完成
+        """
+        if self._starter is not None:
+            self._starter.join()
+        if self._executor is not None:
+            self._job_runner.stop()
+            self._scheduler.stop()
+            self._session_monitor.stop()
+            self._executor.pool.stop_watching()
+        self.publish_pool.shutdown(wait=wait)
+        self.prepare_pool.shutdown(wait=wait)
+        self.schedule_pool.shutdown(wait=wait)
+        self.query_pool.shutdown(wait=wait)
+
+    async def _session(self, account: Optional[str] = None) -> SessionState:
+        """
+        获取账号的会话状态，缓存未过期时直接返回，否则在线程池中检查
+
+        Args:
+            account: 账号名，未指定时自动选择
+
+        Returns:
+            SessionState: 会话状态
+        """
+        client = self.executor.pool.get(account)
+        if client.session.is_fresh(self.session_cache_ttl):
+            return client.session
+        return await self.query_pool.run(client.check_session)
 
     def register_tools(self, mcp_server: "FastMCP") -> None:
         """
@@ -46,7 +213,11 @@ class ToolRegistry:
             mcp_server: MCP服务器实例
         """
         self._register_publish_tools(mcp_server)
+        self._register_batch_tools(mcp_server)
+        self._register_job_tools(mcp_server)
+        self._register_fetch_tools(mcp_server)
         self._register_resource_tools(mcp_server)
+        self._register_metrics_endpoint(mcp_server)
 
     def _register_publish_tools(self, mcp_server: "FastMCP") -> None:
         """
@@ -60,8 +231,11 @@ class ToolRegistry:
             name="publish_text",
             description="发布纯文本笔记到小红书平台，支持添加话题标签",
         )
-        def publish_text(
-            content: str, topics: Optional[List[str]] = None
+        @timed_tool("publish_text")
+        async def publish_text(
+            content: str,
+            topics: Optional[List[str]] = None,
+            account: Optional[str] = None,
         ) -> Dict[str, Any]:
             """
             发布纯文本笔记到小红书
@@ -69,20 +243,25 @@ class ToolRegistry:
             Args:
                 content: 笔记文本内容
                 topics: 话题关键词列表（可选）
+                account: 发布账号（可选），不指定时自动选择负载最低的账号
 
             Returns:
                 Dict[str, Any]: 发布结果，包含笔记ID和发布时间等信息
             """
-            params = PublishTextInput(content=content, topics=topics)
-            result = self.executor.publish_text(params)
+            params = PublishTextInput(content=content, topics=topics, account=account)
+            result = await self.publish_pool.run(self.executor.publish_text, params)
             return result.dict()
 
         @mcp_server.tool(
             name="publish_image",
             description="发布图文笔记到小红书平台，支持多张图片和话题标签",
         )
-        def publish_image(
-            content: str, image_paths: List[str], topics: Optional[List[str]] = None
+        @timed_tool("publish_image")
+        async def publish_image(
+            content: str,
+            image_paths: List[str],
+            topics: Optional[List[str]] = None,
+            account: Optional[str] = None,
         ) -> Dict[str, Any]:
             """
             发布图文笔记到小红书
@@ -91,34 +270,40 @@ class ToolRegistry:
                 content: 笔记文本内容
                 image_paths: 图片路径列表，支持本地路径和https链接
                 topics: 话题关键词列表（可选）
+                account: 发布账号（可选），不指定时自动选择负载最低的账号
 
             Returns:
                 Dict[str, Any]: 发布结果，包含笔记ID和发布时间等信息
             """
             params = PublishImageInput(
-                content=content, image_paths=image_paths, topics=topics
+                content=content, image_paths=image_paths, topics=topics, account=account
             )
-            result = self.executor.publish_image(params)
+            result = await self.publish_pool.run(self.executor.publish_image, params)
             return result.dict()
 
         @mcp_server.tool(
             name="publish_video",
-            description="发布视频笔记到小红书平台，支持自定义封面和话题标签",
+            description="发布视频笔记到小红书平台，支持自定义封面和话题标签，视频和封面可为http(s)链接",
         )
-        def publish_video(
+        @timed_tool("publish_video")
+        async def publish_video(
             content: str,
             video_path: str,
             cover_path: Optional[str] = None,
             topics: Optional[List[str]] = None,
+            video_sha256: Optional[str] = None,
+            account: Optional[str] = None,
         ) -> Dict[str, Any]:
             """
             发布视频笔记到小红书
 
             Args:
                 content: 笔记文本内容
-                video_path: 视频文件路径
-                cover_path: 封面图片路径（可选）
+                video_path: 视频文件路径，支持本地路径和http(s)链接
+                cover_path: 封面图片路径，支持本地路径和http(s)链接（可选）
                 topics: 话题关键词列表（可选）
+                video_sha256: 远程视频的SHA-256摘要，用于下载后校验（可选）
+                account: 发布账号（可选），不指定时自动选择负载最低的账号
 
             Returns:
                 Dict[str, Any]: 发布结果，包含笔记ID和发布时间等信息
@@ -128,25 +313,381 @@ class ToolRegistry:
                 video_path=video_path,
                 cover_path=cover_path,
                 topics=topics,
+                video_sha256=video_sha256,
+                account=account,
             )
-            result = self.executor.publish_video(params)
+            result = await self.publish_pool.run(self.executor.publish_video, params)
             return result.dict()
 
         @mcp_server.tool(
-            name="is_logged_in", description="检查当前小红书账号是否已登录，返回布尔值"
+            name="is_logged_in", description="检查小红书账号是否已登录，返回布尔值"
         )
-        def is_logged_in() -> Dict[str, Any]:
+        @timed_tool("is_logged_in")
+        async def is_logged_in(account: Optional[str] = None) -> Dict[str, Any]:
             """
-            检查当前小红书账号是否已登录
+            检查小红书账号是否已登录
+
+            Args:
+                account: 账号名（可选），不指定时检查所有账号
+
             Returns:
-                Dict[str, Any]: {"logged_in": True/False}
+                Dict[str, Any]: {"logged_in": True/False}，未指定账号时附带各账号状态，
+                任一账号已登录即为 True。结果来自后台会话检查的缓存
             """
             try:
-                status = self.executor.client._is_logged_in()
-                return {"logged_in": status}
+                if account is not None:
+                    state = await self._session(account)
+                    return {"logged_in": bool(state.logged_in), "account": account}
+                names = self.executor.pool.accounts()
+                states = await asyncio.gather(*(self._session(n) for n in names))
+                statuses = [bool(state.logged_in) for state in states]
+                return {
+                    "logged_in": any(statuses),
+                    "accounts": dict(zip(names, statuses)),
+                }
             except Exception as e:
                 return {"status": "error", "message": str(e)}
 
+    def _register_batch_tools(self, mcp_server: "FastMCP") -> None:
+        """
+        注册批量发布工具
+
+        Args:
+            mcp_server: MCP服务器实例
+        """
+        from mcp.server.fastmcp import Context
+
+        @mcp_server.tool(
+            name="publish_batch",
+            description="批量发布文本、图文和视频笔记，下一篇笔记的媒体下载与当前笔记的上传并行执行，"
+            "每篇笔记完成时通过进度通知返回结果",
+        )
+        @timed_tool("publish_batch")
+        async def publish_batch(
+            notes: List[BatchNoteInput], ctx: Context
+        ) -> Dict[str, Any]:
+            """
+            批量发布笔记
+
+            Args:
+                notes: 笔记列表，每项包含 note_type 和对应笔记类型的发布参数
+                ctx: MCP请求上下文，用于发送进度通知
+
+            Returns:
+                Dict[str, Any]: 按输入顺序排列的每篇笔记结果、成功和失败数、总耗时及每分钟发布数
+            """
+            publisher = BatchPublisher(
+                self.executor,
+                self.prepare_pool,
+                self.publish_pool,
+                concurrency=config.get_int("batch_concurrency", 1),
+                prefetch=config.get_int("batch_prefetch", 2),
+            )
+            done = 0
+
+            async def report(item: Dict[str, Any]) -> None:
+                nonlocal done
+                done += 1
+                try:
+                    await ctx.report_progress(
+                        done, len(notes), message=json.dumps(item, ensure_ascii=False)
+                    )
+                except ValueError:
+                    # 不在MCP请求中调用（如测试直接调用）时没有进度通道
+                    pass
+
+            return await publisher.run(
+                [note.dict(exclude_none=True) for note in notes], on_result=report
+            )
+
+    def _register_job_tools(self, mcp_server: "FastMCP") -> None:
+        """
+        注册异步发布任务相关工具
+
+        Args:
+            mcp_server: MCP服务器实例
+        """
+
+        @mcp_server.tool(
+            name="submit_publish",
+            description="提交后台发布任务并立即返回任务ID，任务持久化保存，服务重启后继续执行",
+        )
+        @timed_tool("submit_publish")
+        async def submit_publish(
+            note_type: str,
+            content: str,
+            image_paths: Optional[List[str]] = None,
+            video_path: Optional[str] = None,
+            cover_path: Optional[str] = None,
+            topics: Optional[List[str]] = None,
+            video_sha256: Optional[str] = None,
+            account: Optional[str] = None,
+        ) -> Dict[str, Any]:
+            """
+            提交后台发布任务
+
+            Args:
+                note_type: 笔记类型：text, image 或 video
+                content: 笔记文本内容
+                image_paths: 图片路径列表，图文笔记必填
+                video_path: 视频文件路径，视频笔记必填
+                cover_path: 封面图片路径（可选）
+                topics: 话题关键词列表（可选）
+                video_sha256: 远程视频的SHA-256摘要（可选）
+                account: 发布账号（可选）
+
+            Returns:
+                Dict[str, Any]: {"job_id": 任务ID, "status": "queued"}
+            """
+            fields = {
+                "content": content,
+                "image_paths": image_paths,
+                "video_path": video_path,
+                "cover_path": cover_path,
+                "topics": topics,
+                "video_sha256": video_sha256,
+                "account": account,
+            }
+            try:
+                if note_type not in NOTE_INPUT_MODELS:
+                    raise ValueError(f"不支持的笔记类型: {note_type}")
+                params = NOTE_INPUT_MODELS[note_type](
+                    **{k: v for k, v in fields.items() if v is not None}
+                )
+                # 其他进程负责的账号的任务同样写入共享的任务库，由负责该账号的进程认领执行
+                pool = self.executor.pool
+                if not pool.owned_elsewhere(account):
+                    pool.check(account)
+                job_id = await self.query_pool.run(
+                    self.job_queue.submit,
+                    note_type,
+                    params.dict(exclude_none=True),
+                )
+                self.job_runner.notify()
+                return {"job_id": job_id, "status": "queued"}
+            except Exception as e:
+                return {"status": "error", "message": f"提交发布任务失败: {str(e)}"}
+
+        @mcp_server.tool(
+            name="schedule_publish",
+            description="在指定时间发布笔记：提前下载、预检和预处理媒体，到点只执行上传和创建笔记，"
+            "任务持久化保存，可通过 get_job_status 查询结果和实际发布时间的偏差",
+        )
+        @timed_tool("schedule_publish")
+        async def schedule_publish(
+            note_type: str,
+            content: str,
+            publish_at: str,
+            image_paths: Optional[List[str]] = None,
+            video_path: Optional[str] = None,
+            cover_path: Optional[str] = None,
+            topics: Optional[List[str]] = None,
+            video_sha256: Optional[str] = None,
+            account: Optional[str] = None,
+        ) -> Dict[str, Any]:
+            """
+            提交定时发布任务
+
+            Args:
+                note_type: 笔记类型：text, image 或 video
+                content: 笔记文本内容
+                publish_at: 发布时间，ISO 8601 格式（如 2026-11-11T20:00:00+08:00，不带时区时按服务器本地时间）
+                    或 Unix 时间戳
+                image_paths: 图片路径列表，图文笔记必填
+                video_path: 视频文件路径，视频笔记必填
+                cover_path: 封面图片路径（可选）
+                topics: 话题关键词列表（可选）
+                video_sha256: 远程视频的SHA-256摘要（可选）
+                account: 发布账号（可选）
+
+            Returns:
+                Dict[str, Any]: {"job_id": 任务ID, "status": "scheduled", "publish_at": 发布时间,
+                "stage_at": 开始预处理媒体的时间}
+            """
+            fields = {
+                "content": content,
+                "image_paths": image_paths,
+                "video_path": video_path,
+                "cover_path": cover_path,
+                "topics": topics,
+                "video_sha256": video_sha256,
+                "account": account,
+            }
+            try:
+                if note_type not in NOTE_INPUT_MODELS:
+                    raise ValueError(f"不支持的笔记类型: {note_type}")
+                params = NOTE_INPUT_MODELS[note_type](
+                    **{k: v for k, v in fields.items() if v is not None}
+                )
+                when = parse_publish_at(publish_at)
+                if when <= time.time():
+                    raise ValueError(f"发布时间已过: {publish_at}")
+                # 其他进程负责的账号的定时任务由该进程从任务库中加载并执行
+                pool = self.executor.pool
+                if not pool.owned_elsewhere(account):
+                    pool.check(account)
+                # 写入任务前完成所有可能失败的转换，返回错误时任务一定没有保存，客户端可以安全重试
+                stage_at = max(time.time(), when - self.scheduler.lead_time)
+                reply = {
+                    "status": JOB_SCHEDULED,
+                    "publish_at": datetime.fromtimestamp(when).astimezone().isoformat(),
+                    "stage_at": datetime.fromtimestamp(stage_at)
+                    .astimezone()
+                    .isoformat(),
+                }
+                job_id = await self.query_pool.run(
+                    self.job_queue.schedule,
+                    note_type,
+                    params.dict(exclude_none=True),
+                    when,
+                )
+                if not pool.owned_elsewhere(account):
+                    self.scheduler.add(job_id, when)
+                return {"job_id": job_id, **reply}
+            except Exception as e:
+                return {"status": "error", "message": f"提交定时任务失败: {str(e)}"}
+
+        @mcp_server.tool(
+            name="get_job_status",
+            description="查询后台发布任务的状态和结果",
+        )
+        @timed_tool("get_job_status")
+        async def get_job_status(job_id: str) -> Dict[str, Any]:
+            """
+            查询后台发布任务
+
+            Args:
+                job_id: 任务ID
+
+            Returns:
+                Dict[str, Any]: 任务状态（queued, scheduled, staged, running, success 或 error）、
+                参数和发布结果；定时任务另有 stage_lead（媒体就绪领先发布时间的秒数）、
+                dispatch_lag 和 publish_lag（开始发布、发布完成相对发布时间的偏差秒数）
+            """
+            job = await self.query_pool.run(self.job_queue.get, job_id)
+            if job is None:
+                return {"status": "error", "message": f"任务不存在: {job_id}"}
+            return job
+
+        @mcp_server.tool(
+            name="list_jobs",
+            description="按提交时间倒序列出后台发布任务，可按状态过滤",
+        )
+        @timed_tool("list_jobs")
+        async def list_jobs(
+            status: Optional[str] = None, limit: int = 20
+        ) -> Dict[str, Any]:
+            """
+            列出后台发布任务
+
+            Args:
+                status: 状态过滤：queued, scheduled, staged, running, success 或 error（可选）
+                limit: 最大返回数量，默认20
+
+            Returns:
+                Dict[str, Any]: 任务列表和各状态的任务数
+            """
+            if status is not None and status not in JOB_STATUSES:
+                return {"status": "error", "message": f"不支持的任务状态: {status}"}
+            jobs = await self.query_pool.run(self.job_queue.list, status, limit)
+            counts = await self.query_pool.run(self.job_queue.counts)
+            return {"jobs": jobs, "counts": counts}
+
+    def _register_metrics_endpoint(self, mcp_server: "FastMCP") -> None:
+        """
+        配置了 metrics_path 时，在 SSE 服务器上注册 Prometheus 文本格式的指标路由
+
+        Args:
+            mcp_server: MCP服务器实例
+        """
+        path = config.get("metrics_path")
+        if not path:
+            return
+        from starlette.requests import Request
+        from starlette.responses import PlainTextResponse
+
+        @mcp_server.custom_route(path, methods=["GET"], include_in_schema=False)
+        async def prometheus_metrics(request: Request) -> PlainTextResponse:
+            """
+            输出 Prometheus 文本格式的指标
+
+            Args:
+                request: HTTP 请求
+
+            Returns:
+                PlainTextResponse: 指标文本
+            """
+            return PlainTextResponse(
+                get_metrics().render_prometheus(),
+                media_type="text/plain; version=0.0.4; charset=utf-8",
+            )
+
+    async def _get_note(self, note_id: str) -> Dict[str, Any]:
+        """
+        通过笔记缓存获取笔记，未命中时在 query_pool 中调用读取接口
+
+        Args:
+            note_id: 笔记ID
+
+        Returns:
+            Dict[str, Any]: 笔记详细信息
+        """
+
+        async def load() -> Dict[str, Any]:
+            # 使用执行器的客户端实例
+            client = self.executor.client
+            return await self.query_pool.run(client.get_note_by_id, note_id)
+
+        return await self.note_cache.get(note_id, load)
+
+    def _register_fetch_tools(self, mcp_server: "FastMCP") -> None:
+        """
+        注册批量获取笔记工具
+
+        Args:
+            mcp_server: MCP服务器实例
+        """
+        from mcp.server.fastmcp import Context
+
+        @mcp_server.tool(
+            name="fetch_notes",
+            description=f"批量获取多篇小红书笔记的详细信息（最多 {MAX_NOTES} 篇），"
+            "每篇笔记获取完成时通过进度通知返回，部分笔记失败时返回已获取的笔记和每篇的错误",
+        )
+        @timed_tool("fetch_notes")
+        async def fetch_notes(note_ids: List[str], ctx: Context) -> Dict[str, Any]:
+            """
+            批量获取笔记
+
+            Args:
+                note_ids: 笔记ID列表，重复的ID只获取一次
+                ctx: MCP请求上下文，用于发送进度通知
+
+            Returns:
+                Dict[str, Any]: 笔记ID到笔记信息的映射、笔记ID到错误的映射、成功和失败数及总耗时
+            """
+            fetcher = NoteFetcher(
+                self._get_note, concurrency=config.get_int("fetch_concurrency", 3)
+            )
+            done = 0
+            total = len(set(note_ids))
+
+            async def report(item: Dict[str, Any]) -> None:
+                nonlocal done
+                done += 1
+                try:
+                    await ctx.report_progress(
+                        done, total, message=json.dumps(item, ensure_ascii=False)
+                    )
+                except ValueError:
+                    # 不在MCP请求中调用（如测试直接调用）时没有进度通道
+                    pass
+
+            try:
+                return await fetcher.run(note_ids, on_result=report)
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+
     def _register_resource_tools(self, mcp_server: "FastMCP") -> None:
         """
         注册资源相关工具
@@ -160,7 +701,7 @@ class ToolRegistry:
             name="小红书笔记资源",
             description="获取小红书笔记的详细信息，包含内容、图片和作者等数据",
         )
-        def get_note(note_id: str) -> Dict[str, Any]:
+        async def get_note(note_id: str) -> Dict[str, Any]:
             """
             获取小红书笔记元数据（只读资源）
 
@@ -170,11 +711,9 @@ class ToolRegistry:
             Returns:
                 Dict[str, Any]: 笔记详细信息，包含内容、图片和作者等数据
             """
+
             try:
-                # 使用执行器的客户端实例
-                client = self.executor.client
-                note_data = client.get_note_by_id(note_id)
-                return note_data
+                return await self._get_note(note_id)
             except Exception as e:
                 return {
                     "status": "error",
@@ -187,7 +726,7 @@ class ToolRegistry:
             name="小红书用户资源",
             description="获取当前登录的小红书用户的详细信息，包含昵称、头像和粉丝数等数据",
         )
-        def get_user_info() -> Dict[str, Any]:
+        async def get_user_info() -> Dict[str, Any]:
             """
             获取当前用户信息（只读资源）
 
@@ -195,9 +734,105 @@ class ToolRegistry:
                 Dict[str, Any]: 用户详细信息，包含昵称、头像和粉丝数等数据
             """
             try:
-                # 使用执行器的客户端实例
-                client = self.executor.client
-                user_info = client.get_self_info()
-                return user_info
+                state = await self._session()
+                if not state.user_info:
+                    return {
+                        "status": "error",
+                        "message": f"获取用户信息失败: {state.error or '未登录'}",
+                    }
+                return state.user_info
             except Exception as e:
                 return {"status": "error", "message": f"获取用户信息失败: {str(e)}"}
+
+        @mcp_server.resource(
+            "xhs-user://{account}",
+            name="小红书账号用户资源",
+            description="获取指定账号的小红书用户详细信息",
+        )
+        async def get_account_user_info(account: str) -> Dict[str, Any]:
+            """
+            获取指定账号的用户信息（只读资源）
+
+            Args:
+                account: 账号名
+
+            Returns:
+                Dict[str, Any]: 用户详细信息
+            """
+            try:
+                state = await self._session(account)
+                if not state.user_info:
+                    return {
+                        "status": "error",
+                        "message": f"获取用户信息失败: {state.error or '未登录'}",
+                        "account": account,
+                    }
+                return state.user_info
+            except Exception as e:
+                return {
+                    "status": "error",
+                    "message": f"获取用户信息失败: {str(e)}",
+                    "account": account,
+                }
+
+        @mcp_server.resource(
+            "xhs-accounts://",
+            name="小红书账号池资源",
+            description="列出已加载的账号及其健康状态、会话状态和当前负载",
+        )
+        async def list_accounts() -> Dict[str, Any]:
+            """
+            获取账号池状态（只读资源）
+
+            Returns:
+                Dict[str, Any]: 各账号的健康状态、进行中和已完成的请求数
+            """
+            return {"accounts": self.executor.pool.stats()}
+
+        @mcp_server.resource(
+            "xhs-cache://",
+            name="小红书缓存统计资源",
+            description="笔记缓存的命中、陈旧命中、未命中和合并请求次数，以及当前条目数；"
+            "上传去重索引的条目数和复用次数",
+        )
+        async def get_cache_stats() -> Dict[str, Any]:
+            """
+            获取缓存统计（只读资源）
+
+            Returns:
+                Dict[str, Any]: 各缓存的统计信息，未启用上传索引时不含 uploads
+            """
+            stats = {"note": self.note_cache.stats()}
+            index = get_upload_index()
+            if index is not None:
+                stats["uploads"] = index.stats()
+            return stats
+
+        @mcp_server.resource(
+            "xhs-rate-limits://",
+            name="小红书限流状态资源",
+            description="列出各账号各接口类别的令牌桶余量、排队数和累计等待时间，用于调整限流配置",
+        )
+        async def list_rate_limits() -> Dict[str, Any]:
+            """
+            获取限流状态（只读资源）
+
+            Returns:
+                Dict[str, Any]: 各令牌桶的配置、当前令牌数、排队数和等待时间统计
+            """
+            return {"buckets": get_rate_limiter().stats()}
+
+        @mcp_server.resource(
+            "xhs-metrics://",
+            name="小红书运行指标资源",
+            description="各工具、发布阶段（预检、下载、预处理、上传、创建笔记）和小红书 API 调用的"
+            "调用数、失败数、进行中数量以及耗时的平均值、p50/p95/p99 和最大值",
+        )
+        async def get_metrics_snapshot() -> Dict[str, Any]:
+            """
+            获取运行指标（只读资源）
+
+            Returns:
+                Dict[str, Any]: tool、stage、upstream 三个类别的耗时和调用统计，以及运行时长
+            """
+            return get_metrics().snapshot()
@@ -1,11 +1,11 @@
 """
 Cookie管理工具
 
-提供cookie的加载、保存和验证功能
+提供cookie的加载、解析和验证功能
 """
 
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 def load_cookie(cookie_path: str) -> Optional[str]:
@@ -25,9 +25,41 @@ def load_cookie(cookie_path: str) -> Optional[str]:
     return None
 
 
+def parse_cookie(cookie: str) -> Dict[str, str]:
+    """
+    将 "k1=v1; k2=v2" 格式的cookie字符串解析为字典
+
+    Args:
+        cookie: cookie字符串
+
+    Returns:
+        Dict[str, str]: cookie 键值对，忽略没有等号或键为空的片段，重复的键以最后一次为准
+    """
+    cookies = {}
+    for part in cookie.split(";"):
+        key, sep, value = part.strip().partition("=")
+        key = key.strip()
+        if sep and key:
+            cookies[key] = value.strip()
+    return cookies
+
+
+def format_cookie(cookies: Dict[str, str]) -> str:
+    """
+    将cookie字典格式化为请求头使用的字符串
+
+    Args:
+        cookies: cookie 键值对
+
+    Returns:
+        str: "k1=v1; k2=v2" 格式的字符串
+    """
+    return "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+
 def cookie_valid(cookie: str, required_keys: List[str]) -> bool:
     """
-    检查cookie是否包含必要字段。
+    检查cookie是否包含必要字段且值不为空。
 
     Args:
         cookie: cookie字符串
@@ -36,10 +68,8 @@ def cookie_valid(cookie: str, required_keys: List[str]) -> bool:
     Returns:
         bool: 全部包含返回True，否则False
     """
-    for key in required_keys:
-        if key not in cookie:
-            return False
-    return True
+    cookies = parse_cookie(cookie)
+    return all(cookies.get(key) for key in required_keys)
 
 
 def get_cookie_dir() -> str:
@@ -0,0 +1,297 @@
+"""
+异步日志写入
+
+日志行放入队列后立即返回，由后台线程批量写入并刷新文件；
+文件超过大小上限或跨越轮转周期时轮转，旧文件压缩为 .gz 并只保留最近的若干个
+"""
+
+import atexit
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+# 队列中的停止标记
+_STOP = object()
+
+
+class LogWriter:
+    """
+    后台日志写入器
+
+    文件保持打开状态，每批日志只写入和刷新一次；队列空闲 flush_interval 秒后也会刷新。
+    写入失败时丢弃日志，不影响调用方
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        rotate_interval: float = 86400.0,
+        backup_count: int = 7,
+        flush_interval: float = 1.0,
+        batch_size: int = 512,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        初始化日志写入器
+
+        Args:
+            path: 日志文件路径
+            max_bytes: 单个日志文件的大小上限（字节），0 表示不按大小轮转
+            rotate_interval: 轮转周期（秒），按周期边界对齐，0 表示不按时间轮转
+            backup_count: 保留的压缩旧日志数量
+            flush_interval: 队列空闲时的刷新间隔（秒）
+            batch_size: 每批最多写入的日志行数
+            clock: 时间函数，默认 time.time
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._file: Optional[TextIO] = None
+        self._size = 0
+        self._period = 0
+        self._counters = {"written": 0, "batches": 0, "rotations": 0, "errors": 0}
+
+    def write(self, line: str) -> None:
+        """
+        写入一行日志（不含换行符），立即返回
+
+        Args:
+            line: 日志行
+        """
+        if self._closed:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put(line)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        等待已提交的日志全部写入文件
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 在超时前写入完成返回 True
+        """
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        写入剩余日志并停止后台线程
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取写入统计
+
+        Returns:
+            Dict[str, Any]: 已写入行数、批次数、轮转次数、写入失败次数和队列长度
+        """
+        return {**self._counters, "queued": self._queue.qsize()}
+
+    def _start(self) -> None:
+        """首次写入时启动后台线程"""
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="xhs-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        """后台线程主循环：取出一批日志，写入并刷新"""
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = [entry for entry in batch if isinstance(entry, str)]
+            if lines:
+                self._write_batch(lines)
+            for entry in batch:
+                if isinstance(entry, threading.Event):
+                    entry.set()
+            if any(entry is _STOP for entry in batch):
+                self._close_file()
+                return
+
+    def _write_batch(self, lines: List[str]) -> None:
+        """写入一批日志，必要时先轮转文件"""
+        data = "\n".join(lines) + "\n"
+        size = len(data.encode("utf-8"))
+        try:
+            if self._file is None:
+                self._open()
+            if self._should_rotate(size):
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += size
+            self._counters["written"] += len(lines)
+            self._counters["batches"] += 1
+        except Exception:
+            # 写入失败时丢弃本批日志，下次写入时重新打开文件
+            self._counters["errors"] += 1
+            self._close_file()
+
+    def _period_of(self, timestamp: float) -> int:
+        """计算时间戳所在的轮转周期序号"""
+        if self.rotate_interval <= 0:
+            return 0
+        return int(timestamp // self.rotate_interval)
+
+    def _open(self) -> None:
+        """打开日志文件，已存在的文件按其修改时间确定所在周期"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        try:
+            st = os.stat(self.path)
+            self._size, self._period = st.st_size, self._period_of(st.st_mtime)
+        except OSError:
+            self._size, self._period = 0, self._period_of(self.clock())
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _should_rotate(self, incoming: int) -> bool:
+        """判断写入 incoming 字节前是否需要轮转"""
+        if self._size == 0:
+            return False
+        if self.max_bytes > 0 and self._size + incoming > self.max_bytes:
+            return True
+        return self._period_of(self.clock()) != self._period
+
+    def _rotate(self) -> None:
+        """关闭当前文件，压缩为带时间戳的 .gz 文件，清理多余的旧日志后重新打开"""
+        self._close_file()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.clock()))
+        target = f"{self.path}.{stamp}.gz"
+        suffix = 1
+        while os.path.exists(target):
+            target = f"{self.path}.{stamp}-{suffix}.gz"
+            suffix += 1
+        with open(self.path, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.path)
+        self._counters["rotations"] += 1
+        self._prune()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size, self._period = 0, self._period_of(self.clock())
+
+    def _prune(self) -> None:
+        """只保留最近的 backup_count 个压缩日志"""
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        backups = sorted(
+            (
+                os.path.join(directory, name)
+                for name in os.listdir(directory)
+                if name.startswith(prefix) and name.endswith(".gz")
+            ),
+            key=os.path.getmtime,
+        )
+        for path in backups[: max(0, len(backups) - self.backup_count)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _close_file(self) -> None:
+        """关闭当前文件"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+
+def _setting(key: str, default: Any, cast: Callable[[Any], Any]) -> Any:
+    """
+    读取日志配置项
+
+    不使用 config.get_int/get_float，它们在值无效时写日志，会在创建写入器时递归
+    """
+    from ..config import config
+
+    try:
+        return cast(config.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+_writer: Optional[LogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def default_log_path() -> str:
+    """
+    获取默认日志文件路径
+
+    Returns:
+        str: ~/.mcp_xhs_publisher/logs/mcp_xhs_publisher.log，目录无法创建时使用 /tmp；
+        多进程运行时每个服务器进程写入 mcp_xhs_publisher.worker-<序号>.log，避免轮转时互相覆盖
+    """
+    from ..server_workers import worker_path
+
+    log_dir = os.path.expanduser("~/.mcp_xhs_publisher/logs")
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+    except Exception:
+        # 如果无法创建目录，则回退到临时目录
+        log_dir = "/tmp"
+    return worker_path(os.path.join(log_dir, "mcp_xhs_publisher.log"))
+
+
+def get_log_writer() -> LogWriter:
+    """
+    获取进程内共享的日志写入器，首次调用时按配置创建并在退出时写入剩余日志
+
+    Returns:
+        LogWriter: 使用 log_max_bytes、log_rotate_interval、log_backup_count
+        和 log_flush_interval 配置的写入器
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter(
+                default_log_path(),
+                max_bytes=_setting("log_max_bytes", 10 * 1024 * 1024, int),
+                rotate_interval=_setting("log_rotate_interval", 86400.0, float),
+                backup_count=_setting("log_backup_count", 7, int),
+                flush_interval=_setting("log_flush_interval", 1.0, float),
+            )
+            atexit.register(_writer.close)
+        return _writer
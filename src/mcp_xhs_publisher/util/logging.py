@@ -1,16 +1,19 @@
 """
 日志工具
 
-提供统一的日志记录功能，使用JSON格式输出
+提供统一的日志记录功能，使用JSON格式输出；MCP模式下日志由后台线程批量写入文件
 """
 
 import json
 import logging
-import os
 import sys
 import time
 from typing import Any, Dict, Optional
 
+from ..config import config
+from .log_writer import get_log_writer
+from .tracing import current_trace_id
+
 
 class JsonFormatter(logging.Formatter):
     """JSON格式的日志格式化器"""
@@ -22,16 +25,17 @@ class JsonFormatter(logging.Formatter):
             "level": record.levelname,
             "logger": record.name,
         }
-        # 尝试将 message 反序列化为 dict，避免重复转义
+        # 看起来是 JSON 对象的 message 反序列化为 dict，避免重复转义；普通文本不尝试解析
         msg = record.getMessage()
-        try:
-            msg_obj = json.loads(msg)
+        log_data["message"] = msg
+        if msg[:1] == "{" and msg[-1:] == "}":
+            try:
+                msg_obj = json.loads(msg)
+            except ValueError:
+                msg_obj = None
             if isinstance(msg_obj, dict):
+                del log_data["message"]
                 log_data.update(msg_obj)
-            else:
-                log_data["message"] = msg
-        except Exception:
-            log_data["message"] = msg
 
         # 添加异常信息（如果有）
         if record.exc_info:
@@ -40,10 +44,34 @@ class JsonFormatter(logging.Formatter):
         # 添加自定义字段（如果有）
         if hasattr(record, "data") and record.data:
             log_data.update(record.data)
+        _add_trace_id(log_data)
 
         return json.dumps(log_data, ensure_ascii=False)
 
 
+class BufferedLogHandler(logging.Handler):
+    """在调用线程格式化日志，交给后台写入器写入文件的处理器"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """格式化日志并放入写入队列"""
+        try:
+            get_log_writer().write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        """等待已提交的日志写入文件"""
+        get_log_writer().flush()
+
+
+def _add_trace_id(log_data: Dict[str, Any]) -> None:
+    """在追踪中记录的日志附带追踪ID，便于按请求检索"""
+    if "trace_id" not in log_data:
+        trace_id = current_trace_id()
+        if trace_id:
+            log_data["trace_id"] = trace_id
+
+
 def setup_logger(name: str = "mcp_xhs_publisher", level: int = None) -> logging.Logger:
     """
     设置并返回一个配置好的logger，使用JSON格式输出
@@ -57,13 +85,7 @@ def setup_logger(name: str = "mcp_xhs_publisher", level: int = None) -> logging.
     """
     # 如果未指定日志级别，从配置中获取
     if level is None:
-        try:
-            from .config_loader import get_log_level_from_config
-
-            level = get_log_level_from_config()
-        except (ImportError, ValueError):
-            # 如果无法导入或无法获取配置，使用默认值
-            level = logging.INFO
+        level = config.get_log_level()
 
     # 禁用根日志器，防止日志输出到stdout
     logging.getLogger().handlers = []
@@ -73,18 +95,8 @@ def setup_logger(name: str = "mcp_xhs_publisher", level: int = None) -> logging.
 
     # 在MCP模式下输出到日志文件，而不是stderr
     if in_mcp_mode:
-        # 创建日志目录
-        log_dir = os.path.expanduser("~/.mcp_xhs_publisher/logs")
-        if not os.path.exists(log_dir):
-            try:
-                os.makedirs(log_dir)
-            except Exception:
-                # 如果无法创建目录，则回退到临时目录
-                log_dir = "/tmp"
-
-        # 使用日志文件
-        log_file = os.path.join(log_dir, "mcp_xhs_publisher.log")
-        handler = logging.FileHandler(log_file, encoding="utf-8")
+        # 使用后台写入的日志文件
+        handler = BufferedLogHandler()
     else:
         # 在终端模式下使用stderr
         handler = logging.StreamHandler(sys.stderr)
@@ -156,6 +168,7 @@ def log_info(message: str, logger: Optional[logging.Logger] = None, **data) -> N
             log_data = {"timestamp": time.time(), "level": "INFO", "message": message}
             if data:
                 log_data.update(data)
+            _add_trace_id(log_data)
             print(json.dumps(log_data, ensure_ascii=False), file=sys.stderr)
 
 
@@ -184,6 +197,7 @@ def log_error(message: str, logger: Optional[logging.Logger] = None, **data) ->
             log_data = {"timestamp": time.time(), "level": "ERROR", "message": message}
             if data:
                 log_data.update(data)
+            _add_trace_id(log_data)
             print(json.dumps(log_data, ensure_ascii=False), file=sys.stderr)
 
 
@@ -212,40 +226,32 @@ def log_debug(message: str, logger: Optional[logging.Logger] = None, **data) ->
             log_data = {"timestamp": time.time(), "level": "DEBUG", "message": message}
             if data:
                 log_data.update(data)
+            _add_trace_id(log_data)
             print(json.dumps(log_data, ensure_ascii=False), file=sys.stderr)
 
 
 def _log_to_file(level: str, message: str, data: Dict[str, Any]) -> None:
     """
-    将日志写入文件
+    将日志放入后台写入队列
 
     Args:
         level: 日志级别
         message: 日志消息
         data: 附加数据
     """
-    log_dir = os.path.expanduser("~/.mcp_xhs_publisher/logs")
-    if not os.path.exists(log_dir):
-        try:
-            os.makedirs(log_dir)
-        except Exception:
-            # 如果无法创建目录，则回退到临时目录
-            log_dir = "/tmp"
-
-    log_file = os.path.join(log_dir, "mcp_xhs_publisher.log")
-
     # 构造日志数据
     log_data = {"timestamp": time.time(), "level": level, "message": message}
     if data:
         log_data.update(data)
+    _add_trace_id(log_data)
 
-    # 写入日志文件
+    # 在调用线程序列化，避免后台写入时 data 中的对象已被修改
     try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(log_data, ensure_ascii=False) + "\n")
+        line = json.dumps(log_data, ensure_ascii=False, default=str)
     except Exception:
-        # 如果写入失败，无需进一步处理
-        pass
+        # 如果序列化失败，无需进一步处理
+        return
+    get_log_writer().write(line)
 
 
 # 默认logger实例
@@ -0,0 +1,301 @@
+"""
+运行指标
+
+记录 MCP 工具、发布流程各阶段和小红书 API 调用的耗时分布、调用次数和进行中的数量，
+以字典形式供 xhs-metrics:// 资源读取，或渲染为 Prometheus 文本格式
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple, TypeVar
+
+from .tracing import Span, span
+
+# 耗时分桶上限（秒），覆盖从本地检查到视频上传的范围
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# 指标类别 -> (Prometheus 标签名, 说明)
+TOOL = "tool"
+STAGE = "stage"
+UPSTREAM = "upstream"
+FAMILIES = {
+    TOOL: ("tool", "MCP 工具调用"),
+    STAGE: ("stage", "发布流程阶段"),
+    UPSTREAM: ("call", "小红书 API 调用"),
+}
+
+T = TypeVar("T")
+
+
+class _Series:
+    """单个名称的耗时直方图、成功/失败次数和进行中的数量"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.max = 0.0
+        self.ok = 0
+        self.errors = 0
+        self.in_flight = 0
+
+    def observe(self, seconds: float, ok: bool) -> None:
+        """记录一次调用"""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        if ok:
+            self.ok += 1
+        else:
+            self.errors += 1
+
+    @property
+    def count(self) -> int:
+        """已完成的调用次数"""
+        return self.ok + self.errors
+
+    def quantile(self, q: float) -> float:
+        """按分桶线性插值估算分位数，落在 +Inf 桶时返回最大值"""
+        total = self.count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.max
+                upper = min(self.buckets[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            if i < len(self.buckets):
+                lower = self.buckets[i]
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """汇总统计"""
+        count = self.count
+        return {
+            "calls": count,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "mean": round(self.sum / count, 6) if count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class Metrics:
+    """
+    进程内指标注册表
+
+    各类别下的名称在首次记录时创建，所有操作由一把锁保护，记录一次调用只做几次整数运算
+    """
+
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """
+        初始化指标注册表
+
+        Args:
+            buckets: 耗时分桶上限（秒），升序
+            clock: 计时函数，默认 time.perf_counter
+        """
+        self.buckets = tuple(buckets)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._series: Dict[str, Dict[str, _Series]] = {f: {} for f in FAMILIES}
+        self._started = time.time()
+
+    def _get(self, family: str, name: str) -> _Series:
+        """获取或创建序列，调用方持有锁"""
+        series = self._series[family].get(name)
+        if series is None:
+            series = self._series[family][name] = _Series(self.buckets)
+        return series
+
+    def observe(self, family: str, name: str, seconds: float, ok: bool = True) -> None:
+        """
+        记录一次已完成的调用
+
+        Args:
+            family: 类别：tool、stage 或 upstream
+            name: 工具名、阶段名或 API 方法名
+            seconds: 耗时（秒）
+            ok: 是否成功
+        """
+        with self._lock:
+            self._get(family, name).observe(seconds, ok)
+
+    @contextmanager
+    def track(self, family: str, name: str) -> Iterator[Span]:
+        """
+        计时一次调用，期间计入进行中的数量，并在当前追踪中记录名为 <类别>.<名称> 的 span；
+        抛出异常或调用 Span.fail 时记为失败
+
+        Args:
+            family: 类别：tool、stage 或 upstream
+            name: 工具名、阶段名或 API 方法名
+
+        Yields:
+            Span: 本次调用的 span
+        """
+        with self._lock:
+            self._get(family, name).in_flight += 1
+        start = self.clock()
+        with span(f"{family}.{name}") as current:
+            try:
+                yield current
+            except BaseException:
+                current.failed = True
+                raise
+            finally:
+                elapsed = self.clock() - start
+                with self._lock:
+                    series = self._get(family, name)
+                    series.in_flight -= 1
+                    series.observe(elapsed, not current.failed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取各类别的汇总统计
+
+        Returns:
+            Dict[str, Any]: 运行时长，以及每个类别下各名称的调用数、失败数、进行中数量、
+            平均耗时、p50/p95/p99 估算值和最大耗时（秒）
+        """
+        with self._lock:
+            result: Dict[str, Any] = {
+                family: {name: s.summary() for name, s in sorted(series.items())}
+                for family, series in self._series.items()
+            }
+        result["uptime"] = round(time.time() - self._started, 3)
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        渲染为 Prometheus 文本格式（0.0.4）
+
+        每个类别输出 xhs_<类别>_duration_seconds 直方图、xhs_<类别>_calls_total 计数器
+        （按 status 区分 ok 和 error）和 xhs_<类别>_in_flight 仪表
+
+        Returns:
+            str: 指标文本
+        """
+        lines: List[str] = []
+        with self._lock:
+            for family, series in self._series.items():
+                label, help_text = FAMILIES[family]
+                prefix = f"xhs_{family}"
+                items = sorted(series.items())
+
+                lines.append(f"# HELP {prefix}_duration_seconds {help_text}耗时（秒）")
+                lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+                for name, s in items:
+                    base = f'{label}="{_escape(name)}"'
+                    cumulative = 0
+                    for bound, n in zip(self.buckets + (float("inf"),), s.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(
+                            f'{prefix}_duration_seconds_bucket{{{base},le="{le}"}} '
+                            f"{cumulative}"
+                        )
+                    lines.append(f"{prefix}_duration_seconds_sum{{{base}}} {s.sum!r}")
+                    lines.append(f"{prefix}_duration_seconds_count{{{base}}} {s.count}")
+
+                lines.append(f"# HELP {prefix}_calls_total {help_text}次数")
+                lines.append(f"# TYPE {prefix}_calls_total counter")
+                for name, s in items:
+                    base = f'{label}="{_escape(name)}"'
+                    lines.append(f'{prefix}_calls_total{{{base},status="ok"}} {s.ok}')
+                    lines.append(
+                        f'{prefix}_calls_total{{{base},status="error"}} {s.errors}'
+                    )
+
+                lines.append(f"# HELP {prefix}_in_flight 进行中的{help_text}数量")
+                lines.append(f"# TYPE {prefix}_in_flight gauge")
+                for name, s in items:
+                    lines.append(
+                        f'{prefix}_in_flight{{{label}="{_escape(name)}"}} {s.in_flight}'
+                    )
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """清空所有指标"""
+        with self._lock:
+            self._series = {f: {} for f in FAMILIES}
+            self._started = time.time()
+
+
+def _escape(value: str) -> str:
+    """转义 Prometheus 标签值"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """
+    获取进程内共享的指标注册表
+
+    Returns:
+        Metrics: 指标注册表
+    """
+    return _metrics
+
+
+def timed_tool(
+    name: str,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    为异步工具处理器计时的装饰器，返回 status 为 error 的结果时记为失败；
+    工具调用是追踪的根，处理器内的步骤都记录在这条追踪下
+
+    保留原函数的签名，需放在 mcp_server.tool 装饰器之下
+
+    Args:
+        name: 工具名
+
+    Returns:
+        装饰器
+    """
+
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with _metrics.track(TOOL, name) as current:
+                result = await fn(*args, **kwargs)
+                if isinstance(result, dict) and result.get("status") == "error":
+                    current.fail(result.get("message") or result.get("error"))
+                return result
+
+        return wrapper
+
+    return decorator
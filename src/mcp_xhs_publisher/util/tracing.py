@@ -0,0 +1,350 @@
+"""
+请求追踪
+
+每次工具调用（以及后台任务）创建一条追踪，发布流程中的各个步骤作为嵌套的 span 记录耗时。
+当前 span 保存在 contextvars 中，随 WorkerPool 和下载线程传递；追踪结束时，
+耗时超过 trace_slow_ms 的调用将完整的 span 树写入日志，
+配置 trace_export_path 时每条追踪以 OTLP/JSON 格式追加到该文件
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from ..config import config
+
+T = TypeVar("T")
+
+# span 树中错误信息的最大长度
+MAX_ERROR_LENGTH = 500
+
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar(
+    "xhs_span", default=None
+)
+
+
+class Span:
+    """一个被计时的步骤，没有父 span 时为一条追踪的根"""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        """
+        初始化 span
+
+        Args:
+            name: 步骤名称
+            parent: 父 span，None 表示新建追踪
+            attributes: 附加属性
+        """
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.failed = False
+        self.children: List[Span] = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        if parent is not None:
+            with parent._lock:
+                parent.children.append(self)
+
+    def set(self, **attributes: Any) -> None:
+        """
+        设置附加属性
+
+        Args:
+            **attributes: 属性键值对
+        """
+        self.attributes.update(attributes)
+
+    def fail(self, error: Optional[str] = None) -> None:
+        """
+        标记失败
+
+        Args:
+            error: 错误信息（可选）
+        """
+        self.failed = True
+        if error:
+            self.error = error[:MAX_ERROR_LENGTH]
+
+    def finish(self) -> None:
+        """记录结束时间"""
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为嵌套的 span 树
+
+        Returns:
+            Dict[str, Any]: 名称、耗时（毫秒）、状态、属性和子 span，子 span 按开始时间排序
+        """
+        with self._lock:
+            children = sorted(self.children, key=lambda child: child._start)
+        node: Dict[str, Any] = {
+            "name": self.name,
+            "ms": round((self.duration or 0.0) * 1000, 1),
+            "status": "error" if self.failed else "ok",
+        }
+        if self.error:
+            node["error"] = self.error
+        if self.attributes:
+            node["attributes"] = self.attributes
+        if children:
+            node["children"] = [child.to_dict() for child in children]
+        return node
+
+    def walk(self) -> Iterator["Span"]:
+        """按深度优先顺序遍历自身和所有子 span"""
+        yield self
+        with self._lock:
+            children = list(self.children)
+        for child in children:
+            yield from child.walk()
+
+
+def current_span() -> Optional[Span]:
+    """
+    获取当前 span
+
+    Returns:
+        Optional[Span]: 当前 span，不在追踪中时返回None
+    """
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """
+    获取当前追踪ID，用于关联日志
+
+    Returns:
+        Optional[str]: 追踪ID，不在追踪中时返回None
+    """
+    current = _current.get()
+    return current.trace_id if current is not None else None
+
+
+def annotate(**attributes: Any) -> None:
+    """
+    为当前 span 设置属性，不在追踪中时忽略
+
+    Args:
+        **attributes: 属性键值对
+    """
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    记录一个步骤，当前没有 span 时开始一条新的追踪
+
+    抛出异常时标记为失败；根 span 结束时按配置写入慢调用日志和导出文件
+
+    Args:
+        name: 步骤名称
+        **attributes: 附加属性
+
+    Yields:
+        Span: 本步骤的 span
+    """
+    parent = _current.get()
+    current = Span(name, parent, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.finish()
+        _current.reset(token)
+        if parent is None:
+            _finish_trace(current)
+
+
+def bind(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    将函数绑定到调用方的 contextvars 上下文，提交到其它线程池执行时子 span 仍挂在当前 span 下
+
+    Args:
+        fn: 要在其它线程执行的函数
+
+    Returns:
+        在当前上下文副本中执行 fn 的函数
+    """
+    ctx = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> T:
+        # 每次调用使用独立的副本，绑定后的函数可以在多个线程中同时执行
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+def _finish_trace(root: Span) -> None:
+    """追踪结束：慢调用写入 span 树，配置了导出文件时导出"""
+    slow_ms = config.get_float("trace_slow_ms", 5000.0)
+    duration_ms = (root.duration or 0.0) * 1000
+    if 0 < slow_ms <= duration_ms:
+        from .logging import log_info
+
+        log_info(
+            "慢调用",
+            trace_id=root.trace_id,
+            name=root.name,
+            ms=round(duration_ms, 1),
+            threshold_ms=slow_ms,
+            spans=root.to_dict(),
+        )
+    exporter = get_span_exporter()
+    if exporter is not None:
+        exporter.export(root)
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    """转换为 OTLP/JSON 的 AnyValue"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON 中 64 位整数编码为字符串
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    return {"stringValue": json.dumps(value, ensure_ascii=False, default=str)}
+
+
+def to_otlp(root: Span, service_name: str = "mcp-xhs-publisher") -> Dict[str, Any]:
+    """
+    将一条追踪转换为 OTLP/JSON 的 ExportTraceServiceRequest
+
+    Args:
+        root: 根 span
+        service_name: service.name 资源属性
+
+    Returns:
+        Dict[str, Any]: 可直接由 OpenTelemetry Collector 的 otlpjsonfile 接收器读取的对象
+    """
+    spans = []
+    for item in root.walk():
+        start_ns = int(item.start_time * 1e9)
+        end_ns = start_ns + int((item.duration or 0.0) * 1e9)
+        otlp_span: Dict[str, Any] = {
+            "traceId": item.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [
+                {"key": key, "value": _attribute_value(value)}
+                for key, value in item.attributes.items()
+            ],
+            # STATUS_CODE_OK / STATUS_CODE_ERROR
+            "status": (
+                {"code": 2, "message": item.error or ""} if item.failed else {"code": 1}
+            ),
+        }
+        if item.parent is not None:
+            otlp_span["parentSpanId"] = item.parent.span_id
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [
+                    {"scope": {"name": "mcp_xhs_publisher"}, "spans": spans}
+                ],
+            }
+        ]
+    }
+
+
+class SpanExporter:
+    """
+    追踪导出器
+
+    每条追踪序列化为一行 OTLP/JSON，交给后台日志写入器追加到文件，文件按大小和时间轮转
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化导出器
+
+        Args:
+            path: 导出文件路径
+        """
+        from .log_writer import LogWriter
+
+        self.path = path
+        self._writer = LogWriter(path)
+
+    def export(self, root: Span) -> None:
+        """
+        导出一条追踪，立即返回
+
+        Args:
+            root: 根 span
+        """
+        self._writer.write(json.dumps(to_otlp(root), ensure_ascii=False, default=str))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        等待已导出的追踪写入文件
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 在超时前写入完成返回 True
+        """
+        return self._writer.flush(timeout)
+
+    def close(self) -> None:
+        """写入剩余追踪并停止后台线程"""
+        self._writer.close()
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_span_exporter() -> Optional[SpanExporter]:
+    """
+    获取进程内共享的追踪导出器
+
+    Returns:
+        Optional[SpanExporter]: 配置了 trace_export_path 时返回导出器，否则返回None；
+        配置的路径变化时重新创建，多进程运行时每个服务器进程写入各自的文件
+    """
+    global _exporter
+    from ..server_workers import worker_path
+
+    path = config.get("trace_export_path")
+    if not path:
+        return None
+    path = worker_path(os.path.expanduser(path))
+    with _exporter_lock:
+        if _exporter is None or _exporter.path != path:
+            if _exporter is not None:
+                _exporter.close()
+            _exporter = SpanExporter(path)
+            atexit.register(_exporter.close)
+        return _exporter
@@ -0,0 +1,166 @@
+"""
+异步 TTL/LRU 缓存
+
+条目数有上限，按最近访问顺序淘汰；过期后的一段时间内先返回旧值并在后台刷新
+（stale-while-revalidate）；同一个键的并发未命中共享一次加载（single-flight）
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from .logging import log_error
+
+V = TypeVar("V")
+Loader = Callable[[], Awaitable[V]]
+
+
+class AsyncTTLCache(Generic[V]):
+    """
+    异步 TTL/LRU 缓存
+
+    - 写入后 ttl 秒内为新鲜，直接返回
+    - ttl 到 ttl + stale_ttl 秒之间为陈旧，返回旧值并在后台刷新
+    - 超过 ttl + stale_ttl 秒视为未命中，等待加载
+    加载失败的结果不缓存；后台刷新失败时保留旧值
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 60.0,
+        stale_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大条目数，0 表示不缓存（仍合并并发加载）
+            ttl: 新鲜期（秒）
+            stale_ttl: 过期后仍可返回旧值的时间（秒）
+            clock: 计时函数，默认 time.monotonic
+        """
+        self.clock = clock
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # 键 -> (值, 写入时间)
+        self._entries: "OrderedDict[Hashable, Tuple[V, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Future[V]"] = {}
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "load_errors": 0,
+        }
+
+    def _store(self, key: Hashable, value: V) -> None:
+        """写入条目并淘汰最久未访问的条目"""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (value, self.clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _load(self, key: Hashable, loader: Loader) -> "asyncio.Future[V]":
+        """启动或加入键的加载任务"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self._counters["coalesced"] += 1
+            return future
+
+        async def run() -> V:
+            try:
+                value = await loader()
+            except Exception:
+                self._counters["load_errors"] += 1
+                raise
+            finally:
+                self._inflight.pop(key, None)
+            self._store(key, value)
+            return value
+
+        future = asyncio.ensure_future(run())
+        self._inflight[key] = future
+        return future
+
+    async def get(self, key: Hashable, loader: Loader) -> V:
+        """
+        读取缓存，未命中时调用 loader 加载
+
+        Args:
+            key: 缓存键
+            loader: 返回新值的异步函数
+
+        Returns:
+            缓存值或新加载的值
+
+        Raises:
+            Exception: 未命中且加载失败时抛出 loader 的异常
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = self.clock() - stored_at
+            if age < self.ttl:
+                self._counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._counters["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                refresh = self._load(key, loader)
+                refresh.add_done_callback(self._log_refresh_error)
+                return value
+            del self._entries[key]
+
+        self._counters["misses"] += 1
+        # shield 避免某个等待方被取消时中断其它等待方共享的加载
+        return await asyncio.shield(self._load(key, loader))
+
+    @staticmethod
+    def _log_refresh_error(future: "asyncio.Future[Any]") -> None:
+        """记录后台刷新失败，同时避免未读取的异常告警"""
+        if not future.cancelled() and future.exception() is not None:
+            log_error("缓存后台刷新失败", error=str(future.exception()))
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        删除缓存条目
+
+        Args:
+            key: 缓存键
+        """
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            Dict[str, Any]: 命中、陈旧命中、未命中、合并加载、淘汰和加载失败次数，以及当前条目数
+        """
+        lookups = (
+            self._counters["hits"]
+            + self._counters["stale_hits"]
+            + self._counters["misses"]
+        )
+        hit_ratio = (
+            (self._counters["hits"] + self._counters["stale_hits"]) / lookups
+            if lookups
+            else 0.0
+        )
+        return {
+            **self._counters,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hit_ratio": round(hit_ratio, 4),
+        }
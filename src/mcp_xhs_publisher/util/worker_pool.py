@@ -0,0 +1,124 @@
+"""
+工作线程池
+
+为异步MCP工具处理器提供有界线程池，将阻塞的小红书API调用转移到后台线程执行，
+避免单个耗时调用（如视频上传）阻塞事件循环和其它客户端的请求
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class WorkerPool:
+    """
+    有界工作线程池
+
+    同时执行的任务数不超过 max_workers，超出的调用在池内排队等待。
+    提交到池中的函数会在调用方的 contextvars 上下文中执行
+    """
+
+    def __init__(self, max_workers: int, name: str):
+        """
+        初始化线程池
+
+        Args:
+            max_workers: 最大并发线程数，小于1时按1处理
+            name: 线程池名称，用作线程名前缀
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+
+    def submit(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """
+        提交阻塞函数到线程池
+
+        Args:
+            func: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            Future: 执行结果
+        """
+        ctx = contextvars.copy_context()
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(self._invoke, ctx, func, args, kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: "Future[Any]") -> None:
+        """排队中被取消的任务不会进入工作线程，在此减少排队数"""
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在线程池中执行阻塞函数并异步等待结果
+
+        Args:
+            func: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数的返回值
+        """
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def _invoke(
+        self,
+        ctx: contextvars.Context,
+        func: Callable[..., T],
+        args: tuple,
+        kwargs: Dict[str, Any],
+    ) -> T:
+        """在工作线程中执行函数并维护计数"""
+        with self._lock:
+            self._pending -= 1
+            self._running += 1
+        try:
+            return ctx.run(functools.partial(func, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取线程池运行状态
+
+        Returns:
+            Dict[str, Any]: 包含排队数、运行数和已完成数
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "pending": self._pending,
+                "running": self._running,
+                "completed": self._completed,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        关闭线程池
+
+        Args:
+            wait: 是否等待已提交的任务完成
+        """
+        self._executor.shutdown(wait=wait)